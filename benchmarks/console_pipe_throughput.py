@@ -0,0 +1,122 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Throughput benchmark for ``console_pipe``'s tee engine.
+
+Runs a child that writes a fixed volume of line-oriented output to stdout as
+fast as it can, tees it through
+:func:`hpc_launcher.cli.console_pipe.run_process_with_live_output` into a log
+file (with the console pointed at ``/dev/null``), and reports the sustained
+rate in MB/s for each ``buffer_size`` setting. ``--zero-copy`` adds a row
+for the ``splice(2)``/``tee(2)`` path, which has no buffer size.
+
+Usage::
+
+    python benchmarks/console_pipe_throughput.py [--mb 64] [--line-bytes 120]
+        [--buffer-sizes 32 1024 4096 65536] [--zero-copy]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+from hpc_launcher.cli import console_pipe
+
+# The child writes ``--mb`` megabytes of ``--line-bytes``-long lines, in
+# writes of roughly 64 KiB so that the child itself is not the bottleneck.
+_WRITER = """
+import os, sys
+total = int(sys.argv[1])
+line = b"x" * (int(sys.argv[2]) - 1) + b"\\n"
+block = line * max(1, 65536 // len(line))
+written = 0
+while written < total:
+    os.write(1, block)
+    written += len(block)
+"""
+
+
+def measure(
+    buffer_size: int, total_bytes: int, line_bytes: int, zero_copy: bool = False
+) -> dict:
+    """
+    Tee ``total_bytes`` of child output into a scratch log file and return
+    the measured wall time and throughput.
+    """
+    command = [sys.executable, "-c", _WRITER, str(total_bytes), str(line_bytes)]
+    saved_stdout = sys.stdout
+    with open(os.devnull, "wb") as devnull, tempfile.TemporaryDirectory() as tmp:
+        sys.stdout = io.TextIOWrapper(devnull)
+        try:
+            with open(os.path.join(tmp, "out.log"), "wb") as out_file:
+                start = time.perf_counter()
+                code = console_pipe.run_process_with_live_output(
+                    command,
+                    out_file=out_file,
+                    buffer_size=buffer_size,
+                    zero_copy=zero_copy,
+                )
+                elapsed = time.perf_counter() - start
+            logged = os.path.getsize(os.path.join(tmp, "out.log"))
+        finally:
+            sys.stdout.detach()
+            sys.stdout = saved_stdout
+    if code != 0:
+        raise RuntimeError(f"writer exited with {code}")
+    return {
+        "buffer_size": "splice" if zero_copy else buffer_size,
+        "bytes": logged,
+        "seconds": elapsed,
+        "mb_per_s": logged / elapsed / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=int, default=64, help="MB of output per run")
+    parser.add_argument(
+        "--line-bytes", type=int, default=120, help="Length of each output line"
+    )
+    parser.add_argument(
+        "--buffer-sizes",
+        type=int,
+        nargs="+",
+        default=[32, 1024, 4096, 65536, 1 << 20],
+        help="buffer_size settings to compare",
+    )
+    parser.add_argument(
+        "--zero-copy",
+        action="store_true",
+        help="Also measure the splice/tee path (Linux only)",
+    )
+    args = parser.parse_args()
+
+    runs = [(size, False) for size in args.buffer_sizes]
+    if args.zero_copy:
+        runs.append((console_pipe._DEFAULT_BUFFER_SIZE, True))
+    print(f"{'buffer_size':>12} {'MB':>8} {'seconds':>9} {'MB/s':>9}")
+    for buffer_size, zero_copy in runs:
+        result = measure(
+            buffer_size, args.mb * 1000 * 1000, args.line_bytes, zero_copy
+        )
+        print(
+            f"{result['buffer_size']:>12} {result['bytes'] / 1e6:>8.1f} "
+            f"{result['seconds']:>9.3f} {result['mb_per_s']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
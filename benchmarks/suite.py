@@ -0,0 +1,283 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Start-up and hot-path benchmark suite for the launcher, with JSON results.
+
+Measures wall time and peak RSS of:
+
+``launch --dry-run`` / ``torchrun-hpc --dry-run``
+    The whole CLI, once per scheduler, as a fresh interpreter (what every
+    launch of a sweep pays before anything is submitted).
+``launcher_script``
+    Generating each scheduler's batch script.
+``expand_cli_env``
+    Collapsing a long environment list into the scheduler CLI's ``--env``s.
+``hostlist``
+    Expanding and compressing a 10,000-node hostlist.
+``console_pipe``
+    Teeing a child's output into a log file (see
+    ``console_pipe_throughput.py``), in MB/s.
+
+No scheduler needs to be installed: ``flux``, ``srun``, ``sbatch``,
+``bsub`` and ``jsrun`` are shims on ``PATH`` that exit successfully, and the
+autodetection cache lives in a scratch directory (warmed by one untimed
+run, as it is on a machine used before). Each benchmark runs in its own
+process, so that its peak RSS is its own. ``torchrun-hpc`` is skipped when
+torch is not installed (it refuses to run without it).
+
+Usage::
+
+    python benchmarks/suite.py [--repeat 10] [--output results.json]
+        [--compare baseline.json] [--only launch expand_cli_env ...]
+
+``--compare`` prints each benchmark's median time against an earlier
+results file, to track regressions between releases.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+_SHIMS = ("flux", "srun", "sbatch", "bsub", "jsrun")
+_SCHEDULERS = ("local", "flux", "slurm", "lsf")
+
+# ``expand_cli_env`` input: a realistic mix of plain values, references to
+# earlier entries and repeated keys, as a system's environment list has.
+_ENV_ENTRIES = 200
+
+
+def _cli_benchmark(module: str, scheduler: str):
+    flags = ["--local"] if scheduler == "local" else ["--scheduler", scheduler]
+    return [sys.executable, "-m", module, *flags, "-N2", "-n4", "--dry-run",
+            "--", "python", "train.py", "--epochs", "10"]
+
+
+def _time_launcher_script(repeat: int) -> dict:
+    from hpc_launcher.schedulers import get_schedulers
+    from hpc_launcher.systems.system import GenericSystem
+
+    system = GenericSystem()
+    seconds = []
+    with tempfile.TemporaryDirectory() as launch_dir:
+        for run in range(repeat + 1):  # the first run imports the schedulers
+            start = time.perf_counter()
+            for name in _SCHEDULERS:
+                scheduler = get_schedulers()[name](nodes=2, procs_per_node=4, gpus_per_proc=1)
+                for blocking in (True, False):
+                    scheduler.launcher_script(
+                        system, "python", ["train.py", "--epochs", "10"],
+                        blocking=blocking, launch_dir=launch_dir,
+                    )
+            if run:
+                seconds.append(time.perf_counter() - start)
+    return {"seconds": seconds, "scripts": 2 * len(_SCHEDULERS)}
+
+
+def _time_expand_cli_env(repeat: int) -> dict:
+    from hpc_launcher.schedulers.scheduler import Scheduler
+
+    env_list = []
+    for i in range(_ENV_ENTRIES):
+        if i % 10 == 0:
+            env_list.append(("LD_LIBRARY_PATH", f"/opt/lib{i}:${{LD_LIBRARY_PATH}}"))
+        elif i % 7 == 0:
+            env_list.append((f"BENCH_VAR_{i}", f'"${{BENCH_VAR_{i - 1}}}/sub dir"'))
+        else:
+            env_list.append((f"BENCH_VAR_{i}", f"value-{i}"))
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(100):
+            Scheduler.expand_cli_env(env_list)
+        seconds.append((time.perf_counter() - start) / 100)
+    return {"seconds": seconds, "entries": len(env_list)}
+
+
+def _time_hostlist(repeat: int) -> dict:
+    from hpc_launcher import hostlist
+
+    # Gaps every 97 nodes, as drained nodes leave in a large allocation.
+    text = ",".join(
+        f"elcap[{start:05d}-{start + 95:05d}]" for start in range(1, 10200, 97)
+    )
+    hosts = hostlist.expand(text)[:10000]
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        assert hostlist.expand(hostlist.compress(hosts)) == hosts
+        seconds.append(time.perf_counter() - start)
+    return {"seconds": seconds, "hosts": len(hosts)}
+
+
+def _time_console_pipe(repeat: int) -> dict:
+    sys.path.insert(0, _HERE)
+    from console_pipe_throughput import measure
+
+    runs = [measure(65536, 32 * 1000 * 1000, 120) for _ in range(repeat)]
+    return {
+        "seconds": [run["seconds"] for run in runs],
+        "mb_per_s": statistics.median(run["mb_per_s"] for run in runs),
+    }
+
+
+# In-process benchmarks, each run by ``--run NAME`` in a child process.
+_IN_PROCESS = {
+    "launcher_script": _time_launcher_script,
+    "expand_cli_env": _time_expand_cli_env,
+    "hostlist": _time_hostlist,
+    "console_pipe": _time_console_pipe,
+}
+
+
+def _wait(command: list[str], env: dict, stdout=subprocess.DEVNULL, cwd=None) -> tuple:
+    """Run ``command``; return its wall time, peak RSS (KiB), exit status and output."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, env=env, stdout=stdout, stderr=subprocess.PIPE, cwd=cwd)
+    output = proc.stdout.read() if proc.stdout else None
+    proc.stderr.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - start, rusage.ru_maxrss, proc.returncode, output
+
+
+def _summary(name: str, seconds: list[float], peak_rss_kb: int, **extra) -> dict:
+    return {
+        "name": name,
+        "median_seconds": statistics.median(seconds),
+        "min_seconds": min(seconds),
+        "max_seconds": max(seconds),
+        "runs": len(seconds),
+        "peak_rss_kb": peak_rss_kb,
+        **extra,
+    }
+
+
+def _run_cli(name: str, command: list[str], env: dict, repeat: int, cwd: str) -> dict:
+    _wait(command, env, cwd=cwd)  # warm the autodetection cache and the page cache
+    seconds, peak = [], 0
+    for _ in range(repeat):
+        elapsed, rss, code, _ = _wait(command, env, cwd=cwd)
+        if code != 0:
+            raise RuntimeError(f"{name}: {' '.join(command)} exited with {code}")
+        seconds.append(elapsed)
+        peak = max(peak, rss)
+    return _summary(name, seconds, peak)
+
+
+def _run_in_process(name: str, env: dict, repeat: int) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--run", name, "--repeat", str(repeat)]
+    _, rss, code, output = _wait(command, env, stdout=subprocess.PIPE)
+    if code != 0:
+        raise RuntimeError(f"{name} exited with {code}")
+    result = json.loads(output)
+    return _summary(name, result.pop("seconds"), rss, **result)
+
+
+def run_suite(repeat: int, only: list[str] = ()) -> dict:
+    """Run the benchmarks (those whose name starts with one of ``only``, if given)."""
+    with tempfile.TemporaryDirectory() as scratch:
+        shims = os.path.join(scratch, "bin")
+        os.mkdir(shims)
+        for shim in _SHIMS:
+            path = os.path.join(shims, shim)
+            with open(path, "w") as f:
+                f.write("#!/bin/sh\nexit 0\n")
+            os.chmod(path, 0o755)
+        env = dict(os.environ)
+        env["PATH"] = shims + os.pathsep + env.get("PATH", "")
+        env["XDG_CACHE_HOME"] = os.path.join(scratch, "cache")
+
+        results = []
+
+        def wanted(name):
+            return not only or any(name.startswith(prefix) for prefix in only)
+
+        has_torch = importlib.util.find_spec("torch") is not None
+        for cli, module in (("launch", "hpc_launcher.cli.launch"),
+                            ("torchrun-hpc", "hpc_launcher.cli.torchrun_hpc")):
+            for scheduler in _SCHEDULERS:
+                name = f"{cli} --dry-run ({scheduler})"
+                if not wanted(name):
+                    continue
+                if cli == "torchrun-hpc" and not has_torch:
+                    results.append({"name": name, "skipped": "torch is not installed"})
+                    continue
+                results.append(
+                    _run_cli(name, _cli_benchmark(module, scheduler), env, repeat, scratch)
+                )
+        for name in _IN_PROCESS:
+            if wanted(name):
+                results.append(_run_in_process(name, env, repeat))
+
+    from hpc_launcher.version import __version__
+
+    return {
+        "hpc_launcher": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        "benchmarks": results,
+    }
+
+
+def compare(results: dict, baseline: dict) -> str:
+    """A table of each benchmark's median time against ``baseline``'s."""
+    before = {b["name"]: b for b in baseline["benchmarks"] if "median_seconds" in b}
+    lines = [f"{'benchmark':<34} {'baseline':>10} {'now':>10} {'ratio':>7}"]
+    for bench in results["benchmarks"]:
+        if "median_seconds" not in bench or bench["name"] not in before:
+            continue
+        old, new = before[bench["name"]]["median_seconds"], bench["median_seconds"]
+        lines.append(f"{bench['name']:<34} {old:>9.4f}s {new:>9.4f}s {new / old:>6.2f}x")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per benchmark")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier results file")
+    parser.add_argument("--only", nargs="+", default=[], metavar="PREFIX",
+                        help="Run only the benchmarks whose names start with these")
+    parser.add_argument("--run", choices=_IN_PROCESS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        json.dump(_IN_PROCESS[args.run](args.repeat), sys.stdout)
+        return
+
+    results = run_suite(args.repeat, args.only)
+    text = json.dumps(results, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
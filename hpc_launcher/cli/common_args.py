@@ -15,9 +15,12 @@
 Common arguments for CLI utilities.
 """
 import argparse
+from hpc_launcher.cli.rank_demux import parse_rank_set
+from hpc_launcher.cli.logs import LOG_COMPRESSORS, check_compressor, parse_byte_size
+from hpc_launcher.cli.output_tail import parse_tail_size
 from hpc_launcher.schedulers import get_schedulers
 from hpc_launcher.schedulers.scheduler import Scheduler
-from hpc_launcher.schedulers.local import LocalScheduler
+from hpc_launcher.schedulers.local import LocalParallelScheduler, LocalScheduler
 from hpc_launcher.systems.system import System, GenericSystem
 from hpc_launcher.systems import autodetect, configure
 import logging
@@ -94,6 +97,10 @@ class ParseOverrideKVAction(argparse.Action):
 # working invocation into a hard failure would be a poor trade.
 COMM_BACKEND_CHOICES = ("MPI", "NCCL", "RCCL", "*CCL")
 
+# Where torchrun-hpc's node-local copies (--stage-env, --pycache,
+# --kernel-cache) go by default.
+DEFAULT_NODE_DIR = "/tmp"
+
 
 def resolve_comm_backend(job_comm_protocol: Optional[str]) -> Optional[str]:
     """
@@ -375,6 +382,14 @@ def setup_arguments(parser: argparse.ArgumentParser):
         help="Specifies some or all of the parameters of a system as a dictionary (note it will override any known or autodetected parameters): -p cores_per_node=<int> gpus_per_node=<int> gpu_arch=<str> mem_per_gpu=<float> numa_domains=<int> scheduler=<str>\n -p cores_per_node=<int> gpus_per_node=<int>. \n Also note that a double dash -- is need if this is the last argument",
         metavar="KEY=VALUE",
     )
+    group.add_argument(
+        "--redetect",
+        action="store_true",
+        default=False,
+        help="Probe an unrecognized system's GPUs, CPUs and scheduler again "
+        "instead of reusing the results cached for this host and boot "
+        "(under $XDG_CACHE_HOME/hpc-launcher), and refresh the cache",
+    )
 
     group = parser.add_argument_group("Logging", "Logging parameters")
     group.add_argument(
@@ -398,6 +413,102 @@ def setup_arguments(parser: argparse.ArgumentParser):
         help="If True, uses terminal colors to color the standard error "
         "outputs in red. This does not affect the output files",
     )
+    group.add_argument(
+        "--zero-copy-logs",
+        action="store_true",
+        default=False,
+        help="On Linux, replicate the job's outputs to the console and the "
+        "log files of a blocking launch with splice/tee, without copying "
+        "them through the launcher. Ignored (with a warning) together with "
+        "--color-stderr, --demux-ranks, --console-ranks, --event-log or "
+        "--timeline, which need to read the output, and where unsupported",
+    )
+    group.add_argument(
+        "--demux-ranks",
+        action="store_true",
+        default=False,
+        help="Have the scheduler label each output line with its rank and "
+        "also write every rank's output to its own out.rank<N>.log and "
+        "err.rank<N>.log in the launch directory (blocking launches only)",
+    )
+    group.add_argument(
+        "--console-ranks",
+        default=None,
+        metavar="RANKS",
+        help="Only show the output of these ranks on the console, e.g. 0 or "
+        "0-3,8 (the log files still receive every rank). Labels each output "
+        "line with its rank",
+    )
+    group.add_argument(
+        "--log-rotate-size",
+        type=parse_byte_size,
+        default=None,
+        metavar="SIZE",
+        help="Continue the log files in a new numbered segment (out.log.0, "
+        "out.log.1, ...) after SIZE bytes of output, e.g. 512M or 2G "
+        "(blocking launches only). Read them back with: launch logs <folder>",
+    )
+    group.add_argument(
+        "--log-compress",
+        choices=tuple(LOG_COMPRESSORS),
+        default=None,
+        help="Compress the log files as they are written (out.log.gz or "
+        "out.log.zst; blocking launches only). zstd requires the zstandard "
+        "package. Read them back with: launch logs <folder>",
+    )
+    group.add_argument(
+        "--crash-summary-size",
+        type=parse_tail_size,
+        default=None,
+        dest="output_tail_size",
+        metavar="SIZE",
+        help="Keep SIZE bytes of recent output per stream (e.g. 256K) so "
+        "that a failed blocking launch ends with a summary of its distinct "
+        "tracebacks and the ranks that printed them. Tracebacks are only "
+        "read from rank-labeled output (--demux-ranks, --console-ranks) or "
+        "a single-process job (default: off)",
+    )
+    group.add_argument(
+        "--event-log",
+        action="store_true",
+        default=False,
+        help="Also write events.jsonl to the launch directory: one JSON "
+        "record per output line with its time, stream, rank (if labeled) "
+        "and byte offset into out.log/err.log (blocking launches only)",
+    )
+    group.add_argument(
+        "--log-metrics",
+        action="store_true",
+        default=False,
+        help="Write log_metrics.json to the launch directory when a blocking "
+        "launch ends: how far the thread writing the log files fell behind "
+        "the job's output (bytes queued, peak queue depth, time blocked)",
+    )
+    group.add_argument(
+        "--log-index",
+        action="store_true",
+        default=False,
+        help="Also write out.log.idx/err.log.idx during a blocking launch: "
+        "checkpoints (line, byte offset, time) that let launch logs "
+        "--line/--since seek straight into a large log",
+    )
+    group.add_argument(
+        "--log-index-interval",
+        type=int,
+        default=None,
+        metavar="LINES",
+        help="Lines between the checkpoints written with --log-index "
+        "(default: 1000)",
+    )
+    group.add_argument(
+        "--timeline",
+        action="store_true",
+        default=False,
+        help="Write timeline.json to the launch directory: a Chrome trace "
+        "(open it in Perfetto) of where the launch's time went, from "
+        "argument parsing through submission to the job's first output, "
+        "with each torchrun-hpc rank's start-up and init_process_group",
+    )
 
 
 def validate_arguments(args: argparse.Namespace):
@@ -525,6 +636,65 @@ def validate_arguments(args: argparse.Namespace):
             f"stderr into stdout in the launched command instead."
         )
 
+    if args.demux_ranks and (args.launch_dir is None or args.bg):
+        raise ValueError(
+            "--demux-ranks writes per-rank log files while the launcher tees "
+            "the job's output, which requires a blocking launch with a "
+            "launch directory (-l) and no --bg"
+        )
+    if args.console_ranks is not None:
+        if args.bg:
+            raise ValueError(
+                "--console-ranks filters the console output of a blocking "
+                "launch and cannot be combined with --bg"
+            )
+        parse_rank_set(args.console_ranks)
+
+    if (args.log_rotate_size or args.log_compress or args.event_log
+            or args.log_metrics or args.log_index):
+        if args.launch_dir is None or args.bg:
+            raise ValueError(
+                "--log-rotate-size, --log-compress, --event-log, "
+                "--log-metrics and --log-index apply to the log files the "
+                "launcher writes during a blocking launch with a launch "
+                "directory (-l), and cannot be used without -l or with --bg"
+            )
+        check_compressor(args.log_compress)
+
+    if args.zero_copy_logs:
+        readers = [
+            flag
+            for flag, given in (
+                ("--color-stderr", args.color_stderr),
+                ("--demux-ranks", args.demux_ranks),
+                ("--console-ranks", args.console_ranks is not None),
+                ("--event-log", args.event_log),
+                ("--timeline", args.timeline),
+            )
+            if given
+        ]
+        if readers:
+            # Each of these reads or rewrites the output on its way to the
+            # console or the log, which splice/tee would bypass, so
+            # console_pipe quietly takes the copying path instead.
+            logger.warning(
+                f"--zero-copy-logs is ignored with {', '.join(readers)}: "
+                f"the job's output has to pass through the launcher to be "
+                f"read, so it is copied through it as usual"
+            )
+
+    if args.log_index_interval is not None:
+        if not args.log_index:
+            raise ValueError("--log-index-interval only applies with --log-index")
+        if args.log_index_interval <= 0:
+            raise ValueError("--log-index-interval must be positive")
+
+    if args.timeline and args.launch_dir is None:
+        raise ValueError(
+            "--timeline writes timeline.json into the launch directory, and "
+            "cannot be used without -l"
+        )
+
     if args.output_script and args.batch_script:
         raise ValueError("Cannot specify both an output script name: {args.output_script} and a pre-generated batch script {args.batch_script}.")
 
@@ -586,6 +756,13 @@ def validate_scheduler_arguments(
     if not isinstance(scheduler, LocalScheduler):
         return
 
+    # Only a batch scheduler can submit a job array (launch --sweep).
+    if getattr(args, "sweep", None):
+        raise ValueError(
+            f"--sweep submits a job array, which {type(scheduler).__name__} "
+            f"cannot do: select a batch scheduler"
+        )
+
     # A local "submission" is just running the script: there is no scheduler
     # to hand it to, and no server-side redirection to point at
     # out.log/err.log (a real scheduler sets --output/--error on the submit
@@ -599,6 +776,16 @@ def validate_scheduler_arguments(
             f"({type(scheduler).__name__} was selected)"
         )
 
+    # --scheduler local-parallel forks the ranks of one node itself; it has
+    # no way to run more nodes than the one it is on.
+    if isinstance(scheduler, LocalParallelScheduler):
+        if args.nodes and args.nodes > 1:
+            raise ValueError(
+                f"--scheduler local-parallel runs the ranks of one node on this "
+                f"host, but {args.nodes} nodes were requested"
+            )
+        return
+
     # --local starts exactly one process. It does not spawn -N/-n/-g, and it
     # cannot: there is no launcher to spawn them with. Saying so is the whole
     # remedy -- a user smoke-testing a distributed script otherwise gets a
@@ -608,9 +795,9 @@ def validate_scheduler_arguments(
         logger.warning(
             f'"--local" runs a single process: the requested job size of '
             f"{requested_procs} processes is not spawned, so nothing "
-            f"distributed is exercised. Drop --local (or select a batch "
-            f"scheduler with --scheduler) to actually run {requested_procs} "
-            f"processes."
+            f"distributed is exercised. Use --scheduler local-parallel to fork "
+            f"the ranks of one node on this host, or select a batch scheduler "
+            f"with --scheduler, to actually run {requested_procs} processes."
         )
 
 
@@ -630,6 +817,7 @@ def process_arguments(args: argparse.Namespace, logger: logging.Logger) -> Syste
             args.gpumem_at_least,
             args.system_params,
             resolve_comm_backend(args.job_comm_protocol),
+            redetect=args.redetect,
         )
     )
 
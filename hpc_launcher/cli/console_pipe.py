@@ -8,18 +8,40 @@ but modernized to use ``async def``.
 """
 
 import asyncio
+import collections
+import ctypes
+import ctypes.util
+import errno
 import io
+import json
 import os
 import signal
 import sys
 import subprocess
-from typing import Optional
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+from hpc_launcher.cli.rank_demux import RankDemux
 
 # Bounded time (in seconds) to wait for a child to exit after we forward a
 # termination signal to it before escalating to SIGKILL. Keeps Ctrl-C from
 # wedging the launcher when the child ignores the first signal.
 _CHILD_SHUTDOWN_TIMEOUT = 5.0
 
+# Initial (and smallest) read size, in bytes, for each replicated stream.
+_DEFAULT_BUFFER_SIZE = 4096
+# Upper bound on a single read once the adaptive read size has grown. This is
+# also the child pipes' StreamReader limit, so that the reader may buffer at
+# least one full read before pausing the pipe.
+_MAX_READ_SIZE = 1 << 20
+# Longest time (in seconds) replicated output may sit in a buffer before it
+# is flushed to the console and the log files.
+_FLUSH_INTERVAL = 0.05
+# Most log-file output (in bytes) that may wait in memory for the log writer
+# thread before the readers stop draining the child's pipes.
+_LOG_QUEUE_BYTES = 64 << 20
+
 
 def _signal_child_process(process: "asyncio.subprocess.Process", signum: int) -> None:
     """
@@ -52,22 +74,455 @@ async def _reap(process: "asyncio.subprocess.Process", timeout: Optional[float])
         return False
 
 
+class _LatencyBoundedWriter:
+    """
+    Wraps one binary output stream so that writes are coalesced and flushed
+    on a bounded-latency timer instead of after every chunk.
+
+    Data written here goes straight into the wrapped stream's own buffer
+    (``sys.stdout.buffer`` and the ``"wb"`` log files are both
+    ``io.BufferedWriter``s, which already coalesce small writes into one
+    system call). What used to make the tee expensive was the explicit
+    ``flush()`` issued after every 32-byte read, which defeated that
+    buffering and turned every chunk into a ``write(2)`` on both the
+    console and the log file. A flush is now issued at most
+    ``flush_interval`` seconds after the first unflushed write, so output
+    still reaches its destination promptly while a high-volume stream pays
+    for one system call per buffer rather than one per chunk.
+
+    A stream attached to a terminal is additionally flushed as soon as a
+    complete line has been written, so interactive use looks exactly as it
+    did before.
+    """
+
+    def __init__(self, stream, loop: asyncio.AbstractEventLoop, flush_interval: float):
+        self.stream = stream
+        self._loop = loop
+        self._flush_interval = flush_interval
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # An error raised by a timer-driven flush has no caller to reach, so
+        # it is kept and re-raised from the next write or flush instead.
+        self._deferred_error: Optional[BaseException] = None
+        try:
+            self._line_buffered = stream.isatty()
+        except (AttributeError, ValueError, OSError):
+            self._line_buffered = False
+
+    def write(self, data: bytes) -> None:
+        self._raise_deferred_error()
+        self.stream.write(data)
+        if self._line_buffered and b"\n" in data:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(
+                self._flush_interval, self._flush_from_timer
+            )
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._raise_deferred_error()
+        self.stream.flush()
+
+    def _flush_from_timer(self) -> None:
+        self._timer = None
+        try:
+            self.stream.flush()
+        except Exception as e:
+            self._deferred_error = e
+
+    def _raise_deferred_error(self) -> None:
+        if self._deferred_error is not None:
+            error, self._deferred_error = self._deferred_error, None
+            raise error
+
+
+# Queued in place of data to close a stream on the log writer thread.
+_CLOSE = object()
+
+
+class _LogWriterThread:
+    """
+    Writes the log files on a dedicated thread, fed through a bounded queue.
+
+    A log write on the event loop stalls the readers for as long as the file
+    system takes to accept it, and on a busy parallel file system that can
+    be long enough for the child's pipe to fill and the job itself to block
+    on ``write``. Here the event loop only appends the chunk to an in-memory
+    queue and returns to reading, while this thread performs the writes (and
+    flushes) in order.
+
+    The queue is bounded by ``max_queued_bytes``: once the file system falls
+    that far behind, :meth:`put` blocks the event loop until the thread
+    catches up, which is the same back-pressure the child saw before, only
+    deferred by the size of the queue. The time spent blocked, the volume
+    queued and the peak depth are kept in :meth:`metrics`.
+
+    An error raised by a write has no caller on this thread, so it is kept
+    and re-raised from the next :meth:`put` and from :meth:`close`.
+
+    A stream is anything with ``write`` and ``flush``; the data queued for
+    it only needs a length, so :class:`hpc_launcher.cli.rank_demux.RankDemux`
+    queues its per-rank batches here too.
+    """
+
+    def __init__(self, max_queued_bytes: int = _LOG_QUEUE_BYTES):
+        self._max_queued_bytes = max(1, max_queued_bytes)
+        self._cond = threading.Condition()
+        # (stream, data) entries, in order; ``data`` is None for a flush and
+        # _CLOSE to close the stream.
+        self._queue: "collections.deque[tuple[object, Optional[bytes]]]" = (
+            collections.deque()
+        )
+        self._queued_bytes = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._bytes_queued = 0
+        self._chunks_queued = 0
+        self._blocked_puts = 0
+        self._blocked_seconds = 0.0
+        self._peak_queue_bytes = 0
+        self._peak_queue_chunks = 0
+        self._thread = threading.Thread(
+            target=self._run, name="hpc-launcher-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stream(self, file) -> "_QueuedLogFile":
+        """A write/flush proxy for ``file`` that queues to this thread."""
+        return _QueuedLogFile(self, file)
+
+    def put(self, stream, data: Optional[bytes]) -> None:
+        """Queue ``data`` for ``stream`` (or a flush if ``data`` is None)."""
+        size = 0 if data is None or data is _CLOSE else len(data)
+        with self._cond:
+            self._raise_error()
+            if self._queued_bytes and self._queued_bytes + size > self._max_queued_bytes:
+                start = time.perf_counter()
+                self._blocked_puts += 1
+                while (
+                    self._error is None
+                    and self._queued_bytes
+                    and self._queued_bytes + size > self._max_queued_bytes
+                ):
+                    self._cond.wait()
+                self._blocked_seconds += time.perf_counter() - start
+                self._raise_error()
+            self._queue.append((stream, data))
+            if size:
+                self._queued_bytes += size
+                self._bytes_queued += size
+                self._chunks_queued += 1
+                self._peak_queue_bytes = max(self._peak_queue_bytes, self._queued_bytes)
+                self._peak_queue_chunks = max(self._peak_queue_chunks, len(self._queue))
+            self._cond.notify_all()
+
+    def close_stream(self, stream) -> None:
+        """Queue closing ``stream`` once everything queued for it is written."""
+        self.put(stream, _CLOSE)
+
+    def close(self) -> None:
+        """Write out everything queued, stop the thread, and report errors."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        with self._cond:
+            self._raise_error()
+
+    def metrics(self) -> dict:
+        """Counters describing how far the log writes fell behind."""
+        with self._cond:
+            return {
+                "bytes_queued": self._bytes_queued,
+                "chunks_queued": self._chunks_queued,
+                "blocked_puts": self._blocked_puts,
+                "blocked_seconds": round(self._blocked_seconds, 6),
+                "peak_queue_bytes": self._peak_queue_bytes,
+                "peak_queue_chunks": self._peak_queue_chunks,
+                "max_queue_bytes": self._max_queued_bytes,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+            written = 0
+            try:
+                for stream, data in batch:
+                    if data is None:
+                        stream.flush()
+                    elif data is _CLOSE:
+                        stream.close()
+                    else:
+                        stream.write(data)
+                        written += len(data)
+            except BaseException as e:
+                with self._cond:
+                    self._error = e
+                    self._queue.clear()
+                    self._queued_bytes = 0
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                # Released only once written, so the bound covers everything
+                # held in memory, including the batch being written.
+                self._queued_bytes -= written
+                self._cond.notify_all()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+
+class _QueuedLogFile:
+    """The stream interface ``replicate_output`` writes a log file through."""
+
+    def __init__(self, writer: _LogWriterThread, file):
+        self._writer = writer
+        self._file = file
+
+    def isatty(self) -> bool:
+        return False
+
+    def write(self, data: bytes) -> None:
+        self._writer.put(self._file, bytes(data))
+
+    def flush(self) -> None:
+        self._writer.put(self._file, None)
+
+
 async def replicate_output(
-    input_stream, out1, out2=None, prefix=b"", suffix=b"", buffer_size=32
+    input_stream,
+    out1,
+    out2=None,
+    prefix=b"",
+    suffix=b"",
+    buffer_size=_DEFAULT_BUFFER_SIZE,
+    flush_interval=_FLUSH_INTERVAL,
+    taps: Sequence = (),
 ):
     """
-    Reads a stream, ``buffer_size`` characters at a time, and replicates
-    outputs to ``out1`` and ``out2``.
+    Reads a stream and replicates its contents to ``out1`` and ``out2``.
+
+    Reads start at ``buffer_size`` bytes and adapt to the stream: whenever a
+    read comes back full, the next one asks for twice as much (up to
+    ``_MAX_READ_SIZE``), and a read that comes back less than half full
+    halves it again (down to ``buffer_size``). A chatty job is therefore
+    drained in a handful of large reads per event-loop iteration, while a
+    quiet one is not handed oversized buffers for single lines.
+
+    Writes to both outputs are coalesced and flushed on a latency timer (see
+    :class:`_LatencyBoundedWriter`); everything still buffered is flushed
+    before this returns, including when it is cancelled.
+
+    :param input_stream: An ``asyncio.StreamReader`` to drain.
+    :param out1: The primary (console) binary stream. ``prefix`` and
+                 ``suffix`` are written around each chunk sent here.
+    :param out2: An optional secondary binary stream (a log file), which
+                 receives the raw bytes only.
+    :param prefix: Bytes written to ``out1`` before each chunk.
+    :param suffix: Bytes written to ``out1`` after each chunk.
+    :param buffer_size: The initial, and smallest, read size in bytes.
+    :param flush_interval: The longest time, in seconds, that written data
+                           may sit unflushed.
+    :param taps: Objects whose ``write`` is also handed every raw chunk as
+                 it is read (e.g. the crash-summary
+                 :class:`hpc_launcher.cli.output_tail.RingBuffer`). They
+                 share this reader's reads, cost no extra pipe traffic and
+                 are never flushed here.
     """
-    while True:
-        line = await input_stream.read(buffer_size)
-        if not line:  # EOF
-            break
-        out1.write(prefix + line + suffix)
-        out1.flush()
-        if out2 is not None:
-            out2.write(line)
-            out2.flush()
+    loop = asyncio.get_running_loop()
+    outputs = [_LatencyBoundedWriter(out1, loop, flush_interval)]
+    if out2 is not None:
+        outputs.append(_LatencyBoundedWriter(out2, loop, flush_interval))
+    console = outputs[0]
+
+    min_read = max(1, buffer_size)
+    max_read = max(min_read, _MAX_READ_SIZE)
+    read_size = min_read
+    try:
+        while True:
+            chunk = await input_stream.read(read_size)
+            if not chunk:  # EOF
+                break
+            if len(chunk) >= read_size:
+                read_size = min(read_size * 2, max_read)
+            elif len(chunk) < read_size // 2:
+                read_size = max(read_size // 2, min_read)
+
+            if prefix or suffix:
+                console.write(prefix + chunk + suffix)
+            else:
+                console.write(chunk)
+            for out in outputs[1:]:
+                out.write(chunk)
+            for tap in taps:
+                tap.write(chunk)
+    except BaseException:
+        # Cancelled (e.g. by a forwarded Ctrl-C) or failed: still push out
+        # what was already read, but never let a flush error mask the
+        # original exception.
+        for out in outputs:
+            try:
+                out.flush()
+            except Exception:
+                pass
+        raise
+    for out in outputs:
+        out.flush()
+
+
+# ---------------------------------------------------------------------------
+# Zero-copy replication (Linux)
+# ---------------------------------------------------------------------------
+
+# Bytes moved per tee(2)/splice(2) call: one default pipe buffer.
+_SPLICE_CHUNK = 1 << 16
+
+
+def _load_tee() -> Optional[Callable[[int, int, int, int], int]]:
+    """
+    Return libc's ``tee(2)``, or None where it (or ``os.splice``) is missing.
+
+    Python exposes ``splice(2)`` as ``os.splice`` (3.10+, Linux only) but has
+    no binding for ``tee(2)``, the call that duplicates a pipe's contents into
+    a second pipe without consuming them, so it is taken from libc directly.
+    """
+    if not hasattr(os, "splice") or not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        tee = libc.tee
+    except (OSError, AttributeError, TypeError):
+        return None
+    tee.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_size_t, ctypes.c_uint]
+    tee.restype = ctypes.c_ssize_t
+    return tee
+
+
+def _fileno(stream) -> Optional[int]:
+    """The file descriptor behind ``stream``, or None if it has none."""
+    try:
+        return stream.fileno()
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+class _ZeroCopyTee:
+    """
+    Duplicates one of the child's output pipes into the console and a log
+    file without copying the data through Python objects.
+
+    Each iteration ``tee(2)``s up to one pipe buffer from the child's pipe
+    into a private pipe (which leaves the data in place), ``splice(2)``s the
+    same number of bytes from the child's pipe into the log file, and then
+    splices the private pipe's copy to the console. With no log file the
+    child's pipe is spliced straight to the console.
+
+    Not every destination accepts ``splice(2)`` -- most notably a terminal,
+    and some file systems -- so a destination that rejects it is switched to
+    a plain ``read``/``write`` copy for the rest of the run. The file side,
+    which carries the volume, stays zero-copy on every local file system.
+
+    Runs on a thread: the calls block, and are driven by the child's output.
+    """
+
+    def __init__(self, tee, source_fd: int, console_fd: int, file_fd: Optional[int]):
+        self._tee = tee
+        self._source_fd = source_fd
+        self._console_fd = console_fd
+        self._file_fd = file_fd
+        self._copy_fds: set[int] = set()
+
+    def run(self) -> None:
+        try:
+            if self._file_fd is None:
+                while self._move(self._source_fd, self._console_fd, _SPLICE_CHUNK):
+                    pass
+                return
+            mirror_r, mirror_w = os.pipe()
+            try:
+                while True:
+                    count = self._tee(self._source_fd, mirror_w, _SPLICE_CHUNK, 0)
+                    if count < 0:
+                        err = ctypes.get_errno()
+                        if err == errno.EINTR:
+                            continue
+                        raise OSError(err, os.strerror(err))
+                    if count == 0:  # EOF: every writer has closed the pipe
+                        break
+                    self._move_exactly(self._source_fd, self._file_fd, count)
+                    self._move_exactly(mirror_r, self._console_fd, count)
+            finally:
+                os.close(mirror_r)
+                os.close(mirror_w)
+        finally:
+            os.close(self._source_fd)
+
+    def _move(self, src: int, dst: int, count: int) -> int:
+        """Move up to ``count`` bytes from pipe ``src`` to ``dst``; 0 at EOF."""
+        if dst not in self._copy_fds:
+            try:
+                return os.splice(src, dst, count)
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                    raise
+                self._copy_fds.add(dst)
+        data = os.read(src, count)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(dst, view):]
+        return len(data)
+
+    def _move_exactly(self, src: int, dst: int, count: int) -> None:
+        while count:
+            moved = self._move(src, dst, count)
+            if not moved:
+                raise EOFError("pipe closed while data was being replicated")
+            count -= moved
+
+
+def _run_in_daemon_thread(
+    loop: asyncio.AbstractEventLoop, target: Callable[[], None]
+) -> "asyncio.Future":
+    """
+    Run ``target`` on a daemon thread and return a future for its completion.
+
+    A daemon thread rather than an executor: a zero-copy loop only returns
+    once every writer of the child's pipe has exited, and neither a Ctrl-C
+    that has already been forwarded nor ``asyncio.run``'s executor shutdown
+    should then wait on a grandchild that escaped the process group.
+    """
+    future = loop.create_future()
+
+    def _resolve(error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def _target() -> None:
+        error = None
+        try:
+            target()
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(_resolve, error)
+        except RuntimeError:  # the loop has already been closed
+            pass
+
+    threading.Thread(target=_target, daemon=True).start()
+    return future
 
 
 async def _run_process(
@@ -75,8 +530,14 @@ async def _run_process(
     out_file: Optional[io.FileIO] = None,
     err_file: Optional[io.FileIO] = None,
     color_stderr: bool = False,
-    buffer_size: int = 32,
+    buffer_size: int = _DEFAULT_BUFFER_SIZE,
     env: Optional[dict[str, str]] = None,
+    zero_copy: bool = False,
+    console_ranks: Optional[frozenset[int]] = None,
+    demux_ranks: bool = False,
+    log_metrics_file: Optional[str] = None,
+    out_taps: Sequence = (),
+    err_taps: Sequence = (),
 ) -> int:
     """
     Runs a process asynchronously and pipes its stdout and stderr to up to two
@@ -88,50 +549,159 @@ async def _run_process(
     :param err_file: An optional handle to a file to pipe ``stderr`` to. Note
                      that the file must be opened in binary mode.
     :param color_stderr: If True, colors the standard error output in red.
-    :param buffer_size: Output buffer size in characters.
+    :param buffer_size: Initial read size in bytes; see
+                        :func:`replicate_output`.
     :param env: An optional complete environment for the child. ``None``
                 (the default) inherits the launcher's own environment; a
                 caller that has an environment to inject and no other channel
                 for it (see ``Scheduler.ephemeral_environment``) passes the
                 merged mapping here.
+    :param zero_copy: If True, replicate with ``splice(2)``/``tee(2)`` (see
+                      :class:`_ZeroCopyTee`) when the platform and the
+                      outputs allow it, falling back to the ``asyncio``
+                      readers otherwise. Never used with ``color_stderr``,
+                      which has to add bytes to the console stream, nor
+                      with ``console_ranks``, ``demux_ranks`` or any tap,
+                      which have to read every byte.
+    :param console_ranks: If given, only lines labeled with one of these
+                          ranks (and unlabeled lines) reach the console.
+    :param demux_ranks: If True, also write each rank's labeled lines to
+                        its own file next to ``out_file``/``err_file`` (see
+                        :class:`hpc_launcher.cli.rank_demux.RankDemux`).
+    :param log_metrics_file: If given, where to write the log writer
+                             thread's metrics (see :class:`_LogWriterThread`)
+                             as JSON once the run ends.
+    :param out_taps: Extra sinks for the raw standard output (see
+                     :func:`replicate_output`).
+    :param err_taps: Extra sinks for the raw standard error.
     :return: The command's exit code.
     """
+    loop = asyncio.get_running_loop()
+    err_prefix, err_suffix = (b"\033[31m", b"\033[0m") if color_stderr else (b"", b"")
+    demuxing = demux_ranks or console_ranks is not None
+    demuxes = [None, None]
+    tee = (
+        _load_tee()
+        if zero_copy
+        and not color_stderr
+        and not demuxing
+        and not out_taps
+        and not err_taps
+        else None
+    )
+    console_fds = (_fileno(sys.stdout.buffer), _fileno(sys.stderr.buffer))
+    file_fds = tuple(None if f is None else _fileno(f) for f in (out_file, err_file))
+    use_zero_copy = (
+        tee is not None
+        and None not in console_fds
+        and all(fd is not None for f, fd in zip((out_file, err_file), file_fds) if f)
+    )
+
     # Create the subprocess in its own session/process group so that we can
     # (a) forward Ctrl-C to the whole child tree without also signalling
     # ourselves, and (b) reliably kill grandchildren the scheduler script may
     # spawn.
     args = [] if len(command) == 1 else command[1:]
-    process = await asyncio.create_subprocess_exec(
-        command[0],
-        *args,
-        bufsize=0,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        start_new_session=True,
-        env=env,
-    )
+    log_writer: Optional[_LogWriterThread] = None
+    if use_zero_copy:
+        # The child writes into pipes we own outright, so that their read
+        # ends can be handed to tee(2)/splice(2) rather than to asyncio.
+        for stream in (sys.stdout, sys.stderr, out_file, err_file):
+            if stream is not None:
+                stream.flush()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                command[0],
+                *args,
+                bufsize=0,
+                stdout=out_w,
+                stderr=err_w,
+                start_new_session=True,
+                env=env,
+            )
+        except BaseException:
+            os.close(out_r)
+            os.close(err_r)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+        gather_task = asyncio.gather(
+            _run_in_daemon_thread(
+                loop, _ZeroCopyTee(tee, out_r, console_fds[0], file_fds[0]).run
+            ),
+            _run_in_daemon_thread(
+                loop, _ZeroCopyTee(tee, err_r, console_fds[1], file_fds[1]).run
+            ),
+        )
+    else:
+        process = await asyncio.create_subprocess_exec(
+            command[0],
+            *args,
+            bufsize=0,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+            env=env,
+            limit=_MAX_READ_SIZE,
+        )
 
-    # Read the stdout and stderr concurrently.
-    gather_task = asyncio.gather(
-        replicate_output(
-            process.stdout, sys.stdout.buffer, out_file, buffer_size=buffer_size
-        ),
-        replicate_output(
-            process.stderr,
-            sys.stderr.buffer,
-            err_file,
-            prefix=(b"\033[31m" if color_stderr else b""),
-            suffix=(b"\033[0m" if color_stderr else b""),
-            buffer_size=buffer_size,
-        ),
-    )
+        # Log files are written on their own thread; the console stays here.
+        if out_file is not None or err_file is not None:
+            log_writer = _LogWriterThread()
+        if demuxing:
+
+            def _demux(console, log, prefix=b"", suffix=b""):
+                log_name = getattr(log, "name", None) if demux_ranks else None
+                return RankDemux(
+                    console,
+                    log_name if isinstance(log_name, str) else None,
+                    console_ranks,
+                    prefix=prefix,
+                    suffix=suffix,
+                    log_writer=log_writer,
+                )
+
+            # The demux colors whole lines itself: a color code written in
+            # front of a chunk would hide the rank label of its first line.
+            demuxes = [
+                _demux(sys.stdout.buffer, out_file),
+                _demux(sys.stderr.buffer, err_file, err_prefix, err_suffix),
+            ]
+            err_prefix = err_suffix = b""
+        if log_writer is not None:
+            if out_file is not None:
+                out_file = log_writer.stream(out_file)
+            if err_file is not None:
+                err_file = log_writer.stream(err_file)
+
+        # Read the stdout and stderr concurrently.
+        gather_task = asyncio.gather(
+            replicate_output(
+                process.stdout,
+                demuxes[0] or sys.stdout.buffer,
+                out_file,
+                buffer_size=buffer_size,
+                taps=out_taps,
+            ),
+            replicate_output(
+                process.stderr,
+                demuxes[1] or sys.stderr.buffer,
+                err_file,
+                prefix=err_prefix,
+                suffix=err_suffix,
+                buffer_size=buffer_size,
+                taps=err_taps,
+            ),
+        )
 
     # Intercept SIGINT/SIGTERM at the event-loop level. This replaces Python's
     # default SIGINT->KeyboardInterrupt behavior for the duration of the run, so
     # a Ctrl-C is handled deterministically here instead of surfacing (possibly)
     # inside asyncio.run(): we forward the signal to the child's process group
     # and cancel the readers, guaranteeing the child dies within a bounded time.
-    loop = asyncio.get_running_loop()
     received_sig: Optional[int] = None
 
     def _on_signal(signum: int) -> None:
@@ -183,6 +753,21 @@ async def _run_process(
                 loop.remove_signal_handler(sig)
             except (NotImplementedError, RuntimeError, ValueError):
                 pass
+        try:
+            # The demuxes queue their last per-rank writes on the log
+            # writer, so they are closed before it is.
+            for demux in demuxes:
+                if demux is not None:
+                    demux.close()
+        finally:
+            if log_writer is not None:
+                try:
+                    log_writer.close()
+                finally:
+                    if log_metrics_file:
+                        with open(log_metrics_file, "w") as fp:
+                            json.dump(log_writer.metrics(), fp, indent=2)
+                            fp.write("\n")
 
 
 def run_process_with_live_output(
@@ -190,8 +775,14 @@ def run_process_with_live_output(
     out_file: Optional[io.FileIO] = None,
     err_file: Optional[io.FileIO] = None,
     color_stderr: bool = False,
-    buffer_size: int = 32,
+    buffer_size: int = _DEFAULT_BUFFER_SIZE,
     env: Optional[dict[str, str]] = None,
+    zero_copy: bool = False,
+    console_ranks: Optional[frozenset[int]] = None,
+    demux_ranks: bool = False,
+    log_metrics_file: Optional[str] = None,
+    out_taps: Sequence = (),
+    err_taps: Sequence = (),
 ) -> int:
     """
     Runs a process asynchronously and pipes its stdout and stderr to up to two
@@ -217,15 +808,50 @@ def run_process_with_live_output(
     :param err_file: An optional handle to a file to pipe ``stderr`` to. Note
                      that the file must be opened in binary mode.
     :param color_stderr: If True, colors the standard error output in red.
-    :param buffer_size: Output buffer size in characters.
+    :param buffer_size: Initial read size in bytes; see
+                        :func:`replicate_output`.
     :param env: An optional complete environment for the child. ``None``
                 (the default) inherits the launcher's own environment.
+    :param zero_copy: If True, replicate the outputs with ``splice(2)``/
+                      ``tee(2)`` where available instead of copying them
+                      through Python. Falls back silently otherwise, and is
+                      never used together with ``color_stderr``,
+                      ``console_ranks``, ``demux_ranks`` or any tap, which
+                      need to see every byte (``--event-log`` and
+                      ``--timeline`` add taps; ``validate_arguments`` warns
+                      when a flag turns the mode off).
+    :param console_ranks: If given, only these ranks' lines (and unlabeled
+                          lines) are shown on the console.
+    :param demux_ranks: If True, write each rank's lines to its own
+                        ``<log>.rank<N>.<ext>`` file next to ``out_file`` and
+                        ``err_file``.
+    :param log_metrics_file: If given, write the log writer thread's queue
+                             and back-pressure counters there as JSON when
+                             the run ends.
+    :param out_taps: Extra sinks handed every raw chunk of standard output
+                     (objects with a ``write`` method), e.g. a
+                     :class:`hpc_launcher.cli.output_tail.RingBuffer`.
+                     Never used together with ``zero_copy``.
+    :param err_taps: The same, for standard error.
     :return: The command's exit code.
     """
     if not command:
         return 0
     return asyncio.run(
-        _run_process(command, out_file, err_file, color_stderr, buffer_size, env)
+        _run_process(
+            command,
+            out_file,
+            err_file,
+            color_stderr,
+            buffer_size,
+            env,
+            zero_copy,
+            console_ranks,
+            demux_ranks,
+            log_metrics_file,
+            out_taps,
+            err_taps,
+        )
     )
 
 
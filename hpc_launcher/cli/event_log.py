@@ -0,0 +1,210 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+A structured, line-by-line record of a blocking launch's output.
+
+``--event-log`` writes ``events.jsonl`` into the launch folder next to
+``out.log``/``err.log``. The first record anchors the clock::
+
+    {"type": "start", "monotonic": 81234.501, "time": 1760000000.123}
+
+and every output line then gets one record::
+
+    {"type": "line", "t": 12.034551, "stream": "out", "rank": 3, "offset": 40960, "length": 57}
+
+``t`` is seconds since the start record (on the launcher's monotonic
+clock, taken when the line's newline was read), ``rank`` is the line's rank
+label if the scheduler was asked to add them (see ``--demux-ranks``) and
+``null`` otherwise -- an unlabeled ``2024: epoch done`` is not rank 2024 --
+and ``offset``/``length`` locate the raw line, label included,
+in the uncompressed ``out.log``/``err.log``. Step times, stalls and output
+rates can therefore be queried from the JSON alone, and the text of any
+line of interest read with a single seek.
+"""
+import time
+from typing import Optional
+
+from hpc_launcher.cli.rank_demux import rank_of
+
+# Buffered records (in bytes) that trigger a write.
+_BATCH_BYTES = 1 << 16
+# Longest time (in seconds) a complete record may wait in the batch.
+_BATCH_SECONDS = 1.0
+
+
+class EventLog:
+    """
+    The ``events.jsonl`` writer shared by a launch's two streams.
+
+    Records are built as strings and appended to an in-memory batch, which
+    is written out once it holds ``_BATCH_BYTES`` or its oldest record is
+    ``_BATCH_SECONDS`` old, and on :meth:`close`. The age bound is kept by
+    a timer on the event loop feeding the taps (``console_pipe``'s), so a
+    stream that goes quiet still has its last records written; without a
+    running loop it is checked as each chunk arrives.
+
+    :param path: Where to write the event log.
+    :param labeled: Whether the output carries rank labels; if not, no line
+                    is given a rank.
+    """
+
+    def __init__(self, path: str, labeled: bool = False):
+        self._file = open(path, "w")
+        self._labeled = labeled
+        self._timer = None
+        # An error raised by a timer-driven write has no caller to reach, so
+        # it is kept and re-raised from the next write or close instead.
+        self._deferred_error: Optional[BaseException] = None
+        self._start = time.monotonic()
+        self._batch: list[str] = []
+        self._batch_bytes = 0
+        self._batch_started = 0.0
+        self._taps: list["_EventLogTap"] = []
+        self._append(
+            f'{{"type": "start", "monotonic": {self._start:.6f}, '
+            f'"time": {time.time():.6f}}}\n'
+        )
+        self._write_batch()
+
+    def tap(self, stream: str) -> "_EventLogTap":
+        """A raw-chunk sink recording the lines of ``stream`` (``out``/``err``)."""
+        tap = _EventLogTap(self, stream)
+        self._taps.append(tap)
+        return tap
+
+    def close(self) -> None:
+        """Record any unterminated last lines, write the batch, and close."""
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._raise_deferred_error()
+            for tap in self._taps:
+                tap.close()
+            self._write_batch()
+        finally:
+            self._file.close()
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _record(self, now: float, stream: str, rank: Optional[int], offset: int, length: int) -> None:
+        self._append(
+            f'{{"type": "line", "t": {now - self._start:.6f}, "stream": "{stream}", '
+            f'"rank": {"null" if rank is None else rank}, '
+            f'"offset": {offset}, "length": {length}}}\n'
+        )
+
+    def _append(self, record: str) -> None:
+        if not self._batch:
+            self._batch_started = time.monotonic()
+        self._batch.append(record)
+        self._batch_bytes += len(record)
+
+    def _rank_of(self, head: bytes) -> Optional[int]:
+        return rank_of(head) if self._labeled else None
+
+    def _maybe_write_batch(self, now: float) -> None:
+        self._raise_deferred_error()
+        if self._batch_bytes >= _BATCH_BYTES or (
+            self._batch and now - self._batch_started >= _BATCH_SECONDS
+        ):
+            self._write_batch()
+        if self._batch and self._timer is None:
+            # asyncio is already loaded by whatever runs the taps.
+            import asyncio
+
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            delay = max(0.0, self._batch_started + _BATCH_SECONDS - now)
+            self._timer = loop.call_later(delay, self._write_from_timer)
+
+    def _write_from_timer(self) -> None:
+        self._timer = None
+        try:
+            self._write_batch()
+        except Exception as e:
+            self._deferred_error = e
+
+    def _raise_deferred_error(self) -> None:
+        if self._deferred_error is not None:
+            error, self._deferred_error = self._deferred_error, None
+            raise error
+
+    def _write_batch(self) -> None:
+        if self._batch:
+            self._file.write("".join(self._batch))
+            self._file.flush()
+            self._batch.clear()
+            self._batch_bytes = 0
+
+
+class _EventLogTap:
+    """
+    Splits one stream's raw chunks into lines for :class:`EventLog`.
+
+    Only the current line's first bytes are held between chunks (for its
+    rank label); the rest of the stream is counted, never copied.
+    """
+
+    # Enough of a line's start to read any rank label.
+    _HEAD = 32
+
+    def __init__(self, log: EventLog, stream: str):
+        self._log = log
+        self._stream = stream
+        self._offset = 0  # raw offset of the current line's first byte
+        self._head = b""  # that line's first bytes
+        self._pending = 0  # bytes of the current line seen so far
+
+    def write(self, chunk: bytes) -> None:
+        now = time.monotonic()
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            self._line_done(now, chunk, start, end + 1)
+            start = end + 1
+        if start < len(chunk):
+            if len(self._head) < self._HEAD:
+                self._head += chunk[start:start + self._HEAD - len(self._head)]
+            self._pending += len(chunk) - start
+        self._log._maybe_write_batch(now)
+
+    def close(self) -> None:
+        """Record a final unterminated line, if any."""
+        if self._pending:
+            self._log._record(
+                time.monotonic(), self._stream, self._log._rank_of(self._head), self._offset, self._pending
+            )
+            self._offset += self._pending
+            self._head, self._pending = b"", 0
+
+    def _line_done(self, now: float, chunk: bytes, start: int, end: int) -> None:
+        if self._pending:
+            head = self._head
+            if len(head) < self._HEAD:
+                head += chunk[start:start + self._HEAD - len(head)]
+        else:
+            head = chunk[start:start + self._HEAD]
+        length = self._pending + end - start
+        self._log._record(now, self._stream, self._log._rank_of(head), self._offset, length)
+        self._offset += length
+        self._head, self._pending = b"", 0
@@ -13,7 +13,8 @@
 # SPDX-License-Identifier: (Apache-2.0)
 import argparse
 import sys
-from hpc_launcher.cli import common_args, launch_helpers
+from hpc_launcher.cli import common_args, launch_helpers, logs, sweep
+from hpc_launcher.runtime import timeline
 from hpc_launcher.schedulers import get_schedulers
 from hpc_launcher.schedulers.local import LocalScheduler
 
@@ -23,6 +24,11 @@ logger = logging.getLogger(__name__)
 
 
 def main():
+    # ``launch logs <folder>`` reads back a launch folder's logs.
+    if sys.argv[1:2] == ["logs"]:
+        sys.exit(logs.main(sys.argv[2:]))
+
+    timeline.start("launch")
     parser = argparse.ArgumentParser(
         description="Launches a distributed job on the current HPC cluster or cloud."
     )
@@ -38,11 +44,31 @@ def main():
         nargs=argparse.REMAINDER,
         help="Arguments to the command that should be executed",
     )
+    parser.add_argument(
+        "--sweep",
+        default=None,
+        metavar="SWEEP_FILE",
+        help="Submit one job per point of the parameter sweep in SWEEP_FILE "
+        "(YAML or JSON), as a single job array. {name} in the command and its "
+        "arguments is replaced by each point's value of the parameter name. "
+        "Implies --bg.",
+    )
 
-    args = parser.parse_args()
+    with timeline.phase("parse arguments"):
+        args = parser.parse_args()
 
     launch_helpers.setup_logging(logger, args.verbose)
 
+    points = None
+    if args.sweep:
+        if args.batch_script or not args.command:
+            raise ValueError("--sweep needs a command to render, not a --batch-script")
+        # Read the sweep before anything is created: a bad file fails fast.
+        with timeline.phase("load sweep"):
+            points = sweep.load(args.sweep)
+        # A job array is a batch submission.
+        args.bg = True
+
     # Default the launch directory *before* validation so that the ephemeral
     # rejection of --out/--err/-o/--save-hostlist only fires for genuinely
     # ephemeral runs (no -l, blocking, no batch script) rather than for configs
@@ -62,16 +88,48 @@ def main():
     requested_procs = common_args.requested_process_count(args)
 
     # Process special arguments that can autoselect the number of ranks / GPUs
-    system = common_args.process_arguments(args, logger)
+    with timeline.phase("process arguments"):
+        system = common_args.process_arguments(args, logger)
 
     # Pick batch scheduler
-    scheduler = launch_helpers.select_scheduler(args, logger, system)
+    with timeline.phase("select scheduler"):
+        scheduler = launch_helpers.select_scheduler(args, logger, system)
 
     # Checks that need the resolved scheduler rather than the raw flags:
     # --scheduler local selects the same LocalScheduler as --local without
     # setting args.local. Run before any launch artifacts are created.
     common_args.validate_scheduler_arguments(scheduler, args, requested_procs)
 
+    if points is not None:
+        _, folder_name = scheduler.create_launch_folder_name(
+            args.command, "sweep", args.launch_dir
+        )
+        result = sweep.submit(
+            scheduler,
+            system,
+            folder_name,
+            args.command,
+            args.args,
+            points,
+            args.output_script,
+            args.override_args,
+            args.save_hostlist,
+            args.setup_only,
+            args.dry_run,
+        )
+        if args.timeline and not args.dry_run:
+            timeline.save(folder_name)
+        if result.job_ids:
+            msg = (
+                f"Job IDs: {result.job_ids[0]} .. {result.job_ids[-1]} "
+                f"({len(points)} points) launched from {folder_name}, "
+                f"listed in {sweep.SWEEP_FILE}"
+            )
+            logger.info(msg)
+            if not args.verbose:
+                print(msg)
+        sys.exit(result.returncode or 0)
+
     folder_name = None
     script_file = None
     if args.output_script:
@@ -83,9 +141,10 @@ def main():
             args.command or args.batch_script.rsplit('.', 1)[0], "launch", args.launch_dir
         )
 
-        script_file = scheduler.create_launch_folder(
-            folder_name, not args.bg, script_file, args.dry_run
-        )
+        with timeline.phase("create launch folder"):
+            script_file = scheduler.create_launch_folder(
+                folder_name, not args.bg, script_file, args.dry_run
+            )
 
     result = scheduler.launch(
         system,
@@ -102,6 +161,9 @@ def main():
         args.batch_script != "", # If a batch script is provided don't allow it to be modified
     )
 
+    if args.timeline and not args.dry_run:
+        timeline.save(folder_name)
+
     if result.job_id:
         msg = f"Job ID: {result.job_id} launched from {folder_name}"
         logger.info(msg)
@@ -0,0 +1,192 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+The parallel run command of ``--scheduler local-parallel``: runs ``-n``
+ranks of a command on this host, as ``srun`` or ``flux run`` would on one
+node.
+
+Each rank is started with ``RANK``, ``LOCAL_RANK``, ``WORLD_SIZE`` and
+``LOCAL_WORLD_SIZE`` in its environment, which is where
+:meth:`hpc_launcher.schedulers.local.LocalParallelScheduler.get_parallel_configuration`
+(and so the torchrun-hpc trampoline) reads them back. Every line the ranks
+write is labeled ``"<rank>: "``, the form ``srun --label`` uses, so the
+launcher's ``--demux-ranks`` and ``--console-ranks`` work on it.
+
+A rank that fails takes the job down with it, as under a scheduler: the
+other ranks are sent ``SIGTERM``, and ``SIGKILL`` if they have not exited
+:data:`GRACE_SECONDS` later. The exit status is the first failed rank's
+(``128 + signal`` if it was killed), or 0.
+
+From a shell::
+
+    python -m hpc_launcher.cli.local_ranks -n 4 [--no-label] COMMAND [ARGS ...]
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+# Seconds the other ranks have to exit after a rank fails.
+GRACE_SECONDS = 10.0
+
+_POLL_SECONDS = 0.02
+
+
+def rank_environment(rank: int, world_size: int, env: Optional[dict] = None) -> dict[str, str]:
+    """The environment of one rank: ``env`` (default: ours) and its identity."""
+    env = dict(os.environ if env is None else env)
+    env.update(
+        RANK=str(rank),
+        LOCAL_RANK=str(rank),
+        WORLD_SIZE=str(world_size),
+        LOCAL_WORLD_SIZE=str(world_size),
+    )
+    return env
+
+
+def _relay(stream, out, label: bytes, lock: threading.Lock):
+    """Copy ``stream`` to ``out`` a line at a time, each line labeled."""
+    for line in iter(stream.readline, b""):
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        with lock:
+            out.write(label + line)
+            out.flush()
+    stream.close()
+
+
+def _exit_status(returncode: int) -> int:
+    return 128 - returncode if returncode < 0 else returncode
+
+
+def _stop(procs: list[subprocess.Popen], signum: int):
+    for proc in procs:
+        if proc.poll() is None:
+            try:
+                proc.send_signal(signum)
+            except ProcessLookupError:
+                pass
+
+
+def run(
+    command: list[str],
+    world_size: int,
+    label: bool = True,
+    grace: float = GRACE_SECONDS,
+) -> int:
+    """
+    Run ``world_size`` ranks of ``command`` and wait for them.
+
+    :return: The exit status of the first rank to fail, or 0.
+    """
+    procs: list[subprocess.Popen] = []
+    relays = []
+    lock = threading.Lock()
+    failed: Optional[int] = None
+    deadline = None
+
+    def on_signal(signum, frame):
+        # The launcher signals the whole process group, but a user may only
+        # signal this process.
+        nonlocal failed, deadline
+        if failed is None:
+            failed = 128 + signum
+        _stop(procs, signum)
+        deadline = time.monotonic() + grace
+
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        previous = {s: signal.signal(s, on_signal) for s in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        for rank in range(world_size):
+            proc = subprocess.Popen(
+                command,
+                env=rank_environment(rank, world_size),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            procs.append(proc)
+            prefix = f"{rank}: ".encode() if label else b""
+            for stream, out in ((proc.stdout, sys.stdout.buffer), (proc.stderr, sys.stderr.buffer)):
+                relay = threading.Thread(target=_relay, args=(stream, out, prefix, lock), daemon=True)
+                relay.start()
+                relays.append(relay)
+
+        running = list(enumerate(procs))
+        while running:
+            for rank, proc in list(running):
+                if proc.poll() is None:
+                    continue
+                running.remove((rank, proc))
+                if proc.returncode and failed is None:
+                    failed = _exit_status(proc.returncode)
+                    if running:
+                        with lock:
+                            sys.stderr.buffer.write(
+                                f"local_ranks: rank {rank} exited with status {failed}; "
+                                f"stopping the other {len(running)} ranks\n".encode()
+                            )
+                            sys.stderr.buffer.flush()
+                    _stop([p for _, p in running], signal.SIGTERM)
+                    deadline = time.monotonic() + grace
+            if deadline is not None and time.monotonic() >= deadline:
+                _stop([p for _, p in running], signal.SIGKILL)
+                deadline = None
+            if running:
+                time.sleep(_POLL_SECONDS)
+    finally:
+        # Also reached if a rank could not be started at all.
+        _stop(procs, signal.SIGKILL)
+        for proc in procs:
+            proc.wait()
+        for relay in relays:
+            # Something a rank left behind may still hold its pipes open.
+            relay.join(grace)
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+    return failed or 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m hpc_launcher.cli.local_ranks",
+        description="Run several ranks of a command on this host.",
+    )
+    parser.add_argument("-n", "--ranks", type=int, required=True, help="The number of ranks")
+    parser.add_argument(
+        "--no-label", dest="label", action="store_false",
+        help='Do not prefix each output line with "<rank>: "',
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="The command to run")
+    args = parser.parse_args(argv)
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("no command given")
+    if args.ranks < 1:
+        parser.error("--ranks must be at least 1")
+    try:
+        sys.exit(run(args.command, args.ranks, args.label))
+    except OSError as e:
+        parser.exit(127, f"local_ranks: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
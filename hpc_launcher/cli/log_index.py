@@ -0,0 +1,243 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Line-number and time checkpoints into a launch log, for random access.
+
+A blocking launch writes ``out.log.idx``/``err.log.idx`` next to its logs.
+Each is a small text file of checkpoints, one per line::
+
+    # hpc-launcher log index v1 start=1760000000.123456 interval=1000
+    0 0 0.000000
+    1017 40960 12.034551
+    2049 81920 24.100312
+
+A checkpoint ``line offset t`` says that (0-based) line ``line`` of the
+uncompressed log starts at byte ``offset``, and that the launcher read it
+``t`` seconds after ``start``. The index is built from the raw chunks as
+they pass through ``console_pipe``'s tee -- one ``bytes.count`` per chunk,
+plus one ``rfind`` when a checkpoint is due -- so the log is never read
+back. Checkpoints fall on the last line boundary of the chunk in which at
+least ``interval`` lines (or ``_CHECKPOINT_SECONDS`` with any output) have
+passed since the previous one, plus a last one at the end of the output.
+
+``launch logs --line``/``--since`` (see :mod:`hpc_launcher.cli.logs`) look
+up the nearest checkpoint at or before the requested position and scan
+forward from there, rather than from the top of a multi-gigabyte log.
+"""
+import bisect
+import datetime
+import re
+import time
+from typing import NamedTuple, Optional
+
+# Default number of lines between checkpoints.
+DEFAULT_INDEX_INTERVAL = 1000
+
+# Longest time (in seconds) without a checkpoint while output is arriving,
+# so that --since stays precise for jobs that print slowly.
+_CHECKPOINT_SECONDS = 10.0
+# Longest time (in seconds) a written checkpoint may sit unflushed; kept by
+# a timer on the event loop feeding the writer, so that a checkpoint before
+# a quiet period is flushed even though no further output arrives.
+_FLUSH_SECONDS = 1.0
+
+_HEADER = "# hpc-launcher log index v1"
+
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def index_path(log_file: str) -> str:
+    """The index of ``log_file`` (e.g. ``out.log`` -> ``out.log.idx``)."""
+    return log_file + ".idx"
+
+
+class LogIndexWriter:
+    """
+    A raw-chunk sink (see the ``taps`` of
+    :func:`hpc_launcher.cli.console_pipe.replicate_output`) that writes one
+    stream's checkpoints as its output goes by.
+
+    :param path: Where to write the index.
+    :param interval: Lines between checkpoints.
+    """
+
+    def __init__(self, path: str, interval: int = DEFAULT_INDEX_INTERVAL):
+        self._file = open(path, "w")
+        self._interval = max(1, interval)
+        self._start = time.monotonic()
+        self._lines = 0  # newlines seen so far
+        self._offset = 0  # bytes seen so far
+        self._last_line = 0
+        self._last_time = self._start
+        self._flushed = self._start
+        self._timer = None
+        # An error from a timer-driven flush, raised from the next call
+        self._deferred_error: Optional[BaseException] = None
+        self._at_line_start = True
+        self._file.write(
+            f"{_HEADER} start={time.time():.6f} interval={self._interval}\n"
+            "0 0 0.000000\n"
+        )
+        self._file.flush()
+
+    def write(self, chunk: bytes) -> None:
+        self._raise_deferred_error()
+        newlines = chunk.count(b"\n")
+        if newlines:
+            lines = self._lines + newlines
+            now = time.monotonic()
+            if (
+                lines - self._last_line >= self._interval
+                or now - self._last_time >= _CHECKPOINT_SECONDS
+            ):
+                offset = self._offset + chunk.rfind(b"\n") + 1
+                self._file.write(f"{lines} {offset} {now - self._start:.6f}\n")
+                self._last_line, self._last_time = lines, now
+                self._maybe_flush(now)
+            self._lines = lines
+        self._offset += len(chunk)
+        self._at_line_start = chunk.endswith(b"\n")
+
+    def close(self) -> None:
+        """Add a last checkpoint at the end of the output, if it ends a line."""
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._raise_deferred_error()
+            if self._lines > self._last_line and self._at_line_start:
+                self._file.write(
+                    f"{self._lines} {self._offset} {time.monotonic() - self._start:.6f}\n"
+                )
+        finally:
+            self._file.close()
+
+    def _maybe_flush(self, now: float) -> None:
+        if now - self._flushed >= _FLUSH_SECONDS:
+            self._flush(now)
+        elif self._timer is None:
+            # asyncio is already loaded by whatever runs the taps.
+            import asyncio
+
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            delay = self._flushed + _FLUSH_SECONDS - now
+            self._timer = loop.call_later(delay, self._flush_from_timer)
+
+    def _flush(self, now: float) -> None:
+        self._file.flush()
+        self._flushed = now
+
+    def _flush_from_timer(self) -> None:
+        self._timer = None
+        try:
+            self._flush(time.monotonic())
+        except Exception as e:
+            self._deferred_error = e
+
+    def _raise_deferred_error(self) -> None:
+        if self._deferred_error is not None:
+            error, self._deferred_error = self._deferred_error, None
+            raise error
+
+    def __enter__(self) -> "LogIndexWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class LogIndex(NamedTuple):
+    """A log's checkpoints, as read back by :func:`read_index`."""
+
+    # Wall-clock (Unix) time at which the launch started
+    start: float
+    # Parallel, ascending lists: line number, byte offset, seconds since start
+    lines: list[int]
+    offsets: list[int]
+    times: list[float]
+
+    def at_line(self, line: int) -> tuple[int, int]:
+        """The last checkpoint ``(line, offset)`` at or before 0-based ``line``."""
+        i = max(0, bisect.bisect_right(self.lines, line) - 1)
+        return self.lines[i], self.offsets[i]
+
+    def at_time(self, seconds: float) -> tuple[int, int]:
+        """
+        The last checkpoint ``(line, offset)`` read at or before ``seconds``
+        after the start: every line read later lies after it.
+        """
+        i = max(0, bisect.bisect_right(self.times, seconds) - 1)
+        return self.lines[i], self.offsets[i]
+
+
+def read_index(path: str, log_size: Optional[int] = None) -> Optional[LogIndex]:
+    """
+    Read an index written by :class:`LogIndexWriter`.
+
+    A checkpoint that is still only partially written (the job is running)
+    is ignored, as are any beyond ``log_size`` (a stale index left over
+    from an earlier, longer run).
+
+    :return: The index, or ``None`` if there is none or it is unreadable.
+    """
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError:
+        return None
+    rows = text.split("\n")
+    match = re.match(re.escape(_HEADER) + r" start=([\d.]+)", rows[0])
+    if not match:
+        return None
+    index = LogIndex(float(match.group(1)), [], [], [])
+    for row in rows[1:-1]:  # the last element follows the final newline
+        fields = row.split()
+        if len(fields) != 3:
+            break
+        line, offset = int(fields[0]), int(fields[1])
+        if log_size is not None and offset > log_size:
+            break
+        index.lines.append(line)
+        index.offsets.append(offset)
+        index.times.append(float(fields[2]))
+    if not index.lines:
+        return None
+    return index
+
+
+def parse_since(value: str, start: float) -> float:
+    """
+    Parse ``launch logs --since``: a duration after the launch started
+    (``90``, ``90s``, ``15m``, ``2h``) or an ISO 8601 local time
+    (``2025-06-01T14:30:00``).
+
+    :param value: The command-line value.
+    :param start: The launch's start time (Unix time).
+    :return: Seconds after ``start``.
+    :raises ValueError: If ``value`` is neither.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d*)?)\s*([smhd]?)\s*", value.lower())
+    if match:
+        return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    try:
+        when = datetime.datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(
+            f"Invalid time {value!r}: expected a duration after the launch "
+            "started (e.g. 90s, 15m, 2h) or an ISO 8601 time"
+        ) from None
+    return when.timestamp() - start
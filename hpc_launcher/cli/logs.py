@@ -0,0 +1,470 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Compressed and size-rotated launch logs, and the ``launch logs`` reader.
+
+With ``--log-compress`` and/or ``--log-rotate-size`` a blocking launch does
+not write ``out.log``/``err.log`` as plain text. Each is streamed through an
+incremental compressor and, once a segment has taken ``--log-rotate-size``
+bytes of output, continued in the next numbered segment::
+
+    out.log.gz                            (--log-compress gzip)
+    out.log.0  out.log.1  ...             (--log-rotate-size 1G)
+    out.log.0.zst  out.log.1.zst  ...     (both)
+
+``launch logs <folder>`` decompresses and concatenates the segments in
+order, so the result is byte-for-byte what the plain ``out.log`` would have
+held. ``--line``/``--since`` start the output further in, found through the
+log's checkpoint index (see :mod:`hpc_launcher.cli.log_index`) rather than
+by reading everything before it.
+"""
+import argparse
+import os
+import re
+import sys
+from typing import Optional
+
+# gzip, mmap and the log index are imported where they are used: every
+# launch imports this module to parse its arguments, and only a blocking
+# launch or ``launch logs`` needs them.
+
+# Compressors accepted by --log-compress, and the suffix each adds.
+LOG_COMPRESSORS = {"gzip": ".gz", "zstd": ".zst"}
+
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+# Chunk size used when copying decompressed output to the console.
+_COPY_CHUNK = 1 << 20
+
+
+def parse_byte_size(value: str) -> int:
+    """
+    Parse a size such as ``"4096"``, ``"512M"`` or ``"2G"`` (binary units,
+    an optional trailing ``B`` or ``iB`` is accepted).
+
+    :raises ValueError: If the size is malformed or not positive.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)(?:I?B)?\s*", value.upper())
+    if not match:
+        raise ValueError(f"Invalid size {value!r}: expected e.g. 4096, 512M or 2G")
+    size = int(match.group(1)) * _SIZE_UNITS[match.group(2)]
+    if size <= 0:
+        raise ValueError(f"Invalid size {value!r}: must be positive")
+    return size
+
+
+def _require_zstandard():
+    try:
+        import zstandard
+    except (ImportError, ModuleNotFoundError):
+        raise ValueError(
+            "zstd log compression requires the zstandard package "
+            "(pip install hpc-launcher[zstd]); use --log-compress gzip instead"
+        )
+    return zstandard
+
+
+def check_compressor(compress: Optional[str]) -> None:
+    """Raise ``ValueError`` if ``compress`` cannot be used here."""
+    if compress is None:
+        return
+    if compress not in LOG_COMPRESSORS:
+        raise ValueError(
+            f"Unknown log compressor {compress!r}; choose from "
+            f"{', '.join(LOG_COMPRESSORS)}"
+        )
+    if compress == "zstd":
+        _require_zstandard()
+
+
+def segment_path(log_file: str, index: Optional[int], compress: Optional[str]) -> str:
+    """
+    The file holding segment ``index`` of ``log_file`` (``None`` when the
+    log is not rotated).
+    """
+    path = log_file if index is None else f"{log_file}.{index}"
+    return path + (LOG_COMPRESSORS[compress] if compress else "")
+
+
+class SegmentedLogWriter:
+    """
+    A binary output stream that compresses and/or rotates a log file.
+
+    Compression is incremental: each :meth:`flush` pushes out a complete
+    compressed block (gzip's ``Z_SYNC_FLUSH``, zstd's ``FLUSH_BLOCK``), so a
+    log can be read back while the job is still running, at the cost of a
+    few bytes per flush. A segment is closed, and the next one started, as
+    soon as it has taken ``rotate_size`` bytes of (uncompressed) output; a
+    segment can therefore run over by at most one write, and no write is
+    ever split across two segments.
+
+    Has no ``fileno()``, so ``console_pipe`` never hands it to the
+    zero-copy path.
+
+    :param log_file: The plain log file this replaces (e.g. ``out.log``).
+    :param rotate_size: Uncompressed bytes per segment, or ``None`` for a
+                        single segment.
+    :param compress: A key of :data:`LOG_COMPRESSORS`, or ``None``.
+    """
+
+    def __init__(
+        self,
+        log_file: str,
+        rotate_size: Optional[int] = None,
+        compress: Optional[str] = None,
+    ):
+        check_compressor(compress)
+        self.name = log_file
+        self._rotate_size = rotate_size
+        self._compress = compress
+        self._index = 0 if rotate_size else None
+        self._segment_bytes = 0
+        self._raw = None
+        self._stream = None
+        self._open_segment()
+
+    def write(self, data: bytes) -> int:
+        if self._stream is None:
+            self._open_segment()
+        self._stream.write(data)
+        self._segment_bytes += len(data)
+        if self._rotate_size and self._segment_bytes >= self._rotate_size:
+            self._close_segment()
+            self._index += 1
+        return len(data)
+
+    def flush(self) -> None:
+        if self._stream is not None:
+            self._stream.flush()
+            self._raw.flush()
+
+    def close(self) -> None:
+        if self._stream is None and self._index == 0:
+            # Nothing was ever written: keep an empty first segment so the
+            # log's presence does not depend on whether the job printed.
+            self._open_segment()
+        self._close_segment()
+
+    def __enter__(self) -> "SegmentedLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _open_segment(self) -> None:
+        self._raw = open(segment_path(self.name, self._index, self._compress), "wb")
+        self._segment_bytes = 0
+        if self._compress == "gzip":
+            import gzip
+
+            # mtime=0 keeps the archive a pure function of the output.
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", mtime=0)
+        elif self._compress == "zstd":
+            self._stream = (
+                _require_zstandard().ZstdCompressor().stream_writer(self._raw, closefd=False)
+            )
+        else:
+            self._stream = self._raw
+
+    def _close_segment(self) -> None:
+        if self._stream is None:
+            return
+        stream, raw, self._stream, self._raw = self._stream, self._raw, None, None
+        try:
+            if stream is not raw:
+                stream.close()
+        finally:
+            raw.close()
+
+
+def open_log_file(
+    log_file: str, rotate_size: Optional[int] = None, compress: Optional[str] = None
+):
+    """
+    Open ``log_file`` for a blocking launch's output: a plain ``"wb"`` file,
+    or a :class:`SegmentedLogWriter` when rotation or compression is asked
+    for.
+    """
+    if rotate_size or compress:
+        check_compressor(compress)
+        remove_log_file(log_file)
+        return SegmentedLogWriter(log_file, rotate_size, compress)
+    return open(log_file, "wb")
+
+
+def _numbered_segments(log_file: str) -> list[str]:
+    """``log_file``'s numbered segments that exist, in order."""
+    folder, base = os.path.split(log_file)
+    suffixes = "|".join(map(re.escape, LOG_COMPRESSORS.values()))
+    pattern = re.compile(re.escape(base) + r"\.(\d+)(?:" + suffixes + r")?")
+    numbered = []
+    for name in os.listdir(folder or "."):
+        match = pattern.fullmatch(name)
+        if match:
+            numbered.append((int(match.group(1)), os.path.join(folder, name)))
+    return [path for _, path in sorted(numbered)]
+
+
+def find_segments(log_file: str) -> list[str]:
+    """
+    The files holding ``log_file``'s output, in order: the plain file, or
+    its single compressed file, or its numbered segments.
+
+    :raises FileNotFoundError: If no form of the log exists.
+    """
+    if os.path.exists(log_file):
+        return [log_file]
+    for suffix in LOG_COMPRESSORS.values():
+        if os.path.exists(log_file + suffix):
+            return [log_file + suffix]
+    segments = _numbered_segments(log_file)
+    if not segments:
+        raise FileNotFoundError(f"No log found at {log_file} (plain, compressed or rotated)")
+    return segments
+
+
+def remove_log_file(log_file: str) -> None:
+    """
+    Remove every form of ``log_file`` left by an earlier run in the same
+    launch folder, so that a shorter rerun is not read back followed by the
+    previous run's trailing segments.
+    """
+    for suffix in ("",) + tuple(LOG_COMPRESSORS.values()):
+        if os.path.isfile(log_file + suffix):
+            os.remove(log_file + suffix)
+    for path in _numbered_segments(log_file):
+        os.remove(path)
+
+
+def open_segment(path: str):
+    """Open one segment for reading, decompressing it if needed."""
+    if path.endswith(LOG_COMPRESSORS["gzip"]):
+        import gzip
+
+        return gzip.open(path, "rb")
+    if path.endswith(LOG_COMPRESSORS["zstd"]):
+        raw = open(path, "rb")
+        return _require_zstandard().ZstdDecompressor().stream_reader(
+            raw, read_across_frames=True, closefd=True
+        )
+    return open(path, "rb")
+
+
+def _iter_log(log_file: str):
+    """Yield ``log_file``'s decompressed contents, chunk by chunk."""
+    for path in find_segments(log_file):
+        with open_segment(path) as segment:
+            # read1 performs at most one underlying read, so nothing that
+            # was already decompressed is lost if the next read fails.
+            read = getattr(segment, "read1", segment.read)
+            try:
+                while True:
+                    chunk = read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+            except EOFError:
+                # A gzip segment still being written (or cut short by a
+                # crash) ends without a trailer; what was flushed is intact.
+                pass
+
+
+def copy_log(log_file: str, out) -> None:
+    """Write ``log_file``'s full, decompressed contents to binary ``out``."""
+    for chunk in _iter_log(log_file):
+        out.write(chunk)
+
+
+def _skip_lines(buf, pos: int, count: int) -> tuple[int, int]:
+    """
+    Advance ``pos`` past up to ``count`` newlines of ``buf`` (``bytes`` or
+    ``mmap``).
+
+    :return: The new position and the number of newlines still to skip.
+    """
+    while count:
+        end = buf.find(b"\n", pos)
+        if end < 0:
+            return len(buf), count
+        pos = end + 1
+        count -= 1
+    return pos, 0
+
+
+def _copy_lines(buffers, start: int, skip: int, count: Optional[int], out) -> None:
+    """
+    Write the lines of the concatenated ``buffers`` that follow byte
+    ``start`` of the first one, less the first ``skip`` of them, to ``out``
+    (at most ``count`` lines, if given).
+    """
+    for buf in buffers:
+        pos = start
+        start = 0
+        if skip:
+            pos, skip = _skip_lines(buf, pos, skip)
+            if skip:
+                continue
+        end = len(buf)
+        if count is not None:
+            end, count = _skip_lines(buf, pos, count)
+        with memoryview(buf) as view:
+            for piece in range(pos, end, _COPY_CHUNK):
+                out.write(view[piece:min(piece + _COPY_CHUNK, end)])
+        if count == 0:
+            return
+
+
+def copy_lines(
+    log_file: str,
+    out,
+    line: int = 0,
+    since: Optional[float] = None,
+    count: Optional[int] = None,
+) -> None:
+    """
+    Write part of ``log_file`` to binary ``out``, starting at 0-based
+    ``line``, or at the first checkpoint read ``since`` seconds after the
+    launch started, and ending after ``count`` lines (or at the end).
+
+    The log's index (see :mod:`hpc_launcher.cli.log_index`) gives the
+    nearest checkpoint before the start. A plain log is then mapped with
+    ``mmap`` and scanned for newlines from that offset only; a compressed
+    or rotated one has to be decompressed up to it, but is not split into
+    lines before it either.
+
+    Since checkpoints are taken every ``interval`` lines, ``since`` is
+    resolved to the checkpoint just before it: up to an interval's worth of
+    earlier lines may be included.
+
+    :raises FileNotFoundError: If no form of the log exists.
+    :raises ValueError: If ``since`` is given but the log has no index.
+    """
+    from hpc_launcher.cli.log_index import index_path, read_index
+
+    segments = find_segments(log_file)
+    plain = segments == [log_file]
+    size = os.path.getsize(log_file) if plain else None
+    index = read_index(index_path(log_file), size)
+    if since is not None:
+        if index is None:
+            raise ValueError(f"{log_file} has no index ({index_path(log_file)})")
+        checkpoint, offset = index.at_time(since)
+        line = checkpoint
+    elif index is not None:
+        checkpoint, offset = index.at_line(line)
+    else:
+        checkpoint, offset = 0, 0
+    skip = line - checkpoint
+
+    if plain:
+        if not size:
+            return
+        import mmap
+
+        with open(log_file, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            _copy_lines([mapped], offset, skip, count, out)
+        return
+
+    def from_offset():
+        pos = 0
+        for chunk in _iter_log(log_file):
+            if pos + len(chunk) > offset:
+                yield chunk[max(0, offset - pos):]
+            pos += len(chunk)
+
+    _copy_lines(from_offset(), 0, skip, count, out)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="launch logs",
+        description="Print a launch folder's (compressed and/or rotated) logs.",
+    )
+    parser.add_argument("folder", help="The launch folder")
+    parser.add_argument(
+        "--stream",
+        choices=("out", "err"),
+        default="out",
+        help="Which log to print (default: out)",
+    )
+    parser.add_argument(
+        "--file",
+        default=None,
+        help="The log's file name, if it was renamed with --out/--err "
+        "(default: out.log or err.log)",
+    )
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument(
+        "--line",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Start at line N (1-based)",
+    )
+    start.add_argument(
+        "--since",
+        default=None,
+        metavar="TIME",
+        help="Start at the output read TIME after the launch started "
+        "(e.g. 90s, 15m, 2h) or at an ISO 8601 time (e.g. "
+        "2025-06-01T14:30); resolved to the nearest index checkpoint before it",
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Print at most N lines",
+    )
+    args = parser.parse_args(argv)
+    if args.line is not None and args.line < 1:
+        parser.error("--line must be at least 1")
+    if args.count is not None and args.count < 0:
+        parser.error("--count must not be negative")
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"{args.folder} is not a launch folder")
+    log_file = os.path.join(args.folder, args.file or f"{args.stream}.log")
+    try:
+        if args.line is None and args.since is None and args.count is None:
+            copy_log(log_file, sys.stdout.buffer)
+        else:
+            since = None
+            if args.since is not None:
+                from hpc_launcher.cli.log_index import index_path, parse_since, read_index
+
+                index = read_index(index_path(log_file))
+                if index is None:
+                    parser.error(
+                        f"--since needs the log's index, {index_path(log_file)}, "
+                        f"which is written by a launch with --log-index"
+                    )
+                since = parse_since(args.since, index.start)
+            copy_lines(
+                log_file,
+                sys.stdout.buffer,
+                line=(args.line or 1) - 1,
+                since=since,
+                count=args.count,
+            )
+        sys.stdout.buffer.flush()
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+    except BrokenPipeError:
+        # e.g. ``launch logs run | head``
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    return 0
@@ -0,0 +1,222 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+The last few hundred kilobytes of a job's output, kept in memory, and the
+crash summary built from them when a blocking job fails.
+
+When a 512-rank job dies, every rank typically prints the same traceback,
+and the one that matters is buried somewhere in a multi-gigabyte
+``err.log``. :class:`RingBuffer` keeps the tail of each stream as it passes
+through ``console_pipe``'s tee, and :func:`summarize_tail` collapses the
+identical tracebacks in it into one entry per distinct traceback, with the
+ranks (or, for unlabeled output, the number of copies) that printed it.
+"""
+import re
+from collections import OrderedDict
+from typing import Optional
+
+from hpc_launcher.cli.logs import parse_byte_size
+from hpc_launcher.cli.rank_demux import format_rank_set, split_rank_label
+
+# Default capacity of a RingBuffer, and a sensible --crash-summary-size.
+DEFAULT_TAIL_SIZE = 256 << 10
+
+# Lines shown per stream when the tail contains no traceback.
+_FALLBACK_LINES = 20
+
+_TRACEBACK_START = "Traceback (most recent call last):"
+# The line that ends a traceback: the unindented "ExceptionType: message"
+# (or bare "ExceptionType") after the indented frames.
+_EXCEPTION_LINE = re.compile(r"[A-Za-z_][\w.]*(:.*)?$")
+
+
+def parse_tail_size(value: str) -> int:
+    """:func:`parse_byte_size`, also accepting ``0`` (no tail is kept)."""
+    if value.strip() == "0":
+        return 0
+    return parse_byte_size(value)
+
+
+class RingBuffer:
+    """
+    A fixed-capacity byte buffer that keeps the most recent ``capacity``
+    bytes written to it.
+
+    :meth:`write` costs one or two slice copies into a preallocated
+    ``bytearray`` regardless of how much has been written before, so it
+    can sit in the tee's hot path.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_TAIL_SIZE):
+        self.capacity = max(1, capacity)
+        self._buffer = bytearray(self.capacity)
+        self._end = 0  # next write position
+        self._size = 0
+        self.total = 0  # bytes ever written
+
+    def write(self, data: bytes) -> None:
+        n = len(data)
+        self.total += n
+        cap = self.capacity
+        if n >= cap:
+            self._buffer[:] = data[n - cap:]
+            self._end = 0
+            self._size = cap
+            return
+        first = min(n, cap - self._end)
+        self._buffer[self._end:self._end + first] = data[:first]
+        if first < n:
+            self._buffer[:n - first] = data[first:]
+        self._end = (self._end + n) % cap
+        self._size = min(cap, self._size + n)
+
+    @property
+    def truncated(self) -> bool:
+        """True if older output has been dropped."""
+        return self.total > self._size
+
+    def getvalue(self) -> bytes:
+        """The buffered bytes, oldest first."""
+        if self._size < self.capacity:
+            return bytes(self._buffer[:self._size])
+        return bytes(self._buffer[self._end:] + self._buffer[:self._end])
+
+    def lines(self) -> list[str]:
+        """
+        The buffered output as text lines, dropping the first line if it
+        may have been cut by the wrap-around.
+        """
+        lines = self.getvalue().decode(errors="replace").splitlines()
+        if self.truncated and lines:
+            lines = lines[1:]
+        return lines
+
+
+def _split_by_rank(lines: list[str], labeled: bool) -> "OrderedDict[Optional[int], list[str]]":
+    """
+    Group lines by their rank label (``None`` for unlabeled lines, and for
+    every line of output that carries no labels).
+    """
+    by_rank: "OrderedDict[Optional[int], list[str]]" = OrderedDict()
+    for line in lines:
+        rank, body = split_rank_label(line) if labeled else (None, line)
+        by_rank.setdefault(rank, []).append(body)
+    return by_rank
+
+
+def _tracebacks(lines: list[str]) -> list[str]:
+    """The complete Python tracebacks in one rank's lines, in order."""
+    found = []
+    current: Optional[list[str]] = None
+    for line in lines:
+        if line.startswith(_TRACEBACK_START):
+            current = [line]
+        elif current is not None:
+            current.append(line)
+            if not line[:1].isspace() and _EXCEPTION_LINE.match(line):
+                # Chained exceptions ("During handling of the above
+                # exception ...") start a new traceback of their own; the
+                # last one raised is the one that ended the rank.
+                found.append("\n".join(current))
+                current = None
+    return found
+
+
+def _format_size(size: int) -> str:
+    """``size`` in KiB, or in bytes below 1 KiB, where KiB would round to 0."""
+    if size < 1024:
+        return f"{size} bytes"
+    return f"{size / 1024:g} KiB"
+
+
+def _who(ranks: list[Optional[int]]) -> str:
+    labeled = sorted(r for r in ranks if r is not None)
+    if len(labeled) == len(ranks):
+        return f"{len(labeled)} rank{'s' if len(labeled) != 1 else ''} ({format_rank_set(labeled)})"
+    return f"{len(ranks)} cop{'ies' if len(ranks) != 1 else 'y'}"
+
+
+def summarize_tail(
+    returncode: int,
+    err_tail: RingBuffer,
+    out_tail: Optional[RingBuffer] = None,
+    labeled: bool = False,
+    tracebacks: bool = True,
+) -> str:
+    """
+    Build the crash summary printed after a failed blocking launch.
+
+    Every distinct traceback found in the tails (standard error first) is
+    listed once, with the ranks that printed it -- or, for output without
+    rank labels, how many times it appears. Without any traceback, the last
+    few distinct lines of standard error are shown instead, collapsed the
+    same way.
+
+    :param returncode: The job's exit status.
+    :param err_tail: The standard error ring buffer.
+    :param out_tail: The standard output ring buffer, if kept.
+    :param labeled: Whether the output carries rank labels. Without them a
+                    line such as ``2024: epoch done`` is not read as rank
+                    2024's.
+    :param tracebacks: Whether to look for tracebacks at all. Pass False for
+                       the unlabeled output of several processes: their
+                       lines interleave, so a traceback read from it would
+                       stitch together the lines of different ranks. Only
+                       the last distinct lines are shown then.
+    :return: The summary text, or an empty string if there is no output.
+    """
+    tails = [err_tail] + ([out_tail] if out_tail is not None else [])
+    entries: "OrderedDict[str, list[Optional[int]]]" = OrderedDict()
+    for tail in tails if tracebacks else ():
+        for rank, lines in _split_by_rank(tail.lines(), labeled).items():
+            if rank is None:
+                # Unlabeled output: each occurrence counts separately.
+                for tb in _tracebacks(lines):
+                    entries.setdefault(tb, []).append(None)
+            else:
+                # A rank that printed the same traceback twice (e.g. to
+                # both streams) still counts once; its last one is kept.
+                tbs = _tracebacks(lines)
+                if tbs and rank not in entries.get(tbs[-1], ()):
+                    entries.setdefault(tbs[-1], []).append(rank)
+    kind = "traceback"
+    if not entries:
+        kind = "line"
+        for rank, lines in _split_by_rank(err_tail.lines(), labeled).items():
+            for line in lines[-_FALLBACK_LINES:]:
+                if not line.strip():
+                    continue
+                seen = entries.setdefault(line, [])
+                if rank is None or rank not in seen:
+                    seen.append(rank)
+        while len(entries) > _FALLBACK_LINES:
+            entries.popitem(last=False)
+    if not entries:
+        return ""
+
+    header = (
+        f"Job exited with code {returncode}. "
+        f"{len(entries)} distinct {kind}{'s' if len(entries) != 1 else ''} "
+        "in the job's recent output"
+    )
+    if any(tail.truncated for tail in tails):
+        header += f" (last {_format_size(tails[0].capacity)} per stream)"
+    parts = [header + ":"]
+    if kind == "traceback":
+        for text, ranks in entries.items():
+            parts.append(f"--- {_who(ranks)} ---\n{text}")
+    else:
+        for text, ranks in entries.items():
+            parts.append(text if ranks == [None] else f"[{_who(ranks)}] {text}")
+    return "\n".join(parts) + "\n"
@@ -0,0 +1,323 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Splits a job's rank-labeled output stream into per-rank log files.
+
+Every scheduler can prefix each output line with the rank that wrote it:
+``flux run --label-io`` and ``srun --label`` emit ``"<rank>: "`` (``srun``
+right-aligns the rank with spaces) and ``jsrun --stdio_mode prepended``
+emits the same ``"<rank>: "`` form. :class:`RankDemux` sits in front of the
+console in ``console_pipe``'s tee, strips those labels, appends each line to
+its rank's own log file, and passes only the selected ranks' lines on to the
+console. The combined log file still receives the labeled stream unchanged.
+"""
+import os
+import re
+from collections import OrderedDict
+from typing import Optional
+
+# Leading label added by ``flux run --label-io``, ``srun --label`` and
+# ``jsrun --stdio_mode prepended``.
+_RANK_LABEL = re.compile(rb" *(\d+): ?")
+_RANK_LABEL_TEXT = re.compile(_RANK_LABEL.pattern.decode())
+
+# Default cap on simultaneously open per-rank files. Far below a typical
+# ``RLIMIT_NOFILE`` soft limit of 1024 once the launcher's own descriptors
+# are counted, and large enough that a job of a few hundred ranks never
+# reopens a file.
+DEFAULT_MAX_OPEN_FILES = 128
+
+# Pending per-rank output (in bytes) that forces a write-out before the next
+# flush is due.
+_MAX_PENDING_BYTES = 1 << 20
+
+# Longest unterminated line held back waiting for its newline. A line that
+# never ends -- a progress bar redrawn with "\r", or one enormous record --
+# is passed on in pieces of this size rather than held until the job exits.
+_MAX_PARTIAL_BYTES = 64 << 10
+
+
+def parse_rank_set(spec: Optional[str]) -> Optional[frozenset[int]]:
+    """
+    Parse a rank selection such as ``"0"``, ``"0,4,8"`` or ``"0-3,16"``.
+
+    :param spec: The selection, or ``None``/``"all"`` for every rank.
+    :return: The selected ranks, or ``None`` if every rank is selected.
+    :raises ValueError: If the selection is malformed.
+    """
+    if spec is None or spec.strip().lower() == "all":
+        return None
+    ranks = set()
+    for part in spec.split(","):
+        part = part.strip()
+        first, sep, last = part.partition("-")
+        try:
+            lo = int(first)
+            hi = int(last) if sep else lo
+        except ValueError:
+            raise ValueError(f"Invalid rank selection {spec!r}: {part!r} is not a rank or range")
+        if lo < 0 or hi < lo:
+            raise ValueError(f"Invalid rank selection {spec!r}: bad range {part!r}")
+        ranks.update(range(lo, hi + 1))
+    return frozenset(ranks)
+
+
+def format_rank_set(ranks) -> str:
+    """
+    The compact form of a set of ranks that :func:`parse_rank_set` reads
+    back, e.g. ``[0, 1, 2, 3, 16]`` becomes ``"0-3,16"``.
+    """
+    parts = []
+    ordered = sorted(set(ranks))
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        parts.append(str(ordered[i]) if i == j else f"{ordered[i]}-{ordered[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def rank_of(line: bytes) -> Optional[int]:
+    """The rank label at the start of a raw output line, or ``None``."""
+    match = _RANK_LABEL.match(line)
+    return None if match is None else int(match.group(1))
+
+
+def split_rank_label(line: str) -> tuple[Optional[int], str]:
+    """
+    Split a decoded output line into its rank label and the rest, e.g.
+    ``"  3: loss=0.1"`` becomes ``(3, "loss=0.1")``. An unlabeled line is
+    returned unchanged with a rank of ``None``.
+    """
+    match = _RANK_LABEL_TEXT.match(line)
+    if match is None:
+        return None, line
+    return int(match.group(1)), line[match.end():]
+
+
+def rank_log_path(log_file: str, rank: int) -> str:
+    """
+    The per-rank log file for ``rank`` next to ``log_file``:
+    ``out.log`` becomes ``out.rank<rank>.log``.
+    """
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.rank{rank}{ext}"
+
+
+class _RankBatch:
+    """One write-out of per-rank output, sized for a log writer's queue."""
+
+    def __init__(self, pending: dict[int, list[bytes]], size: int):
+        self.chunks = [(rank, b"".join(chunks)) for rank, chunks in pending.items()]
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class _RankFiles:
+    """
+    The per-rank log files, kept open in a least-recently-used pool of at
+    most ``max_open_files`` descriptors; a rank evicted from the pool is
+    reopened for appending the next time it has output. Only ever used from
+    one thread: the log writer's, when there is one.
+    """
+
+    def __init__(self, log_file: str, max_open_files: int):
+        self._log_file = log_file
+        self._max_open_files = max(1, max_open_files)
+        self._open_files: "OrderedDict[int, object]" = OrderedDict()
+        self._created: set[int] = set()
+
+    def write(self, batch: _RankBatch) -> None:
+        for rank, data in batch.chunks:
+            self._file_for(rank).write(data)
+
+    def flush(self) -> None:
+        for f in self._open_files.values():
+            f.flush()
+
+    def close(self) -> None:
+        while self._open_files:
+            _, f = self._open_files.popitem(last=False)
+            f.close()
+
+    def _file_for(self, rank: int):
+        f = self._open_files.get(rank)
+        if f is not None:
+            self._open_files.move_to_end(rank)
+            return f
+        if len(self._open_files) >= self._max_open_files:
+            _, evicted = self._open_files.popitem(last=False)
+            evicted.close()
+        # Unbuffered: every write is already one batch for this rank.
+        mode = "ab" if rank in self._created else "wb"
+        f = open(rank_log_path(self._log_file, rank), mode, buffering=0)
+        self._created.add(rank)
+        self._open_files[rank] = f
+        return f
+
+
+class RankDemux:
+    """
+    A binary output stream that demultiplexes rank-labeled lines.
+
+    Written chunks are split into lines (a trailing partial line is held
+    until its newline arrives, since a label only appears at the start of a
+    line). A labeled line has its label stripped and is queued for its
+    rank's file; it reaches the console only if its rank is selected. An
+    unlabeled line -- the scheduler's own messages, or everything from a
+    launcher that does not label -- always reaches the console.
+
+    A partial line is held only until it ends in ``"\r"`` or grows to
+    ``_MAX_PARTIAL_BYTES``: a progress bar redraws its line with ``"\r"``
+    and never ends it, and used to reach neither the console nor the file
+    until the job exited. What is passed on early is routed with the label
+    its line started with, and the rest of the line follows it unlabeled.
+
+    Per-rank output is batched in memory and written out on :meth:`flush`,
+    with one ``write(2)`` per rank, so a job of thousands of ranks costs a
+    few hundred system calls per flush rather than one per line. Files are
+    kept open in a least-recently-used pool of at most ``max_open_files``
+    descriptors. Given a ``log_writer`` (see
+    ``console_pipe._LogWriterThread``), the batches are written -- and the
+    files opened and closed -- on its thread rather than by the caller, in
+    the same bounded queue as the combined log files.
+
+    :param console: The binary stream that receives the selected lines, or
+                    ``None`` to discard them.
+    :param log_file: The combined log file whose name the per-rank files
+                     are derived from (see :func:`rank_log_path`), or
+                     ``None`` to only filter the console.
+    :param console_ranks: The ranks shown on the console, or ``None`` for
+                          all of them.
+    :param max_open_files: Upper bound on simultaneously open rank files.
+    :param prefix: Bytes written to the console before each batch of lines.
+    :param suffix: Bytes written to the console after each batch of lines.
+    :param log_writer: If given, the thread that writes the per-rank files.
+    """
+
+    def __init__(
+        self,
+        console,
+        log_file: Optional[str] = None,
+        console_ranks: Optional[frozenset[int]] = None,
+        max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+        prefix: bytes = b"",
+        suffix: bytes = b"",
+        log_writer=None,
+    ):
+        self._console = console
+        self._prefix = prefix
+        self._suffix = suffix
+        self._log_file = log_file
+        self._console_ranks = console_ranks
+        self._files = None if log_file is None else _RankFiles(log_file, max_open_files)
+        self._log_writer = log_writer
+        self._partial = b""
+        # Whether the last piece routed ended mid-line, and if so the rank
+        # (None if unlabeled) that the rest of the line belongs to.
+        self._mid_line = False
+        self._line_rank: Optional[int] = None
+        self._pending: dict[int, list[bytes]] = {}
+        self._pending_bytes = 0
+        self._seen: set[int] = set()
+
+    @property
+    def ranks_seen(self) -> frozenset[int]:
+        """Ranks that have had output written to their own file."""
+        return frozenset(self._seen)
+
+    def isatty(self) -> bool:
+        return self._console is not None and self._console.isatty()
+
+    def write(self, data: bytes) -> None:
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        if len(data) - end >= _MAX_PARTIAL_BYTES:
+            end = len(data)
+        elif data.rfind(b"\r", end) >= 0:
+            end = data.rfind(b"\r", end) + 1
+        self._partial = data[end:]
+        if end:
+            self._route(data[:end])
+
+    def flush(self) -> None:
+        self._write_pending()
+        if self._files is not None:
+            if self._log_writer is not None:
+                self._log_writer.put(self._files, None)
+            else:
+                self._files.flush()
+        if self._console is not None:
+            self._console.flush()
+
+    def close(self) -> None:
+        """Route a trailing unterminated line, flush, and close every file."""
+        if self._partial or self._mid_line:
+            partial, self._partial = self._partial, b""
+            self._route(partial + b"\n")
+        try:
+            self.flush()
+        finally:
+            if self._files is not None:
+                if self._log_writer is not None:
+                    self._log_writer.close_stream(self._files)
+                else:
+                    self._files.close()
+
+    def _route(self, data: bytes) -> None:
+        console = []
+        select = self._console_ranks
+        pieces = data.split(b"\n")
+        last = pieces.pop()
+        # Only "\n" ends a line: a "\r" progress update belongs to the
+        # labeled line it overwrites.
+        pieces = [piece + b"\n" for piece in pieces]
+        if last:
+            pieces.append(last)
+        for piece in pieces:
+            if self._mid_line:
+                rank, body = self._line_rank, piece
+            else:
+                match = _RANK_LABEL.match(piece)
+                rank = None if match is None else int(match.group(1))
+                body = piece if match is None else piece[match.end():]
+            self._mid_line = not piece.endswith(b"\n")
+            self._line_rank = rank
+            if rank is None:
+                console.append(piece)
+                continue
+            if self._files is not None:
+                self._pending.setdefault(rank, []).append(body)
+                self._pending_bytes += len(body)
+                self._seen.add(rank)
+            if select is None or rank in select:
+                console.append(piece)
+        if console and self._console is not None:
+            self._console.write(self._prefix + b"".join(console) + self._suffix)
+        if self._pending_bytes >= _MAX_PENDING_BYTES:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        batch = _RankBatch(self._pending, self._pending_bytes)
+        self._pending, self._pending_bytes = {}, 0
+        if self._log_writer is not None:
+            self._log_writer.put(self._files, batch)
+        else:
+            self._files.write(batch)
@@ -0,0 +1,299 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Node-local staging of the Python environment for ``torchrun-hpc
+--stage-env``.
+
+Every rank of a large job imports torch and the user's packages from the
+shared file system: a few thousand files each, times 4-8 ranks per node,
+times hundreds of nodes. The metadata servers see that as one storm, and it
+dominates start-up at scale. Staging reads the environment from the shared
+file system once per node instead:
+
+1. At launch, the active environment (``sys.prefix`` -- a venv or conda
+   prefix) is packed into a tarball, cached under
+   ``$XDG_CACHE_HOME/hpc-launcher/envs`` (or ``$HPC_LAUNCHER_STAGE_CACHE``,
+   which must be visible from the compute nodes) and named by a hash of
+   what an install changes (see :func:`content_key`), so that an unchanged
+   environment is packed only once. Packs not used for a day are removed
+   once more than a few have accumulated.
+2. The launch command becomes ``stage_env.sh`` in the launch folder. In
+   every task it unpacks the tarball into node-local storage (``/tmp`` by
+   default) unless an earlier task or job on that node already has: the
+   first task per node to take a lock (``flock(1)``) extracts the tarball,
+   the others wait for it. Then it replaces itself with the staged interpreter,
+   so that ``sys.executable`` and the site-packages (and with them torch and
+   the user's packages) come from the node-local copy.
+
+A staged copy is kept for later jobs on the same node; its name includes the
+user ID and the environment's hash. Every task holds a shared lock on its
+copy while it runs, and the task that stages a new copy removes the user's
+other copies that no task holds and none has used for a day. A venv's
+interpreter is a symlink to its base installation, so only the venv's own
+packages are staged (which is where torch lives); a conda prefix is staged
+whole.
+"""
+import glob
+import hashlib
+import logging
+import os
+import shlex
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Optional
+
+from hpc_launcher.cli.common_args import DEFAULT_NODE_DIR
+from hpc_launcher.systems import detection_cache
+
+logger = logging.getLogger(__name__)
+
+STAGE_SCRIPT = "stage_env.sh"
+CACHE_ENV = "HPC_LAUNCHER_STAGE_CACHE"
+
+# Seconds a task waits for another task on its node to finish staging.
+_WAIT_SECONDS = 1800
+
+# Packs kept in the cache however long ago they were used, and the age
+# (since last use) past which the others are removed. A day is well beyond
+# the time a submitted job waits to start and unpack the pack it names.
+_KEEP_PACKS = 3
+_UNUSED_SECONDS = 24 * 3600
+
+
+def archive_dir() -> str:
+    """Where packed environments are cached (shared with the compute nodes)."""
+    return os.getenv(CACHE_ENV) or os.path.join(detection_cache.cache_dir(), "envs")
+
+
+def content_key(prefix: str, executable: Optional[str] = None) -> str:
+    """
+    A digest of what installing, upgrading or removing a package changes in
+    the environment under ``prefix``: the entries of its site-packages
+    directories (each ``*.dist-info``/``*.egg-info`` record is named after
+    its package and version) with their modification times, conda's
+    ``conda-meta/history``, ``pyvenv.cfg`` and the interpreter.
+
+    It is computed on every launch, from the login node and over the shared
+    file system, so it reads a few hundred directory entries rather than
+    stat-ing every file of the environment. A file edited in place under
+    site-packages, without reinstalling its package, does not change it.
+    """
+    prefix = os.path.abspath(prefix)
+    digest = hashlib.sha256()
+
+    def add(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        relative = os.path.relpath(path, prefix)
+        digest.update(f"{relative}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+
+    for name in ("pyvenv.cfg", os.path.join("conda-meta", "history")):
+        add(os.path.join(prefix, name))
+    if executable:
+        add(os.path.realpath(executable))
+    site_packages = sorted(
+        glob.glob(os.path.join(prefix, "lib*", "python*", "site-packages"))
+        + glob.glob(os.path.join(prefix, "lib*", "site-packages"))
+        + glob.glob(os.path.join(prefix, "Lib", "site-packages"))
+    )
+    for directory in site_packages:
+        add(directory)
+        try:
+            entries = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            add(os.path.join(directory, entry))
+    return digest.hexdigest()[:16]
+
+
+def _evict_packs(cache: str, keep: str) -> None:
+    """
+    Remove the packs in ``cache`` beyond the :data:`_KEEP_PACKS` most
+    recently used that no launch has used for :data:`_UNUSED_SECONDS`, and
+    the temporary files of packings that did not finish. ``keep`` is never
+    removed.
+    """
+    now = time.time()
+    packs = []
+    for path in glob.glob(os.path.join(cache, "env-*.tar")) + glob.glob(
+        os.path.join(cache, ".env-*.tar")
+    ):
+        try:
+            packs.append((os.stat(path).st_mtime, path))
+        except OSError:
+            continue
+    packs.sort(reverse=True)
+    complete = 0
+    for mtime, path in packs:
+        partial = os.path.basename(path).startswith(".")
+        if not partial:
+            complete += 1
+        if path == keep or (not partial and complete <= _KEEP_PACKS):
+            continue
+        if now - mtime > _UNUSED_SECONDS:
+            logger.info(f"Removing the unused packed environment {path}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def pack(prefix: str, key: str, cache: Optional[str] = None) -> str:
+    """
+    The tarball of the environment under ``prefix``, packed into ``cache``
+    (default: :func:`archive_dir`) unless it already is. Its modification
+    time records its last use, for :func:`_evict_packs`.
+
+    :return: The path of the tarball.
+    """
+    cache = cache or archive_dir()
+    archive = os.path.join(cache, f"env-{key}.tar")
+    if os.path.exists(archive):
+        logger.info(f"Staging the cached environment {archive}")
+        try:
+            os.utime(archive)
+        except OSError:
+            pass
+        return archive
+    os.makedirs(cache, exist_ok=True)
+    logger.warning(f"Packing {prefix} into {archive} for --stage-env (once per environment)")
+    fd, tmp = tempfile.mkstemp(dir=cache, prefix=".env-", suffix=".tar")
+    try:
+        # Uncompressed: the tarball is read once per node, and extracting
+        # it should cost no more than copying it.
+        with os.fdopen(fd, "wb") as f, tarfile.open(fileobj=f, mode="w") as tar:
+            tar.add(prefix, arcname=".")
+        os.replace(tmp, archive)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    _evict_packs(cache, archive)
+    return archive
+
+
+def stage_script(archive: str, key: str, python: str, node_dir: str = DEFAULT_NODE_DIR) -> str:
+    """
+    The per-task ``stage_env.sh``: stage ``archive`` under ``node_dir`` once
+    per node, then run the staged ``python`` (relative to the environment's
+    prefix) with the script's arguments.
+    """
+    q = shlex.quote
+    unused_minutes = _UNUSED_SECONDS // 60
+    return f"""#!/bin/sh
+# Generated by torchrun-hpc --stage-env: runs the Python environment from a
+# node-local copy instead of the shared file system.
+archive={q(archive)}
+node_dir={q(node_dir)}
+staged="$node_dir"/hpc-launcher-env-$(id -u)-{key}
+python="$staged"/{q(python)}
+if [ ! -e "$staged/.staged" ]; then
+    # The first task on the node to take the lock stages the environment and
+    # the others wait for it. flock(1) holds it through an open descriptor,
+    # so it is released however its holder exits: a task killed mid-extract
+    # cannot leave the node locked for later tasks and jobs.
+    mkdir -p "$node_dir" && {{
+        if flock -w {_WAIT_SECONDS} 9 && [ ! -e "$staged/.staged" ]; then
+            rm -rf "$staged.tmp" "$staged"
+            if mkdir "$staged.tmp" && tar -xf "$archive" -C "$staged.tmp" \
+                    && touch "$staged.tmp/.staged" && mv "$staged.tmp" "$staged"; then
+                echo "stage_env: staged $archive into $staged on $(hostname)" >&2
+                # Remove this user's other copies that no task is using (see
+                # below) and none has started from for a day.
+                for marker in "$node_dir"/hpc-launcher-env-$(id -u)-*/.staged; do
+                    copy=${{marker%/.staged}}
+                    if [ "$copy" != "$staged" ] && [ -e "$marker" ] \
+                            && [ -n "$(find "$marker" -mmin +{unused_minutes})" ]; then
+                        {{ flock -n 8 && rm -rf "$copy" "$copy.lock" "$copy.use"; }} 8>>"$copy.use"
+                    fi
+                done
+            else
+                rm -rf "$staged.tmp"
+            fi
+        fi
+    }} 9>>"$staged.lock"
+    if [ ! -e "$staged/.staged" ]; then
+        echo "stage_env: could not stage $archive into $staged on $(hostname)" >&2
+        exit 1
+    fi
+fi
+# Every task holds a shared lock on the copy for as long as it runs (the
+# interpreter inherits the descriptor), which keeps another job's cleanup
+# away from it; the marker's time records the copy's last use.
+touch "$staged/.staged" 2>/dev/null
+command exec 8>>"$staged.use" && flock -s -w 60 8
+exec "$python" "$@"
+"""
+
+
+def _is_environment(prefix: str) -> bool:
+    """Is ``prefix`` a venv or a conda environment, rather than a base install?"""
+    if prefix == sys.prefix and sys.prefix != sys.base_prefix:
+        return True
+    return os.path.isfile(os.path.join(prefix, "pyvenv.cfg")) or os.path.isdir(
+        os.path.join(prefix, "conda-meta")
+    )
+
+
+def prepare(
+    folder: str,
+    node_dir: str = DEFAULT_NODE_DIR,
+    dry_run: bool = False,
+    prefix: Optional[str] = None,
+    executable: Optional[str] = None,
+) -> str:
+    """
+    Pack the running interpreter's environment (unless ``dry_run``) and write
+    ``stage_env.sh`` into the launch folder.
+
+    :param folder: The launch folder.
+    :param node_dir: The node-local directory to stage into.
+    :param dry_run: Only return the script's path.
+    :param prefix: The environment to stage (default: ``sys.prefix``).
+    :param executable: Its interpreter (default: ``sys.executable``).
+    :return: The path of ``stage_env.sh``, to launch in place of the
+             interpreter.
+    :raises ValueError: If the prefix is not a venv or conda environment
+                        (it would be the system's whole installation), or
+                        the interpreter is not inside it, so that there is
+                        nothing to stage it from.
+    """
+    prefix = prefix or sys.prefix
+    if not _is_environment(prefix):
+        raise ValueError(
+            f"--stage-env: {prefix} is not a venv or conda environment; "
+            "staging it would copy the whole Python installation to every "
+            "node. Activate an environment, or launch without --stage-env"
+        )
+    prefix = os.path.abspath(prefix)
+    executable = os.path.abspath(executable or sys.executable)
+    python = os.path.relpath(executable, prefix)
+    if python.startswith(os.pardir):
+        raise ValueError(
+            f"--stage-env: the interpreter {executable} is not inside its "
+            f"environment {prefix}"
+        )
+    script_path = os.path.abspath(os.path.join(folder, STAGE_SCRIPT))
+    if dry_run:
+        return script_path
+    key = content_key(prefix, executable)
+    archive = pack(prefix, key)
+    with open(script_path, "w") as f:
+        f.write(stage_script(archive, key, python, node_dir))
+    os.chmod(script_path, 0o755)
+    return script_path
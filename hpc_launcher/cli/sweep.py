@@ -0,0 +1,282 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Parameter sweeps, ``launch --sweep sweep.yaml``: every point of the sweep
+is rendered in this process and the whole sweep is submitted as one job
+array -- one ``sbatch --array``, ``flux batch --cc`` or ``bsub -J
+name[1-N]`` -- instead of one submission (and one launcher process) per
+point.
+
+A sweep file (YAML, or JSON without PyYAML) lists the points::
+
+    parameters:        # every combination of these values
+      lr: [0.1, 0.01]
+      batch_size: [32, 64]
+    points:            # and/or these points, as given
+      - {lr: 0.5, batch_size: 16}
+
+and ``{lr}``/``{batch_size}`` in the command and its arguments are replaced
+by each point's values. The sweep folder holds one launch folder per point,
+``point-<index>`` (its own ``launch.sh``, ``out.log`` and ``err.log``, the
+script written by :meth:`Scheduler.launcher_script` exactly as for a single
+``--bg`` launch), the array's batch script ``array.sh``, which runs the
+launch script of the element's folder, and ``sweep.json``, which maps every
+index to its folder, parameters and job ID.
+
+Every point shares the job options of the launch (nodes, time limit, queue
+and so on): the elements of a job array are one job request.
+"""
+import copy
+from dataclasses import dataclass, field
+import itertools
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+from typing import TYPE_CHECKING, Optional
+
+from hpc_launcher.runtime.timeline import phase as timeline_phase
+
+if TYPE_CHECKING:
+    from hpc_launcher.schedulers.scheduler import Scheduler
+    from hpc_launcher.systems.system import System
+
+logger = logging.getLogger(__name__)
+
+# The launch folder of each point in the sweep folder, by array index
+POINT_FOLDER = "point-{}"
+# The batch script of the job array
+ARRAY_SCRIPT = "array.sh"
+# The map of array indices to points and job IDs
+SWEEP_FILE = "sweep.json"
+
+
+@dataclass
+class SweepResult:
+    """
+    The result of a :func:`submit` call.
+
+    :ivar job_ids: The job ID of each point, in order (``None`` where it is
+                   not known), or empty if nothing was submitted.
+    :ivar returncode: The exit status the launcher should propagate: that of
+                      the submit command, or ``None`` after a successful
+                      submission.
+    """
+
+    job_ids: list[Optional[str]] = field(default_factory=list)
+    returncode: Optional[int] = None
+
+
+def _require_yaml():
+    try:
+        import yaml
+    except (ImportError, ModuleNotFoundError):
+        raise ValueError(
+            "YAML sweep files require the PyYAML package "
+            "(pip install hpc-launcher[sweep]); or write the sweep file in JSON"
+        )
+    return yaml
+
+
+def expand(
+    parameters: Optional[dict] = None, points: Optional[list[dict]] = None
+) -> list[dict[str, str]]:
+    """
+    The points of a sweep: every combination of the values in
+    ``parameters``, then ``points`` as given. Values are used as strings.
+
+    :param parameters: A list of values (or a single value) per parameter.
+    :param points: Parameter values of additional points.
+    :return: The points, each a mapping of parameter names to values.
+    """
+    result = []
+    if parameters:
+        names = list(parameters)
+        values = [v if isinstance(v, list) else [v] for v in parameters.values()]
+        for combination in itertools.product(*values):
+            result.append(dict(zip(names, combination)))
+    for point in points or []:
+        if not isinstance(point, dict):
+            raise ValueError(f"A sweep point must be a mapping of parameters to values: {point!r}")
+        result.append(point)
+    return [{str(k): str(v) for k, v in point.items()} for point in result]
+
+
+def load(path: str) -> list[dict[str, str]]:
+    """
+    Read the points of a sweep file.
+
+    :param path: A YAML or JSON file with ``parameters`` and/or ``points``.
+    :return: The points, as :func:`expand` returns them.
+    """
+    with open(path) as f:
+        text = f.read()
+    if path.endswith(".json"):
+        spec = json.loads(text)
+    else:
+        try:
+            yaml = _require_yaml()
+        except ValueError:
+            # JSON is YAML too: read it without PyYAML.
+            try:
+                spec = json.loads(text)
+            except json.JSONDecodeError:
+                raise ValueError(f"{path} is not JSON, and reading YAML requires PyYAML "
+                                 f"(pip install hpc-launcher[sweep])")
+        else:
+            spec = yaml.safe_load(text)
+    if not isinstance(spec, dict) or not set(spec) & {"parameters", "points"}:
+        raise ValueError(f"The sweep file {path} has neither parameters nor points")
+    unknown = set(spec) - {"parameters", "points"}
+    if unknown:
+        raise ValueError(f"Unknown keys in the sweep file {path}: {', '.join(sorted(unknown))}")
+    points = expand(spec.get("parameters"), spec.get("points"))
+    if not points:
+        raise ValueError(f"The sweep file {path} has no points")
+    return points
+
+
+def substitute(text: str, point: dict[str, str]) -> str:
+    """Replace the ``{name}`` of every parameter of ``point`` in ``text``."""
+    if not point:
+        return text
+    pattern = re.compile(r"\{(" + "|".join(map(re.escape, point)) + r")\}")
+    return pattern.sub(lambda match: point[match.group(1)], text)
+
+
+def submit(
+    scheduler: "Scheduler",
+    system: "System",
+    folder_name: str,
+    command: str,
+    args: list[str],
+    points: list[dict[str, str]],
+    script_name: Optional[str] = None,
+    override_launch_args: Optional[dict] = None,
+    save_hostlist: bool = False,
+    setup_only: bool = False,
+    dry_run: bool = False,
+) -> SweepResult:
+    """
+    Render the launch folder of every point of a sweep under
+    ``folder_name`` and submit them as one job array.
+
+    :param scheduler: The configured scheduler; each point is rendered from a
+                      copy of it.
+    :param system: The system to use.
+    :param folder_name: The sweep folder.
+    :param command: The command to run, with ``{name}`` parameters.
+    :param args: Its arguments, with ``{name}`` parameters.
+    :param points: The points, from :func:`load` or :func:`expand`.
+    :param script_name: The name of each point's launch script, if not
+                        ``launch.sh``.
+    :param override_launch_args: Scheduler arguments to override, as for
+                                 :meth:`Scheduler.launch`.
+    :param save_hostlist: Have each point write its hostlist.
+    :param setup_only: Write the sweep folder without submitting it.
+    :param dry_run: Only log what would be submitted.
+    :return: A :class:`SweepResult`.
+    """
+    if not points:
+        raise ValueError("A sweep needs at least one point")
+    text = " ".join([command, *args])
+    unused = {name for point in points for name in point if "{" + name + "}" not in text}
+    if unused:
+        logger.warning(
+            f"The sweep parameters {', '.join(sorted(unused))} do not appear as "
+            f"{{name}} in the command or its arguments"
+        )
+
+    sweep_dir = os.path.abspath(folder_name)
+    indices = scheduler.array_indices(len(points))
+    template = copy.deepcopy(scheduler)
+    template.override_launch_args = override_launch_args
+
+    mapping = []
+    with timeline_phase("generate launch scripts"):
+        for index, point in zip(indices, points):
+            point_dir = os.path.join(sweep_dir, POINT_FOLDER.format(index))
+            point_scheduler = copy.deepcopy(template)
+            filename = point_scheduler.create_launch_folder(point_dir, False, script_name, dry_run)
+            # The same name in every folder
+            script_name = os.path.basename(filename)
+            point_scheduler.work_dir = point_dir
+            point_command = substitute(command, point)
+            if os.path.isfile(point_command):
+                point_command = os.path.abspath(point_command)
+            script = point_scheduler.launcher_script(
+                system, point_command, [substitute(a, point) for a in args],
+                False, save_hostlist, point_dir,
+            )
+            if not dry_run:
+                with open(filename, "w") as fp:
+                    fp.write(script)
+                    fp.write(f"\n# Element {index} of the job array in {os.path.join(sweep_dir, ARRAY_SCRIPT)}\n")
+                    if scheduler.command_line:
+                        fp.write("# User command invoked: " + " ".join(scheduler.command_line) + "\n")
+                os.chmod(filename, 0o700)
+            mapping.append(dict(index=index, folder=POINT_FOLDER.format(index), parameters=point))
+
+        # The array's own output files are the elements' out.log and err.log.
+        array_scheduler = copy.deepcopy(template)
+        array_scheduler.work_dir = sweep_dir
+        point_pattern = os.path.join(sweep_dir, POINT_FOLDER)
+        element = point_pattern.replace("{}", scheduler.array_index_pattern())
+        for attr, default in (("out_log_file", "out.log"), ("err_log_file", "err.log")):
+            setattr(array_scheduler, attr,
+                    os.path.join(element, os.path.basename(getattr(template, attr) or default)))
+        array_script = array_scheduler.array_script(system, point_pattern, script_name)
+
+    array_file = os.path.join(sweep_dir, ARRAY_SCRIPT)
+    full_cmdline = scheduler.array_launch_command(indices) + [array_file]
+    if not dry_run:
+        with open(array_file, "w") as fp:
+            fp.write(array_script)
+            fp.write("\n# Launch command: " + " ".join(full_cmdline) + "\n")
+        os.chmod(array_file, 0o700)
+        _write_mapping(sweep_dir, command, args, full_cmdline, mapping)
+
+    if setup_only:
+        logger.warning(f'To launch, run: {" ".join(full_cmdline)}')
+        return SweepResult(returncode=0)
+
+    logger.info(f'Launching {" ".join(full_cmdline)}')
+    if dry_run:
+        return SweepResult(returncode=0)
+
+    with timeline_phase("submit"):
+        process = subprocess.run(full_cmdline, capture_output=True)
+    # As in Scheduler.launch: only the exit status decides success.
+    sys.stderr.buffer.write(process.stderr)
+    if process.returncode:
+        logger.error(f"Batch scheduler exited with error code {process.returncode}")
+        sys.stdout.buffer.write(process.stdout)
+        return SweepResult(returncode=process.returncode)
+
+    job_ids = scheduler.get_array_job_ids(process.stdout.decode(), indices)
+    for entry, job_id in zip(mapping, job_ids):
+        entry["job_id"] = job_id
+    _write_mapping(sweep_dir, command, args, full_cmdline, mapping)
+    return SweepResult(job_ids=job_ids, returncode=None)
+
+
+def _write_mapping(sweep_dir, command, args, full_cmdline, mapping):
+    with open(os.path.join(sweep_dir, SWEEP_FILE), "w") as fp:
+        json.dump(
+            dict(command=[command, *args], launch_command=full_cmdline, points=mapping),
+            fp, indent=2,
+        )
+        fp.write("\n")
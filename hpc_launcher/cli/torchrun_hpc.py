@@ -13,16 +13,19 @@
 # SPDX-License-Identifier: (Apache-2.0)
 import argparse
 from hpc_launcher.cli import common_args, launch_helpers
+from hpc_launcher.runtime import startup_telemetry, timeline
 from hpc_launcher.schedulers import get_schedulers
 from hpc_launcher.schedulers.scheduler import Scheduler
 from hpc_launcher.schedulers.local import LocalScheduler
+from hpc_launcher.systems import cpu_affinity
 
-try:
-    import mpi4py
+# Only whether mpi4py and torch are installed matters here (they are used by
+# the trampoline, on the compute nodes), so look them up without importing
+# them: importing torch alone can take seconds from a cold parallel file
+# system.
+import importlib.util
 
-    mpi = True
-except (ImportError, ModuleNotFoundError):
-    mpi = None
+mpi = importlib.util.find_spec("mpi4py") is not None
 
 import logging
 import os
@@ -33,6 +36,7 @@ logger = logging.getLogger(__name__)
 
 
 def main():
+    timeline.start("torchrun-hpc")
     parser = argparse.ArgumentParser(
         description=
         "A wrapper script that launches and runs distributed PyTorch on HPC systems."
@@ -42,7 +46,29 @@ def main():
         "-r",
         "--rdv",
         default=None,
-        help="Specifies rendezvous protocol to use: mpi | tcp",
+        help="Specifies rendezvous protocol to use: mpi | tcp | tcp-hier | file. "
+        "tcp-hier connects one rank per node to rank 0's store, relaying "
+        "the node's other ranks; file uses a file store in the launch folder.",
+    )
+
+    parser.add_argument(
+        "--probe-port",
+        action="store_true",
+        default=False,
+        help="Choose the tcp rendezvous port on the first node of the job "
+        "instead of the launch host: rank 0 tests the port there, takes "
+        "another if it is in use (or if listening fails), and the other "
+        "ranks read the port it chose from the launch folder.",
+    )
+
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        default=False,
+        help="Have rank 0 gather every rank's start-up times (import torch, "
+        "device selection, init_process_group) and write them with a report "
+        "of the slowest ranks to the launch folder. Adds one collective "
+        "right after init_process_group.",
     )
 
     parser.add_argument(
@@ -64,6 +90,62 @@ def main():
         "Ensureing that HIP vs ROCR can improve behavior of HF Accelerate and TorchTitan.",
     )
 
+    parser.add_argument(
+        "--cpu-bind",
+        choices=cpu_affinity.POLICIES,
+        default="none",
+        help="Bind each rank to its share of the node's cores: none (leave "
+        "the scheduler's binding), numa (round-robin over NUMA domains), "
+        "gpu-local (the NUMA domain of the rank's GPU) or packed (contiguous "
+        "blocks). Sets OMP_NUM_THREADS to match unless it is already set.",
+    )
+
+    parser.add_argument(
+        "--nic-affinity",
+        action="store_true",
+        default=False,
+        help="On nodes with several NICs, point each rank's NCCL_SOCKET_IFNAME "
+        "and FI_CXI_DEVICE_NAME (or NCCL_IB_HCA) at the NIC closest to its "
+        "GPU in the PCI topology, instead of one NIC for the whole node.",
+    )
+
+    parser.add_argument(
+        "--stage-env",
+        action="store_true",
+        default=False,
+        help="Run every rank's Python from a node-local copy of the active "
+        "environment instead of the shared file system: it is packed once "
+        "(cached by content), and the first task on each node unpacks it.",
+    )
+
+    parser.add_argument(
+        "--pycache",
+        action="store_true",
+        default=False,
+        help="Compile the script's directory and the site-packages into a "
+        "bytecode cache (reused across launches) and have every rank read it "
+        "from a node-local copy through PYTHONPYCACHEPREFIX.",
+    )
+
+    parser.add_argument(
+        "--kernel-cache",
+        action="store_true",
+        default=False,
+        help="Keep MIOpen, Triton and TorchInductor caches across jobs: each "
+        "node seeds its node-local caches from a shared cache next to the "
+        "launch folder, and merges new entries back when the job ends.",
+    )
+
+    parser.add_argument(
+        "--node-local-dir",
+        "--stage-env-dir",
+        dest="node_local_dir",
+        default=common_args.DEFAULT_NODE_DIR,
+        metavar="DIR",
+        help="Node-local directory for --stage-env, --pycache and --kernel-cache "
+        f"(default: {common_args.DEFAULT_NODE_DIR})",
+    )
+
     parser.add_argument(
         "-m",
         "--module",
@@ -81,7 +163,8 @@ def main():
         help="Arguments to the command that should be executed",
     )
 
-    args = parser.parse_args()
+    with timeline.phase("parse arguments"):
+        args = parser.parse_args()
 
     launch_helpers.setup_logging(logger, args.verbose)
 
@@ -118,7 +201,8 @@ def main():
     # scheduler validation further down can tell "-n 2" apart from "this node
     # has two GPUs".
     requested_procs = common_args.requested_process_count(args)
-    system = common_args.process_arguments(args, logger)
+    with timeline.phase("process arguments"):
+        system = common_args.process_arguments(args, logger)
     if args.job_comm_protocol == "MPI":
         logger.warning(
             f"Using MPI as the primary communication protocol for PyTorch requires additional support"
@@ -126,7 +210,8 @@ def main():
     else:
         system.job_comm_protocol = "*CCL"
     # Pick batch scheduler
-    scheduler = launch_helpers.select_scheduler(args, logger, system)
+    with timeline.phase("select scheduler"):
+        scheduler = launch_helpers.select_scheduler(args, logger, system)
 
     # Checks that need the resolved scheduler rather than the raw flags:
     # --scheduler local selects the same LocalScheduler as --local without
@@ -145,19 +230,27 @@ def main():
                 raise Exception("MPI rendezvous requested but not available")
             else:
                 env_list = scheduler.setup_rendezvous_protocol("mpi")
-        elif args.rdv == "tcp":
-            env_list = scheduler.setup_rendezvous_protocol("tcp")
+        elif args.rdv in ("tcp", "tcp-hier", "file"):
+            env_list = scheduler.setup_rendezvous_protocol(args.rdv)
         else:
             raise Exception(f"Unknown rendezvous {args.rdv} requested.")
 
+    if args.probe_port and args.rdv in ("mpi", "file"):
+        logger.warning("--probe-port only applies to the tcp and tcp-hier rendezvous; ignoring it")
+        args.probe_port = False
+
+    if args.cpu_bind != "none":
+        env_list.append(("TORCHRUN_HPC_CPU_BIND", args.cpu_bind))
+
+    if args.nic_affinity:
+        env_list.append(("TORCHRUN_HPC_NIC_AFFINITY", "1"))
+
     if args.unswap_rocr_hip_vis_dev:
         env_list.append(("TORCHRUN_HPC_UNSWAP_ROCR_HIP_VIS_DEV", "TRUE"))
 
     system.extend_environment_variables(env_list)
 
-    try:
-        import torch
-    except (ModuleNotFoundError, ImportError):
+    if importlib.util.find_spec("torch") is None:
         print(
             "PyTorch is not installed on this system, but is required for torchrun-hpc."
         )
@@ -166,9 +259,32 @@ def main():
     _, folder_name = scheduler.create_launch_folder_name(
         args.command, "torchrun_hpc", args.launch_dir)
 
-    script_file = scheduler.create_launch_folder(folder_name, not args.bg,
-                                                 args.output_script,
-                                                 args.dry_run)
+    with timeline.phase("create launch folder"):
+        script_file = scheduler.create_launch_folder(folder_name, not args.bg,
+                                                     args.output_script,
+                                                     args.dry_run)
+
+    # The file rendezvous and the tcp-hier relays meet in the launch folder.
+    system.extend_environment_variables(
+        [("TORCHRUN_HPC_LAUNCH_DIR", os.path.abspath(folder_name))]
+    )
+    if args.startup_report:
+        # Rank 0 writes the job's start-up report into the launch folder (see
+        # hpc_launcher.runtime.startup_telemetry).
+        system.extend_environment_variables(
+            [(startup_telemetry.REPORT_ENV, os.path.abspath(folder_name))]
+        )
+    if args.probe_port:
+        # Rank 0 publishes the port it listens on in the launch folder.
+        from hpc_launcher.runtime import rendezvous_port
+
+        system.extend_environment_variables(rendezvous_port.prepare(folder_name))
+    if args.timeline:
+        # Every rank's trampoline writes its own part of the timeline into
+        # the launch folder (see hpc_launcher.runtime.timeline).
+        system.extend_environment_variables(
+            [(timeline.TIMELINE_ENV, os.path.abspath(folder_name))]
+        )
 
     trampoline_file = "torchrun_hpc_trampoline.py"
 
@@ -188,6 +304,39 @@ def main():
         )
 
     command = sys.executable
+    if args.stage_env:
+        from hpc_launcher.cli import stage_env
+
+        with timeline.phase("stage environment"):
+            command = stage_env.prepare(folder_name, args.node_local_dir, args.dry_run)
+    if args.pycache and args.stage_env:
+        logger.warning(
+            "--pycache is ignored with --stage-env: the staged environment "
+            "already brings its own bytecode to each node"
+        )
+    elif args.pycache:
+        from hpc_launcher.runtime import pycache
+
+        with timeline.phase("build bytecode cache"):
+            directories = pycache.default_directories(
+                None if args.module else args.command
+            )
+            system.extend_environment_variables(
+                pycache.prepare(folder_name, directories, args.node_local_dir, args.dry_run)
+            )
+    if args.kernel_cache:
+        from hpc_launcher.runtime import kernel_cache
+
+        params = system.active_system_params
+        system.extend_environment_variables(
+            kernel_cache.prepare(
+                folder_name,
+                system.system_name,
+                params.gpu_arch if params else None,
+                args.node_local_dir,
+                args.dry_run,
+            )
+        )
     launch_args = [
         "-u",
         f"{os.path.abspath(folder_name)}/{trampoline_file}",
@@ -215,6 +364,9 @@ def main():
         args.launch_dir != None and args.save_hostlist,
     )
 
+    if args.timeline and not args.dry_run:
+        timeline.save(folder_name)
+
     if result.job_id:
         msg = f"Job ID: {result.job_id} launched from {folder_name}"
         logger.info(msg)
@@ -0,0 +1,243 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Bracket hostlists (``node[001-128,130]``) without the scheduler's tools.
+
+Generated launch scripts used to resolve the job's first node with
+``scontrol show hostnames`` (a fork, and an RPC to slurmctld from every
+batch script), with LC's ``/bin/hostlist`` (which most machines do not
+have) and with ``tr``/``sort -u``. The expressions here follow Slurm's
+syntax: comma-separated entries, each of which may hold several bracketed
+groups of numbers and ranges, whose zero padding is the width of each
+range's lower bound. Whitespace also separates entries, as it does in
+``$LSB_HOSTS`` and in ``flux hostlist`` output.
+
+:func:`expand` and :func:`compress` run in time proportional to their
+output. :class:`Hostlist` is an ordered set of host names with the set
+operators.
+
+From a shell::
+
+    python -m hpc_launcher.hostlist first "$SLURM_JOB_NODELIST"
+    python -m hpc_launcher.hostlist {expand,compress,count,first} [HOSTLIST ...]
+
+reads the hostlists from the arguments, or from standard input if there are
+none.
+"""
+import re
+import shlex
+import sys
+from typing import Iterable, Iterator, Union
+
+_TRAILING_NUMBER = re.compile(r"^(.*?)(\d+)(\D*)$")
+
+
+def _entries(text: str) -> Iterator[str]:
+    """The top-level entries of a hostlist: split on commas and whitespace outside brackets."""
+    depth = 0
+    start = 0
+    for i, c in enumerate(text):
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+            if depth < 0:
+                raise ValueError(f"Unbalanced ']' in hostlist {text!r}")
+        elif depth == 0 and (c == "," or c.isspace()):
+            if i > start:
+                yield text[start:i]
+            start = i + 1
+    if depth:
+        raise ValueError(f"Unbalanced '[' in hostlist {text!r}")
+    if start < len(text):
+        yield text[start:]
+
+
+def _numbers(group: str, text: str) -> Iterator[str]:
+    """The numbers of a bracketed group such as ``001-003,7``, zero-padded."""
+    for part in group.split(","):
+        low, _, high = part.strip().partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            raise ValueError(f"Bad range {part!r} in hostlist {text!r}")
+        if not high:
+            yield low
+            continue
+        if int(high) < int(low):
+            raise ValueError(f"Descending range {part!r} in hostlist {text!r}")
+        width = len(low)
+        for n in range(int(low), int(high) + 1):
+            yield str(n).zfill(width)
+
+
+def _expand_entry(entry: str, text: str) -> Iterator[str]:
+    start = entry.find("[")
+    if start < 0:
+        yield entry
+        return
+    end = entry.find("]", start)
+    prefix, rest = entry[:start], entry[end + 1:]
+    tails = list(_expand_entry(rest, text)) if "[" in rest else [rest]
+    for number in _numbers(entry[start + 1:end], text):
+        for tail in tails:
+            yield prefix + number + tail
+
+
+def iter_hosts(hostlist: str) -> Iterator[str]:
+    """The host names of ``hostlist``, in order (duplicates included)."""
+    for entry in _entries(hostlist):
+        yield from _expand_entry(entry, hostlist)
+
+
+def expand(hostlist: str) -> list[str]:
+    """:func:`iter_hosts` as a list."""
+    return list(iter_hosts(hostlist))
+
+
+def _format(prefix: str, runs: list[list], suffix: str) -> str:
+    def number(n, width):
+        return str(n).zfill(width)
+
+    if len(runs) == 1 and runs[0][0] == runs[0][1]:
+        return f"{prefix}{number(runs[0][0], runs[0][2])}{suffix}"
+    ranges = ",".join(
+        number(low, width) if low == high else f"{number(low, width)}-{number(high, width)}"
+        for low, high, width in runs
+    )
+    return f"{prefix}[{ranges}]{suffix}"
+
+
+def compress(hosts: Iterable[str]) -> str:
+    """
+    The shortest bracket expression for ``hosts`` that this module writes.
+    Hosts that differ only in their last number are grouped in the order
+    each group first appears, and consecutive numbers within a group become
+    ranges; so the first host stays first, but hosts of different groups may
+    be reordered.
+    """
+    groups: dict[tuple[str, str], list[list]] = {}
+    for host in hosts:
+        match = _TRAILING_NUMBER.match(host)
+        if not match:
+            groups.setdefault((host, None), [])
+            continue
+        prefix, digits, suffix = match.groups()
+        n = int(digits)
+        # Width 0 is an unpadded number; a padded one keeps its width.
+        width = len(digits) if digits[0] == "0" and len(digits) > 1 else 0
+        runs = groups.setdefault((prefix, suffix), [])
+        if runs:
+            last = runs[-1]
+            fits = len(digits) == last[2] if last[2] else width == 0
+            if fits and n == last[1] + 1:
+                last[1] = n
+                continue
+        runs.append([n, n, width])
+    return ",".join(
+        prefix if suffix is None else _format(prefix, runs, suffix)
+        for (prefix, suffix), runs in groups.items()
+    )
+
+
+class Hostlist:
+    """An ordered set of host names, read from and written as a bracket hostlist."""
+
+    def __init__(self, hosts: Union[str, Iterable[str]] = ()):
+        if isinstance(hosts, str):
+            hosts = iter_hosts(hosts)
+        self._hosts = dict.fromkeys(hosts)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._hosts)
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def __contains__(self, host: str) -> bool:
+        return host in self._hosts
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Hostlist):
+            return NotImplemented
+        return list(self._hosts) == list(other._hosts)
+
+    def __or__(self, other: "Hostlist") -> "Hostlist":
+        return Hostlist([*self._hosts, *other])
+
+    def __and__(self, other: "Hostlist") -> "Hostlist":
+        return Hostlist(host for host in self._hosts if host in other)
+
+    def __sub__(self, other: "Hostlist") -> "Hostlist":
+        return Hostlist(host for host in self._hosts if host not in other)
+
+    def first(self) -> str:
+        """The first host. :raises ValueError: If the hostlist is empty."""
+        for host in self._hosts:
+            return host
+        raise ValueError("Empty hostlist")
+
+    def __str__(self) -> str:
+        return compress(self._hosts)
+
+    def __repr__(self) -> str:
+        return f"Hostlist({str(self)!r})"
+
+
+def shell_command(command: str, hostlist: str = "") -> str:
+    """
+    The shell command that runs ``python -m hpc_launcher.hostlist command
+    hostlist`` with the launcher's own interpreter, for generated scripts.
+    ``hostlist`` is inserted as is, so that it may be a variable reference.
+    """
+    return f"{shlex.quote(sys.executable)} -m hpc_launcher.hostlist {command} {hostlist}".rstrip()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m hpc_launcher.hostlist",
+        description="Expand or compress bracket hostlists such as node[001-128,130].",
+    )
+    parser.add_argument(
+        "command",
+        choices=("expand", "compress", "count", "first"),
+        help="expand: one host per line; compress: one bracket expression; "
+        "count: the number of distinct hosts; first: the first host",
+    )
+    parser.add_argument(
+        "hostlist", nargs="*", help="Hostlists to combine (default: read standard input)"
+    )
+    args = parser.parse_args(argv)
+    text = " ".join(args.hostlist) if args.hostlist else sys.stdin.read()
+    try:
+        if args.command == "first":
+            # Only as much of the hostlist as it takes to find its first host.
+            host = next(iter_hosts(text), None)
+            if host is None:
+                parser.exit(1, "hostlist: empty hostlist\n")
+            print(host)
+            return
+        hosts = Hostlist(text)
+    except ValueError as e:
+        parser.exit(2, f"hostlist: {e}\n")
+    if args.command == "expand":
+        sys.stdout.writelines(f"{host}\n" for host in hosts)
+    elif args.command == "compress":
+        print(hosts)
+    else:
+        print(len(hosts))
+
+
+if __name__ == "__main__":
+    main()
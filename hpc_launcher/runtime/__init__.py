@@ -0,0 +1,21 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Helpers that run inside the job rather than in the launcher's command line:
+the timeline and start-up report every rank contributes to, the rendezvous
+port and relay, and the bytecode and kernel caches the torchrun-hpc
+trampoline prepares on each node. The systems layer and the trampoline
+import them, so they live outside :mod:`hpc_launcher.cli` and import
+nothing from it.
+"""
@@ -0,0 +1,364 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Persistent compiler and kernel caches for ``torchrun-hpc --kernel-cache``.
+
+MIOpen's tuning databases, Triton's compiled kernels and TorchInductor's
+graph cache live in node-local directories (the AMD system profiles point
+MIOpen at ``$TMPDIR``), which start empty on every allocation. Every job
+then tunes and compiles its kernels from scratch. With ``--kernel-cache``:
+
+1. At launch, a shared cache directory is chosen next to the launch folder,
+   ``<launch folder's parent>/.hpc-launcher-kernel-cache/<key>`` (or under
+   ``$HPC_LAUNCHER_KERNEL_CACHE_DIR``). The key is a hash of what the cached
+   kernels depend on: the system, its GPU architecture, and the installed
+   torch, Triton and ROCm versions.
+2. The job's environment block points ``MIOPEN_USER_DB_PATH``,
+   ``MIOPEN_CUSTOM_CACHE_DIR``, ``TRITON_CACHE_DIR`` and
+   ``TORCHINDUCTOR_CACHE_DIR`` to a node-local directory under
+   ``--node-local-dir``.
+3. Before the user's script starts, the first rank on each node seeds the
+   node-local directory from the shared cache (:func:`seed`), and the
+   node's other ranks wait for it on a node-local ``flock``.
+4. When the user's script ends, local rank 0 of each node merges the
+   entries that are new or changed on the node back into the shared cache
+   (:func:`merge_back`).
+
+The shared cache is a directory tree rather than a single archive, so that
+a merge only writes the files that changed. Every file is written under a
+temporary name and renamed into place, so a job seeding from the cache
+never reads a half-written file. Merges from concurrent jobs are serialized
+by a lock directory in the shared cache (``flock`` is not reliable across
+the nodes of a parallel file system). Its holder refreshes its mtime every
+:data:`_HEARTBEAT_SECONDS` for as long as it merges, so it is only broken
+once it has gone :data:`_STALE_SECONDS` untouched: its holder died. MIOpen's text databases are
+merged record by record; every other file is replaced when the node's copy
+is newer.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import platform
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "HPC_LAUNCHER_KERNEL_CACHE_DIR"
+SOURCE_ENV = "HPC_LAUNCHER_KERNEL_CACHE"
+LAUNCH_ENV = "HPC_LAUNCHER_KERNEL_CACHE_LAUNCH"
+SHARED_DIR = ".hpc-launcher-kernel-cache"
+
+# Each cache's environment variable and its subdirectory of the cache.
+CACHES = (
+    ("MIOPEN_USER_DB_PATH", "miopen-user-db"),
+    ("MIOPEN_CUSTOM_CACHE_DIR", "miopen-cache"),
+    ("TRITON_CACHE_DIR", "triton"),
+    ("TORCHINDUCTOR_CACHE_DIR", "inductor"),
+)
+
+# MIOpen's text databases: one ``key=value`` record per line.
+_RECORD_SUFFIXES = (".udb", ".ufdb.txt", ".fdb.txt")
+
+# Seconds a rank waits for another rank on its node to seed the cache.
+_WAIT_SECONDS = 600
+# Seconds after which a merge lock is assumed to belong to a job that died.
+_STALE_SECONDS = 600
+# Seconds between the refreshes of a held lock's mtime; well within
+# _STALE_SECONDS, so that a long merge is never taken for a dead one.
+_HEARTBEAT_SECONDS = 60
+
+
+def _installed_version(distribution: str) -> str:
+    """The installed version of ``distribution`` (without importing it), or ``""``."""
+    from importlib import metadata
+
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def cache_key(system_name: str, gpu_arch: Optional[str]) -> str:
+    """
+    A digest of what cached kernels depend on: the system and its GPU
+    architecture, and the installed torch, Triton and ROCm versions.
+    """
+    rocm = os.getenv("ROCM_PATH")
+    parts = [
+        system_name,
+        gpu_arch or "",
+        platform.machine(),
+        _installed_version("torch"),
+        _installed_version("triton") or _installed_version("pytorch-triton-rocm"),
+        os.path.basename(os.path.realpath(rocm)) if rocm else "",
+    ]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+
+
+def shared_path(folder: str, key: str) -> str:
+    """The shared cache ``key`` for the launch folder ``folder``."""
+    root = os.getenv(CACHE_DIR_ENV) or os.path.join(
+        os.path.dirname(os.path.abspath(folder)), SHARED_DIR
+    )
+    return os.path.join(root, key)
+
+
+def node_local_path(node_dir: str, key: str) -> str:
+    """The node-local copy of the cache ``key`` (per user, since ``/tmp`` is shared)."""
+    return os.path.join(node_dir, f"hpc-launcher-kernels-{os.getuid()}-{key}")
+
+
+def prepare(
+    folder: str,
+    system_name: str,
+    gpu_arch: Optional[str],
+    node_dir: str,
+    dry_run: bool = False,
+) -> list[tuple[str, str]]:
+    """
+    Create the shared cache for this system (unless ``dry_run``) and return
+    the environment the job needs to use it.
+    """
+    key = cache_key(system_name, gpu_arch)
+    shared = shared_path(folder, key)
+    local = node_local_path(node_dir, key)
+    if not dry_run:
+        os.makedirs(shared, exist_ok=True)
+        logger.info(f"Kernel caches are seeded from and merged into {shared}")
+    env = [(variable, os.path.join(local, sub)) for variable, sub in CACHES]
+    env.append((SOURCE_ENV, shared))
+    env.append((LAUNCH_ENV, f"{time.time_ns():x}"))
+    return env
+
+
+def _files(root: str) -> dict[str, os.stat_result]:
+    """Every regular file under ``root`` by relative path, skipping the lock and markers."""
+    found = {}
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.endswith(".lock")]
+        for name in files:
+            if name.startswith(".seeded-") or name.startswith(".tmp-"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                found[os.path.relpath(path, root)] = st
+    return found
+
+
+def _merge_records(ours: str, theirs: str) -> bytes:
+    """
+    Merge two MIOpen text databases: every record of ``theirs``, with the
+    records of ``ours`` taking precedence for the same key.
+    """
+    records = {}
+    for path in (theirs, ours):
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.rstrip(b"\n")
+                if line:
+                    records[line.split(b"=", 1)[0]] = line
+    return b"".join(line + b"\n" for line in records.values())
+
+
+def _write(
+    dest: str,
+    source: Optional[str] = None,
+    data: Optional[bytes] = None,
+    mtime_ns: Optional[int] = None,
+):
+    """
+    Atomically replace ``dest`` with a copy of ``source`` (keeping its mtime)
+    or ``data`` (modified at ``mtime_ns``, if given).
+    """
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if source is not None:
+                with open(source, "rb") as src:
+                    shutil.copyfileobj(src, f)
+            else:
+                f.write(data)
+        if source is not None:
+            shutil.copystat(source, tmp)
+        elif mtime_ns is not None:
+            os.utime(tmp, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def sync(source: str, dest: str) -> int:
+    """
+    Copy into ``dest`` every file of ``source`` that ``dest`` lacks or has an
+    older copy of; MIOpen's text databases are merged record by record.
+
+    :return: The number of files written.
+    """
+    theirs = _files(dest)
+    written = 0
+    for relative, st in _files(source).items():
+        existing = theirs.get(relative)
+        if existing is not None and existing.st_mtime_ns >= st.st_mtime_ns:
+            continue
+        src, dst = os.path.join(source, relative), os.path.join(dest, relative)
+        if existing is not None and relative.endswith(_RECORD_SUFFIXES):
+            # Not older than the source, so that it is not merged again.
+            _write(dst, data=_merge_records(src, dst),
+                   mtime_ns=max(st.st_mtime_ns, time.time_ns()))
+        else:
+            _write(dst, source=src)
+        written += 1
+    return written
+
+
+def _acquire(lock: str, wait: float) -> bool:
+    """
+    Create the lock directory ``lock`` in the shared cache, waiting up to
+    ``wait`` seconds for its holder.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            os.mkdir(lock)
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock).st_mtime > _STALE_SECONDS:
+                    os.rmdir(lock)
+                    continue
+            except OSError:
+                continue
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.1)
+
+
+class _Held:
+    """
+    Holds a lock directory taken by :func:`_acquire`: refreshes its mtime
+    every :data:`_HEARTBEAT_SECONDS` from a background thread, so that
+    waiters do not break it while its holder is alive, and removes it on
+    exit.
+    """
+
+    def __init__(self, lock: str):
+        self._lock = lock
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def __enter__(self) -> "_Held":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._done.set()
+        self._thread.join()
+        os.rmdir(self._lock)
+
+    def _beat(self) -> None:
+        while not self._done.wait(_HEARTBEAT_SECONDS):
+            try:
+                os.utime(self._lock)
+            except OSError:
+                pass
+
+
+def seed() -> Optional[int]:
+    """
+    Seed this node's kernel caches from the shared cache, once per node and
+    launch. The first rank on the node to lock ``<node dir>.lock`` copies;
+    the others wait for it and copy nothing. The lock is an ``flock``, which
+    the kernel releases however its holder exits, so a rank killed mid-copy
+    does not stall the node's later ranks.
+
+    :return: The number of files copied, or ``None`` if the job does not use
+             the cache or this rank did not seed it.
+    """
+    shared, launch = os.getenv(SOURCE_ENV), os.getenv(LAUNCH_ENV)
+    local = os.getenv(CACHES[0][0])
+    if not shared or not launch or not local:
+        return None
+    local = os.path.dirname(local)
+    marker = os.path.join(local, f".seeded-{launch}")
+    if os.path.exists(marker):
+        return None
+    try:
+        os.makedirs(local, exist_ok=True)
+        lock = open(local + ".lock", "a")
+    except OSError:
+        return None
+    with lock:
+        deadline = time.monotonic() + _WAIT_SECONDS
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.1)
+            except OSError:
+                return None
+        try:
+            if os.path.exists(marker):
+                return None  # another rank seeded while this one waited
+            copied = sync(shared, local)
+            for _, sub in CACHES:
+                os.makedirs(os.path.join(local, sub), exist_ok=True)
+            open(marker, "w").close()
+            return copied
+        except OSError as e:
+            print(f"hpc-launcher: could not seed the kernel caches from {shared}: {e}",
+                  file=sys.stderr)
+            return None
+
+
+def merge_back() -> Optional[int]:
+    """
+    Merge this node's new and changed kernel cache entries into the shared
+    cache. Call once per node (from local rank 0) when the job ends.
+
+    :return: The number of files written, or ``None`` if the job does not use
+             the cache or the merge failed.
+    """
+    shared, local = os.getenv(SOURCE_ENV), os.getenv(CACHES[0][0])
+    if not shared or not local:
+        return None
+    local = os.path.dirname(local)
+    lock = os.path.join(shared, ".merge.lock")
+    if not _acquire(lock, _STALE_SECONDS):
+        print(f"hpc-launcher: gave up waiting for {lock}; kernel caches not merged",
+              file=sys.stderr)
+        return None
+    with _Held(lock):
+        try:
+            return sync(local, shared)
+        except OSError as e:
+            print(f"hpc-launcher: could not merge the kernel caches into {shared}: {e}",
+                  file=sys.stderr)
+            return None
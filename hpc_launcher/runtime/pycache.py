@@ -0,0 +1,418 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+A launcher-managed bytecode cache for ``torchrun-hpc --pycache``.
+
+A rank importing from a shared or read-only installation stats every
+module's ``__pycache__`` entry on the shared file system, and recompiles
+every module whose bytecode is missing or stale there -- on every import,
+if it cannot write the result back. With ``--pycache``:
+
+1. At launch, the user's script directory, the standard library and the
+   site-packages are each compiled into a content-addressed cache,
+   ``$XDG_CACHE_HOME/hpc-launcher/pycache/<key>`` (or
+   ``$HPC_LAUNCHER_PYCACHE_CACHE``), laid out as a ``PYTHONPYCACHEPREFIX``
+   tree. A directory's key is a hash of the interpreter's cache tag and its
+   source files' paths, sizes and modification times, so editing the
+   script only rebuilds the script directory's cache, and an unchanged
+   installation is compiled once and reused by later launches. Caches no
+   launch has used for a day are removed.
+2. The job's environment block exports ``PYTHONPYCACHEPREFIX`` pointing to
+   a node-local directory, and ``HPC_LAUNCHER_PYCACHE`` listing the shared
+   caches.
+3. Before it imports anything else, each rank's trampoline calls
+   :func:`sync_to_node`, and the first rank on each node merges the shared
+   caches into the node-local directory. After that, every rank reads its
+   bytecode from node-local storage.
+
+The installation directories are compiled in full. The script directory
+(which may well be ``$HOME``) is walked without its hidden directories, and
+is left out of the cache if it holds more than :data:`_SCRIPT_MAX_DIRS`
+directories.
+
+The launch folder's ``pycache_metrics.json`` records how many modules had no
+valid bytecode of their own and how long they took to compile. Each rank
+would otherwise have compiled those modules on import, so that time is an
+estimate of the most import time the cache saves per rank: it was measured
+on the launch host, and a rank only compiles the modules it imports.
+"""
+import fcntl
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import py_compile
+import shutil
+import site
+import sys
+import sysconfig
+import tempfile
+import time
+from typing import Optional
+
+from hpc_launcher.systems import detection_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENV = "HPC_LAUNCHER_PYCACHE_CACHE"
+SOURCE_ENV = "HPC_LAUNCHER_PYCACHE"
+METRICS_FILE = "pycache_metrics.json"
+
+_COMPLETE = ".complete"
+
+# Seconds a rank waits for another rank on its node to copy the cache.
+_WAIT_SECONDS = 600
+
+# Directories beyond which the script directory is not compiled at launch.
+_SCRIPT_MAX_DIRS = 1000
+
+# Seconds after which a cache no launch has used is removed.
+_UNUSED_SECONDS = 24 * 3600
+
+
+def cache_root() -> str:
+    """Where compiled caches are kept (shared with the compute nodes)."""
+    return os.getenv(CACHE_ENV) or os.path.join(detection_cache.cache_dir(), "pycache")
+
+
+def source_files(
+    directory: str, skip: frozenset = frozenset(), max_dirs: Optional[int] = None
+) -> Optional[list[str]]:
+    """
+    Every ``.py`` file under ``directory``, sorted, outside the directories
+    in ``skip``.
+
+    :param max_dirs: If given, hidden directories are not walked, and
+                     ``None`` is returned once more than ``max_dirs``
+                     directories have been.
+    :return: The files, or ``None`` if ``directory`` is too large to walk.
+    """
+    found = []
+    walked = 0
+    for root, dirs, files in os.walk(os.path.abspath(directory)):
+        walked += 1
+        if max_dirs is not None and walked > max_dirs:
+            return None
+        dirs[:] = sorted(
+            d
+            for d in dirs
+            if d != "__pycache__"
+            and os.path.join(root, d) not in skip
+            and not (max_dirs is not None and d.startswith("."))
+        )
+        found.extend(os.path.join(root, f) for f in files if f.endswith(".py"))
+    return sorted(found)
+
+
+def cache_key(directory: str, sources: list[str]) -> str:
+    """A digest of the interpreter's cache tag, ``directory`` and its sources' paths, sizes and mtimes."""
+    digest = hashlib.sha256(
+        f"{sys.implementation.cache_tag}\0{os.path.abspath(directory)}\n".encode()
+    )
+    for source in sources:
+        try:
+            st = os.stat(source)
+        except OSError:
+            continue
+        digest.update(f"{source}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def plan(directories: list[str]) -> list[tuple[str, list[str], str]]:
+    """
+    Walk each of ``directories`` once, each without the others nested in
+    it. The installation directories are walked in full; any other (the
+    script's) is bounded by :data:`_SCRIPT_MAX_DIRS`, and left out if it
+    exceeds it.
+
+    :return: Each directory with its sources and :func:`cache_key`.
+    """
+    directories = [os.path.abspath(d) for d in directories]
+    installation = set(_installation_directories())
+    planned = []
+    for directory in directories:
+        skip = frozenset(d for d in directories if d != directory)
+        bounded = directory not in installation
+        sources = source_files(directory, skip, _SCRIPT_MAX_DIRS if bounded else None)
+        if sources is None:
+            logger.warning(
+                f"Not compiling {directory} into the bytecode cache: it holds more "
+                f"than {_SCRIPT_MAX_DIRS} directories. Its modules are compiled by "
+                "the ranks as usual."
+            )
+            continue
+        planned.append((directory, sources, cache_key(directory, sources)))
+    return planned
+
+
+def node_local_path(node_dir: str, key: str) -> str:
+    """The node-local copy of the cache ``key`` (per user, since ``/tmp`` is shared)."""
+    return os.path.join(node_dir, f"hpc-launcher-pycache-{os.getuid()}-{key}")
+
+
+def _has_own_bytecode(source: str) -> bool:
+    """
+    Does ``source`` have valid bytecode in its own ``__pycache__``, which a
+    rank would load instead of compiling it?
+    """
+    head, tail = os.path.split(source)
+    cached = os.path.join(
+        head, "__pycache__", f"{tail[:-3]}.{sys.implementation.cache_tag}.pyc"
+    )
+    try:
+        with open(cached, "rb") as f:
+            header = f.read(16)
+        st = os.stat(source)
+    except OSError:
+        return False
+    if len(header) < 16 or header[:4] != importlib.util.MAGIC_NUMBER:
+        return False
+    if int.from_bytes(header[4:8], "little") & 0b1:
+        return True  # hash-based bytecode, valid until the source changes
+    return (
+        int.from_bytes(header[8:12], "little") == int(st.st_mtime) & 0xFFFFFFFF
+        and int.from_bytes(header[12:16], "little") == st.st_size & 0xFFFFFFFF
+    )
+
+
+def _compile(source: str, prefix: str) -> tuple[float, bool]:
+    """Compile ``source`` into the ``prefix`` tree; return the seconds taken and success."""
+    cfile = os.path.join(
+        prefix + os.path.dirname(source),
+        f"{os.path.basename(source)[:-3]}.{sys.implementation.cache_tag}.pyc",
+    )
+    start = time.perf_counter()
+    try:
+        py_compile.compile(source, cfile=cfile, doraise=True)
+        return time.perf_counter() - start, True
+    except (py_compile.PyCompileError, OSError, ValueError):
+        return time.perf_counter() - start, False
+
+
+def build(
+    directory: str, sources: list[str], key: str, workers: Optional[int] = None
+) -> tuple[str, dict]:
+    """
+    Compile ``sources``, found under ``directory`` and keyed ``key`` by
+    :func:`plan`, into the shared cache, unless it is already there. A
+    reused cache's modification time records its use, for :func:`_evict`.
+
+    :return: The cache's path and its metrics.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    cache = os.path.join(cache_root(), key)
+    if os.path.exists(os.path.join(cache, _COMPLETE)):
+        try:
+            os.utime(cache)
+        except OSError:
+            pass
+        with open(os.path.join(cache, METRICS_FILE)) as f:
+            return cache, json.load(f)
+
+    logger.warning(
+        f"Compiling {len(sources)} modules under {directory} into the bytecode "
+        f"cache {cache} (once per change)"
+    )
+    os.makedirs(cache_root(), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=cache_root(), prefix=f".{key}-")
+    try:
+        start = time.perf_counter()
+        if sources:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(
+                    pool.map(_compile, sources, [tmp] * len(sources), chunksize=64)
+                )
+        else:
+            results = []
+        uncached = [
+            seconds
+            for source, (seconds, ok) in zip(sources, results)
+            if ok and not _has_own_bytecode(source)
+        ]
+        metrics = {
+            "key": key,
+            "directory": directory,
+            "modules": sum(ok for _, ok in results),
+            "failed": sum(not ok for _, ok in results),
+            "modules_without_own_bytecode": len(uncached),
+            "estimated_compile_seconds_saved_per_rank": round(sum(uncached), 6),
+            "build_seconds": round(time.perf_counter() - start, 6),
+        }
+        with open(os.path.join(tmp, METRICS_FILE), "w") as f:
+            json.dump(metrics, f, indent=1)
+        open(os.path.join(tmp, _COMPLETE), "w").close()
+        try:
+            os.rename(tmp, cache)
+        except OSError:
+            # A concurrent launch built the same cache first.
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return cache, metrics
+
+
+def _evict(keep: set[str]) -> None:
+    """
+    Remove the caches, and the temporary directories of builds that did not
+    finish, that no launch has used for :data:`_UNUSED_SECONDS`. The keys in
+    ``keep`` are never removed.
+    """
+    root = cache_root()
+    now = time.time()
+    try:
+        entries = os.listdir(root)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(root, entry)
+        if entry in keep or not os.path.isdir(path):
+            continue
+        try:
+            unused = now - os.stat(path).st_mtime > _UNUSED_SECONDS
+        except OSError:
+            continue
+        if unused:
+            logger.info(f"Removing the unused bytecode cache {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def prepare(
+    folder: str,
+    directories: list[str],
+    node_dir: str,
+    dry_run: bool = False,
+) -> list[tuple[str, str]]:
+    """
+    Build the shared caches for ``directories`` (unless ``dry_run``), write
+    their metrics into the launch folder and return the environment the job
+    needs to use them.
+    """
+    planned = plan(directories)
+    keys = [key for _, _, key in planned]
+    node_key = hashlib.sha256("\n".join(keys).encode()).hexdigest()[:16]
+    env = [
+        ("PYTHONPYCACHEPREFIX", node_local_path(node_dir, node_key)),
+        (SOURCE_ENV, os.pathsep.join(os.path.join(cache_root(), key) for key in keys)),
+    ]
+    if dry_run:
+        return env
+    start = time.perf_counter()
+    caches = [build(directory, sources, key)[1] for directory, sources, key in planned]
+    metrics = {
+        "key": node_key,
+        "modules": sum(c["modules"] for c in caches),
+        "failed": sum(c["failed"] for c in caches),
+        "modules_without_own_bytecode": sum(c["modules_without_own_bytecode"] for c in caches),
+        "estimated_compile_seconds_saved_per_rank": round(
+            sum(c["estimated_compile_seconds_saved_per_rank"] for c in caches), 6
+        ),
+        "build_seconds": round(time.perf_counter() - start, 6),
+        "caches": caches,
+    }
+    with open(os.path.join(folder, METRICS_FILE), "w") as f:
+        json.dump(metrics, f, indent=1)
+    _evict(set(keys))
+    logger.info(
+        f"Bytecode cache: {metrics['modules']} modules in {len(caches)} directories, "
+        f"{metrics['modules_without_own_bytecode']} of them without bytecode of "
+        f"their own, saving each rank an estimated "
+        f"{metrics['estimated_compile_seconds_saved_per_rank']:.2f}s of compilation at most"
+    )
+    return env
+
+
+def _installation_directories() -> list[str]:
+    """The standard library and the site-packages that exist."""
+    paths = sysconfig.get_paths()
+    directories = []
+    for directory in (
+        [paths["stdlib"], paths["platstdlib"]]
+        + site.getsitepackages()
+        + [site.getusersitepackages()]
+    ):
+        directory = os.path.abspath(directory)
+        if os.path.isdir(directory) and directory not in directories:
+            directories.append(directory)
+    return directories
+
+
+def default_directories(script: Optional[str]) -> list[str]:
+    """
+    The user's script directory, the standard library and the site-packages.
+
+    :param script: The user's script, or ``None`` when a module is run with
+                   ``-m``: it is found on the path, and the working directory
+                   is not compiled in its place.
+    """
+    directories = [os.path.dirname(os.path.abspath(script))] if script else []
+    for directory in _installation_directories():
+        if directory not in directories:
+            directories.append(directory)
+    return directories
+
+
+def sync_to_node() -> Optional[float]:
+    """
+    Merge the shared caches (``$HPC_LAUNCHER_PYCACHE``) into this node's
+    ``PYTHONPYCACHEPREFIX`` unless another rank already has. The first rank
+    on the node to lock ``<prefix>.lock`` copies, and the others wait for
+    it. The lock is an ``flock``, which the kernel releases however its
+    holder exits, so a rank killed mid-copy does not stall the node's later
+    ranks. If the copy fails, the interpreter compiles into the node-local
+    directory itself, as it would without the cache.
+
+    :return: Seconds spent, or ``None`` if the job does not use the cache.
+    """
+    source = os.getenv(SOURCE_ENV)
+    dest = sys.pycache_prefix
+    if not source or not dest:
+        return None
+    start = time.monotonic()
+    complete = os.path.join(dest, _COMPLETE)
+    if os.path.exists(complete):
+        return time.monotonic() - start
+    try:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        lock = open(dest + ".lock", "a")
+    except OSError:
+        return None
+    with lock:
+        deadline = start + _WAIT_SECONDS
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return time.monotonic() - start
+                time.sleep(0.1)
+            except OSError:
+                return None
+        if os.path.exists(complete):  # copied while this rank waited
+            return time.monotonic() - start
+        try:
+            for cache in source.split(os.pathsep):
+                shutil.copytree(
+                    cache,
+                    dest,
+                    dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns(_COMPLETE, METRICS_FILE),
+                )
+            open(complete, "w").close()
+        except (OSError, shutil.Error) as e:
+            print(f"hpc-launcher: could not copy the bytecode cache {source}: {e}", file=sys.stderr)
+    return time.monotonic() - start
@@ -0,0 +1,166 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Choosing the TCP rendezvous port on the rank-0 node, for ``torchrun-hpc
+--probe-port``.
+
+:func:`hpc_launcher.schedulers.scheduler.pick_rendezvous_port` chooses the
+port on the launch host, where it may be free while another job or service
+holds it on the rank-0 compute node. Rank 0 then fails to listen, the other
+ranks wait for a store that never comes up, and the allocation is lost.
+With ``--probe-port``:
+
+1. Rank 0 bind-tests the launch host's port on its own node and, if it is
+   taken, takes a free one there instead. It publishes ``<attempt> <port>``
+   in a file in the launch folder (named in ``$TORCHRUN_HPC_PORT_FILE``,
+   which is unique to the launch) and starts the rendezvous store on it.
+2. The other ranks wait for that file and connect to the port it names.
+3. If the store cannot listen after all (the port was taken between the
+   test and the bind), rank 0 publishes the next attempt with a new port.
+   A rank that cannot connect within :data:`ATTEMPT_SECONDS` reads the file
+   again and follows it, until :data:`TIMEOUT_SECONDS` have passed.
+
+The store itself is made by a ``connect(port, is_master, timeout)``
+callable (a ``torch.distributed.TCPStore`` in the trampoline), so that this
+module does not import torch.
+"""
+import os
+import socket
+import time
+from typing import Any, Callable, Optional
+
+from hpc_launcher.schedulers.scheduler import pick_rendezvous_port
+
+PORT_FILE_ENV = "TORCHRUN_HPC_PORT_FILE"
+PORT_FILE = "rendezvous_port"
+
+# Ports rank 0 tries before giving up.
+ATTEMPTS = 5
+# Seconds a rank tries to connect to one published port before it reads the
+# file again.
+ATTEMPT_SECONDS = 60.0
+# Seconds the whole rendezvous may take (torch's default for the store).
+TIMEOUT_SECONDS = 1800.0
+
+
+def prepare(folder: str) -> list[tuple[str, str]]:
+    """
+    The environment that turns port probing on for a launch: the port file,
+    named uniquely so that a relaunch from the same folder cannot read an
+    earlier launch's port.
+    """
+    path = os.path.join(os.path.abspath(folder), f"{PORT_FILE}.{time.time_ns():x}")
+    return [(PORT_FILE_ENV, path)]
+
+
+def port_is_free(port: int) -> bool:
+    """Can this node listen on ``port``?"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("", port))
+        return True
+    except OSError:
+        return False
+
+
+def choose_port(preferred: Optional[int] = None) -> int:
+    """``preferred`` if this node can listen on it, else a free ephemeral port."""
+    if preferred and port_is_free(preferred):
+        return preferred
+    return pick_rendezvous_port()
+
+
+def publish(path: str, attempt: int, port: int):
+    """Atomically write ``<attempt> <port>`` to ``path``."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{attempt} {port}\n")
+    os.replace(tmp, path)
+
+
+def read(path: str) -> Optional[tuple[int, int]]:
+    """The published ``(attempt, port)``, or ``None`` if there is none yet."""
+    try:
+        with open(path) as f:
+            attempt, port = f.read().split()
+        return int(attempt), int(port)
+    except (OSError, ValueError):
+        return None
+
+
+def wait_for(path: str, deadline: float, poll: float = 0.1) -> tuple[int, int]:
+    """
+    Wait for rank 0 to publish a port.
+
+    :raises TimeoutError: If nothing is published by ``deadline``
+                          (``time.monotonic()``).
+    """
+    while True:
+        published = read(path)
+        if published is not None:
+            return published
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Rank 0 published no rendezvous port in {path}")
+        time.sleep(poll)
+
+
+def rendezvous(
+    rank: int,
+    path: str,
+    connect: Callable[[int, bool, float], Any],
+    preferred: Optional[int] = None,
+    attempts: int = ATTEMPTS,
+    attempt_seconds: float = ATTEMPT_SECONDS,
+    timeout: float = TIMEOUT_SECONDS,
+) -> tuple[Any, int]:
+    """
+    Agree on a port through the file at ``path`` and connect to it, trying
+    new ports as described above.
+
+    :param rank: This process's global rank; rank 0 chooses the port.
+    :param path: The launch's port file.
+    :param connect: ``connect(port, is_master, timeout)`` returns the store,
+                    or raises if it cannot listen (rank 0) or connect.
+    :param preferred: The port rank 0 tries first.
+    :return: The store and its port.
+    :raises RuntimeError: If rank 0 could not listen on any of ``attempts``
+                          ports.
+    :raises TimeoutError: If another rank could not connect in ``timeout``
+                          seconds.
+    """
+    if rank == 0:
+        errors = []
+        for attempt in range(attempts):
+            port = choose_port(preferred if attempt == 0 else None)
+            publish(path, attempt, port)
+            try:
+                return connect(port, True, timeout), port
+            except (OSError, RuntimeError) as e:
+                errors.append(f"{port}: {e}")
+        raise RuntimeError(
+            f"Could not listen for the rendezvous on any of {attempts} ports: "
+            + "; ".join(errors)
+        )
+
+    deadline = time.monotonic() + timeout
+    while True:
+        _, port = wait_for(path, deadline)
+        remaining = deadline - time.monotonic()
+        try:
+            return connect(port, False, max(1.0, min(attempt_seconds, remaining))), port
+        except (OSError, RuntimeError) as e:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Could not connect to the rendezvous on port {port}: {e}"
+                ) from e
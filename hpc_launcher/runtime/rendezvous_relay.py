@@ -0,0 +1,265 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+The node relay of the hierarchical TCP rendezvous, ``torchrun-hpc --rdv
+tcp-hier``.
+
+With ``--rdv tcp``, every rank opens its own connection to the TCP store on
+rank 0, so a job of N ranks opens N connections to one process at start-up,
+and keeps them open. With ``tcp-hier``, only the first rank on each node
+(local rank 0) connects to rank 0: it runs a :class:`Server` on a Unix
+socket, and the node's other ranks send their store operations to it through
+a :class:`Client`. Rank 0 sees a few connections per node instead of one per
+rank.
+
+The relay runs its operations on connections of its own, never on the
+first rank's, where they would queue behind that rank's own blocking
+operations in ``init_process_group``. A blocking ``get`` or ``wait`` is not
+run on the relay's shared connection either, where it would hold up another
+local rank that needs it to set the very key being waited for. The relay
+runs one blocking ``wait`` on rank 0's store per distinct set of keys
+instead, on another connection, and every local rank waiting for the same
+keys is answered when it returns. In a rendezvous
+a node's ranks mostly wait for the same keys, so rank 0 sees one request
+per node for them rather than a stream of polls from every rank.
+
+The socket is in the abstract namespace (no file to clean up), named after
+the rendezvous and the launch folder, and the server only answers processes
+of its own user. Requests and replies are JSON lines, with values in base64.
+The store is any object with the methods of ``torch.distributed.Store``, so
+that this module does not import torch.
+"""
+import base64
+import datetime
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+def address(rdv_protocol: str, launch_dir: str = "") -> str:
+    """The abstract Unix socket address of the node relay for a rendezvous."""
+    digest = hashlib.sha1(f"{rdv_protocol} {launch_dir}".encode()).hexdigest()[:16]
+    return f"\0torchrun-hpc-rdv-{digest}"
+
+
+def _encode(value: bytes) -> str:
+    return base64.b64encode(value).decode("ascii")
+
+
+def _decode(value: str) -> bytes:
+    return base64.b64decode(value)
+
+
+def _bytes(value) -> bytes:
+    return value.encode() if isinstance(value, str) else bytes(value)
+
+
+class _Wait:
+    """A blocking ``wait`` on rank 0's store, shared by the local ranks waiting for its keys."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = {"result": self.server.run(json.loads(line))}
+            except TimeoutError as e:
+                reply = {"error": str(e), "timeout": True}
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Runs the store operations of a node's ranks on connections of its own
+    to rank 0's store, in the background.
+
+    :param address: The relay's socket address (see :func:`address`).
+    :param connect: Opens a connection to rank 0's store: one for the
+                    relay's non-blocking operations, and one per concurrent
+                    blocking wait; connections are kept for reuse.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: str, connect: Callable[[], Any]):
+        self.store = connect()
+        self._connect = connect
+        self._idle = []  # wait connections not in use
+        self._waits = {}  # sorted keys -> the _Wait in flight for them
+        self._waits_lock = threading.Lock()
+        super().__init__(address, _Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def verify_request(self, request, client_address) -> bool:
+        # Abstract sockets have no file permissions: check the peer's user.
+        creds = request.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def run(self, request: dict):
+        """Run one request on the store and return its JSON-ready result."""
+        store, op = self.store, request["op"]
+        if op == "set":
+            store.set(request["key"], _decode(request["value"]))
+            return None
+        if op == "get":
+            self.wait([request["key"]], request["timeout"])
+            return _encode(store.get(request["key"]))
+        if op == "add":
+            return store.add(request["key"], request["value"])
+        if op == "compare_set":
+            return _encode(store.compare_set(
+                request["key"], _decode(request["expected"]), _decode(request["desired"])))
+        if op == "check":
+            return store.check(request["keys"])
+        if op == "wait":
+            self.wait(request["keys"], request["timeout"])
+            return None
+        if op == "delete_key":
+            return store.delete_key(request["key"])
+        if op == "num_keys":
+            return store.num_keys()
+        raise ValueError(f"Unknown store operation {op!r}")
+
+    def wait(self, keys: list[str], timeout: float):
+        """
+        Wait for ``keys`` to be set in the store. The first local rank to
+        wait for a set of keys runs the blocking ``wait`` on rank 0's store;
+        the others waiting for the same keys share its result.
+
+        :raises TimeoutError: If they are not all set within ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        group = tuple(sorted(keys))
+        while True:
+            with self._waits_lock:
+                pending = self._waits.get(group)
+                owner = pending is None
+                if owner:
+                    pending = self._waits[group] = _Wait()
+            if owner:
+                self._run_wait(group, pending, deadline)
+            else:
+                pending.done.wait(max(0.0, deadline - time.monotonic()))
+            if pending.done.is_set() and pending.error is None:
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out after {timeout:g} s waiting for keys {keys}")
+            if owner:
+                raise pending.error
+            # The shared wait ended with its own rank's earlier deadline.
+
+    def _run_wait(self, group: tuple, pending: _Wait, deadline: float):
+        try:
+            with self._waits_lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+            remaining = max(0.0, deadline - time.monotonic())
+            connection.wait(list(group), datetime.timedelta(seconds=remaining))
+            with self._waits_lock:
+                self._idle.append(connection)
+        except Exception as e:
+            # A connection whose wait failed is dropped rather than reused.
+            pending.error = e
+        finally:
+            with self._waits_lock:
+                del self._waits[group]
+            pending.done.set()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class Client:
+    """
+    The store operations of a rank that is not the first on its node, run
+    by its node's :class:`Server`. Blocking operations give up after
+    ``timeout`` seconds unless they are given their own.
+    """
+
+    def __init__(self, address: str, timeout: float, connect_timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # The node's first rank may still be connecting to rank 0.
+        deadline = time.monotonic() + (timeout if connect_timeout is None else connect_timeout)
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(address)
+                break
+            except OSError:
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("The first rank on this node started no rendezvous relay")
+                time.sleep(0.05)
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    def _call(self, **request):
+        with self._lock:
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise RuntimeError("The rendezvous relay on this node closed its connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise (TimeoutError if reply.get("timeout") else RuntimeError)(reply["error"])
+        return reply["result"]
+
+    def set(self, key: str, value):
+        self._call(op="set", key=key, value=_encode(_bytes(value)))
+
+    def get(self, key: str) -> bytes:
+        return _decode(self._call(op="get", key=key, timeout=self.timeout))
+
+    def add(self, key: str, value: int) -> int:
+        return self._call(op="add", key=key, value=value)
+
+    def compare_set(self, key: str, expected, desired) -> bytes:
+        return _decode(self._call(op="compare_set", key=key,
+                                  expected=_encode(_bytes(expected)),
+                                  desired=_encode(_bytes(desired))))
+
+    def check(self, keys: list[str]) -> bool:
+        return self._call(op="check", keys=list(keys))
+
+    def wait(self, keys: list[str], timeout: Optional[float] = None):
+        self._call(op="wait", keys=list(keys),
+                   timeout=self.timeout if timeout is None else timeout)
+
+    def delete_key(self, key: str) -> bool:
+        return self._call(op="delete_key", key=key)
+
+    def num_keys(self) -> int:
+        return self._call(op="num_keys")
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
@@ -0,0 +1,124 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Per-rank start-up times of a ``torchrun-hpc`` job, and the report rank 0
+writes from them.
+
+Every rank's trampoline times its three start-up steps -- ``import torch``,
+device selection and ``init_process_group`` (the rendezvous). With
+``torchrun-hpc --startup-report`` (which sets :data:`REPORT_ENV`), right
+after the process group is up, every rank sends them to rank 0 in a single
+``gather_object``; without it the job runs no collective of its own. Rank 0
+writes two files into the launch folder:
+
+``startup_telemetry.json``
+    Every rank's record (rank, host and seconds per step).
+``startup_report.txt``
+    A histogram of each step's time across ranks and the slowest ranks with
+    their hosts, so the one slow node that holds up a 1000-GPU job's
+    start-up stands out.
+
+This module is deliberately free of torch so that the report can be built
+(and tested) anywhere.
+"""
+import json
+import os
+from typing import Optional
+
+# Start-up steps, in the order they run, and their report labels.
+STEPS = {
+    "import_torch": "import torch",
+    "device_selection": "device selection",
+    "rendezvous": "init_process_group (rendezvous)",
+}
+
+# Set (to the launch folder) in every rank's environment by --startup-report.
+REPORT_ENV = "TORCHRUN_HPC_STARTUP_REPORT"
+
+TELEMETRY_FILE = "startup_telemetry.json"
+REPORT_FILE = "startup_report.txt"
+
+# Slowest ranks listed in the report.
+SLOWEST_RANKS = 10
+
+_HISTOGRAM_BINS = 10
+_HISTOGRAM_WIDTH = 40
+
+
+def rank_record(rank: int, host: str, **seconds: float) -> dict:
+    """One rank's record: its rank, host and seconds per step (see :data:`STEPS`)."""
+    record = {"rank": rank, "host": host}
+    record.update({step: round(seconds.get(step, 0.0), 6) for step in STEPS})
+    return record
+
+
+def _total(record: dict) -> float:
+    return sum(record[step] for step in STEPS)
+
+
+def histogram(values: list[float], bins: int = _HISTOGRAM_BINS) -> list[str]:
+    """
+    A text histogram of ``values`` (seconds): one line per equal-width bin,
+    with its range, count and a bar scaled to the fullest bin.
+    """
+    if not values:
+        return []
+    low, high = min(values), max(values)
+    if high == low:
+        return [f"  {low:9.3f}s             {len(values):6d} {'#' * _HISTOGRAM_WIDTH}"]
+    width = (high - low) / bins
+    counts = [0] * bins
+    for value in values:
+        counts[min(bins - 1, int((value - low) / width))] += 1
+    peak = max(counts)
+    lines = []
+    for i, count in enumerate(counts):
+        bar = "#" * (round(count * _HISTOGRAM_WIDTH / peak) if count else 0)
+        lines.append(
+            f"  {low + i * width:9.3f}s - {low + (i + 1) * width:9.3f}s {count:6d} {bar}".rstrip()
+        )
+    return lines
+
+
+def format_report(records: list[dict], slowest: int = SLOWEST_RANKS) -> str:
+    """The text of ``startup_report.txt`` for every rank's record."""
+    parts = [f"Start-up times of {len(records)} rank{'s' if len(records) != 1 else ''}"]
+    for step, label in STEPS.items():
+        values = sorted(r[step] for r in records)
+        median = values[len(values) // 2]
+        parts.append(
+            f"\n{label}: min {values[0]:.3f}s, median {median:.3f}s, max {values[-1]:.3f}s"
+        )
+        parts.extend(histogram(values))
+    ranked = sorted(records, key=_total, reverse=True)[:slowest]
+    parts.append(f"\nSlowest {len(ranked)} rank{'s' if len(ranked) != 1 else ''} (total start-up):")
+    parts.append(
+        f"  {'rank':>6} {'host':<24} {'total':>9} "
+        + " ".join(f"{step:>16}" for step in STEPS)
+    )
+    for r in ranked:
+        parts.append(
+            f"  {r['rank']:>6} {r['host']:<24} {_total(r):8.3f}s "
+            + " ".join(f"{r[step]:15.3f}s" for step in STEPS)
+        )
+    return "\n".join(parts) + "\n"
+
+
+def write_report(folder: str, records: list[Optional[dict]]) -> None:
+    """Write the gathered records and their report into the launch folder."""
+    records = sorted((r for r in records if r), key=lambda r: r["rank"])
+    with open(os.path.join(folder, TELEMETRY_FILE), "w") as f:
+        json.dump(records, f, indent=1)
+    with open(os.path.join(folder, REPORT_FILE), "w") as f:
+        f.write(format_report(records))
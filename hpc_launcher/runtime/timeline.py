@@ -0,0 +1,248 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Where a launch's time goes, as a Chrome trace (``--timeline``).
+
+``launch``/``torchrun-hpc`` record a span for each phase of their own run
+(interpreter start-up, argument parsing, system autodetection, script
+generation, submission, the job itself) and an instant for the first
+output the job prints. Under ``torchrun-hpc`` every rank's trampoline also
+records its start-up, ``import torch``, ``init_process_group`` (which
+includes the rendezvous) and the user's script, and writes them to
+``timeline.rank<N>.json`` in the launch folder. At the end of a blocking
+launch these are merged into the launcher's ``timeline.json``, with a
+derived "queue wait and process start" span from the job's start to the
+first rank's process creation; a ``--bg`` launch leaves them next to it
+(each fragment is itself a valid trace, and Perfetto opens several at
+once).
+
+Every process times its phases with ``time.monotonic`` and places them on
+a shared axis through one ``time.time`` reading taken at start-up, so spans
+are exact within a process and aligned across processes (and, to the
+accuracy of the nodes' clocks, across hosts). Recording is always on -- it
+is a handful of clock reads -- and only written out when asked for.
+"""
+import contextlib
+import glob
+import json
+import os
+import re
+import time
+from typing import Optional
+
+# Tells the trampoline where to write its events (the launch folder).
+TIMELINE_ENV = "HPC_LAUNCHER_TIMELINE"
+TIMELINE_FILE = "timeline.json"
+
+# Trace process IDs: the launcher, then one per rank.
+_LAUNCHER_PID = 0
+_RANK_FRAGMENT = re.compile(r"timeline\.rank(\d+)\.json")
+
+
+def _rank_fragment(rank: int) -> str:
+    return f"timeline.rank{rank}.json"
+
+
+def _process_start() -> Optional[float]:
+    """
+    This process's creation time (Unix time), from procfs on Linux --
+    ``psutil`` computes it the same way, but importing it costs more than
+    reading two files -- or else from psutil, if it can tell.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22, counted after the parenthesized command name (which
+            # may contain spaces), is the start time in ticks since boot.
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime "))
+        return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().create_time()
+    except Exception:
+        return None
+
+
+class Timeline:
+    """
+    The trace events of one process, in Chrome trace format.
+
+    :param process_name: The name shown for the process's track.
+    :param pid: The process's track ID in the trace.
+    """
+
+    def __init__(self, process_name: str, pid: int = _LAUNCHER_PID):
+        # Maps time.monotonic() onto Unix time.
+        self._offset = time.time() - time.monotonic()
+        self.pid = pid
+        self.events: list[dict] = []
+        self.set_process_name(process_name, pid)
+
+    def set_process_name(self, name: str, pid: Optional[int] = None) -> None:
+        """Name (and, e.g. once a rank is known, renumber) this process's track."""
+        if pid is not None and pid != self.pid:
+            for event in self.events:
+                event["pid"] = pid
+            self.pid = pid
+        self.events = [e for e in self.events if e.get("ph") != "M"]
+        self.events.append(
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": name}}
+        )
+        self.events.append(
+            {"name": "process_sort_index", "ph": "M", "pid": self.pid,
+             "args": {"sort_index": self.pid}}
+        )
+
+    def _us(self, monotonic: float) -> int:
+        return round((monotonic + self._offset) * 1e6)
+
+    def complete(self, name: str, start: float, end: float, **args) -> None:
+        """Record a span between two ``time.monotonic`` readings."""
+        event = {
+            "name": name, "ph": "X", "pid": self.pid, "tid": 0,
+            "ts": self._us(start), "dur": max(0, self._us(end) - self._us(start)),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def instant(self, name: str, when: Optional[float] = None, **args) -> None:
+        """Record an instant (at ``time.monotonic`` reading ``when``, or now)."""
+        event = {
+            "name": name, "ph": "i", "s": "p", "pid": self.pid, "tid": 0,
+            "ts": self._us(time.monotonic() if when is None else when),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **args):
+        """Record the enclosed block as a span."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.monotonic(), **args)
+
+    def record_startup(self) -> None:
+        """Record interpreter start-up and imports, from process creation to now."""
+        created = _process_start()
+        if created is not None:
+            self.complete("interpreter start-up and imports", created - self._offset, time.monotonic())
+
+    def write(self, path: str, extra_events: list[dict] = ()) -> None:
+        with open(path, "w") as f:
+            json.dump(
+                {"traceEvents": self.events + list(extra_events), "displayTimeUnit": "ms"}, f
+            )
+
+
+class FirstOutputTap:
+    """
+    A raw-chunk sink (see ``console_pipe``'s taps) that records an instant
+    when the job's first output on ``stream`` arrives, and nothing after.
+    """
+
+    def __init__(self, timeline: Timeline, stream: str):
+        self._timeline = timeline
+        self._stream = stream
+
+    def write(self, chunk: bytes) -> None:
+        self._timeline.instant(f"first output ({self._stream})")
+        self.write = _ignore
+
+
+def _ignore(chunk: bytes) -> None:
+    pass
+
+
+_current: Optional[Timeline] = None
+
+
+def start(process_name: str, pid: int = _LAUNCHER_PID) -> Timeline:
+    """Start this process's timeline, beginning with its start-up span."""
+    global _current
+    _current = Timeline(process_name, pid)
+    _current.record_startup()
+    return _current
+
+
+def current() -> Optional[Timeline]:
+    """This process's timeline, if :func:`start` was called."""
+    return _current
+
+
+def phase(name: str, **args):
+    """:meth:`Timeline.phase` on this process's timeline, if any."""
+    if _current is None:
+        return contextlib.nullcontext()
+    return _current.phase(name, **args)
+
+
+def write_rank_fragment(folder: str, rank: int) -> None:
+    """Write a rank's timeline next to the launcher's (trampoline side)."""
+    if _current is not None:
+        _current.write(os.path.join(folder, _rank_fragment(rank)))
+
+
+def _find_span(events: list[dict], name: str) -> Optional[dict]:
+    for event in events:
+        if event.get("name") == name and event.get("ph") == "X":
+            return event
+    return None
+
+
+def save(folder: str) -> Optional[str]:
+    """
+    Write the launcher's timeline to ``timeline.json`` in ``folder``,
+    merging in (and removing) any rank fragments already written there.
+
+    :return: The path written, or ``None`` if no timeline was started.
+    """
+    if _current is None:
+        return None
+    rank_events: list[dict] = []
+    fragments = []
+    for path in glob.glob(os.path.join(folder, "timeline.rank*.json")):
+        if not _RANK_FRAGMENT.fullmatch(os.path.basename(path)):
+            continue
+        try:
+            with open(path) as f:
+                rank_events.extend(json.load(f)["traceEvents"])
+        except (OSError, ValueError, KeyError):
+            continue  # a rank that died while writing
+        fragments.append(path)
+
+    extra = []
+    job = _find_span(_current.events, "run job")
+    starts = [
+        e["ts"] for e in rank_events
+        if e.get("name") == "interpreter start-up and imports"
+    ]
+    if job is not None and starts and min(starts) > job["ts"]:
+        extra.append({
+            "name": "queue wait and process start", "ph": "X",
+            "pid": _current.pid, "tid": 1,
+            "ts": job["ts"], "dur": min(starts) - job["ts"],
+        })
+    path = os.path.join(folder, TIMELINE_FILE)
+    _current.write(path, extra + rank_events)
+    for fragment in fragments:
+        os.remove(fragment)
+    return path
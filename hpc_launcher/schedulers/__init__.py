@@ -13,23 +13,48 @@
 # SPDX-License-Identifier: (Apache-2.0)
 
 
-def get_schedulers():
-    from .local import LocalScheduler
-    from .flux import FluxScheduler
-    from .slurm import SlurmScheduler
-    from .lsf import LSFScheduler
-
-    return {
-        None: LocalScheduler,
-        "local": LocalScheduler,
-        "LocalScheduler": LocalScheduler,
-        "flux": FluxScheduler,
-        "FluxScheduler": FluxScheduler,
-        "slurm": SlurmScheduler,
-        "SlurmScheduler": SlurmScheduler,
-        "lsf": LSFScheduler,
-        "LSFScheduler": LSFScheduler,
-    }
+from collections.abc import Mapping
+import importlib
+
+# Scheduler names (and class names) and the module and class implementing
+# each. A scheduler's module -- and the system module it may pull in -- is
+# imported only when it is looked up, so that resolving the one a launch
+# needs does not import the other three.
+_SCHEDULERS = {
+    None: ("local", "LocalScheduler"),
+    "local": ("local", "LocalScheduler"),
+    "LocalScheduler": ("local", "LocalScheduler"),
+    "local-parallel": ("local", "LocalParallelScheduler"),
+    "LocalParallelScheduler": ("local", "LocalParallelScheduler"),
+    "flux": ("flux", "FluxScheduler"),
+    "FluxScheduler": ("flux", "FluxScheduler"),
+    "slurm": ("slurm", "SlurmScheduler"),
+    "SlurmScheduler": ("slurm", "SlurmScheduler"),
+    "lsf": ("lsf", "LSFScheduler"),
+    "LSFScheduler": ("lsf", "LSFScheduler"),
+}
+
+
+class _SchedulerRegistry(Mapping):
+    """A read-only mapping of scheduler names to classes, imported on lookup."""
+
+    def __getitem__(self, name):
+        module, cls = _SCHEDULERS[name]
+        return getattr(importlib.import_module(f"{__name__}.{module}"), cls)
+
+    def __iter__(self):
+        return iter(_SCHEDULERS)
+
+    def __len__(self):
+        return len(_SCHEDULERS)
+
+    def __contains__(self, name):
+        return name in _SCHEDULERS
+
+
+def get_schedulers() -> Mapping:
+    return _SchedulerRegistry()
+
 
 def parse_env_list(*e) -> str:
     if len(e) == 1:
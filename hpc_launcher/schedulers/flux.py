@@ -22,6 +22,7 @@ if TYPE_CHECKING:
     # If type-checking, import the other class
     from hpc_launcher.systems import System
 
+from hpc_launcher import hostlist
 from hpc_launcher.schedulers.scheduler import Scheduler
 from hpc_launcher.schedulers import parse_env_list
 
@@ -50,6 +51,10 @@ class FluxScheduler(Scheduler):
         # Unbuffered output
         self.common_launch_args["-u"] = None
 
+        # Rank-labeled output for the launcher's demultiplexer
+        if self.labels_rank_output(blocking):
+            self.run_only_args["--label-io"] = None
+
         # Set the Number of GPUs per task
         # There is a difference in option names between tasks and allocations
         if self.gpus_per_proc > 0:
@@ -144,6 +149,22 @@ class FluxScheduler(Scheduler):
         # The job ID is the only printout when calling flux batch
         return output.strip()
 
+    def array_launch_command(self, indices: range) -> list[str]:
+        # --cc submits one copy of the job per index, in one request
+        return ["flux", "batch", f"--cc={indices[0]}-{indices[-1]}"]
+
+    def array_index_pattern(self) -> str:
+        return "{{cc}}"
+
+    @classmethod
+    def get_array_index_env_variable(cls) -> str:
+        return "${FLUX_JOB_CC}"
+
+    def get_array_job_ids(self, output: str, indices: range) -> list[Optional[str]]:
+        # One job ID per line, in the order of the indices
+        job_ids = output.split()
+        return [job_ids[n] if n < len(job_ids) else None for n in range(len(indices))]
+
     @classmethod
     def num_nodes_in_allocation(cls) -> Optional[int]:
         if os.getenv("FLUX_URI"):
@@ -195,7 +216,7 @@ class FluxScheduler(Scheduler):
             env_list.append(
                 (
                     "TORCHRUN_HPC_MASTER_ADDR",
-                    "`flux hostlist local | /bin/hostlist -n 1`",
+                    f"`flux hostlist local | {hostlist.shell_command('first')}`",
                 )
             )
             env_list.append(
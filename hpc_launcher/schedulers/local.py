@@ -17,6 +17,7 @@ from typing import TYPE_CHECKING, Optional
 
 import os
 import shlex
+import sys
 import logging
 
 logger = logging.getLogger(__name__)
@@ -220,3 +221,59 @@ class LocalScheduler(Scheduler):
         else:
             msg = f"Unsupported rendezvous protocol {protocol} for scheduler {type(self).__name__}"
             raise Exception(msg)
+
+
+@dataclass
+class LocalParallelScheduler(LocalScheduler):
+    """
+    Runs ``procs_per_node`` ranks of the job on this host without a batch
+    scheduler, for ``--scheduler local-parallel``: the cheapest way to
+    exercise a rendezvous, gloo collectives and multi-rank start-up on a
+    workstation or CI node.
+
+    It is :class:`LocalScheduler` with a parallel run command,
+    :mod:`hpc_launcher.cli.local_ranks`, which plays the part of ``srun``:
+    the launch script runs it once, and it forks the ranks with ``RANK``,
+    ``LOCAL_RANK``, ``WORLD_SIZE`` and ``LOCAL_WORLD_SIZE`` set, labels their
+    output and stops them all when one fails. Without a launch script it
+    goes on the command line instead. Only one node can be run.
+    """
+
+    def spawn_command(self) -> list[str]:
+        """The parallel run command, as arguments."""
+        return [sys.executable, "-m", "hpc_launcher.cli.local_ranks",
+                "-n", str(max(1, self.procs_per_node or 1))]
+
+    def launch_command(self, system: "System", blocking: bool = True, cli_env_only: bool = False) -> list[str]:
+        """
+        With a launch script the script runs the ranks; an ephemeral run has
+        none, so the ranks are run from the command line.
+        """
+        return [] if self.work_dir else self.spawn_command()
+
+    def require_parallel_internal_run_command(self, blocking: bool) -> bool:
+        return True
+
+    def labels_rank_output(self, blocking: bool) -> bool:
+        # local_ranks labels every line it relays, whatever was asked for
+        return True
+
+    def internal_script_run_command(self) -> str:
+        return shlex.join(self.spawn_command()) + " "
+
+    @classmethod
+    def get_parallel_rank_env_variable(cls) -> str:
+        return "${RANK}"
+
+    @classmethod
+    def get_parallel_configuration(cls) -> tuple[int, int, int, int]:
+        """
+        The rank's identity as :mod:`hpc_launcher.cli.local_ranks` set it,
+        or a single process when it was started some other way.
+        """
+        env = {}
+        for e in ("WORLD_SIZE", "RANK", "LOCAL_WORLD_SIZE", "LOCAL_RANK"):
+            if not os.getenv(e):
+                return 1, 0, 1, 0
+            env[e] = int(os.getenv(e))
+        return env["WORLD_SIZE"], env["RANK"], env["LOCAL_WORLD_SIZE"], env["LOCAL_RANK"]
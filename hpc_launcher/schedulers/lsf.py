@@ -23,6 +23,7 @@ if TYPE_CHECKING:
     # If type-checking, import the other class
     from hpc_launcher.systems import System
 
+from hpc_launcher import hostlist
 from hpc_launcher.schedulers.scheduler import Scheduler
 from hpc_launcher.schedulers import parse_env_list
 
@@ -51,6 +52,10 @@ class LSFScheduler(Scheduler):
         self.run_only_args["--cpu_per_rs"] = "ALL_CPUS"
         self.run_only_args["--gpu_per_rs"] = "ALL_GPUS"
 
+        # Rank-labeled output for the launcher's demultiplexer
+        if self.labels_rank_output(blocking):
+            self.run_only_args["--stdio_mode"] = "prepended"
+
         if self.out_log_file and not blocking:
             self.submit_only_args["-o"] = f"{self.out_log_file}"
         if self.err_log_file and not blocking:
@@ -187,7 +192,9 @@ class LSFScheduler(Scheduler):
         return
 
     def export_hostlist(self) -> str:
-        return "export HPC_LAUNCHER_HOSTLIST=$(echo $LSB_HOSTS | tr ' ' '\\n' | sort -u)\n"
+        # $LSB_HOSTS names each host once per slot.
+        compress = hostlist.shell_command("compress", '"$LSB_HOSTS"')
+        return f"export HPC_LAUNCHER_HOSTLIST=$({compress})\n"
 
     def enable_run_args_on_launch_command(self) -> bool:
         if os.getenv("LSB_HOSTS"):
@@ -240,6 +247,26 @@ class LSFScheduler(Scheduler):
             return match.group(1)
         return None
 
+    def array_indices(self, size: int) -> range:
+        # LSF job array indices start at 1
+        return range(1, size + 1)
+
+    def array_launch_command(self, indices: range) -> list[str]:
+        # The array is named with its index range; -J on the command line
+        # takes precedence over a #BSUB -J in the script.
+        return ["bsub", "-J", f"{self.job_name or 'sweep'}[{indices[0]}-{indices[-1]}]"]
+
+    def array_index_pattern(self) -> str:
+        return "%I"
+
+    @classmethod
+    def get_array_index_env_variable(cls) -> str:
+        return "${LSB_JOBINDEX}"
+
+    def get_array_job_ids(self, output: str, indices: range) -> list[Optional[str]]:
+        array_id = self.get_job_id(output)
+        return [f"{array_id}[{i}]" if array_id else None for i in indices]
+
     @classmethod
     def num_nodes_in_allocation(cls) -> Optional[int]:
         if os.getenv("LLNL_NUM_COMPUTE_NODES"):
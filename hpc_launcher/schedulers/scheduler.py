@@ -12,6 +12,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0)
 from collections import OrderedDict, ChainMap
+import contextlib
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Optional
 from io import StringIO
@@ -25,7 +26,6 @@ import shlex
 import shutil
 import socket
 import uuid
-from hpc_launcher.cli.console_pipe import run_process_with_live_output
 from hpc_launcher.schedulers import parse_env_list
 
 import logging
@@ -33,6 +33,17 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def run_process_with_live_output(*args, **kwargs) -> int:
+    """
+    ``console_pipe.run_process_with_live_output``, imported on first use:
+    ``console_pipe`` pulls in ``asyncio``, which a dry run or a batch
+    submission never needs.
+    """
+    from hpc_launcher.cli import console_pipe
+
+    return console_pipe.run_process_with_live_output(*args, **kwargs)
+
+
 # ---------------------------------------------------------------------------
 # Rendezvous port selection
 # ---------------------------------------------------------------------------
@@ -42,6 +53,9 @@ logger = logging.getLogger(__name__)
 _RENDEZVOUS_PORT_FALLBACK_MIN = 20000
 _RENDEZVOUS_PORT_FALLBACK_MAX = 65000
 
+# The file store of ``--rdv file``, in the launch folder.
+RENDEZVOUS_FILE = "rendezvous_store"
+
 
 def pick_rendezvous_port() -> int:
     """
@@ -61,7 +75,9 @@ def pick_rendezvous_port() -> int:
     *launch* host, so a port free here may already be in use on the rank-0
     compute node. This narrows -- but does not fully eliminate -- the
     collision window; the previous fixed port collided for *every* pair of
-    coincident jobs.
+    coincident jobs. ``torchrun-hpc --probe-port`` closes it by having rank
+    0 test the port on its own node and pick another there if need be (see
+    :mod:`hpc_launcher.runtime.rendezvous_port`).
 
     :return: A TCP port number in ``[1024, 65535]``.
     """
@@ -151,6 +167,7 @@ def shell_expand_assignment(value: str, lookup) -> str:
 if TYPE_CHECKING:
     # If type-checking, import the other class
     from hpc_launcher.systems.system import System
+    from hpc_launcher.cli.output_tail import RingBuffer
 
 
 @dataclass
@@ -212,6 +229,35 @@ class Scheduler:
     ld_preloads: Optional[list[str]] = None
     # Capture the original command so that it can be added to the launch script
     command_line: Optional[list[str]] = None
+    # Replicate a blocking launch's outputs to the log files with splice(2)/
+    # tee(2) instead of copying them through the launcher (Linux only)
+    zero_copy_logs: bool = False
+    # Write each rank's output to its own out.rank<N>.log/err.rank<N>.log
+    demux_ranks: bool = False
+    # Ranks whose output is shown on the console (e.g. "0" or "0-3,8"),
+    # or None for all of them
+    console_ranks: Optional[str] = None
+    # Start a new numbered log segment after this many bytes of output
+    log_rotate_size: Optional[int] = None
+    # Compress the log files of a blocking launch ("gzip" or "zstd")
+    log_compress: Optional[str] = None
+    # Bytes of recent output kept per stream for the crash summary of a
+    # failed blocking launch (0, the default, disables it)
+    output_tail_size: int = 0
+    # Write events.jsonl, one record per output line, into the launch folder
+    event_log: bool = False
+    # Write log_metrics.json, the log writer thread's counters, into the
+    # launch folder
+    log_metrics: bool = False
+    # Write out.log.idx/err.log.idx, checkpoints into the log files, into
+    # the launch folder
+    log_index: bool = False
+    # Lines between the checkpoints of the index (None for
+    # log_index.DEFAULT_INDEX_INTERVAL)
+    log_index_interval: Optional[int] = None
+    # Write timeline.json, a Chrome trace of the launch's phases, into the
+    # launch folder
+    timeline: bool = False
 
     # Command line flags given to a batch or interactive submit command
     submit_only_args: OrderedDict = field(default_factory=OrderedDict)
@@ -297,7 +343,10 @@ class Scheduler:
         :param for_launch_cmd:  Some args should not be in both the header and launch cmnd. Ex: flux --dependency=afterany:XXX
         :return: A tuple of (shell script as a string, list of command-line arguments).
         """
-        env_vars = system.environment_variables()
+        from hpc_launcher.runtime import timeline
+
+        with timeline.phase("System.environment_variables"):
+            env_vars = system.environment_variables()
         passthrough_env_vars = system.passthrough_environment_variables()
 
         header = StringIO()
@@ -489,6 +538,70 @@ class Scheduler:
         """
         raise NotImplementedError
 
+    def _output_tails(self) -> tuple[Optional["RingBuffer"], Optional["RingBuffer"]]:
+        """
+        The ring buffers a blocking launch keeps of its recent output, as
+        ``(out_tail, err_tail)``: None when the summary is disabled, or when
+        ``--zero-copy-logs`` keeps the output from passing through the
+        launcher at all.
+        """
+        if not self.output_tail_size or self.zero_copy_logs:
+            return None, None
+        # Like the rest of a blocking launch's output handling (see
+        # launch()), imported only when it is used: the schedulers, and the
+        # systems and runtime modules that import them, do not depend on
+        # hpc_launcher.cli otherwise.
+        from hpc_launcher.cli.output_tail import RingBuffer
+
+        return RingBuffer(self.output_tail_size), RingBuffer(self.output_tail_size)
+
+    def _report_failure(
+        self,
+        returncode: int,
+        out_tail: Optional["RingBuffer"],
+        err_tail: Optional["RingBuffer"],
+        labeled: bool = False,
+    ) -> None:
+        """
+        Print the deduplicated summary of a failed blocking launch's last
+        output (see :func:`hpc_launcher.cli.output_tail.summarize_tail`), so
+        that the traceback every rank printed does not have to be dug out of
+        the full log.
+
+        Tracebacks are only read from rank-labeled output, or from a job of
+        one process: the unlabeled lines of several ranks interleave, and a
+        traceback read from them would be stitched together from different
+        ranks' lines.
+        """
+        if not returncode or err_tail is None:
+            return
+        from hpc_launcher.cli.output_tail import summarize_tail
+
+        summary = summarize_tail(
+            returncode,
+            err_tail,
+            out_tail,
+            labeled,
+            tracebacks=labeled or (self.nodes or 1) * (self.procs_per_node or 1) <= 1,
+        )
+        if summary:
+            sys.stderr.write("\n" + summary)
+            sys.stderr.flush()
+
+    def labels_rank_output(self, blocking: bool) -> bool:
+        """
+        Should the run command prefix each output line with its rank?
+
+        Only a blocking launch has its output read back by the launcher
+        (see :class:`hpc_launcher.cli.rank_demux.RankDemux`), so the labels
+        are only requested when that output is going to be demultiplexed or
+        filtered; otherwise the job's output is left exactly as written.
+
+        :param blocking: Whether the launch waits for the job.
+        :return: True if the run command should label its output.
+        """
+        return blocking and (self.demux_ranks or self.console_ranks is not None)
+
     def ephemeral_environment(self, system: "System") -> Optional[dict[str, str]]:
         """
         The complete environment to start an ephemeral (no launch folder) job
@@ -762,6 +875,77 @@ class Scheduler:
         """
         return None
 
+    def array_indices(self, size: int) -> range:
+        """
+        The indices the scheduler numbers the elements of a job array of
+        ``size`` elements with.
+
+        :param size: The number of elements.
+        :return: The range of element indices.
+        """
+        return range(size)
+
+    def array_launch_command(self, indices: range) -> list[str]:
+        """
+        Returns the command that submits a batch script once per index of
+        ``indices``, as one job array. The script's own job options apply to
+        every element.
+
+        :param indices: The element indices, from :meth:`array_indices`.
+        :return: The command prefix before the script to submit.
+        """
+        raise NotImplementedError
+
+    def array_index_pattern(self) -> str:
+        """
+        Returns the token that the scheduler replaces with the element index
+        in the output and error file names of a job array.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def get_array_index_env_variable(cls) -> str:
+        """
+        Inside an element of a job array, return the environment variable to
+        get its index
+
+        :return: environment variable for the element index in a job array
+        """
+        raise NotImplementedError
+
+    def get_array_job_ids(self, output: str, indices: range) -> list[Optional[str]]:
+        """
+        Parses the job IDs of the elements of a job array from the output of
+        its submission, in the order of ``indices``.
+
+        :param output: Console outputs of the batch submission.
+        :param indices: The element indices that were submitted.
+        :return: One job ID per element, or None where the output cannot be
+                 parsed.
+        """
+        raise NotImplementedError
+
+    def array_script(self, system: "System", point_folder: str, script_name: str) -> str:
+        """
+        Returns the batch script of a job array: the job options of this
+        scheduler, and a line that runs the launch script of the element's
+        own folder. ``point_folder`` is the path of those folders with
+        ``{}`` in place of the element index; the output and error files of
+        the scheduler should name them through :meth:`array_index_pattern`.
+
+        :param system: The system to use.
+        :param point_folder: The element folders, as a ``str.format`` pattern.
+        :param script_name: The name of the launch script in each folder.
+        :return: A shell script as a string.
+        """
+        header, _ = self.build_command_string_and_batch_script(system, blocking=False)
+        # Quote the literal parts of the path, and leave the index variable
+        # to expand.
+        folder = f'"{self.get_array_index_env_variable()}"'.join(
+            shlex.quote(part) if part else "" for part in point_folder.split("{}", 1)
+        )
+        return header + f"\ncd {folder} && exec ./{shlex.quote(script_name)}\n"
+
     @classmethod
     def num_nodes_in_allocation(cls) -> tuple[int]:
         """
@@ -807,20 +991,35 @@ class Scheduler:
         Setup a protocol for a tool like PyTorch to use to establish
         distributed communication.
 
+        ``tcp`` puts the store on rank 0 and ``tcp-hier`` does too, but
+        relays the store operations of each node's ranks through its first
+        rank (see :mod:`hpc_launcher.runtime.rendezvous_relay`). ``file`` uses a
+        file store in the launch folder, named uniquely for the launch; its
+        path is relative, and the trampoline resolves it against
+        ``TORCHRUN_HPC_LAUNCH_DIR``. ``mpi`` needs mpi4py.
+
         :param protocol: Field to select which protocol to use for the rendezvous
         :return: A list of strings that are added to the torchrun-hpc launch environment.
         """
+        protocol = protocol.lower()
         env_list = []
         env_list.append(("TORCHRUN_HPC_SCHEDULER", type(self).__name__))
-        env_list.extend(self.dynamically_configure_rendezvous_protocol(protocol))
-        if protocol.lower() == "tcp":
+        if protocol == "file":
+            # Every rank reaches the launch folder: no address to configure.
+            env_list.append(
+                ("TORCHRUN_HPC_RDV_PROTOCOL", f"file://{RENDEZVOUS_FILE}.{time.time_ns():x}")
+            )
+            return env_list
+        env_list.extend(self.dynamically_configure_rendezvous_protocol(
+            "tcp" if protocol == "tcp-hier" else protocol))
+        if protocol in ("tcp", "tcp-hier"):
             env_list.append(
                 (
                     "TORCHRUN_HPC_RDV_PROTOCOL",
-                    '"tcp://${TORCHRUN_HPC_MASTER_ADDR}:${TORCHRUN_HPC_MASTER_PORT}"',
+                    f'"{protocol}://${{TORCHRUN_HPC_MASTER_ADDR}}:${{TORCHRUN_HPC_MASTER_PORT}}"',
                 )
             )
-        elif protocol.lower() == "mpi":
+        elif protocol == "mpi":
             env_list.append(("TORCHRUN_HPC_RDV_PROTOCOL", "mpi://"))
         else:
             msg = f"Unsupported rendezvous protocol {protocol}"
@@ -967,7 +1166,6 @@ class Scheduler:
         :return: A :class:`LaunchResult` carrying the job ID (if any) and the
                  exit status the caller should propagate.
         """
-
         self.override_launch_args = override_launch_args
 
         # If the command is run from a directory
@@ -1037,10 +1235,19 @@ class Scheduler:
                 # ``start_new_session`` and signal forwarding, so a SIGTERM to
                 # the launcher killed the launcher alone and reparented the
                 # still-running job to PID 1.
+                from hpc_launcher.cli.rank_demux import parse_rank_set
+
+                out_tail, err_tail = self._output_tails()
                 returncode = run_process_with_live_output(
                     full_cmdline,
                     color_stderr=color_stderr,
                     env=self.ephemeral_environment(system),
+                    console_ranks=parse_rank_set(self.console_ranks),
+                    out_taps=[out_tail] if out_tail else [],
+                    err_taps=[err_tail] if err_tail else [],
+                )
+                self._report_failure(
+                    returncode, out_tail, err_tail, self.labels_rank_output(blocking)
                 )
                 # Only the exit status decides success: plenty of successful
                 # programs (and schedulers) log to stderr.
@@ -1054,7 +1261,9 @@ class Scheduler:
             full_cmdline = cmd + [filename]
             logger.info(f"Script filename: {filename}")
             if not dry_run and not immutable_launch_script:
-                with open(filename, "w") as fp:
+                from hpc_launcher.runtime import timeline
+
+                with timeline.phase("generate launch script"), open(filename, "w") as fp:
                     fp.write(
                         self.launcher_script(system, command, args, blocking, save_hostlist, os.path.dirname(filename))
                     )
@@ -1076,20 +1285,76 @@ class Scheduler:
                 return LaunchResult(job_id=None, returncode=0)
 
             if blocking:  # Launch job and trace outputs live
-               with open(self.out_log_file, "wb") as out_file:
-                   with open(self.err_log_file, "wb") as err_file:
-
+               # Like console_pipe (see run_process_with_live_output), the
+               # output handling is imported only once a blocking launch runs:
+               # a dry run or a batch submission needs none of it.
+               from hpc_launcher.cli.event_log import EventLog
+               from hpc_launcher.cli.log_index import DEFAULT_INDEX_INTERVAL, LogIndexWriter, index_path
+               from hpc_launcher.cli.logs import open_log_file
+               from hpc_launcher.cli.rank_demux import parse_rank_set
+               from hpc_launcher.runtime.timeline import FirstOutputTap, current as current_timeline, phase as timeline_phase
+
+               launch_dir = os.path.dirname(self.out_log_file)
+               out_tail, err_tail = self._output_tails()
+               out_taps = [out_tail] if out_tail else []
+               err_taps = [err_tail] if err_tail else []
+               with contextlib.ExitStack() as stack:
+                   if self.event_log:
+                       events = stack.enter_context(
+                           EventLog(
+                               os.path.join(launch_dir, "events.jsonl"),
+                               self.labels_rank_output(blocking),
+                           )
+                       )
+                       out_taps.append(events.tap("out"))
+                       err_taps.append(events.tap("err"))
+                   if self.timeline and current_timeline() is not None:
+                       out_taps.append(FirstOutputTap(current_timeline(), "out"))
+                       err_taps.append(FirstOutputTap(current_timeline(), "err"))
+                   index_interval = self.log_index_interval or DEFAULT_INDEX_INTERVAL
+                   if self.log_index and not self.zero_copy_logs:
+                       for log_file, taps in (
+                           (self.out_log_file, out_taps),
+                           (self.err_log_file, err_taps),
+                       ):
+                           taps.append(stack.enter_context(LogIndexWriter(
+                               index_path(log_file), index_interval
+                           )))
+                   out_file = stack.enter_context(open_log_file(
+                       self.out_log_file, self.log_rotate_size, self.log_compress
+                   ))
+                   err_file = stack.enter_context(open_log_file(
+                       self.err_log_file, self.log_rotate_size, self.log_compress
+                   ))
+
+                   with timeline_phase("run job"):
                        returncode = run_process_with_live_output(
                            full_cmdline,
                            out_file=out_file,
                            err_file=err_file,
                            color_stderr=color_stderr,
+                           zero_copy=self.zero_copy_logs,
+                           console_ranks=parse_rank_set(self.console_ranks),
+                           demux_ranks=self.demux_ranks,
+                           log_metrics_file=(
+                               os.path.join(launch_dir, "log_metrics.json")
+                               if self.log_metrics
+                               else None
+                           ),
+                           out_taps=out_taps,
+                           err_taps=err_taps,
                        )
+               self._report_failure(
+                   returncode, out_tail, err_tail, self.labels_rank_output(blocking)
+               )
                # In this mode, there is no job ID; propagate the child's status.
                return LaunchResult(job_id=None, returncode=returncode)
             else:
                 # Run batch script and get job ID
-                process = subprocess.run(full_cmdline, capture_output=True)
+                from hpc_launcher.runtime import timeline
+
+                with timeline.phase("submit"):
+                    process = subprocess.run(full_cmdline, capture_output=True)
                 # Always show the user what the submit command said on stderr,
                 # but never treat it as a failure signal: schedulers routinely
                 # warn on an otherwise successful submission (e.g. sbatch's
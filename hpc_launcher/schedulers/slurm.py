@@ -24,6 +24,7 @@ if TYPE_CHECKING:
 
 from hpc_launcher.systems.lc.sierra_family import Sierra
 
+from hpc_launcher import hostlist
 from hpc_launcher.schedulers.scheduler import Scheduler
 from hpc_launcher.schedulers import parse_env_list
 
@@ -57,6 +58,10 @@ class SlurmScheduler(Scheduler):
             # On Sierra family systems srun is a proxy to lrun and lacks this flag
             self.run_only_args["-u"] = None
 
+        # Rank-labeled output for the launcher's demultiplexer
+        if self.labels_rank_output(blocking):
+            self.run_only_args["--label"] = None
+
         # Number of Nodes
         self.common_launch_args["--nodes"] = f"{self.nodes}"
 
@@ -162,6 +167,21 @@ class SlurmScheduler(Scheduler):
             return last_line.split(" ")[-1]
         return None
 
+    def array_launch_command(self, indices: range) -> list[str]:
+        return ["sbatch", f"--array={indices[0]}-{indices[-1]}"]
+
+    def array_index_pattern(self) -> str:
+        return "%a"
+
+    @classmethod
+    def get_array_index_env_variable(cls) -> str:
+        return "${SLURM_ARRAY_TASK_ID}"
+
+    def get_array_job_ids(self, output: str, indices: range) -> list[Optional[str]]:
+        # sbatch prints the ID of the whole array; an element is <id>_<index>
+        array_id = self.get_job_id(output)
+        return [f"{array_id}_{i}" if array_id else None for i in indices]
+
     @classmethod
     def num_nodes_in_allocation(cls) -> Optional[int]:
         if os.getenv("FLUX_URI"):
@@ -216,7 +236,8 @@ class SlurmScheduler(Scheduler):
             env_list.append(
                 (
                     "TORCHRUN_HPC_MASTER_ADDR",
-                    "`scontrol show hostnames $SLURM_JOB_NODELIST | head -n 1`",
+                    # Expanded locally: no scontrol fork and slurmctld RPC.
+                    "`" + hostlist.shell_command("first", '"$SLURM_JOB_NODELIST"') + "`",
                 )
             )
             env_list.append(
@@ -12,27 +12,46 @@
 #
 # SPDX-License-Identifier: (Apache-2.0)
 from hpc_launcher.systems.system import System, GenericSystem, SystemParams
-from hpc_launcher.systems.lc.el_capitan_family import ElCapitan
-from hpc_launcher.systems.lc.cts2 import CTS2
-from hpc_launcher.systems.lc.sierra_family import Sierra
-from hpc_launcher.systems.lc.corona import Corona 
+from hpc_launcher.systems import detection_cache, gpu_sysfs
+import importlib
 import logging
 import socket
 import re
 import math
 import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Seconds the probes of an unrecognized system may take before the launcher
+# gives up on the ones still running (e.g., a GPU driver stuck in its init).
+DEFAULT_PROBE_TIMEOUT = 30.0
+PROBE_TIMEOUT_ENV = "HPC_LAUNCHER_PROBE_TIMEOUT"
+
 # Detect system lazily
 _system = None
 
+# Known systems (hostnames with trailing digits removed) and the module and
+# class describing each, imported only for the system the launcher runs on.
+_KNOWN_SYSTEMS = {
+    **dict.fromkeys(
+        ("tioga", "tuolumne", "elcap", "rzadams", "rzvernal", "tenaya"),
+        ("hpc_launcher.systems.lc.el_capitan_family", "ElCapitan"),
+    ),
+    **dict.fromkeys(("ipa", "matrix", "rzvector"), ("hpc_launcher.systems.lc.cts2", "CTS2")),
+    **dict.fromkeys(
+        ("lassen", "sierra", "rzansel"), ("hpc_launcher.systems.lc.sierra_family", "Sierra")
+    ),
+    "corona": ("hpc_launcher.systems.lc.corona", "Corona"),
+}
+
 # ==============================================
 # Access functions
 # ==============================================
 
 
-def find_AMD_gpus() -> (int, float, str):
+def find_AMD_gpus_amdsmi() -> (int, float, str):
     try:
         import amdsmi as smi
     except (ImportError, ModuleNotFoundError, KeyError):
@@ -68,7 +87,7 @@ def find_AMD_gpus() -> (int, float, str):
             return (num_gpus, mem_per_gpu, gpu_arch)
 
 
-def find_NVIDIA_gpus() -> (int, float, str):
+def find_NVIDIA_gpus_nvml() -> (int, float, str):
     try:
         import pynvml
     except (ImportError, ModuleNotFoundError):
@@ -98,9 +117,55 @@ def find_NVIDIA_gpus() -> (int, float, str):
             return (num_gpus, mem_per_gpu, gpu_arch)
 
 
-def find_gpus() -> (str, int, float, str):
-    (num_AMD_gpus, mem_per_AMD_gpu, AMD_arch) = find_AMD_gpus()
-    (num_NVIDIA_gpus, mem_per_NVIDIA_gpu, NVIDIA_arch) = find_NVIDIA_gpus()
+def find_AMD_gpus(root: str = "/") -> (int, float, str):
+    """
+    Count the AMD GPUs and find their memory and architecture from sysfs,
+    falling back to amdsmi only for what sysfs does not provide.
+
+    :param root: The file system root that holds ``sys/`` (for testing).
+    """
+    found = gpu_sysfs.find_AMD_gpus(root)
+    if found is None:
+        return find_AMD_gpus_amdsmi()
+    (num_gpus, mem_per_gpu, gpu_arch) = found
+    if num_gpus > 0 and (mem_per_gpu is None or gpu_arch is None):
+        (smi_gpus, smi_mem, smi_arch) = find_AMD_gpus_amdsmi()
+        if smi_gpus > 0:
+            mem_per_gpu = smi_mem if mem_per_gpu is None else mem_per_gpu
+            gpu_arch = gpu_arch or smi_arch
+    return (num_gpus, mem_per_gpu or 0, gpu_arch)
+
+
+def find_NVIDIA_gpus(root: str = "/") -> (int, float, str):
+    """
+    Count the NVIDIA GPUs from procfs. NVML is asked for their memory and
+    compute capability, which the driver does not publish there, only if
+    there are any. Without NVML the GPUs are still counted, with a memory
+    of 0 (unknown) and no architecture.
+
+    :param root: The file system root that holds ``proc/`` (for testing).
+    """
+    num_gpus = gpu_sysfs.count_NVIDIA_gpus(root)
+    if num_gpus == 0:
+        return (0, 0, None)
+    (nvml_gpus, mem_per_gpu, gpu_arch) = find_NVIDIA_gpus_nvml()
+    if nvml_gpus == 0:
+        logger.warning(
+            f"Found {num_gpus} NVIDIA GPUs but could not query NVML for their "
+            "memory and compute capability - install nvidia-ml-py "
+            "(hpc-launcher[cuda]) or pass -p mem_per_gpu=<GB> gpu_arch=<sm_XY>"
+        )
+        return (num_gpus, 0, None)
+    return (num_gpus, mem_per_gpu, gpu_arch)
+
+
+def find_gpus(root: str = "/") -> (str, int, float, str):
+    return _combine_gpus(find_AMD_gpus(root), find_NVIDIA_gpus(root))
+
+
+def _combine_gpus(AMD_gpus, NVIDIA_gpus) -> (str, int, float, str):
+    (num_AMD_gpus, mem_per_AMD_gpu, AMD_arch) = AMD_gpus
+    (num_NVIDIA_gpus, mem_per_NVIDIA_gpu, NVIDIA_arch) = NVIDIA_gpus
     if num_AMD_gpus == 0 and num_NVIDIA_gpus == 0:
         logger.warning(
             "Unable to autodetect any GPUs on this system - try installing amdsmi or nvidia-ml-py"
@@ -198,37 +263,132 @@ def clear_autodetected_system():
     _system = None
 
 
-def autodetect_current_system(quiet: bool = False) -> System:
+def _probe_timeout() -> float:
+    try:
+        return float(os.getenv(PROBE_TIMEOUT_ENV, DEFAULT_PROBE_TIMEOUT))
+    except ValueError:
+        return DEFAULT_PROBE_TIMEOUT
+
+
+def run_probes(probes: dict, timeout: float) -> (dict, list[str]):
+    """
+    Run independent probes concurrently, each in its own daemon thread.
+
+    A probe still running after ``timeout`` seconds is abandoned (a daemon
+    thread does not keep the launcher from exiting, unlike a
+    ``concurrent.futures`` worker, which is joined at exit), and so is one
+    that raises. Each probe's latency is logged at INFO level (``-v``).
+
+    :param probes: Probe names mapped to functions without arguments.
+    :param timeout: Seconds to wait for all of them.
+    :return: The results of the probes that finished, by name, and the names
+             of those that did not.
+    """
+    results = {}
+    seconds = {}
+
+    def run(name, probe):
+        start = time.perf_counter()
+        try:
+            results[name] = probe()
+        except Exception as e:
+            logger.warning(f"Autodetection probe {name} failed: {e}")
+        finally:
+            seconds[name] = time.perf_counter() - start
+
+    threads = [
+        threading.Thread(target=run, args=(name, probe), name=f"probe {name}", daemon=True)
+        for name, probe in probes.items()
+    ]
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    unfinished = []
+    for name in probes:
+        if name in seconds:
+            logger.info(f"Autodetection probe {name} took {seconds[name]:.3f}s")
+        else:
+            unfinished.append(name)
+            logger.warning(
+                f"Autodetection probe {name} did not finish within {timeout:g}s, "
+                f"ignoring it (set {PROBE_TIMEOUT_ENV} to wait longer)"
+            )
+    return {name: results[name] for name in probes if name in results}, unfinished
+
+
+def probe_system() -> dict:
+    """
+    Run the hardware and scheduler probes used to describe an unrecognized
+    system, concurrently and with a timeout (see :func:`run_probes`).
+    Probes that fail or time out count as finding nothing.
+
+    :return: The probe results, as a JSON-serializable dictionary. Its
+             ``"incomplete"`` entry is true if a probe did not finish.
+    """
+    found, unfinished = run_probes(
+        {
+            "AMD GPUs": find_AMD_gpus,
+            "NVIDIA GPUs": find_NVIDIA_gpus,
+            "CPUs": count_cpus,
+            "scheduler": find_scheduler,
+            "NUMA domains": num_NUMA_domains,
+        },
+        _probe_timeout(),
+    )
+    (generic_name, num_gpus, mem_per_gpu, gpu_arch) = _combine_gpus(
+        found.get("AMD GPUs", (0, 0, None)), found.get("NVIDIA GPUs", (0, 0, None))
+    )
+    return {
+        "name": generic_name,
+        "cores_per_node": found.get("CPUs", 0),
+        "gpus_per_node": num_gpus,
+        "gpu_arch": gpu_arch,
+        "mem_per_gpu": mem_per_gpu,
+        "scheduler": found.get("scheduler"),
+        "numa_domains": found.get("NUMA domains", 1),
+        "incomplete": bool(unfinished),
+    }
+
+
+def autodetect_current_system(
+    quiet: bool = False, cache: bool = False, redetect: bool = False
+) -> System:
     """
     Tries to detect the current system based on information such
     as the hostname and HPC center.
+
+    :param quiet: Do not warn when falling back to a generic system.
+    :param cache: Reuse (and save) an unrecognized host's probe results via
+                  :mod:`hpc_launcher.systems.detection_cache`.
+    :param redetect: With ``cache``, probe again instead of reading the
+                     cache, and save the fresh results.
     """
 
     sys = system()
-    if sys in ("tioga", "tuolumne", "elcap", "rzadams", "rzvernal", "tenaya"):
-        return ElCapitan(sys)
-
-    if sys in ("ipa", "matrix", "rzvector"):
-        return CTS2(sys)
-
-    if sys in ("lassen", "sierra", "rzansel"):
-        return Sierra(sys)
-
-    if sys == "corona":
-        return Corona(sys)
- 
-   # Try to find current system via other means
-    (generic_name, num_gpus, mem_per_gpu, gpu_arch) = find_gpus()
-    num_cpus = count_cpus()
-    scheduler = find_scheduler()
+    if sys in _KNOWN_SYSTEMS:
+        module, cls = _KNOWN_SYSTEMS[sys]
+        return getattr(importlib.import_module(module), cls)(sys)
+
+    # Try to find current system via other means
+    probes = detection_cache.load() if cache and not redetect else None
+    if probes is None:
+        probes = probe_system()
+        if cache and not probes.get("incomplete"):
+            detection_cache.store(probes)
+    else:
+        logger.info(f"Using the cached system autodetection from {detection_cache.cache_dir()}")
+    generic_name = probes["name"]
     generic_sys = GenericSystem()
     autodetected_system_params = SystemParams(
-        cores_per_node=num_cpus,
-        gpus_per_node=num_gpus,
-        gpu_arch=gpu_arch,
-        mem_per_gpu=mem_per_gpu,
-        scheduler=scheduler,
-        numa_domains=num_NUMA_domains(),
+        cores_per_node=probes["cores_per_node"],
+        gpus_per_node=probes["gpus_per_node"],
+        gpu_arch=probes["gpu_arch"],
+        mem_per_gpu=probes["mem_per_gpu"],
+        scheduler=probes["scheduler"],
+        numa_domains=probes["numa_domains"],
     )
     generic_sys.system_params = {"auto": autodetected_system_params}
     generic_sys.default_queue = "auto"
@@ -14,6 +14,7 @@
 import logging
 from typing import Optional
 from dataclasses import dataclass, fields, asdict, replace
+from hpc_launcher.runtime import timeline
 from hpc_launcher.systems import autodetect
 from hpc_launcher.systems.system import System, SystemParams
 from hpc_launcher.utils import ceildiv
@@ -32,6 +33,7 @@ def configure_launch(
     gpumem_at_least: int = 0,
     cli_system_params: Optional[dict[str, str]] = None,
     job_comm_protocol: Optional[str] = None,
+    redetect: bool = False,
 ) -> tuple[System, int, int, int]:
     """
     See if the system can be autodetected and then process some special
@@ -51,10 +53,13 @@ def configure_launch(
                             (or None if not specified)
     :param job_comm_protocol: CLI provide description of the jos intended communication protocol
                             (or None if not specified)
+    :param redetect: Probe an unrecognized system's hardware again rather
+                     than reusing the cached results
     :return: A tuple of (autodetected System, number of nodes, number of
              processes per node)
     """
-    system = autodetect.autodetect_current_system()
+    with timeline.phase("autodetect_current_system"):
+        system = autodetect.autodetect_current_system(cache=True, redetect=redetect)
     # Pass the job's intended communication protocol to the system object
     system.job_comm_protocol = job_comm_protocol
     logger.info(
@@ -140,6 +145,13 @@ def configure_launch(
         if gpus_at_least > 0:
             nodes = ceildiv(gpus_at_least, procs_per_node)
         elif gpumem_at_least > 0:
+            if not system_params.mem_per_gpu and system_params.gpus_per_node:
+                raise ValueError(
+                    f"--gpumem-at-least was requested but the memory of "
+                    f"system {system.system_name!r}'s GPUs is unknown (it "
+                    "could not be auto-detected); pass it with "
+                    "-p mem_per_gpu=<GB>, or use --gpus-at-least"
+                )
             if not system_params.mem_per_gpu:
                 raise ValueError(
                     f"--gpumem-at-least was requested but system "
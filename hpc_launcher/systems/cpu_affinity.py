@@ -0,0 +1,239 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Topology-aware CPU binding of a node's ranks, for ``torchrun-hpc
+--cpu-bind``.
+
+Unless the scheduler binds them, all of a node's ranks may run on any of
+its cores. The data-loader workers and OpenMP threads of a rank then land
+on whichever NUMA domain the kernel picks, often not the one its GPU is
+attached to, and every host-to-device copy crosses the socket interconnect.
+The policies:
+
+``none``
+    Leave the affinity the scheduler gave the rank alone.
+``numa``
+    Deal the local ranks out over the NUMA domains round-robin, and give
+    each rank an equal share of its domain's cores.
+``gpu-local``
+    Give each rank a share of the cores in its GPU's NUMA domain (from the
+    GPU's PCI ``numa_node``), falling back to ``numa`` when that is not
+    known. Ranks that share a domain are assumed to be consecutive local
+    ranks, as they are when GPUs are numbered by PCI bus. The rank's GPU is
+    found in sysfs by the PCI address the runtime reports for it (see
+    :func:`physical_gpu`).
+``packed``
+    Ignore the topology: split the node's cores into equal contiguous
+    blocks, one per local rank.
+
+The topology comes from sysfs: ``/sys/devices/system/node/node<N>/cpulist``
+for the NUMA domains, and the GPU's PCI device (see
+:mod:`hpc_launcher.systems.gpu_sysfs`) for its ``numa_node``. Cores outside
+the rank's current affinity (the scheduler's cpuset) are never used. All
+paths are relative to ``root`` so that a fake tree can stand in for the
+real one.
+"""
+import logging
+import os
+import re
+from typing import Optional
+
+from hpc_launcher.systems import gpu_sysfs
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("none", "numa", "gpu-local", "packed")
+
+_NODES = "sys/devices/system/node"
+
+_NODE = re.compile(r"node(\d+)$")
+
+
+def parse_cpulist(text: str) -> list[int]:
+    """The CPUs of a sysfs cpulist such as ``0-3,8-11,16``."""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def numa_domains(root: str = "/") -> dict[int, list[int]]:
+    """The CPUs of every NUMA domain that has any, by domain number."""
+    nodes = os.path.join(root, _NODES)
+    try:
+        entries = os.listdir(nodes)
+    except OSError:
+        return {}
+    domains = {}
+    for entry in entries:
+        match = _NODE.match(entry)
+        if not match:
+            continue
+        try:
+            with open(os.path.join(nodes, entry, "cpulist")) as f:
+                cpus = parse_cpulist(f.read())
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            domains[int(match.group(1))] = cpus
+    return dict(sorted(domains.items()))
+
+
+def numa_node(device: str) -> Optional[int]:
+    """The NUMA domain of a PCI device directory, or ``None`` if unknown."""
+    try:
+        with open(os.path.join(device, "numa_node")) as f:
+            node = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return node if node >= 0 else None  # -1: the platform does not say
+
+
+def gpu_numa_nodes(root: str = "/") -> list[Optional[int]]:
+    """The NUMA domain of every GPU on the node, in device order (``None`` if unknown)."""
+    return [numa_node(device) for device in gpu_sysfs.gpu_devices(root)]
+
+
+def _pci_slot(address: str) -> Optional[tuple[int, int, int]]:
+    """The (domain, bus, device) of a PCI address such as ``0000:c1:00.0``."""
+    parts = address.strip().lower().split(".")[0].split(":")
+    if len(parts) == 2:
+        parts.insert(0, "0")
+    try:
+        domain, bus, device = (int(part, 16) for part in parts)
+    except ValueError:
+        return None
+    return domain, bus, device
+
+
+def gpu_index(pci_address: str, root: str = "/") -> Optional[int]:
+    """
+    The node-wide index (in :func:`gpu_sysfs.gpu_devices` order) of the GPU
+    at ``pci_address``, or ``None`` if sysfs has no such GPU.
+    """
+    slot = _pci_slot(pci_address)
+    if slot is None:
+        return None
+    for index, device in enumerate(gpu_sysfs.gpu_devices(root)):
+        if _pci_slot(os.path.basename(os.path.realpath(device))) == slot:
+            return index
+    return None
+
+
+def physical_gpu(
+    local_device_id: int, pci_address: Optional[str] = None, root: str = "/"
+) -> Optional[int]:
+    """
+    The node-wide index of the GPU a rank selected.
+
+    :param local_device_id: The rank's device index, within its visible devices.
+    :param pci_address: The device's PCI address, as the runtime reports it.
+                        It is looked up in sysfs, which is the only way to
+                        see through nested ``ROCR_VISIBLE_DEVICES`` and
+                        ``HIP_VISIBLE_DEVICES`` lists, UUIDs and enumeration
+                        orders that differ from the driver's.
+    :return: The GPU's index, or ``None`` if it is not known. Without an
+             address that sysfs resolves, it is guessed (with a warning)
+             from the first populated ``*_VISIBLE_DEVICES`` variable.
+    """
+    if pci_address is not None:
+        index = gpu_index(pci_address, root)
+        if index is not None:
+            return index
+    logger.warning(
+        f"Could not find the PCI device of GPU {local_device_id} "
+        f"(address {pci_address}) in sysfs; guessing it from the visible devices"
+    )
+    for variable in ("CUDA_VISIBLE_DEVICES", "ROCR_VISIBLE_DEVICES", "HIP_VISIBLE_DEVICES"):
+        visible = os.getenv(variable)
+        if visible:
+            devices = visible.split(",")
+            device = devices[local_device_id % len(devices)].strip()
+            return int(device) if device.isdigit() else None
+    return local_device_id
+
+
+def _share(cpus: list[int], index: int, count: int) -> list[int]:
+    """The ``index``-th of ``count`` equal contiguous shares of ``cpus``."""
+    count = max(1, min(count, len(cpus)))
+    index %= count
+    size, extra = divmod(len(cpus), count)
+    start = index * size + min(index, extra)
+    return cpus[start:start + size + (index < extra)]
+
+
+def bind_cpus(
+    policy: str,
+    local_rank: int,
+    local_world_size: int,
+    gpu: Optional[int] = None,
+    allowed: Optional[set[int]] = None,
+    root: str = "/",
+) -> Optional[list[int]]:
+    """
+    The CPUs that ``policy`` gives a local rank.
+
+    :param policy: One of :data:`POLICIES`.
+    :param local_rank: The rank's index on its node.
+    :param local_world_size: The number of ranks on the node.
+    :param gpu: The node-wide index of the rank's GPU, for ``gpu-local``.
+    :param allowed: The CPUs the rank may use (default: its current affinity).
+    :param root: The file system root to read the topology from.
+    :return: The CPUs to bind to, or ``None`` to leave the affinity alone.
+    """
+    if policy == "none":
+        return None
+    if allowed is None:
+        allowed = os.sched_getaffinity(0)
+    local_world_size = max(1, local_world_size)
+    if policy == "packed":
+        return _share(sorted(allowed), local_rank, local_world_size) or None
+
+    domains = {
+        node: cpus
+        for node, cpus in ((n, [c for c in cpus if c in allowed])
+                           for n, cpus in numa_domains(root).items())
+        if cpus
+    }
+    if not domains:
+        return _share(sorted(allowed), local_rank, local_world_size) or None
+    per_domain = -(-local_world_size // len(domains))
+    domain = None
+    if policy == "gpu-local" and gpu is not None:
+        nodes = gpu_numa_nodes(root)
+        if gpu < len(nodes):
+            domain = nodes[gpu]
+    if domain not in domains:
+        domain = list(domains)[local_rank % len(domains)]
+        return _share(domains[domain], local_rank // len(domains), per_domain)
+    return _share(domains[domain], local_rank % per_domain, per_domain)
+
+
+def apply(cpus: list[int]):
+    """
+    Bind every thread of this process to ``cpus``: the affinity of a thread
+    that already exists (torch starts some on import) is not inherited.
+    """
+    try:
+        threads = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        threads = [0]
+    for tid in threads:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            continue  # the thread has exited
@@ -0,0 +1,144 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+A per-host, per-boot cache of the hardware probes run on unrecognized
+hosts.
+
+Autodetecting an unknown system reads its GPUs from sysfs (asking amdsmi or
+NVML for what sysfs lacks), counts CPUs and NUMA domains and looks for a
+scheduler, which can take from hundreds of milliseconds to seconds -- paid
+again by every ``launch`` of a sweep that calls it hundreds of times,
+although none of the answers can change until the node reboots or the
+environment that steers them does.
+
+The probe results are therefore kept in
+``$XDG_CACHE_HOME/hpc-launcher/autodetect-<hostname>.json`` (one file per
+host, so that nodes sharing a home directory do not overwrite each
+other's), together with a key made of everything they depend on: the
+hostname, the kernel's boot ID, the Python environment (which decides
+whether amdsmi/NVML can be imported at all), and the environment variables
+that steer the probes (``ROCM_PATH``, ``FLUX_URI``, ``PATH``, the
+``*_VISIBLE_DEVICES`` masks, ...). An entry is used only if its key matches
+and it is younger than ``HPC_LAUNCHER_DETECT_CACHE_TTL`` seconds (default:
+one day; ``0`` disables the cache). ``--redetect`` probes again and
+replaces it.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from hpc_launcher.version import __version__
+
+logger = logging.getLogger(__name__)
+
+# Default lifetime of a cache entry, in seconds.
+DEFAULT_TTL = 24 * 3600
+TTL_ENV = "HPC_LAUNCHER_DETECT_CACHE_TTL"
+
+# Environment variables that change what the probes find.
+_KEY_ENV = (
+    "PATH",
+    "ROCM_PATH",
+    "CUDA_HOME",
+    "FLUX_URI",
+    "SLURM_CONF",
+    "LSF_ENVDIR",
+    "CUDA_VISIBLE_DEVICES",
+    "ROCR_VISIBLE_DEVICES",
+    "HIP_VISIBLE_DEVICES",
+    "LD_LIBRARY_PATH",
+)
+
+_BOOT_ID = "/proc/sys/kernel/random/boot_id"
+
+
+def cache_dir() -> str:
+    """``$XDG_CACHE_HOME/hpc-launcher``, or ``~/.cache/hpc-launcher``."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "hpc-launcher")
+
+
+def _cache_file() -> str:
+    return os.path.join(cache_dir(), f"autodetect-{socket.gethostname()}.json")
+
+
+def _ttl() -> float:
+    try:
+        return float(os.getenv(TTL_ENV, DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def cache_key() -> str:
+    """A digest of everything the cached probe results depend on."""
+    try:
+        with open(_BOOT_ID) as f:
+            boot_id = f.read().strip()
+    except OSError:
+        boot_id = None
+    inputs = {
+        "version": __version__,
+        "hostname": socket.gethostname(),
+        "boot_id": boot_id,
+        "python": sys.prefix,
+        "env": {name: os.getenv(name) for name in _KEY_ENV},
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def load() -> Optional[dict]:
+    """
+    The cached probe results for this host, boot and environment, if there
+    are any younger than the TTL.
+    """
+    ttl = _ttl()
+    if ttl <= 0:
+        return None
+    try:
+        with open(_cache_file()) as f:
+            entry = json.load(f)
+        if entry["key"] != cache_key() or time.time() - entry["created"] > ttl:
+            return None
+        return entry["probes"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def store(probes: dict) -> None:
+    """
+    Cache this host's probe results. The file is replaced atomically, so a
+    concurrent ``launch`` reads either the old entry or the new one; a cache
+    that cannot be written is skipped silently.
+    """
+    if _ttl() <= 0:
+        return
+    entry = {"key": cache_key(), "created": time.time(), "probes": probes}
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir(), prefix=".autodetect-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, _cache_file())
+        except BaseException:
+            os.remove(tmp)
+            raise
+    except OSError as e:
+        logger.info(f"Not caching the autodetected system: {e}")
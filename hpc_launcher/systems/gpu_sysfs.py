@@ -0,0 +1,167 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+GPU discovery from the files the kernel drivers publish, without the vendor
+libraries.
+
+Importing amdsmi or NVML and initializing the driver through them takes
+hundreds of milliseconds just to learn how many GPUs a node has, what they
+are and how much memory they carry. Most of that is readable from sysfs and
+procfs in a few milliseconds:
+
+``/sys/class/drm/card<N>/device/``
+    ``vendor`` (PCI vendor ID) for every GPU the kernel's DRM subsystem
+    knows, and, for amdgpu, ``mem_info_vram_total`` (bytes).
+``/sys/class/kfd/kfd/topology/nodes/<N>/properties``
+    The ROCm KFD topology; GPU nodes carry a non-zero ``gfx_target_version``
+    (e.g. ``90402`` for gfx942).
+``/proc/driver/nvidia/gpus/<bus id>/information``
+    One directory per GPU the NVIDIA kernel driver manages.
+
+Each function returns what it could find and ``None`` for what it could
+not, so that the caller asks the vendor library only for the gaps (the
+NVIDIA driver, for one, publishes neither the compute capability nor the
+memory size). All paths are relative to ``root`` so that a fake tree can
+stand in for the real one.
+"""
+import os
+import re
+from typing import Optional
+
+AMD_VENDOR_ID = 0x1002
+NVIDIA_VENDOR_ID = 0x10DE
+
+_DRM = "sys/class/drm"
+_KFD_NODES = "sys/class/kfd/kfd/topology/nodes"
+_NVIDIA_GPUS = "proc/driver/nvidia/gpus"
+_PCI_DEVICES = "sys/bus/pci/devices"
+
+_CARD = re.compile(r"card(\d+)$")
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def drm_cards(vendor_id: int, root: str = "/") -> Optional[list[str]]:
+    """
+    The device directories of the DRM cards from one PCI vendor, in card
+    order, or ``None`` if there is no DRM class in sysfs to look at.
+    """
+    drm = os.path.join(root, _DRM)
+    try:
+        entries = os.listdir(drm)
+    except OSError:
+        return None
+    cards = sorted(
+        (int(m.group(1)), entry) for entry in entries if (m := _CARD.match(entry))
+    )
+    devices = []
+    for _, card in cards:
+        device = os.path.join(drm, card, "device")
+        vendor = _read(os.path.join(device, "vendor"))
+        try:
+            if vendor is not None and int(vendor, 16) == vendor_id:
+                devices.append(device)
+        except ValueError:
+            continue
+    return devices
+
+
+def gfx_arch(gfx_target_version: int) -> str:
+    """
+    The ``gfx`` name of a KFD ``gfx_target_version``, which packs the major,
+    minor and stepping versions as decimal ``MMmmss`` (e.g. ``90010`` is
+    gfx90a, ``110000`` is gfx1100).
+    """
+    major, rest = divmod(gfx_target_version, 10000)
+    minor, stepping = divmod(rest, 100)
+    return f"gfx{major}{minor:x}{stepping:x}"
+
+
+def kfd_gpu_archs(root: str = "/") -> Optional[list[str]]:
+    """
+    The architecture of every GPU node in the KFD topology, in node order
+    (CPU nodes have a ``gfx_target_version`` of 0 and are skipped), or
+    ``None`` if there is no KFD topology.
+    """
+    nodes = os.path.join(root, _KFD_NODES)
+    try:
+        entries = os.listdir(nodes)
+    except OSError:
+        return None
+    archs = []
+    for node in sorted((e for e in entries if e.isdigit()), key=int):
+        properties = _read(os.path.join(nodes, node, "properties")) or ""
+        for line in properties.splitlines():
+            name, _, value = line.partition(" ")
+            if name == "gfx_target_version":
+                if value.strip().isdigit() and int(value):
+                    archs.append(gfx_arch(int(value)))
+                break
+    return archs
+
+
+def find_AMD_gpus(root: str = "/") -> Optional[tuple[int, Optional[float], Optional[str]]]:
+    """
+    The number of AMD GPUs, the VRAM of the first in GiB and its
+    architecture, each ``None`` where sysfs does not say; ``None`` if there
+    is no DRM class in sysfs at all.
+    """
+    cards = drm_cards(AMD_VENDOR_ID, root)
+    if cards is None:
+        return None
+    if not cards:
+        return (0, 0, None)
+    mem_per_gpu = None
+    vram = _read(os.path.join(cards[0], "mem_info_vram_total"))
+    if vram is not None and vram.isdigit():
+        mem_per_gpu = int(vram) / (1024**3)
+    archs = kfd_gpu_archs(root)
+    return (len(cards), mem_per_gpu, archs[0] if archs else None)
+
+
+def count_NVIDIA_gpus(root: str = "/") -> int:
+    """
+    The number of GPUs the NVIDIA kernel driver manages, or 0 if the driver
+    is not loaded (in which case NVML cannot find any either).
+    """
+    gpus = os.path.join(root, _NVIDIA_GPUS)
+    try:
+        return sum(
+            os.path.exists(os.path.join(gpus, gpu, "information"))
+            for gpu in os.listdir(gpus)
+        )
+    except OSError:
+        return 0
+
+
+def gpu_devices(root: str = "/") -> list[str]:
+    """
+    The sysfs PCI device directory of every GPU on the node, in device
+    order: the AMD DRM cards, or else the GPUs the NVIDIA driver manages by
+    PCI bus ID.
+    """
+    cards = drm_cards(AMD_VENDOR_ID, root)
+    if cards:
+        return cards
+    try:
+        bus_ids = sorted(os.listdir(os.path.join(root, _NVIDIA_GPUS)))
+    except OSError:
+        return []
+    return [os.path.join(root, _PCI_DEVICES, bus_id.lower()) for bus_id in bus_ids]
@@ -0,0 +1,137 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+GPU-to-NIC affinity on multi-rail nodes, for ``torchrun-hpc
+--nic-affinity``.
+
+An El Capitan or Tuolumne node has one Slingshot NIC per APU, but the
+system profile names a single interface (``NCCL_SOCKET_IFNAME=hsi0``) for
+every rank, so the bootstrap traffic of all of a node's ranks shares one
+rail, and the fabric plugin picks NICs without regard to where each GPU
+sits. With ``--nic-affinity``, each rank exports the hints for the NIC
+closest to its own GPU before ``init_process_group``.
+
+"Closest" is read from the PCI topology in sysfs. A device's resolved
+``/sys/devices/pci<domain>:<bus>/...`` path lists every bridge between it
+and its root complex, so the NIC whose path shares the most leading
+components with the GPU's sits behind the same PCIe switch (or, failing
+that, the same root complex). Ties are broken by NUMA domain, and NICs that
+are still equally close are dealt out over the GPUs round-robin.
+
+NICs are found through ``/sys/class/cxi`` (Slingshot) and
+``/sys/class/infiniband``; the network interface of each is the entry of
+``/sys/class/net`` on the same PCI device. All paths are relative to
+``root`` so that a synthetic tree can stand in for the real one.
+"""
+import os
+from typing import NamedTuple, Optional
+
+from hpc_launcher.systems import gpu_sysfs
+from hpc_launcher.systems.cpu_affinity import numa_node
+
+_CXI = "sys/class/cxi"
+_INFINIBAND = "sys/class/infiniband"
+_NET = "sys/class/net"
+
+
+class Nic(NamedTuple):
+    """A network adapter and where it sits."""
+
+    # The adapter's name in its class: cxi0, mlx5_0, ...
+    name: str
+    # "cxi" or "infiniband"
+    kind: str
+    # The network interface on the same PCI device (hsi0, ib0, ...), if any
+    interface: Optional[str]
+    # The resolved sysfs path of its PCI device
+    pci_path: str
+    numa_node: Optional[int]
+
+
+def _listdir(path: str) -> list[str]:
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
+
+
+def _pci_path(device: str) -> Optional[str]:
+    path = os.path.realpath(device)
+    return path if os.path.isdir(path) else None
+
+
+def nics(root: str = "/") -> list[Nic]:
+    """Every Slingshot and InfiniBand adapter on the node, in name order."""
+    interfaces = {}
+    for interface in _listdir(os.path.join(root, _NET)):
+        path = _pci_path(os.path.join(root, _NET, interface, "device"))
+        if path is not None:
+            interfaces.setdefault(path, interface)
+    found = []
+    for kind, directory in (("cxi", _CXI), ("infiniband", _INFINIBAND)):
+        for name in _listdir(os.path.join(root, directory)):
+            path = _pci_path(os.path.join(root, directory, name, "device"))
+            if path is not None:
+                found.append(Nic(name, kind, interfaces.get(path), path, numa_node(path)))
+    return found
+
+
+def _shared_depth(a: str, b: str) -> int:
+    """How many leading path components two PCI device paths share."""
+    depth = 0
+    for x, y in zip(a.split(os.sep), b.split(os.sep)):
+        if x != y:
+            break
+        depth += 1
+    return depth
+
+
+def _closest(path: str, adapters: list[Nic]) -> list[Nic]:
+    """The NICs equally closest to the PCI device at ``path``."""
+    node = numa_node(path)
+
+    def distance(nic):
+        same_node = node is not None and nic.numa_node == node
+        return (_shared_depth(path, nic.pci_path), same_node)
+
+    best = max(distance(nic) for nic in adapters)
+    return [nic for nic in adapters if distance(nic) == best]
+
+
+def closest_nic(gpu: int, root: str = "/", adapters: Optional[list[Nic]] = None) -> Optional[Nic]:
+    """
+    The NIC closest to the node's ``gpu``-th GPU, or ``None`` if the GPU or
+    the NICs cannot be found.
+    """
+    adapters = nics(root) if adapters is None else adapters
+    paths = [_pci_path(device) for device in gpu_sysfs.gpu_devices(root)]
+    if not adapters or not 0 <= gpu < len(paths) or paths[gpu] is None:
+        return None
+    candidates = _closest(paths[gpu], adapters)
+    # Deal the GPUs that are equally close to the same NICs out over them.
+    peers = [i for i, path in enumerate(paths) if path and _closest(path, adapters) == candidates]
+    return candidates[peers.index(gpu) % len(candidates)]
+
+
+def environment(nic: Nic) -> dict[str, str]:
+    """The per-rank hints that steer the communication libraries to ``nic``."""
+    env = {}
+    if nic.interface:
+        env["NCCL_SOCKET_IFNAME"] = nic.interface
+        env["GLOO_SOCKET_IFNAME"] = nic.interface
+    if nic.kind == "cxi":
+        env["FI_CXI_DEVICE_NAME"] = nic.name
+    else:
+        env["NCCL_IB_HCA"] = f"={nic.name}"
+    return env
@@ -34,7 +34,7 @@ class SystemParams:
     gpus_per_node: int = 0
     # Vendor specific GPU compiler architecture
     gpu_arch: str = None
-    # Number of GB of memory per GPU
+    # Number of GB of memory per GPU (0 if unknown)
     mem_per_gpu: float = 0.0
     # Number of NUMA domains
     numa_domains: int = 0
@@ -62,7 +62,11 @@ class SystemParams:
             return self.numa_domains
 
     def prettyprint(self):
-        if self.fraction_max_gpu_mem != 1.0:
+        if not self.mem_per_gpu:
+            # GPUs found without their memory (e.g. NVIDIA without NVML)
+            effective_gpu_mem = "unknown "
+            max_gpu_mem = ""
+        elif self.fraction_max_gpu_mem != 1.0:
             effective_gpu_mem = self.fraction_max_gpu_mem * self.mem_per_gpu
             max_gpu_mem = f" ({self.mem_per_gpu} GB max)"
         else:
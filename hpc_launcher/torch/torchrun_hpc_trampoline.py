@@ -11,19 +11,45 @@
 # https://github.com/LBANN and https://github.com/LLNL/LBANN.
 #
 # SPDX-License-Identifier: (Apache-2.0)
-import hpc_launcher.torch
+import time
 
-import torch
-import torch.distributed as dist
+# With --pycache, copy the launcher's bytecode cache to this node before
+# anything else is imported through it.
+from hpc_launcher.runtime import pycache
+
+_pycache_start = time.monotonic()
+_pycache_seconds = pycache.sync_to_node()
+
+from hpc_launcher.runtime import (kernel_cache, rendezvous_port, rendezvous_relay,
+                                  startup_telemetry, timeline)
+
+# Started first, so that the time to import torch is recorded on its own.
+timeline.start("torchrun-hpc rank")
+if _pycache_seconds is not None:
+    timeline.current().complete(
+        "sync bytecode cache", _pycache_start, _pycache_start + _pycache_seconds
+    )
+
+_import_start = time.monotonic()
+with timeline.phase("import torch"):
+    import hpc_launcher.torch
+
+    import torch
+    import torch.distributed as dist
+_import_seconds = time.monotonic() - _import_start
+import contextlib
+import datetime
 import runpy
+import socket
 import sys
 import os
 
 from hpc_launcher.schedulers import get_schedulers
+from hpc_launcher.systems import cpu_affinity, nic_affinity
 
 
 def _process_group_kwargs(backend, init_method, world_size, rank, device,
-                          local_device_id):
+                          local_device_id, store=None):
     """
     Build the keyword arguments for ``torch.distributed.init_process_group``.
 
@@ -33,13 +59,20 @@ def _process_group_kwargs(backend, init_method, world_size, rank, device,
     index``. Passing it unconditionally crashed every multi-rank CPU/gloo job
     at initialization. Include ``device_id`` only when an
     accelerator is actually in use.
+
+    With a ``store`` (see ``_rendezvous_store``) the rendezvous has already
+    happened, and ``init_method`` is left out: torch accepts only one of
+    the two.
     """
     kwargs = dict(
         backend=backend,
-        init_method=init_method,
         world_size=world_size,
         rank=rank,
     )
+    if store is not None:
+        kwargs["store"] = store
+    else:
+        kwargs["init_method"] = init_method
     if device != "cpu" and torch.cuda.is_available():
         kwargs["device_id"] = torch.device(device, local_device_id)
     return kwargs
@@ -169,6 +202,196 @@ def _apply_memory_fraction(local_device_id):
             fraction_max_gpu_mem, device=local_device_id)
 
 
+def _physical_gpu(local_device_id):
+    """
+    The node-wide index of this rank's GPU, found in sysfs by the PCI
+    address torch reports for it (see
+    :func:`hpc_launcher.systems.cpu_affinity.physical_gpu`), or ``None``
+    without a GPU.
+    """
+    if not torch.cuda.is_available():
+        return None
+    try:
+        props = torch.cuda.get_device_properties(local_device_id)
+        address = f"{props.pci_domain_id:04x}:{props.pci_bus_id:02x}:{props.pci_device_id:02x}"
+    except (AttributeError, RuntimeError, AssertionError):
+        address = None  # older torch, or the device is not usable
+    return cpu_affinity.physical_gpu(local_device_id, address)
+
+
+def _bind_cpus(local_rank, local_world_size, local_device_id):
+    """
+    Bind this rank to its share of the node's cores under the
+    ``--cpu-bind`` policy (see :mod:`hpc_launcher.systems.cpu_affinity`),
+    and size the OpenMP and torch thread pools to match unless the user
+    set ``OMP_NUM_THREADS``.
+
+    :return: The CPUs the rank was bound to, or ``None`` if it was not.
+    """
+    policy = os.getenv("TORCHRUN_HPC_CPU_BIND", "none")
+    if policy == "none" or not hasattr(os, "sched_setaffinity"):
+        return None
+    with timeline.phase("bind cpus", policy=policy):
+        cpus = cpu_affinity.bind_cpus(
+            policy, local_rank, local_world_size,
+            gpu=_physical_gpu(local_device_id) if policy == "gpu-local" else None,
+        )
+        if not cpus:
+            return None
+        cpu_affinity.apply(cpus)
+    if "OMP_NUM_THREADS" not in os.environ:
+        os.environ["OMP_NUM_THREADS"] = str(len(cpus))
+        torch.set_num_threads(len(cpus))
+    return cpus
+
+
+def _select_nic(local_device_id):
+    """
+    With ``--nic-affinity``, point this rank's communication libraries at
+    the NIC closest to its GPU on a multi-rail node (see
+    :mod:`hpc_launcher.systems.nic_affinity`), overriding the system's
+    node-wide choice. Must run before ``init_process_group``.
+
+    :return: The hints exported, or ``None`` if there was no choice to make.
+    """
+    if not os.getenv("TORCHRUN_HPC_NIC_AFFINITY"):
+        return None
+    with timeline.phase("select nic"):
+        adapters = nic_affinity.nics()
+        if len(adapters) < 2:
+            return None
+        gpu = _physical_gpu(local_device_id)
+        if gpu is None:
+            return None
+        nic = nic_affinity.closest_nic(gpu, adapters=adapters)
+        if nic is None:
+            return None
+        env = nic_affinity.environment(nic)
+        os.environ.update(env)
+    return env
+
+
+def _relay_store(client):
+    """
+    The store of a rank that is not the first on its node under ``--rdv
+    tcp-hier``: the first rank runs its operations on the TCP store (see
+    :mod:`hpc_launcher.runtime.rendezvous_relay`). The class is made here
+    rather than at import so that importing the trampoline does no more
+    than import torch.
+    """
+
+    class _RelayStore(dist.Store):
+
+        def __init__(self, client):
+            super().__init__()
+            self._client = client
+
+        def set(self, key, value):
+            self._client.set(key, value)
+
+        def get(self, key):
+            return self._client.get(key)
+
+        def add(self, key, value):
+            return self._client.add(key, value)
+
+        def compare_set(self, key, expected_value, desired_value):
+            return self._client.compare_set(key, expected_value, desired_value)
+
+        def check(self, keys):
+            return self._client.check(keys)
+
+        def wait(self, keys, timeout=None):
+            self._client.wait(keys, None if timeout is None else timeout.total_seconds())
+
+        def delete_key(self, key):
+            return self._client.delete_key(key)
+
+        def num_keys(self):
+            return self._client.num_keys()
+
+    return _RelayStore(client)
+
+
+def _tcp_store(host, port, world_size, rank):
+    """
+    Rank 0's TCP store, from any rank. With ``--probe-port``, rank 0
+    chooses the port on its own node and starts the store there, trying
+    new ports if it cannot listen; the other ranks follow it through the
+    launch folder (see :mod:`hpc_launcher.runtime.rendezvous_port`). The chosen
+    port replaces the launch host's in ``TORCHRUN_HPC_MASTER_PORT``.
+    """
+
+    def connect(port, is_master, timeout):
+        return dist.TCPStore(host, port, world_size, is_master,
+                             datetime.timedelta(seconds=timeout),
+                             wait_for_workers=False)
+
+    path = os.getenv(rendezvous_port.PORT_FILE_ENV)
+    if not path:
+        return connect(port, rank == 0, rendezvous_port.TIMEOUT_SECONDS)
+    with timeline.phase("probe rendezvous port"):
+        store, port = rendezvous_port.rendezvous(rank, path, connect, port)
+    os.environ["TORCHRUN_HPC_MASTER_PORT"] = str(port)
+    return store
+
+
+def _rendezvous_store(rdv_protocol, world_size, rank, local_rank):
+    """
+    The store for ``init_process_group`` when torch's own ``init_method``
+    cannot do the rendezvous: with ``--probe-port``, and with ``--rdv
+    tcp-hier``, where the first rank on each node connects to rank 0 (which
+    must be the first on its node) and relays the store operations of the
+    node's other ranks.
+
+    :return: The store, or ``None`` to use ``init_method``.
+    """
+    scheme, _, location = (rdv_protocol or "").partition("://")
+    if scheme == "tcp" and not os.getenv(rendezvous_port.PORT_FILE_ENV):
+        return None
+    if scheme not in ("tcp", "tcp-hier"):
+        return None
+    host, _, port = location.rpartition(":")
+    if scheme == "tcp":
+        return _tcp_store(host, int(port), world_size, rank)
+
+    relay = rendezvous_relay.address(rdv_protocol, os.getenv("TORCHRUN_HPC_LAUNCH_DIR", ""))
+    if local_rank == 0:
+        store = _tcp_store(host, int(port), world_size, rank)
+        # --probe-port may have moved the store to another port.
+        port = int(os.getenv("TORCHRUN_HPC_MASTER_PORT", port))
+
+        def connect():
+            # The relay's own connections, so that the node's other ranks do
+            # not queue behind this rank's blocking operations
+            return dist.TCPStore(host, port, world_size, False,
+                                 datetime.timedelta(seconds=rendezvous_port.TIMEOUT_SECONDS),
+                                 wait_for_workers=False)
+
+        rendezvous_relay.Server(relay, connect)
+        return store
+    client = rendezvous_relay.Client(relay, rendezvous_port.TIMEOUT_SECONDS)
+    path = os.getenv(rendezvous_port.PORT_FILE_ENV)
+    if path:
+        # The relay is up, so the node's first rank has connected to the
+        # port rank 0 published last: export that rather than the launch
+        # host's.
+        published = rendezvous_port.read(path)
+        if published is not None:
+            os.environ["TORCHRUN_HPC_MASTER_PORT"] = str(published[1])
+    return _relay_store(client)
+
+
+def _init_method(rdv_protocol):
+    """``--rdv file`` names its store relative to the launch folder."""
+    if rdv_protocol and rdv_protocol.startswith("file://"):
+        path = rdv_protocol[len("file://"):]
+        if not os.path.isabs(path):
+            launch_dir = os.getenv("TORCHRUN_HPC_LAUNCH_DIR", os.getcwd())
+            return "file://" + os.path.join(launch_dir, path)
+    return rdv_protocol
+
+
 def _destroy_process_group():
     """
     Release the process group, best effort, on the way out of the job.
@@ -195,6 +418,69 @@ def _destroy_process_group():
         )
 
 
+def _report_startup(record, rank, world_size, device, local_device_id):
+    """
+    Send this rank's start-up times to rank 0, which writes the job's
+    start-up report into the launch folder (see
+    :mod:`hpc_launcher.runtime.startup_telemetry`).
+
+    Only with ``--startup-report``: it is one ``gather_object`` right after
+    ``init_process_group``, which a default launch should not pay for. Every
+    rank takes part or none does, since all of them see the same variable.
+    NCCL moves the pickled objects through the current CUDA
+    device, so it is pinned to the rank's own device for the call. A
+    failure to write the report is printed and otherwise ignored.
+    """
+    folder = os.getenv(startup_telemetry.REPORT_ENV)
+    if not folder:
+        return
+    records = [record]
+    if world_size > 1 and dist.is_initialized():
+        records = [None] * world_size if rank == 0 else None
+        pinned = (torch.cuda.device(local_device_id) if device == "cuda"
+                  else contextlib.nullcontext())
+        with pinned:
+            dist.gather_object(record, records, dst=0)
+    if rank == 0:
+        try:
+            startup_telemetry.write_report(folder, records)
+        except OSError as e:
+            print(f"torchrun-hpc: could not write the start-up report: {e}",
+                  file=sys.stderr)
+
+
+def _write_timeline(rank):
+    """
+    Write this rank's part of a ``--timeline`` launch's trace into the launch
+    folder, where the launcher merges it into ``timeline.json``. Like
+    :func:`_destroy_process_group`, a failure is reported and swallowed.
+    """
+    folder = os.getenv(timeline.TIMELINE_ENV)
+    if not folder:
+        return
+    try:
+        timeline.write_rank_fragment(folder, rank)
+    except OSError as e:
+        print(f"torchrun-hpc: could not write the launch timeline: {e}",
+              file=sys.stderr)
+
+
+def _merge_kernel_cache(local_rank):
+    """
+    With ``--kernel-cache``, merge this node's new kernel cache entries into
+    the shared cache, once per node. Local rank 0 merges only what it sees
+    when its own script has ended, so entries that the node's other ranks
+    write after that wait for the next job.
+    """
+    if local_rank != 0 or not os.getenv(kernel_cache.SOURCE_ENV):
+        return
+    with timeline.phase("merge kernel caches"):
+        merged = kernel_cache.merge_back()
+    if merged:
+        print(f"torchrun-hpc: merged {merged} kernel cache files into "
+              f"{os.getenv(kernel_cache.SOURCE_ENV)}", file=sys.stderr)
+
+
 def main():
     # Strip off the name of this script and pass the rest to runpy
     args = sys.argv[1:]
@@ -206,8 +492,10 @@ def main():
 
     scheduler_type = os.getenv("TORCHRUN_HPC_SCHEDULER")
     scheduler = get_schedulers()[scheduler_type]
-    (world_size, rank, local_world_size,
-     local_rank) = (scheduler.get_parallel_configuration())
+    with timeline.phase("get_parallel_configuration"):
+        (world_size, rank, local_world_size,
+         local_rank) = (scheduler.get_parallel_configuration())
+    timeline.current().set_process_name(f"rank {rank}", pid=rank + 1)
 
     # Check on the backend and report if the memory size was set
     backend = None
@@ -228,6 +516,7 @@ def main():
     # Standard operating mode assumes that there is one rank per GPU.
     # Round-robin the visible GPUs to select this rank's device. This is a
     # device index, not this rank's identity -- see _rank_identity.
+    device_start = time.monotonic()
     local_device_id = _select_local_device_id(local_rank)
 
     # Publish this rank's identity, overwriting anything the launch script may
@@ -241,8 +530,23 @@ def main():
     # used to run at import time against device 0 regardless of the device the
     # worker ends up using.
     _apply_memory_fraction(local_device_id)
+    device_seconds = time.monotonic() - device_start
+
+    # Bind the rank, and with it the data-loader workers and OpenMP threads
+    # it starts, to the cores its --cpu-bind policy gives it.
+    _bind_cpus(local_rank, local_world_size, local_device_id)
+
+    # On a multi-rail node, use the NIC next to this rank's GPU.
+    _select_nic(local_device_id)
+
+    # With --kernel-cache, the first rank on each node fills the node's
+    # MIOpen, Triton and TorchInductor caches before any kernel is needed.
+    if os.getenv(kernel_cache.SOURCE_ENV):
+        with timeline.phase("seed kernel caches"):
+            kernel_cache.seed()
 
     torch_dist_initialized = dist.is_initialized()
+    rendezvous_seconds = 0.0
     rdv_protocol = os.getenv("TORCHRUN_HPC_RDV_PROTOCOL")
     if world_size > 1 or rdv_protocol == "mpi://":
         if rdv_protocol == "mpi://":
@@ -272,11 +576,20 @@ def main():
                 print(
                     f"[Rank {rank} of {world_size}]: Initializing distributed PyTorch using protocol: {rdv_protocol}"
                 )
+            # The rendezvous happens inside init_process_group, or before it
+            # with --probe-port.
+            rendezvous_start = time.monotonic()
+            store = _rendezvous_store(rdv_protocol, world_size, rank,
+                                      local_rank)
             # TODO(later): Fix how we handle CUDA visible devices and MPI bind
-            pg_kwargs = _process_group_kwargs(backend, rdv_protocol,
+            pg_kwargs = _process_group_kwargs(backend,
+                                              _init_method(rdv_protocol),
                                               world_size, rank, device,
-                                              local_device_id)
-            dist.init_process_group(**pg_kwargs)
+                                              local_device_id, store)
+            with timeline.phase("init_process_group", backend=backend,
+                                init_method=rdv_protocol):
+                dist.init_process_group(**pg_kwargs)
+            rendezvous_seconds = time.monotonic() - rendezvous_start
 
             if rdv_protocol == "mpi://" and rank == 0:
                 print("[Rank {} of {}]: MPI Version: {}".format(
@@ -284,6 +597,17 @@ def main():
                 print("[Rank {} of {}]: MPI Implementation: {}".format(
                     rank, world_size, MPI.Get_library_version()))
 
+    _report_startup(
+        startup_telemetry.rank_record(
+            rank,
+            socket.gethostname(),
+            import_torch=_import_seconds,
+            device_selection=device_seconds,
+            rendezvous=rendezvous_seconds,
+        ),
+        rank, world_size, device, local_device_id,
+    )
+
     # The rendezvous coordinates go alongside the identity published above, so
     # an application that sets torch distributed up itself finds a complete
     # environment.
@@ -312,12 +636,15 @@ def main():
     # Nothing here handles the exception -- it propagates, and with it the
     # process's non-zero exit status.
     try:
-        if is_module:
-            runpy.run_module(args[0], run_name="__main__", alter_sys=True)
-        else:
-            runpy.run_path(args[0], run_name="__main__")
+        with timeline.phase("user script"):
+            if is_module:
+                runpy.run_module(args[0], run_name="__main__", alter_sys=True)
+            else:
+                runpy.run_path(args[0], run_name="__main__")
     finally:
         _destroy_process_group()
+        _merge_kernel_cache(local_rank)
+        _write_timeline(rank)
 
 
 if __name__ == "__main__":
@@ -98,5 +98,7 @@ setup(
         "rocm": ["amdsmi"],
         "rocm-auto": [amdsmi_requirement()],
         "cuda": ["nvidia-ml-py"],
+        "zstd": ["zstandard"],
+        "sweep": ["pyyaml"],
     },
 )
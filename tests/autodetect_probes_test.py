@@ -0,0 +1,83 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for running an unrecognized system's autodetection probes
+concurrently, with a timeout and per-probe latency logging.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+
+from hpc_launcher.systems import autodetect, detection_cache
+
+
+def _sleeper(seconds, value):
+    def probe():
+        time.sleep(seconds)
+        return value
+    return probe
+
+
+def test_probes_run_concurrently():
+    start = time.monotonic()
+    found, unfinished = autodetect.run_probes(
+        {name: _sleeper(0.3, name) for name in ("a", "b", "c", "d")}, timeout=10
+    )
+    assert time.monotonic() - start < 1.0
+    assert found == {"a": "a", "b": "b", "c": "c", "d": "d"}
+    assert unfinished == []
+
+
+def test_hung_probe_is_abandoned(caplog):
+    hang = threading.Event()
+    start = time.monotonic()
+    with caplog.at_level(logging.INFO, logger=autodetect.__name__):
+        found, unfinished = autodetect.run_probes(
+            {"driver": hang.wait, "fast": _sleeper(0, 3)}, timeout=0.2
+        )
+    hang.set()
+    assert time.monotonic() - start < 2.0
+    assert found == {"fast": 3} and unfinished == ["driver"]
+    assert "Autodetection probe fast took" in caplog.text
+    assert "probe driver did not finish within 0.2s" in caplog.text
+
+
+def test_failing_probe_counts_as_finding_nothing(caplog):
+    def broken():
+        raise RuntimeError("driver mismatch")
+
+    found, unfinished = autodetect.run_probes({"broken": broken}, timeout=5)
+    assert found == {} and unfinished == []
+    assert "driver mismatch" in caplog.text
+
+
+def test_incomplete_probes_are_not_cached(monkeypatch):
+    monkeypatch.setattr(socket, "gethostname", lambda: "unknown-host")
+    monkeypatch.setenv(autodetect.PROBE_TIMEOUT_ENV, "0.2")
+    hang = threading.Event()
+    monkeypatch.setattr(autodetect, "find_NVIDIA_gpus", lambda: hang.wait() or (0, 0, None))
+    monkeypatch.setattr(autodetect, "find_AMD_gpus", lambda: (4, 64.0, "gfx90a"))
+    autodetect.clear_autodetected_system()
+    try:
+        system = autodetect.autodetect_current_system(quiet=True, cache=True)
+    finally:
+        hang.set()
+        autodetect.clear_autodetected_system()
+    assert system.system_name == "Generic AMD"
+    assert system.system_params["auto"].gpus_per_node == 4
+    assert not os.path.exists(
+        os.path.join(detection_cache.cache_dir(), "autodetect-unknown-host.json")
+    )
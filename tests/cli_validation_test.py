@@ -685,3 +685,35 @@ def test_out_and_err_at_the_same_path_are_rejected(tmp_path):
     assert not (launch_dir / "both.log").exists(), (
         f"a truncated combined log was written anyway:\n{stderr}"
     )
+
+
+# ---------------------------------------------------------------------------
+# --zero-copy-logs is dropped, with a warning, by every flag that has to read
+# the output, not only --color-stderr.
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("flag", [
+    ["--color-stderr"], ["--demux-ranks"], ["--console-ranks", "0"],
+    ["--event-log"], ["--timeline"],
+])
+def test_zero_copy_logs_warns_when_a_flag_turns_it_off(tmp_path, flag):
+    proc = subprocess.run(
+        LAUNCH
+        + ["--local", "-N1", "-l", str(tmp_path / "run"), "--zero-copy-logs"]
+        + flag
+        + ["--", "/bin/sh", "-c", "echo OUTLINE"],
+        capture_output=True,
+    )
+    stderr = proc.stderr.decode(errors="replace")
+    assert proc.returncode == 0, stderr
+    assert f"--zero-copy-logs is ignored with {flag[0]}" in stderr
+
+
+def test_zero_copy_logs_alone_does_not_warn(tmp_path):
+    proc = subprocess.run(
+        LAUNCH
+        + ["--local", "-N1", "-l", str(tmp_path / "run"), "--zero-copy-logs",
+           "--", "/bin/sh", "-c", "echo OUTLINE"],
+        capture_output=True,
+    )
+    assert proc.returncode == 0
+    assert b"--zero-copy-logs is ignored" not in proc.stderr
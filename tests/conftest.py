@@ -84,3 +84,14 @@ def _no_shared_scheduler_or_system_state():
     assert system._aux_env_list == []
 
     yield
+
+
+@pytest.fixture(autouse=True)
+def _isolated_detection_cache(tmp_path_factory, monkeypatch):
+    """
+    Give every test (and every ``launch`` subprocess it starts) its own,
+    empty ``$XDG_CACHE_HOME``, so that no test reads system autodetection
+    results cached by another -- or by the developer's own launches -- and
+    nothing is written into the real home directory.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("xdg-cache")))
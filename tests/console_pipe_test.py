@@ -0,0 +1,371 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``console_pipe``'s tee engine: large adaptive reads, coalesced
+writes, and flushes on a bounded-latency timer rather than after every chunk;
+its opt-in ``splice(2)``/``tee(2)`` path for blocking launches; and the
+background thread that writes the log files.
+"""
+import asyncio
+import errno
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from hpc_launcher.cli import console_pipe
+
+
+class _RecordingStream(io.BytesIO):
+    """A binary sink that counts flushes and can pretend to be a terminal."""
+
+    def __init__(self, tty: bool = False):
+        super().__init__()
+        self.flushes = 0
+        self._tty = tty
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+    def isatty(self):
+        return self._tty
+
+
+class _RecordingReader:
+    """An ``asyncio.StreamReader`` stand-in that records the sizes asked for."""
+
+    def __init__(self, chunks):
+        self._data = b"".join(chunks)
+        self.requested = []
+
+    async def read(self, n):
+        self.requested.append(n)
+        chunk, self._data = self._data[:n], self._data[n:]
+        return chunk
+
+
+def _feed(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_output_is_replicated_byte_for_byte():
+    """Every byte reaches both outputs, in order, for a multi-MB stream."""
+    payload = b"".join(b"line %d\n" % i for i in range(300000))
+
+    async def _run():
+        console, log = _RecordingStream(), _RecordingStream()
+        await console_pipe.replicate_output(_feed(payload), console, log)
+        return console, log
+
+    console, log = asyncio.run(_run())
+    assert console.getvalue() == payload
+    assert log.getvalue() == payload
+
+
+def test_prefix_and_suffix_only_reach_the_console():
+    async def _run():
+        console, log = _RecordingStream(), _RecordingStream()
+        await console_pipe.replicate_output(
+            _feed(b"error\n"), console, log, prefix=b"<", suffix=b">"
+        )
+        return console, log
+
+    console, log = asyncio.run(_run())
+    assert console.getvalue() == b"<error\n>"
+    assert log.getvalue() == b"error\n"
+
+
+def test_read_size_grows_for_a_full_pipe_and_shrinks_back():
+    """
+    Reads start at ``buffer_size``, double while they come back full, and
+    never exceed ``_MAX_READ_SIZE``.
+    """
+    reader = _RecordingReader([b"x" * (8 * console_pipe._MAX_READ_SIZE)])
+
+    async def _run():
+        await console_pipe.replicate_output(reader, _RecordingStream(), buffer_size=32)
+
+    asyncio.run(_run())
+    assert reader.requested[0] == 32
+    assert reader.requested[1] == 64
+    assert max(reader.requested) == console_pipe._MAX_READ_SIZE
+
+
+def test_flushes_are_coalesced_not_issued_per_chunk():
+    """
+    The old engine flushed both outputs after every 32-byte read. A stream
+    that arrives in thousands of chunks within one flush interval must now
+    cost a bounded number of flushes.
+    """
+    chunks = [b"step %05d loss 0.1\n" % i for i in range(5000)]
+
+    async def _run():
+        reader = asyncio.StreamReader()
+        console, log = _RecordingStream(), _RecordingStream()
+        task = asyncio.ensure_future(
+            console_pipe.replicate_output(
+                reader, console, log, buffer_size=16, flush_interval=60.0
+            )
+        )
+        for chunk in chunks:
+            reader.feed_data(chunk)
+            await asyncio.sleep(0)
+        reader.feed_eof()
+        await task
+        return console, log
+
+    console, log = asyncio.run(_run())
+    assert log.getvalue() == b"".join(chunks)
+    # Only the final flush at EOF: the timer never expired.
+    assert console.flushes == 1
+    assert log.flushes == 1
+
+
+def test_partial_output_is_flushed_within_the_latency_bound():
+    """
+    Output that arrives without being followed by EOF -- a job printing a
+    progress line and then computing -- must still be flushed once the
+    flush interval elapses rather than waiting for more data.
+    """
+
+    async def _run():
+        reader = asyncio.StreamReader()
+        log = _RecordingStream()
+        task = asyncio.ensure_future(
+            console_pipe.replicate_output(
+                reader, _RecordingStream(), log, flush_interval=0.01
+            )
+        )
+        reader.feed_data(b"epoch 1 ...")
+        await asyncio.sleep(0.5)
+        flushed_before_eof = log.flushes
+        reader.feed_eof()
+        await task
+        return flushed_before_eof
+
+    assert asyncio.run(_run()) >= 1
+
+
+def test_terminal_output_is_flushed_on_newline():
+    """
+    A console attached to a terminal is line-flushed, so interactive use
+    does not wait for the timer.
+    """
+
+    async def _run():
+        reader = asyncio.StreamReader()
+        console = _RecordingStream(tty=True)
+        task = asyncio.ensure_future(
+            console_pipe.replicate_output(reader, console, flush_interval=60.0)
+        )
+        reader.feed_data(b"ready\n")
+        await asyncio.sleep(0.05)
+        flushed_before_eof = console.flushes
+        reader.feed_eof()
+        await task
+        return flushed_before_eof
+
+    assert asyncio.run(_run()) == 1
+
+
+def test_large_child_output_reaches_the_log_file(tmp_path):
+    """End-to-end through ``run_process_with_live_output``."""
+    writer = (
+        "import os\n"
+        "for i in range(20000):\n"
+        "    os.write(1, b'%06d ' % i + b'y' * 100 + b'\\n')\n"
+    )
+    log_path = tmp_path / "out.log"
+    with open(log_path, "wb") as out_file:
+        code = console_pipe.run_process_with_live_output(
+            [sys.executable, "-c", writer], out_file=out_file
+        )
+    assert code == 0
+    lines = log_path.read_bytes().splitlines()
+    assert len(lines) == 20000
+    assert lines[-1].startswith(b"019999 ")
+
+
+_ZERO_COPY_HARNESS = """
+import sys
+from hpc_launcher.cli import console_pipe
+
+def _unexpected(*args, **kwargs):
+    raise AssertionError("zero-copy run fell back to the asyncio readers")
+
+console_pipe.replicate_output = _unexpected
+writer = (
+    "import os\\n"
+    "for i in range(40000):\\n"
+    "    os.write(1, b'%06d ' % i + b'z' * 100 + b'\\\\n')\\n"
+    "os.write(2, b'done\\\\n')\\n"
+)
+with open(sys.argv[1], "wb") as out_file, open(sys.argv[2], "wb") as err_file:
+    sys.exit(console_pipe.run_process_with_live_output(
+        [sys.executable, "-c", writer],
+        out_file=out_file,
+        err_file=err_file,
+        zero_copy=True,
+    ))
+"""
+
+
+@pytest.mark.skipif(
+    console_pipe._load_tee() is None, reason="splice(2)/tee(2) unavailable"
+)
+def test_zero_copy_replicates_to_console_and_files(tmp_path):
+    """Runs in a child so that the console is a pipe this test can read."""
+    out_path, err_path = tmp_path / "out.log", tmp_path / "err.log"
+    result = subprocess.run(
+        [sys.executable, "-c", _ZERO_COPY_HARNESS, str(out_path), str(err_path)],
+        capture_output=True,
+    )
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.splitlines()
+    assert len(lines) == 40000
+    assert lines[-1].startswith(b"039999 ")
+    assert out_path.read_bytes() == result.stdout
+    assert err_path.read_bytes() == result.stderr == b"done\n"
+
+
+@pytest.mark.skipif(
+    console_pipe._load_tee() is None, reason="splice(2)/tee(2) unavailable"
+)
+def test_zero_copy_falls_back_for_a_destination_without_splice(
+    tmp_path, monkeypatch
+):
+    """A console that rejects ``splice(2)`` (e.g. a tty) gets read/write."""
+    payload = b"".join(b"%06d line\n" % i for i in range(50000))
+    source_r, source_w = os.pipe()
+    console_r, console_w = os.pipe()
+    real_splice = os.splice
+
+    def _splice(src, dst, count, *args, **kwargs):
+        if dst == console_w:
+            raise OSError(errno.EINVAL, os.strerror(errno.EINVAL))
+        return real_splice(src, dst, count, *args, **kwargs)
+
+    monkeypatch.setattr(os, "splice", _splice)
+
+    def _write_source():
+        with os.fdopen(source_w, "wb") as f:
+            f.write(payload)
+
+    def _drain_console(into):
+        with os.fdopen(console_r, "rb") as f:
+            into.append(f.read())
+
+    console = []
+    threads = [
+        threading.Thread(target=_write_source),
+        threading.Thread(target=_drain_console, args=(console,)),
+    ]
+    for t in threads:
+        t.start()
+    with open(tmp_path / "out.log", "wb") as out_file:
+        console_pipe._ZeroCopyTee(
+            console_pipe._load_tee(), source_r, console_w, out_file.fileno()
+        ).run()
+    os.close(console_w)
+    for t in threads:
+        t.join()
+    assert console == [payload]
+    assert (tmp_path / "out.log").read_bytes() == payload
+
+
+class _GatedStream(io.BytesIO):
+    """A log file whose writes wait until the test opens the gate."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def write(self, data):
+        self.gate.wait()
+        return super().write(data)
+
+
+def test_log_writes_do_not_block_the_caller_until_the_queue_is_full():
+    writer = console_pipe._LogWriterThread(max_queued_bytes=8)
+    stream = _GatedStream()
+    log = writer.stream(stream)
+
+    start = time.perf_counter()
+    log.write(b"12345")  # the thread takes this and then stalls on the gate
+    log.write(b"67")
+    assert time.perf_counter() - start < 0.5
+
+    threading.Timer(0.2, stream.gate.set).start()
+    log.write(b"890")  # 5 + 2 + 3 > 8: waits for the stalled write
+    log.flush()
+    writer.close()
+
+    assert stream.getvalue() == b"1234567890"
+    metrics = writer.metrics()
+    assert metrics["bytes_queued"] == 10
+    assert metrics["chunks_queued"] == 3
+    assert metrics["blocked_puts"] == 1
+    assert metrics["blocked_seconds"] >= 0.1
+    assert metrics["peak_queue_bytes"] == 7
+
+
+def test_log_write_errors_surface_on_the_next_write_and_on_close():
+    class _Full(io.BytesIO):
+        def write(self, data):
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+    writer = console_pipe._LogWriterThread()
+    log = writer.stream(_Full())
+    log.write(b"x")
+    with pytest.raises(OSError):
+        writer.close()
+    with pytest.raises(OSError):
+        log.write(b"y")
+
+
+def test_log_writer_metrics_are_written_when_the_run_ends(tmp_path):
+    writer = "import os\nfor i in range(1000):\n    os.write(1, b'z' * 99 + b'\\n')\n"
+    metrics_path = tmp_path / "log_metrics.json"
+    with open(tmp_path / "out.log", "wb") as out_file:
+        code = console_pipe.run_process_with_live_output(
+            [sys.executable, "-c", writer],
+            out_file=out_file,
+            log_metrics_file=str(metrics_path),
+        )
+    assert code == 0
+    assert (tmp_path / "out.log").stat().st_size == 100000
+    metrics = json.loads(metrics_path.read_text())
+    assert metrics["bytes_queued"] == 100000
+    assert metrics["peak_queue_bytes"] <= metrics["max_queue_bytes"]
+
+
+@pytest.mark.parametrize("flag, written", [([], False), (["--log-metrics"], True)])
+def test_launch_writes_log_metrics_only_when_asked(tmp_path, flag, written):
+    launch_dir = tmp_path / "run"
+    proc = subprocess.run(
+        [sys.executable, "-m", "hpc_launcher.cli.launch", "--local", "-N1",
+         "-l", str(launch_dir)] + flag + ["--", "echo", "hi"],
+        capture_output=True,
+    )
+    assert proc.returncode == 0, proc.stderr.decode(errors="replace")
+    assert (launch_dir / "log_metrics.json").exists() == written
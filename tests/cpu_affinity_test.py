@@ -0,0 +1,144 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``torchrun-hpc --cpu-bind``: NUMA and GPU topology from fake
+sysfs trees, and the CPUs each policy gives a node's ranks.
+"""
+import os
+
+import pytest
+
+from hpc_launcher.systems import cpu_affinity
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def mi250x(tmp_path):
+    """
+    A Frontier-like node: 4 NUMA domains of 16 cores, and 8 GPUs whose
+    domains run 3, 3, 1, 1, 0, 0, 2, 2 (GCD order is not domain order).
+    """
+    for node in range(4):
+        _write(tmp_path / f"sys/devices/system/node/node{node}/cpulist",
+               f"{16 * node}-{16 * node + 15}\n")
+    _write(tmp_path / "sys/devices/system/node/online", "0-3\n")
+    drm = tmp_path / "sys/class/drm"
+    for gpu, node in enumerate((3, 3, 1, 1, 0, 0, 2, 2)):
+        _write(drm / f"card{gpu}/device/vendor", "0x1002\n")
+        _write(drm / f"card{gpu}/device/numa_node", f"{node}\n")
+    return tmp_path
+
+
+def test_parse_cpulist():
+    assert cpu_affinity.parse_cpulist("0-3,8-9,12\n") == [0, 1, 2, 3, 8, 9, 12]
+    assert cpu_affinity.parse_cpulist("") == []
+
+
+def test_topology(mi250x):
+    domains = cpu_affinity.numa_domains(str(mi250x))
+    assert list(domains) == [0, 1, 2, 3]
+    assert domains[2] == list(range(32, 48))
+    assert cpu_affinity.gpu_numa_nodes(str(mi250x)) == [3, 3, 1, 1, 0, 0, 2, 2]
+
+
+def test_nvidia_gpus_are_found_by_bus_id(tmp_path):
+    for bus, node in (("0000:c1:00.0", 1), ("0000:41:00.0", 0)):
+        _write(tmp_path / f"proc/driver/nvidia/gpus/{bus}/information", "Model: H100\n")
+        _write(tmp_path / f"sys/bus/pci/devices/{bus}/numa_node", f"{node}\n")
+    assert cpu_affinity.gpu_numa_nodes(str(tmp_path)) == [0, 1]
+
+
+def _bind(root, policy, ranks=8, **kwargs):
+    allowed = set(range(64))
+    return [
+        cpu_affinity.bind_cpus(policy, rank, ranks, gpu=rank, allowed=allowed,
+                               root=str(root), **kwargs)
+        for rank in range(ranks)
+    ]
+
+
+def test_gpu_local_binds_to_the_gpus_domain(mi250x):
+    bound = _bind(mi250x, "gpu-local")
+    assert bound[0] == list(range(48, 56)) and bound[1] == list(range(56, 64))
+    assert bound[4] == list(range(0, 8)) and bound[5] == list(range(8, 16))
+    assert sorted(cpu for cpus in bound for cpu in cpus) == list(range(64))
+
+
+def test_numa_deals_ranks_round_robin(mi250x):
+    bound = _bind(mi250x, "numa")
+    assert bound[0] == list(range(0, 8)) and bound[1] == list(range(16, 24))
+    assert bound[4] == list(range(8, 16))
+    assert sorted(cpu for cpus in bound for cpu in cpus) == list(range(64))
+
+
+def test_packed_ignores_the_topology(mi250x):
+    assert _bind(mi250x, "packed", ranks=3)[1] == list(range(22, 43))
+
+
+def test_only_allowed_cpus_are_used(mi250x):
+    allowed = set(range(0, 64, 2))
+    cpus = cpu_affinity.bind_cpus("gpu-local", 0, 8, gpu=0, allowed=allowed, root=str(mi250x))
+    assert cpus == [48, 50, 52, 54]
+
+
+def test_unknown_gpu_domain_falls_back_to_numa(mi250x):
+    (mi250x / "sys/class/drm/card0/device/numa_node").write_text("-1\n")
+    assert _bind(mi250x, "gpu-local")[0] == _bind(mi250x, "numa")[0]
+
+
+def test_none_leaves_the_affinity_alone(mi250x):
+    assert _bind(mi250x, "none") == [None] * 8
+
+
+def test_physical_gpu_follows_visible_devices(monkeypatch):
+    for variable in ("CUDA_VISIBLE_DEVICES", "ROCR_VISIBLE_DEVICES", "HIP_VISIBLE_DEVICES"):
+        monkeypatch.delenv(variable, raising=False)
+    assert cpu_affinity.physical_gpu(2) == 2
+    monkeypatch.setenv("HIP_VISIBLE_DEVICES", "6")
+    assert cpu_affinity.physical_gpu(0) == 6
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "GPU-0a1b")
+    assert cpu_affinity.physical_gpu(0) is None
+
+
+def test_physical_gpu_is_found_by_its_pci_address(tmp_path, monkeypatch, caplog):
+    # Cards numbered in the reverse of their bus order.
+    for card, bus in enumerate((0xd1, 0xc1, 0x91, 0x81)):
+        device = tmp_path / f"sys/devices/pci0000:{bus:02x}/0000:{bus:02x}:00.0"
+        _write(device / "vendor", "0x1002\n")
+        (tmp_path / f"sys/class/drm/card{card}").mkdir(parents=True)
+        os.symlink(device, tmp_path / f"sys/class/drm/card{card}/device")
+    # Nested visible-device lists that the variables alone cannot resolve.
+    monkeypatch.setenv("ROCR_VISIBLE_DEVICES", "2,3")
+    monkeypatch.setenv("HIP_VISIBLE_DEVICES", "1")
+    root = str(tmp_path)
+    assert cpu_affinity.physical_gpu(0, "0000:81:00.0", root) == 3
+    assert cpu_affinity.physical_gpu(0, "0000:C1:00", root) == 1
+    assert not caplog.records
+    # An address sysfs does not know falls back to the variables, with a warning.
+    assert cpu_affinity.physical_gpu(0, "0000:01:00.0", root) == 2
+    assert "guessing it from the visible devices" in caplog.text
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="Linux only")
+def test_apply_binds_the_process():
+    before = os.sched_getaffinity(0)
+    try:
+        cpu_affinity.apply([min(before)])
+        assert os.sched_getaffinity(0) == {min(before)}
+    finally:
+        cpu_affinity.apply(sorted(before))
@@ -0,0 +1,104 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for the on-disk cache of an unrecognized host's autodetection probes,
+and for ``--redetect``, which bypasses it.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from hpc_launcher.systems import autodetect, detection_cache
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+
+@pytest.fixture
+def counted_probes(monkeypatch):
+    """Replace the slow probes with a counting stand-in."""
+    monkeypatch.setattr(socket, "gethostname", lambda: "unknown-host")
+    autodetect.clear_autodetected_system()
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return {"name": "Generic AMD", "cores_per_node": 96, "gpus_per_node": 4,
+                "gpu_arch": "gfx942", "mem_per_gpu": 128.0, "scheduler": "flux",
+                "numa_domains": 4}
+
+    monkeypatch.setattr(autodetect, "probe_system", probe)
+    yield calls
+    autodetect.clear_autodetected_system()
+
+
+def _detect(**kwargs):
+    return autodetect.autodetect_current_system(quiet=True, **kwargs)
+
+
+def test_second_detection_is_served_from_the_cache(counted_probes):
+    first = _detect(cache=True)
+    second = _detect(cache=True)
+    assert len(counted_probes) == 1
+    assert second.system_name == "Generic AMD"
+    assert second.system_params["auto"].gpus_per_node == 4
+    assert first.system_params == second.system_params
+    path = os.path.join(detection_cache.cache_dir(), "autodetect-unknown-host.json")
+    assert json.load(open(path))["probes"]["scheduler"] == "flux"
+
+
+def test_redetect_probes_again_and_refreshes(counted_probes):
+    _detect(cache=True)
+    _detect(cache=True, redetect=True)
+    _detect(cache=True)
+    assert len(counted_probes) == 2
+
+
+def test_the_cache_is_not_used_unless_asked_for(counted_probes):
+    _detect(cache=True)
+    _detect()
+    assert len(counted_probes) == 2
+
+
+@pytest.mark.parametrize("change", ["env", "ttl", "disabled"])
+def test_stale_entries_are_ignored(counted_probes, monkeypatch, change):
+    _detect(cache=True)
+    if change == "env":
+        monkeypatch.setenv("ROCM_PATH", "/opt/rocm-9.9.9")
+    elif change == "ttl":
+        monkeypatch.setattr(detection_cache.time, "time", lambda: 4e9)
+    else:
+        monkeypatch.setenv(detection_cache.TTL_ENV, "0")
+    _detect(cache=True)
+    assert len(counted_probes) == 2
+
+
+def test_a_corrupt_cache_file_is_reprobed(counted_probes):
+    os.makedirs(detection_cache.cache_dir())
+    with open(os.path.join(detection_cache.cache_dir(), "autodetect-unknown-host.json"), "w") as f:
+        f.write("{not json")
+    assert _detect(cache=True).system_params["auto"].cores_per_node == 96
+    assert len(counted_probes) == 1
+
+
+def test_launch_redetect_flag_is_accepted(tmp_path):
+    proc = subprocess.run(
+        LAUNCH + ["--local", "-N1", "--redetect", "--dry-run", "--", "true"],
+        capture_output=True,
+        cwd=tmp_path,
+    )
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,108 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``events.jsonl``, the per-line structured record of a blocking
+launch's output written by ``--event-log``.
+"""
+import asyncio
+import json
+import subprocess
+import sys
+
+from hpc_launcher.cli import event_log
+from hpc_launcher.cli.event_log import EventLog
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_locate_every_line_across_chunk_boundaries(tmp_path):
+    raw = b"0: first\n  12: second line\nunlabeled\n3: tail without newline"
+    path = tmp_path / "events.jsonl"
+    with EventLog(str(path), labeled=True) as log:
+        tap = log.tap("out")
+        for i in range(0, len(raw), 5):  # split mid-label and mid-line
+            tap.write(raw[i:i + 5])
+
+    start, *lines = _records(path)
+    assert start["type"] == "start" and "monotonic" in start and "time" in start
+    assert [(r["stream"], r["rank"]) for r in lines] == [
+        ("out", 0), ("out", 12), ("out", None), ("out", 3)
+    ]
+    for r in lines:
+        assert r["type"] == "line" and r["t"] >= 0
+    assert [raw[r["offset"]:r["offset"] + r["length"]] for r in lines] == [
+        b"0: first\n", b"  12: second line\n", b"unlabeled\n", b"3: tail without newline"
+    ]
+
+
+def test_records_are_batched(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "_BATCH_SECONDS", 3600.0)
+    path = tmp_path / "events.jsonl"
+    log = EventLog(str(path))
+    tap = log.tap("err")
+    tap.write(b"a\nb\n")
+    assert len(_records(path)) == 1  # only the start record so far
+    tap.write(b"x" * 100 + b"\n" * (event_log._BATCH_BYTES // 50))
+    assert len(_records(path)) > 3  # the size threshold forced a write
+    log.close()
+    assert len(_records(path)) == 1 + 2 + event_log._BATCH_BYTES // 50
+
+
+def test_unlabeled_output_has_no_ranks(tmp_path):
+    path = tmp_path / "events.jsonl"
+    with EventLog(str(path)) as log:
+        log.tap("out").write(b"2024: epoch done\n")
+    assert _records(path)[1]["rank"] is None
+
+
+def test_a_quiet_stream_is_written_after_the_batch_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "_BATCH_SECONDS", 0.05)
+    path = tmp_path / "events.jsonl"
+
+    async def write_then_go_quiet():
+        with EventLog(str(path)) as log:
+            log.tap("out").write(b"last words\n")
+            await asyncio.sleep(0.3)  # no further output arrives
+            return len(_records(path))
+
+    assert asyncio.run(write_then_go_quiet()) == 2
+
+
+def test_launch_event_log_offsets_index_out_log(tmp_path):
+    launch_dir = tmp_path / "run"
+    child = tmp_path / "child.py"
+    child.write_text(
+        "import sys\n"
+        "for i in range(500): print(f'{i % 4}: step {i}')\n"
+        "print('oops', file=sys.stderr)\n"
+    )
+    proc = subprocess.run(
+        LAUNCH + ["--local", "-N1", "-l", str(launch_dir), "--event-log",
+                  "--", sys.executable, str(child)],
+        capture_output=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    records = _records(launch_dir / "events.jsonl")[1:]
+    out = (launch_dir / "out.log").read_bytes()
+    out_records = [r for r in records if r["stream"] == "out"]
+    assert len(out_records) == 500
+    r = out_records[321]
+    assert out[r["offset"]:r["offset"] + r["length"]] == b"1: step 321\n"
+    # --local adds no labels, so "1: step 321" is not taken for rank 1
+    assert r["rank"] is None
+    assert [r["stream"] for r in records if r["stream"] == "err"] == ["err"]
@@ -0,0 +1,117 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for GPU discovery from sysfs/procfs, on fake trees, and for the
+vendor-library fallback around it.
+"""
+import pytest
+
+from hpc_launcher.systems import autodetect, gpu_sysfs
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _amd_node(root, gpus=4, vram=128 * 1024**3, gfx_target_version=90402, kfd=True):
+    """An MI300-like node: a display card, ``gpus`` AMD cards and KFD nodes."""
+    drm = root / "sys/class/drm"
+    _write(drm / "card0/device/vendor", "0x1a03\n")  # BMC display
+    _write(drm / "card0-VGA-1/status", "connected\n")
+    for i in range(gpus):
+        _write(drm / f"card{i + 1}/device/vendor", "0x1002\n")
+        if vram is not None:
+            _write(drm / f"card{i + 1}/device/mem_info_vram_total", f"{vram}\n")
+        _write(drm / f"renderD{128 + i}/device/vendor", "0x1002\n")
+    if kfd:
+        nodes = root / "sys/class/kfd/kfd/topology/nodes"
+        _write(nodes / "0/properties", "cpu_cores_count 96\nsimd_count 0\ngfx_target_version 0\n")
+        for i in range(gpus):
+            _write(
+                nodes / f"{i + 1}/properties",
+                f"cpu_cores_count 0\nsimd_count 1216\ngfx_target_version {gfx_target_version}\n",
+            )
+
+
+def _nvidia_node(root, gpus=4):
+    for i in range(gpus):
+        _write(
+            root / f"proc/driver/nvidia/gpus/0000:{i:02x}:00.0/information",
+            "Model: \t\t NVIDIA H100 80GB HBM3\nBus Type: \t PCIe\n",
+        )
+
+
+@pytest.fixture
+def no_vendor_libraries(monkeypatch):
+    """Fail the test if a vendor library is asked."""
+    calls = []
+
+    def library(name):
+        def find():
+            calls.append(name)
+            return (0, 0, None)
+        return find
+
+    monkeypatch.setattr(autodetect, "find_AMD_gpus_amdsmi", library("amdsmi"))
+    monkeypatch.setattr(autodetect, "find_NVIDIA_gpus_nvml", library("nvml"))
+    return calls
+
+
+@pytest.mark.parametrize(
+    "version,arch",
+    [(90010, "gfx90a"), (90008, "gfx908"), (90402, "gfx942"), (110000, "gfx1100")],
+)
+def test_gfx_target_version_names(version, arch):
+    assert gpu_sysfs.gfx_arch(version) == arch
+
+
+def test_amd_gpus_from_sysfs_alone(tmp_path, no_vendor_libraries):
+    _amd_node(tmp_path)
+    assert autodetect.find_gpus(str(tmp_path)) == ("Generic AMD", 4, 128.0, "gfx942")
+    assert no_vendor_libraries == []
+
+
+def test_amd_falls_back_to_amdsmi_for_missing_fields(tmp_path, monkeypatch):
+    _amd_node(tmp_path, vram=None, kfd=False)
+    monkeypatch.setattr(autodetect, "find_AMD_gpus_amdsmi", lambda: (4, 64.0, "gfx90a"))
+    assert autodetect.find_AMD_gpus(str(tmp_path)) == (4, 64.0, "gfx90a")
+    # Without amdsmi the count from sysfs still stands.
+    monkeypatch.setattr(autodetect, "find_AMD_gpus_amdsmi", lambda: (0, 0, None))
+    assert autodetect.find_AMD_gpus(str(tmp_path)) == (4, 0, None)
+
+
+def test_without_sysfs_amdsmi_is_asked(tmp_path, monkeypatch):
+    monkeypatch.setattr(autodetect, "find_AMD_gpus_amdsmi", lambda: (8, 64.0, "gfx90a"))
+    assert autodetect.find_AMD_gpus(str(tmp_path)) == (8, 64.0, "gfx90a")
+
+
+def test_nvidia_count_from_procfs(tmp_path, monkeypatch):
+    _nvidia_node(tmp_path, gpus=4)
+    monkeypatch.setattr(autodetect, "find_NVIDIA_gpus_nvml", lambda: (4, 79.6, "sm_90"))
+    assert autodetect.find_gpus(str(tmp_path)) == ("Generic NVIDIA", 4, 79.6, "sm_90")
+
+
+def test_nvidia_without_nvml_warns_that_memory_is_unknown(tmp_path, monkeypatch, caplog):
+    _nvidia_node(tmp_path, gpus=4)
+    monkeypatch.setattr(autodetect, "find_NVIDIA_gpus_nvml", lambda: (0, 0, None))
+    with caplog.at_level("WARNING"):
+        assert autodetect.find_NVIDIA_gpus(str(tmp_path)) == (4, 0, None)
+    assert "nvidia-ml-py" in caplog.text and "mem_per_gpu" in caplog.text
+
+
+def test_cpu_node_asks_no_vendor_library(tmp_path, no_vendor_libraries):
+    (tmp_path / "sys/class/drm").mkdir(parents=True)
+    assert autodetect.find_gpus(str(tmp_path)) == ("Generic CPU", 0, 0, None)
+    assert no_vendor_libraries == []
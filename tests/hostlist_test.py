@@ -0,0 +1,108 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for :mod:`hpc_launcher.hostlist`, the bracket hostlist engine the
+generated launch scripts use instead of ``scontrol``, ``/bin/hostlist`` and
+``sort -u``.
+"""
+import subprocess
+
+import pytest
+
+from hpc_launcher import hostlist
+from hpc_launcher.hostlist import Hostlist
+from hpc_launcher.schedulers.flux import FluxScheduler
+from hpc_launcher.schedulers.lsf import LSFScheduler
+from hpc_launcher.schedulers.slurm import SlurmScheduler
+
+
+@pytest.mark.parametrize("text, hosts", [
+    ("node[001-003,010]", ["node001", "node002", "node003", "node010"]),
+    ("tioga[8-11]", ["tioga8", "tioga9", "tioga10", "tioga11"]),
+    ("rack[1-2]-n[01-02]", ["rack1-n01", "rack1-n02", "rack2-n01", "rack2-n02"]),
+    ("login1,elcap[3,5] elcap7", ["login1", "elcap3", "elcap5", "elcap7"]),
+    ("a[1-2]b", ["a1b", "a2b"]),
+    ("", []),
+])
+def test_expand(text, hosts):
+    assert hostlist.expand(text) == hosts
+
+
+@pytest.mark.parametrize("text", ["node[1-", "node]1[", "node[3-1]", "node[a-b]"])
+def test_malformed_hostlists_are_rejected(text):
+    with pytest.raises(ValueError):
+        hostlist.expand(text)
+
+
+@pytest.mark.parametrize("hosts, text", [
+    (["node001", "node002", "node003", "node010"], "node[001-003,010]"),
+    (["tioga8", "tioga9", "tioga10"], "tioga[8-10]"),
+    (["n08", "n09", "n10"], "n[08-10]"),
+    (["n9", "n10", "n010"], "n[9-10,010]"),
+    (["elcap5"], "elcap5"),
+    (["login", "n1", "x1", "n2"], "login,n[1-2],x1"),
+])
+def test_compress(hosts, text):
+    assert hostlist.compress(hosts) == text
+    assert set(hostlist.expand(text)) == set(hosts)
+
+
+def test_ten_thousand_node_round_trip():
+    text = "elcap[0001-4999,5001-10001]"
+    hosts = hostlist.expand(text)
+    assert len(hosts) == 10000 and hosts[0] == "elcap0001" and hosts[-1] == "elcap10001"
+    assert hostlist.compress(hosts) == text
+
+
+def test_set_operations():
+    a, b = Hostlist("n[1-6]"), Hostlist("n[4-9]")
+    assert str(a | b) == "n[1-9]"
+    assert str(a & b) == "n[4-6]"
+    assert str(a - b) == "n[1-3]"
+    assert len(Hostlist("n1 n1 n2 n1")) == 2 and "n2" in a
+    assert Hostlist("n[2,1]").first() == "n2"
+    with pytest.raises(ValueError):
+        Hostlist().first()
+
+
+def _run(*args, stdin=None):
+    proc = subprocess.run(hostlist.shell_command(*args), shell=True, input=stdin,
+                          capture_output=True, universal_newlines=True)
+    return proc.returncode, proc.stdout
+
+
+def test_command_line():
+    assert _run("first", "'node[007-009]'") == (0, "node007\n")
+    assert _run("count", "n[1-3] n2") == (0, "3\n")
+    assert _run("compress", stdin="a1 a1 a2 a2 a3\n") == (0, "a[1-3]\n")
+    assert _run("expand", "a[1-2]") == (0, "a1\na2\n")
+    assert _run("first", "''")[0] == 1
+
+
+@pytest.mark.parametrize("scheduler_cls", [SlurmScheduler, FluxScheduler])
+def test_rendezvous_address_uses_no_scheduler_tools(scheduler_cls):
+    scheduler = scheduler_cls(nodes=2, procs_per_node=1, gpus_per_proc=0)
+    (addr,) = [v for k, v, *_ in scheduler.dynamically_configure_rendezvous_protocol("tcp")
+               if k == "TORCHRUN_HPC_MASTER_ADDR"]
+    assert "-m hpc_launcher.hostlist first" in addr
+    assert "scontrol" not in addr and "/bin/hostlist" not in addr
+
+
+def test_lsf_hostlist_is_compressed_without_sort(monkeypatch):
+    script = LSFScheduler(nodes=2, procs_per_node=1, gpus_per_proc=0).export_hostlist()
+    assert "sort" not in script
+    monkeypatch.setenv("LSB_HOSTS", "batch1 lassen3 lassen3 lassen4 lassen4")
+    out = subprocess.run(script + 'echo "$HPC_LAUNCHER_HOSTLIST"\n', shell=True,
+                         capture_output=True, universal_newlines=True).stdout
+    assert out == "batch1,lassen[3-4]\n"
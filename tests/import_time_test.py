@@ -0,0 +1,109 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Regression test for the import cost of the launcher's start-up path.
+
+Everything ``launch --dry-run`` imports is paid again by every launch, and
+from a cold parallel file system each module costs a metadata round trip
+or more. ``python -X importtime`` lists every import with its cost; the
+heavy ones below must stay off the path (they are imported on demand, when
+a launch actually needs them), and the total must stay within a generous
+bound.
+"""
+import subprocess
+import sys
+
+import pytest
+
+from conftest import require_torch
+
+# Modules that a dry run on an unrecognized host with a warm detection cache
+# must not import.
+_DEFERRED = (
+    "torch",
+    "mpi4py",
+    "asyncio",
+    "amdsmi",
+    "pynvml",
+    "psutil",
+    "gzip",
+    "mmap",
+    "tarfile",
+    "py_compile",
+    "hpc_launcher.cli.console_pipe",
+    "hpc_launcher.cli.event_log",
+    "hpc_launcher.cli.log_index",
+    "hpc_launcher.cli.stage_env",
+    "hpc_launcher.runtime.kernel_cache",
+    "hpc_launcher.runtime.pycache",
+    "hpc_launcher.runtime.rendezvous_port",
+    "hpc_launcher.schedulers.flux",
+    "hpc_launcher.schedulers.slurm",
+    "hpc_launcher.schedulers.lsf",
+    "hpc_launcher.systems.lc.el_capitan_family",
+    "hpc_launcher.systems.lc.cts2",
+    "hpc_launcher.systems.lc.sierra_family",
+    "hpc_launcher.systems.lc.corona",
+)
+
+# Total self time of all imports, in seconds. Typically well under 0.1s.
+_BUDGET = 1.0
+
+
+def _imports(module, *args):
+    """``{module: self seconds}`` of a ``python -X importtime -m`` run."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", module, *args],
+        capture_output=True,
+        universal_newlines=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(self_us) / 1e6
+    return imports
+
+
+@pytest.mark.parametrize(
+    "module", ["hpc_launcher.cli.launch", "hpc_launcher.cli.torchrun_hpc"]
+)
+def test_dry_run_imports_stay_light(module):
+    if module.endswith("torchrun_hpc"):
+        require_torch()  # checked for, not imported
+    argv = ["--local", "-N1", "--dry-run", "--", "true"]
+    _imports(module, *argv)  # warm the detection cache
+    imports = _imports(module, *argv)
+    assert "hpc_launcher.cli.common_args" in imports
+    assert sorted(set(_DEFERRED) & set(imports)) == []
+    assert sum(imports.values()) < _BUDGET
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "hpc_launcher.systems.configure",
+        "hpc_launcher.runtime.kernel_cache",
+        "hpc_launcher.runtime.pycache",
+        "hpc_launcher.runtime.rendezvous_port",
+        "hpc_launcher.runtime.rendezvous_relay",
+        "hpc_launcher.runtime.startup_telemetry",
+        "hpc_launcher.runtime.timeline",
+    ],
+)
+def test_systems_and_runtime_do_not_import_the_cli(module):
+    imports = _imports(module)
+    assert sorted(name for name in imports if name.startswith("hpc_launcher.cli")) == []
@@ -0,0 +1,176 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``torchrun-hpc --kernel-cache``: seeding node-local MIOpen,
+Triton and TorchInductor caches from a shared cache, and merging new
+entries back, with temporary directories standing in for the nodes.
+"""
+import fcntl
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from hpc_launcher.runtime import kernel_cache
+
+# What a rank does: seed its node's caches and report whether it copied.
+_RANK = """
+from hpc_launcher.runtime import kernel_cache
+print(kernel_cache.seed())
+"""
+
+
+def _node(tmp_path, name, launch="1"):
+    """The environment of a job's ranks on the node ``name``."""
+    folder = tmp_path / "runs" / "launch"
+    folder.mkdir(parents=True, exist_ok=True)
+    env = dict(
+        kernel_cache.prepare(str(folder), "elcap", "gfx942", str(tmp_path / name))
+    )
+    env[kernel_cache.LAUNCH_ENV] = launch
+    return env
+
+
+def _use(monkeypatch, env):
+    for variable, value in env.items():
+        monkeypatch.setenv(variable, value)
+
+
+def test_environment_points_every_cache_at_the_node(tmp_path):
+    env = _node(tmp_path, "node0")
+    shared = env[kernel_cache.SOURCE_ENV]
+    assert os.path.isdir(shared)
+    assert os.path.dirname(shared) == str(tmp_path / "runs" / kernel_cache.SHARED_DIR)
+    local = {env[variable] for variable, _ in kernel_cache.CACHES}
+    assert {os.path.dirname(path) for path in local} == {
+        kernel_cache.node_local_path(str(tmp_path / "node0"), os.path.basename(shared))
+    }
+    assert kernel_cache.cache_key("elcap", "gfx942") != kernel_cache.cache_key("elcap", "gfx90a")
+
+
+def test_dry_run_creates_nothing(tmp_path):
+    kernel_cache.prepare(str(tmp_path / "launch"), "elcap", "gfx942", str(tmp_path / "node"),
+                         dry_run=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_one_rank_per_node_seeds(tmp_path):
+    env = _node(tmp_path, "node0")
+    triton = os.path.join(env[kernel_cache.SOURCE_ENV], "triton", "abc")
+    os.makedirs(triton)
+    open(os.path.join(triton, "kernel.hsaco"), "w").write("binary")
+
+    ranks = [
+        subprocess.Popen([sys.executable, "-c", _RANK], env={**os.environ, **env},
+                         stdout=subprocess.PIPE, universal_newlines=True)
+        for _ in range(4)
+    ]
+    outputs = sorted(rank.communicate()[0].strip() for rank in ranks)
+    assert outputs == ["1", "None", "None", "None"]
+    assert open(os.path.join(env["TRITON_CACHE_DIR"], "abc", "kernel.hsaco")).read() == "binary"
+    assert os.path.isdir(env["TORCHINDUCTOR_CACHE_DIR"])
+
+
+def test_a_rank_killed_while_seeding_does_not_lock_the_node(tmp_path, monkeypatch):
+    env = _node(tmp_path, "node0")
+    _use(monkeypatch, env)
+    local = os.path.dirname(env["TRITON_CACHE_DIR"])
+    # Left behind by a rank that died holding it; the kernel dropped its lock.
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    open(local + ".lock", "w").close()
+    assert kernel_cache.seed() == 0
+    assert os.path.isdir(env["TORCHINDUCTOR_CACHE_DIR"])
+
+
+def test_ranks_wait_for_the_seeding_rank(tmp_path, monkeypatch):
+    env = _node(tmp_path, "node0")
+    _use(monkeypatch, env)
+    monkeypatch.setattr(kernel_cache, "_WAIT_SECONDS", 0.3)
+    local = os.path.dirname(env["TRITON_CACHE_DIR"])
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    with open(local + ".lock", "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)  # another rank is seeding
+        start = time.monotonic()
+        assert kernel_cache.seed() is None
+        assert time.monotonic() - start >= 0.3
+    assert not os.path.exists(env["TORCHINDUCTOR_CACHE_DIR"])
+
+
+def test_new_entries_are_merged_back(tmp_path, monkeypatch):
+    first = _node(tmp_path, "node0")
+    _use(monkeypatch, first)
+    kernel_cache.seed()
+    db = os.path.join(first["MIOPEN_USER_DB_PATH"], "gfx942.udb")
+    with open(db, "w") as f:
+        f.write("conv-a=solver:1\nconv-b=solver:2\n")
+    assert kernel_cache.merge_back() == 1
+
+    # A second node, in a later job, tunes another kernel and re-tunes one.
+    second = _node(tmp_path, "node1", launch="2")
+    _use(monkeypatch, second)
+    kernel_cache.seed()
+    db = os.path.join(second["MIOPEN_USER_DB_PATH"], "gfx942.udb")
+    assert open(db).read() == "conv-a=solver:1\nconv-b=solver:2\n"
+    with open(db, "w") as f:
+        f.write("conv-b=solver:3\nconv-c=solver:4\n")
+    os.utime(db, ns=(os.stat(db).st_atime_ns, os.stat(db).st_mtime_ns + 10**9))
+    assert kernel_cache.merge_back() == 1
+    assert kernel_cache.merge_back() == 0
+
+    shared = os.path.join(first[kernel_cache.SOURCE_ENV], "miopen-user-db", "gfx942.udb")
+    assert open(shared).read() == "conv-a=solver:1\nconv-b=solver:3\nconv-c=solver:4\n"
+
+
+def test_stale_merge_lock_is_broken(tmp_path, monkeypatch):
+    env = _node(tmp_path, "node0")
+    _use(monkeypatch, env)
+    kernel_cache.seed()
+    open(os.path.join(env["TRITON_CACHE_DIR"], "entry"), "w").close()
+    lock = os.path.join(env[kernel_cache.SOURCE_ENV], ".merge.lock")
+    os.mkdir(lock)
+    old = os.stat(lock).st_mtime - kernel_cache._STALE_SECONDS - 1
+    os.utime(lock, (old, old))
+    assert kernel_cache.merge_back() == 1
+    assert not os.path.exists(lock)
+
+
+def test_a_long_merge_keeps_its_lock_fresh(tmp_path, monkeypatch):
+    env = _node(tmp_path, "node0")
+    _use(monkeypatch, env)
+    kernel_cache.seed()
+    open(os.path.join(env["TRITON_CACHE_DIR"], "entry"), "w").close()
+    monkeypatch.setattr(kernel_cache, "_HEARTBEAT_SECONDS", 0.05)
+    lock = os.path.join(env[kernel_cache.SOURCE_ENV], ".merge.lock")
+    sync = kernel_cache.sync
+    ages = []
+
+    def slow_sync(source, dest):
+        old = time.time() - kernel_cache._STALE_SECONDS - 1
+        os.utime(lock, (old, old))  # as old as a dead holder's lock
+        time.sleep(0.3)
+        ages.append(time.time() - os.stat(lock).st_mtime)
+        return sync(source, dest)
+
+    monkeypatch.setattr(kernel_cache, "sync", slow_sync)
+    assert kernel_cache.merge_back() == 1
+    assert ages[0] < kernel_cache._STALE_SECONDS
+    assert not os.path.exists(lock)
+
+
+def test_no_cache_without_the_environment(monkeypatch):
+    monkeypatch.delenv(kernel_cache.SOURCE_ENV, raising=False)
+    assert kernel_cache.seed() is None
+    assert kernel_cache.merge_back() is None
@@ -0,0 +1,144 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``--scheduler local-parallel``: forking the ranks of one node on
+this host with their identity in the environment, labeling their output,
+and stopping them all when one fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import require_torch
+from hpc_launcher.cli import common_args
+from hpc_launcher.schedulers import get_schedulers
+from hpc_launcher.schedulers.local import LocalParallelScheduler
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+TORCHRUN = [sys.executable, "-m", "hpc_launcher.cli.torchrun_hpc"]
+LOCAL_RANKS = [sys.executable, "-m", "hpc_launcher.cli.local_ranks"]
+
+PRINT_IDENTITY = (
+    "import os; print(os.environ['RANK'], os.environ['LOCAL_RANK'], "
+    "os.environ['WORLD_SIZE'], os.environ['LOCAL_WORLD_SIZE'])"
+)
+
+
+def test_ranks_get_their_identity_and_labeled_output():
+    proc = subprocess.run(
+        LOCAL_RANKS + ["-n", "3", "--", sys.executable, "-c", PRINT_IDENTITY],
+        capture_output=True, universal_newlines=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert sorted(proc.stdout.splitlines()) == [f"{r}: {r} {r} 3 3" for r in range(3)]
+
+
+def test_a_failed_rank_stops_the_others():
+    script = (
+        "import os, sys, time\n"
+        "if os.environ['RANK'] == '1':\n"
+        "    sys.exit(3)\n"
+        "time.sleep(60)\n"
+    )
+    start = time.monotonic()
+    proc = subprocess.run(
+        LOCAL_RANKS + ["-n", "4", sys.executable, "-c", script],
+        capture_output=True, universal_newlines=True, timeout=30,
+    )
+    assert proc.returncode == 3
+    assert "rank 1 exited with status 3" in proc.stderr
+    assert time.monotonic() - start < 20
+
+
+def test_a_rank_killed_by_a_signal_reports_it():
+    script = "import os, signal; os.kill(os.getpid(), signal.SIGKILL)"
+    proc = subprocess.run(LOCAL_RANKS + ["-n", "2", sys.executable, "-c", script],
+                          capture_output=True, timeout=30)
+    assert proc.returncode == 128 + 9
+
+
+def test_parallel_configuration_from_the_environment(monkeypatch):
+    for name in ("RANK", "LOCAL_RANK", "WORLD_SIZE", "LOCAL_WORLD_SIZE"):
+        monkeypatch.delenv(name, raising=False)
+    assert LocalParallelScheduler.get_parallel_configuration() == (1, 0, 1, 0)
+    monkeypatch.setenv("RANK", "2")
+    monkeypatch.setenv("LOCAL_RANK", "2")
+    monkeypatch.setenv("WORLD_SIZE", "4")
+    monkeypatch.setenv("LOCAL_WORLD_SIZE", "4")
+    assert LocalParallelScheduler.get_parallel_configuration() == (4, 2, 4, 2)
+
+
+def test_registered_and_runs_ranks_from_its_script(tmp_path):
+    assert get_schedulers()["local-parallel"] is LocalParallelScheduler
+    launch_dir = tmp_path / "job"
+    proc = subprocess.run(
+        LAUNCH + ["--scheduler", "local-parallel", "-N", "1", "-n", "3",
+                  "-l", str(launch_dir), "--demux-ranks",
+                  "--", sys.executable, "-c", PRINT_IDENTITY],
+        capture_output=True, universal_newlines=True, cwd=str(tmp_path),
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert "local_ranks -n 3" in (launch_dir / "launch.sh").read_text()
+    assert sorted((launch_dir / "out.log").read_text().splitlines()) == [
+        f"{r}: {r} {r} 3 3" for r in range(3)
+    ]
+    for r in range(3):
+        assert (launch_dir / f"out.rank{r}.log").read_text() == f"{r} {r} 3 3\n"
+
+
+def test_ephemeral_run(tmp_path):
+    proc = subprocess.run(
+        LAUNCH + ["--scheduler", "local-parallel", "-N", "1", "-n", "2",
+                  "--", sys.executable, "-c", PRINT_IDENTITY],
+        capture_output=True, universal_newlines=True, cwd=str(tmp_path),
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert sorted(proc.stdout.splitlines()) == ["0: 0 0 2 2", "1: 1 1 2 2"]
+    assert "single process" not in proc.stderr
+
+
+def test_only_one_node():
+    parser = argparse.ArgumentParser()
+    common_args.setup_arguments(parser)
+    args = parser.parse_args(["-N", "2", "-n", "2", "--scheduler", "local-parallel"])
+    with pytest.raises(ValueError, match="one node"):
+        common_args.validate_scheduler_arguments(
+            LocalParallelScheduler(nodes=2, procs_per_node=2, gpus_per_proc=0), args, 4
+        )
+
+
+def test_torchrun_hpc_gloo_ranks(tmp_path):
+    require_torch()
+    script = tmp_path / "allreduce.py"
+    script.write_text(
+        "import torch\n"
+        "import torch.distributed as dist\n"
+        "t = torch.ones(1)\n"
+        "dist.all_reduce(t)\n"
+        "print(f'rank {dist.get_rank()} sum {t.item()}', flush=True)\n"
+    )
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES="", HIP_VISIBLE_DEVICES="")
+    proc = subprocess.run(
+        TORCHRUN + ["--scheduler", "local-parallel", "-N", "1", "-n", "3",
+                    "-l", str(tmp_path / "job"), str(script)],
+        capture_output=True, universal_newlines=True, cwd=str(tmp_path),
+        env=env, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    for r in range(3):
+        assert f"{r}: rank {r} sum 3.0" in proc.stdout, proc.stdout
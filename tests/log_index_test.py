@@ -0,0 +1,149 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for the checkpoint index written next to a blocking launch's logs and
+for ``launch logs --line/--since``, which seek through it.
+"""
+import asyncio
+import io
+import subprocess
+import sys
+
+import pytest
+
+from hpc_launcher.cli import log_index, logs
+from hpc_launcher.cli.log_index import LogIndexWriter, index_path, parse_since, read_index
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+_LINES = [b"line %d of the job's output\n" % i for i in range(5000)]
+_TEXT = b"".join(_LINES)
+
+
+def _write_log(tmp_path, chunk_size=777, interval=100, compress=None):
+    log_file = tmp_path / "out.log"
+    with logs.open_log_file(str(log_file), None, compress) as out, LogIndexWriter(
+        index_path(str(log_file)), interval
+    ) as index:
+        for start in range(0, len(_TEXT), chunk_size):
+            out.write(_TEXT[start:start + chunk_size])
+            index.write(_TEXT[start:start + chunk_size])
+    return log_file
+
+
+def _lines(log_file, **kwargs) -> bytes:
+    out = io.BytesIO()
+    logs.copy_lines(str(log_file), out, **kwargs)
+    return out.getvalue()
+
+
+def test_checkpoints_point_at_line_starts(tmp_path):
+    log_file = _write_log(tmp_path)
+    index = read_index(index_path(str(log_file)), len(_TEXT))
+    assert index.lines[0] == 0 and len(index.lines) > 5000 // 130
+    for line, offset in zip(index.lines, index.offsets):
+        assert _TEXT[offset:].startswith(_LINES[line]) if line < 5000 else offset == len(_TEXT)
+    assert index.lines[-1] == 5000  # closing adds the end of the output
+    gaps = [b - a for a, b in zip(index.lines, index.lines[1:-1])]
+    assert min(gaps) >= 100 and max(gaps) < 100 + 777 // 20
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_copy_lines_starts_at_the_requested_line(tmp_path, compress):
+    log_file = _write_log(tmp_path, compress=compress)
+    assert _lines(log_file, line=1234, count=3) == b"".join(_LINES[1234:1237])
+    assert _lines(log_file, line=4998) == b"".join(_LINES[4998:])
+    assert _lines(log_file, line=6000) == b""
+    assert _lines(log_file, count=0) == b""
+
+
+def test_copy_lines_without_an_index_scans_from_the_top(tmp_path):
+    log_file = _write_log(tmp_path)
+    (tmp_path / "out.log.idx").unlink()
+    assert _lines(log_file, line=4321, count=1) == _LINES[4321]
+    with pytest.raises(ValueError, match="no index"):
+        _lines(log_file, since=0.0)
+
+
+def test_a_checkpoint_before_a_quiet_period_is_flushed(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_index, "_FLUSH_SECONDS", 0.05)
+    path = str(tmp_path / "out.log.idx")
+
+    async def write_then_go_quiet():
+        with LogIndexWriter(path, interval=1) as index:
+            index.write(_LINES[0])
+            await asyncio.sleep(0.3)  # no further output arrives
+            return read_index(path).lines
+
+    assert asyncio.run(write_then_go_quiet()) == [0, 1]
+
+
+def test_since_starts_at_the_checkpoint_before_it(tmp_path, monkeypatch):
+    clock = iter(range(100, 1000))
+    monkeypatch.setattr(log_index.time, "monotonic", lambda: float(next(clock)))
+    log_file = _write_log(tmp_path, chunk_size=len(_LINES[0]) * 100 + 5, interval=50)
+    index = read_index(index_path(str(log_file)))
+    # One checkpoint per chunk, each read one (fake) second after the last.
+    assert index.times[:3] == [0.0, 1.0, 2.0]
+    assert _lines(log_file, since=2.5).startswith(_LINES[index.lines[2]])
+    assert parse_since("2m", index.start) == 120.0
+    assert parse_since("2025-06-01T14:30:00", 0.0) > 1.7e9
+    with pytest.raises(ValueError):
+        parse_since("yesterday", index.start)
+
+
+def test_a_stale_or_partial_index_is_cut_short(tmp_path):
+    log_file = _write_log(tmp_path)
+    path = index_path(str(log_file))
+    with open(path, "a") as f:
+        f.write("999999 99999999 1.0\n12")
+    index = read_index(path, len(_TEXT))
+    assert index.offsets[-1] <= len(_TEXT)
+
+
+def test_launch_logs_line_and_since(tmp_path):
+    launch_dir = tmp_path / "run"
+    child = tmp_path / "child.py"
+    child.write_text("for i in range(30000): print(f'step {i}')\n")
+    run = subprocess.run(
+        LAUNCH + ["--local", "-N1", "-l", str(launch_dir), "--log-index",
+                  "--log-index-interval", "500", "--", sys.executable, str(child)],
+        capture_output=True,
+    )
+    assert run.returncode == 0, run.stderr
+    index = read_index(str(launch_dir / "out.log.idx"))
+    assert len(index.lines) > 2 and index.lines[-1] == 30000
+
+    out = subprocess.run(
+        LAUNCH + ["logs", str(launch_dir), "--line", "20001", "--count", "2"],
+        capture_output=True,
+    )
+    assert out.returncode == 0, out.stderr
+    assert out.stdout == b"step 20000\nstep 20001\n"
+    out = subprocess.run(
+        LAUNCH + ["logs", str(launch_dir), "--since", "0", "--count", "1"],
+        capture_output=True,
+    )
+    assert out.stdout == b"step 0\n"
+
+
+def test_the_index_is_only_written_with_log_index(tmp_path):
+    launch_dir = tmp_path / "run"
+    run = subprocess.run(
+        LAUNCH + ["--local", "-N1", "-l", str(launch_dir), "--", "echo", "hi"],
+        capture_output=True,
+    )
+    assert run.returncode == 0, run.stderr
+    assert not (launch_dir / "out.log.idx").exists()
+    assert not (launch_dir / "err.log.idx").exists()
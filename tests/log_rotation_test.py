@@ -0,0 +1,137 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for compressed and size-rotated launch logs (``--log-compress``,
+``--log-rotate-size``) and for reading them back with ``launch logs``.
+"""
+import importlib.util
+import io
+import subprocess
+import sys
+
+import pytest
+
+from hpc_launcher.cli import logs
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+HAS_ZSTANDARD = importlib.util.find_spec("zstandard") is not None
+
+_LINES = b"".join(b"line %06d of the job's output\n" % i for i in range(5000))
+
+
+def _read_back(log_file) -> bytes:
+    out = io.BytesIO()
+    logs.copy_log(str(log_file), out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("4096", 4096), ("64K", 64 << 10), ("512m", 512 << 20), ("2GiB", 2 << 30)],
+)
+def test_parse_byte_size(value, expected):
+    assert logs.parse_byte_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "0", "-1", "12Q", "M"])
+def test_parse_byte_size_rejects_malformed_sizes(value):
+    with pytest.raises(ValueError):
+        logs.parse_byte_size(value)
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_rotated_segments_read_back_byte_for_byte(tmp_path, compress):
+    log_file = tmp_path / "out.log"
+    with logs.open_log_file(str(log_file), 16 << 10, compress) as writer:
+        for start in range(0, len(_LINES), 1000):
+            writer.write(_LINES[start:start + 1000])
+    suffix = ".gz" if compress else ""
+    segments = {p.name for p in tmp_path.iterdir()}
+    assert len(segments) >= len(_LINES) // (16 << 10)
+    assert segments == {f"out.log.{i}{suffix}" for i in range(len(segments))}
+    assert _read_back(log_file) == _LINES
+
+
+def test_compressed_log_is_smaller_and_readable_while_being_written(tmp_path):
+    log_file = tmp_path / "out.log"
+    writer = logs.open_log_file(str(log_file), compress="gzip")
+    writer.write(_LINES)
+    writer.flush()
+    assert _read_back(log_file) == _LINES  # no gzip trailer yet
+    writer.close()
+    assert (tmp_path / "out.log.gz").stat().st_size < len(_LINES) // 4
+    assert _read_back(log_file) == _LINES
+
+
+def test_an_earlier_runs_segments_are_removed(tmp_path):
+    log_file = tmp_path / "out.log"
+    with logs.open_log_file(str(log_file), 1 << 10) as writer:
+        writer.write(_LINES)
+    with logs.open_log_file(str(log_file), 1 << 10) as writer:
+        writer.write(b"short\n")
+    assert _read_back(log_file) == b"short\n"
+
+
+@pytest.mark.skipif(not HAS_ZSTANDARD, reason="zstandard is not installed")
+def test_zstd_segments_read_back(tmp_path):
+    log_file = tmp_path / "out.log"
+    with logs.open_log_file(str(log_file), 32 << 10, "zstd") as writer:
+        writer.write(_LINES[:100000])
+        writer.flush()
+        writer.write(_LINES[100000:])
+    assert (tmp_path / "out.log.0.zst").exists()
+    assert _read_back(log_file) == _LINES
+
+
+@pytest.mark.skipif(HAS_ZSTANDARD, reason="zstandard is installed")
+def test_zstd_without_zstandard_is_a_clean_error(tmp_path):
+    with pytest.raises(ValueError, match="zstandard"):
+        logs.open_log_file(str(tmp_path / "out.log"), compress="zstd")
+
+
+def test_launch_logs_reads_a_compressed_rotated_run(tmp_path):
+    """End to end: ``launch`` writes the segments, ``launch logs`` joins them."""
+    launch_dir = tmp_path / "run"
+    child = tmp_path / "child.py"
+    child.write_text(
+        "import sys\nfor i in range(20000): print(i)\nprint('bye', file=sys.stderr)\n"
+    )
+    run = subprocess.run(
+        LAUNCH
+        + ["--local", "-N1", "-l", str(launch_dir), "--log-compress", "gzip",
+           "--log-rotate-size", "32K", "--", sys.executable, str(child)],
+        capture_output=True,
+    )
+    assert run.returncode == 0, run.stderr
+    assert (launch_dir / "out.log.2.gz").exists()
+    assert not (launch_dir / "out.log").exists()
+
+    out = subprocess.run(LAUNCH + ["logs", str(launch_dir)], capture_output=True)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout == run.stdout
+    err = subprocess.run(
+        LAUNCH + ["logs", str(launch_dir), "--stream", "err"], capture_output=True
+    )
+    assert err.stdout == b"bye\n"
+
+
+def test_log_options_require_a_blocking_launch_directory(tmp_path):
+    proc = subprocess.run(
+        LAUNCH + ["--local", "-N1", "--log-compress", "gzip", "--", "true"],
+        capture_output=True,
+        cwd=tmp_path,
+    )
+    assert proc.returncode != 0
+    assert b"--log-compress" in proc.stderr
@@ -0,0 +1,106 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``torchrun-hpc --nic-affinity``: walking a synthetic sysfs PCI
+topology to find the NIC closest to each GPU.
+"""
+import os
+
+from hpc_launcher.systems import nic_affinity
+
+
+def _device(root, path, numa_node=None, vendor=None):
+    """A PCI device directory under ``sys/devices``."""
+    device = root / "sys/devices" / path
+    device.mkdir(parents=True, exist_ok=True)
+    if numa_node is not None:
+        (device / "numa_node").write_text(f"{numa_node}\n")
+    if vendor is not None:
+        (device / "vendor").write_text(f"{vendor}\n")
+    return device
+
+
+def _link(root, cls, name, device):
+    entry = root / "sys/class" / cls / name
+    entry.mkdir(parents=True, exist_ok=True)
+    os.symlink(device, entry / "device")
+
+
+def _el_capitan(root):
+    """
+    Four APUs, each behind its own root complex and PCIe switch together
+    with one Slingshot NIC, but with the NICs numbered in reverse.
+    """
+    for apu in range(4):
+        switch = f"pci0000:{apu * 0x40:02x}/0000:{apu * 0x40:02x}:01.0/0000:{apu * 0x40 + 1:02x}:00.0"
+        gpu = _device(root, f"{switch}/0000:{apu * 0x40 + 2:02x}:00.0", apu, "0x1002")
+        nic = _device(root, f"{switch}/0000:{apu * 0x40 + 2:02x}:01.0", apu)
+        _link(root, "drm", f"card{apu}", gpu)
+        _link(root, "cxi", f"cxi{3 - apu}", nic)
+        _link(root, "net", f"hsi{3 - apu}", nic)
+    _link(root, "net", "lo", _device(root, "virtual/net/lo"))
+
+
+def test_nics_and_their_interfaces(tmp_path):
+    _el_capitan(tmp_path)
+    adapters = nic_affinity.nics(str(tmp_path))
+    assert [(nic.name, nic.kind, nic.interface) for nic in adapters] == [
+        (f"cxi{i}", "cxi", f"hsi{i}") for i in range(4)
+    ]
+    assert [nic.numa_node for nic in adapters] == [3, 2, 1, 0]
+
+
+def test_each_gpu_uses_the_nic_behind_its_switch(tmp_path):
+    _el_capitan(tmp_path)
+    chosen = [nic_affinity.closest_nic(gpu, str(tmp_path)).name for gpu in range(4)]
+    assert chosen == ["cxi3", "cxi2", "cxi1", "cxi0"]
+    assert nic_affinity.closest_nic(4, str(tmp_path)) is None
+
+
+def test_numa_node_breaks_ties_between_root_complexes(tmp_path):
+    for i, node in enumerate((0, 1)):
+        gpu = _device(tmp_path, f"pci0000:0{i}/0000:0{i}:01.0", node, "0x1002")
+        _link(tmp_path, "drm", f"card{i}", gpu)
+    for name, bus, node in (("mlx5_0", "0000:10:00.0", 1), ("mlx5_1", "0000:20:00.0", 0)):
+        nic = _device(tmp_path, f"pci0000:{bus[5:7]}/{bus}", node)
+        _link(tmp_path, "infiniband", name, nic)
+    assert nic_affinity.closest_nic(0, str(tmp_path)).name == "mlx5_1"
+    assert nic_affinity.closest_nic(1, str(tmp_path)).name == "mlx5_0"
+
+
+def test_equally_close_nics_are_shared_round_robin(tmp_path):
+    switch = "pci0000:00/0000:00:01.0"
+    for i in range(4):
+        _link(tmp_path, "drm", f"card{i}",
+              _device(tmp_path, f"{switch}/0000:01:0{i}.0", 0, "0x1002"))
+    for i in range(2):
+        _link(tmp_path, "cxi", f"cxi{i}", _device(tmp_path, f"{switch}/0000:02:0{i}.0", 0))
+    chosen = [nic_affinity.closest_nic(gpu, str(tmp_path)).name for gpu in range(4)]
+    assert chosen == ["cxi0", "cxi1", "cxi0", "cxi1"]
+
+
+def test_environment_hints():
+    cxi = nic_affinity.Nic("cxi2", "cxi", "hsi2", "/sys/devices/x", 2)
+    assert nic_affinity.environment(cxi) == {
+        "NCCL_SOCKET_IFNAME": "hsi2",
+        "GLOO_SOCKET_IFNAME": "hsi2",
+        "FI_CXI_DEVICE_NAME": "cxi2",
+    }
+    ib = nic_affinity.Nic("mlx5_1", "infiniband", None, "/sys/devices/y", 0)
+    assert nic_affinity.environment(ib) == {"NCCL_IB_HCA": "=mlx5_1"}
+
+
+def test_no_nics(tmp_path):
+    assert nic_affinity.nics(str(tmp_path)) == []
+    assert nic_affinity.closest_nic(0, str(tmp_path)) is None
@@ -0,0 +1,142 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for the in-memory tail of a job's output and the deduplicated crash
+summary a failed blocking launch prints from it.
+"""
+import subprocess
+import sys
+
+from hpc_launcher.cli.output_tail import RingBuffer, summarize_tail
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+
+def _tail(text: str, capacity: int = 1 << 16) -> RingBuffer:
+    tail = RingBuffer(capacity)
+    tail.write(text.encode())
+    return tail
+
+
+def _traceback(message: str, label: str = "") -> str:
+    return (
+        f"{label}Traceback (most recent call last):\n"
+        f'{label}  File "train.py", line 7, in <module>\n'
+        f"{label}    main()\n"
+        f"{label}RuntimeError: {message}\n"
+    )
+
+
+def test_ring_buffer_keeps_the_most_recent_bytes():
+    tail = RingBuffer(10)
+    for chunk in (b"abc", b"defgh", b"ijklm", b"n"):
+        tail.write(chunk)
+    assert tail.getvalue() == b"efghijklmn"
+    assert tail.truncated and tail.total == 14
+    tail.write(b"0123456789ABC")  # a write larger than the buffer
+    assert tail.getvalue() == b"3456789ABC"
+
+
+def test_ring_buffer_lines_drop_the_line_cut_by_the_wrap():
+    tail = RingBuffer(12)
+    tail.write(b"first line\nsecond\nthird\n")
+    assert tail.lines() == ["third"]
+    assert _tail("a\nb\n").lines() == ["a", "b"]
+
+
+def test_identical_tracebacks_from_many_ranks_collapse_to_one_entry():
+    err = "".join(_traceback("NaN loss", f"{r}: ") for r in (0, 1, 2, 5))
+    err += _traceback("out of memory", "3: ")
+    summary = summarize_tail(1, _tail(err), _tail(""), labeled=True)
+    assert summary.startswith("Job exited with code 1. 2 distinct tracebacks")
+    assert "--- 4 ranks (0-2,5) ---" in summary
+    assert "--- 1 rank (3) ---" in summary
+    assert summary.count("RuntimeError: NaN loss") == 1
+    assert "0: " not in summary
+
+
+def test_unlabeled_tracebacks_are_counted_by_copies():
+    summary = summarize_tail(1, _tail(_traceback("boom") * 3))
+    assert "--- 3 copies ---" in summary
+    assert summary.count("RuntimeError: boom") == 1
+
+
+def test_a_rank_printing_its_traceback_to_both_streams_counts_once():
+    tb = _traceback("boom", "7: ")
+    assert "--- 1 rank (7) ---" in summarize_tail(1, _tail(tb), _tail(tb), labeled=True)
+
+
+def test_without_a_traceback_the_last_distinct_lines_are_shown():
+    err = "".join(f"{r}: error: connection refused\n" for r in range(8))
+    err += "srun: error: task 3 exited with code 1\n"
+    summary = summarize_tail(2, _tail(err), labeled=True)
+    assert "2 distinct lines" in summary
+    assert "[8 ranks (0-7)] error: connection refused" in summary
+    assert "\nsrun: error: task 3 exited with code 1\n" in summary
+
+
+def test_unlabeled_output_is_not_split_by_rank():
+    err = _traceback("bad", "2024: ")
+    summary = summarize_tail(1, _tail(err))
+    assert "rank" not in summary
+    assert "\n2024: RuntimeError: bad\n" in summary
+
+
+def test_no_output_means_no_summary():
+    assert summarize_tail(1, _tail(""), _tail("")) == ""
+
+
+def test_failed_launch_ends_with_the_summary(tmp_path):
+    child = tmp_path / "child.py"
+    child.write_text(
+        "import sys, time\n"
+        "sys.stderr.write('Traceback (most recent call last):\\n"
+        "  File \"x.py\", line 1, in <module>\\nValueError: bad\\n')\n"
+        "sys.stderr.flush()\n"
+        "time.sleep(0.5)  # let every rank report before the first exit\n"
+        "sys.exit(3)\n"
+    )
+    base = LAUNCH + ["--scheduler", "local-parallel", "-N1", "-n4",
+                     "-l", str(tmp_path / "run")]
+    proc = subprocess.run(
+        base + ["--crash-summary-size", "256K", "--", sys.executable, str(child)],
+        capture_output=True,
+    )
+    assert proc.returncode == 3
+    assert proc.stderr.rstrip().endswith(
+        b"--- 4 ranks (0-3) ---\nTraceback (most recent call last):\n"
+        b'  File "x.py", line 1, in <module>\nValueError: bad'
+    )
+
+    proc = subprocess.run(base + ["--", sys.executable, str(child)], capture_output=True)
+    assert proc.returncode == 3
+    assert b"distinct traceback" not in proc.stderr  # the summary is opt-in
+
+
+def test_interleaved_unlabeled_output_is_not_read_for_tracebacks():
+    # Two ranks' tracebacks, interleaved line by line, without labels.
+    a, b = _traceback("bad a").splitlines(), _traceback("bad b").splitlines()
+    err = "".join(f"{x}\n{y}\n" for x, y in zip(a, b))
+    summary = summarize_tail(1, _tail(err), tracebacks=False)
+    assert "distinct traceback" not in summary
+    assert "distinct lines" in summary and "RuntimeError: bad b" in summary
+
+
+def test_a_small_tail_reports_its_size_in_bytes():
+    tail = RingBuffer(100)
+    tail.write(b"x" * 200 + b"\nValueError: bad\n")
+    assert "(last 100 bytes per stream)" in summarize_tail(1, tail)
+    assert "(last 256 KiB per stream)" in summarize_tail(
+        1, _tail("x\n" * (200 << 10) + "ValueError: bad\n", 256 << 10)
+    )
@@ -0,0 +1,201 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``torchrun-hpc --pycache``: the content-addressed bytecode cache
+built at launch and copied to node-local storage by the first rank on each
+node.
+"""
+import fcntl
+import json
+import os
+import py_compile
+import subprocess
+import sys
+import sysconfig
+
+import pytest
+
+from hpc_launcher.runtime import pycache
+
+# What a rank does: sync the cache to the node, then import through it.
+_RANK = """
+import sys
+from hpc_launcher.runtime import pycache
+pycache.sync_to_node()
+sys.path.insert(0, sys.argv[1])
+import app, helpers
+print(app.__cached__)
+"""
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """A script directory of three modules, one with bytecode of its own."""
+    monkeypatch.setenv(pycache.CACHE_ENV, str(tmp_path / "shared-cache"))
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "app.py").write_text("import helpers\nVALUE = helpers.f()\n")
+    (src / "helpers.py").write_text("def f():\n    return 42\n")
+    (src / "compiled.py").write_text("X = 1\n")
+    py_compile.compile(str(src / "compiled.py"))
+    return src
+
+
+def _build(directory):
+    ((directory, sources, key),) = pycache.plan([str(directory)])
+    return pycache.build(directory, sources, key)
+
+
+def test_cache_is_built_once_per_content(sources):
+    cache, metrics = _build(sources)
+    assert metrics["modules"] == 3
+    assert metrics["modules_without_own_bytecode"] == 2
+    assert metrics["estimated_compile_seconds_saved_per_rank"] > 0
+    tag = sys.implementation.cache_tag
+    assert os.path.exists(f"{cache}{sources}/app.{tag}.pyc")
+
+    again, same = _build(sources)
+    assert (again, same) == (cache, metrics)
+
+    (sources / "helpers.py").write_text("def f():\n    return 43\n")
+    changed, _ = _build(sources)
+    assert changed != cache
+
+
+def test_editing_the_script_rebuilds_only_its_directory(tmp_path, sources):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "lib.py").write_text("Y = 1\n")
+    directories = [str(sources), str(library)]
+    first = dict(pycache.prepare(str(tmp_path), directories, str(tmp_path / "node")))
+    (sources / "app.py").write_text("import helpers\nVALUE = 0\n")
+    second = dict(pycache.prepare(str(tmp_path), directories, str(tmp_path / "node")))
+
+    script_before, library_before = first[pycache.SOURCE_ENV].split(os.pathsep)
+    script_after, library_after = second[pycache.SOURCE_ENV].split(os.pathsep)
+    assert library_after == library_before and script_after != script_before
+    assert second["PYTHONPYCACHEPREFIX"] != first["PYTHONPYCACHEPREFIX"]
+    metrics = json.loads((tmp_path / pycache.METRICS_FILE).read_text())
+    assert [c["directory"] for c in metrics["caches"]] == directories
+    assert metrics["modules"] == 4
+
+
+def test_nested_directories_are_compiled_once(tmp_path, sources):
+    nested = sources / "pkg"
+    nested.mkdir()
+    (nested / "inner.py").write_text("Z = 1\n")
+    planned = pycache.plan([str(sources), str(nested)])
+    assert [len(files) for _, files, _ in planned] == [3, 1]
+
+
+def test_a_large_script_directory_is_left_out(tmp_path, sources, monkeypatch):
+    monkeypatch.setattr(pycache, "_SCRIPT_MAX_DIRS", 2)
+    (sources / ".hidden").mkdir()
+    (sources / ".hidden" / "skipped.py").write_text("")
+    (sources / "pkg").mkdir()
+    assert [len(files) for _, files, _ in pycache.plan([str(sources)])] == [3]
+    (sources / "pkg" / "sub").mkdir()
+    assert pycache.plan([str(sources)]) == []
+
+
+def test_unused_caches_are_evicted(tmp_path, sources):
+    old, _ = _build(sources)
+    os.utime(old, (0, 0))
+    (sources / "helpers.py").write_text("def f():\n    return 43\n")
+    pycache.prepare(str(tmp_path), [str(sources)], str(tmp_path / "node"))
+    assert not os.path.exists(old)
+    # A reused cache is marked as used, and kept.
+    ((_, _, key),) = pycache.plan([str(sources)])
+    current = os.path.join(pycache.cache_root(), key)
+    os.utime(current, (0, 0))
+    pycache.prepare(str(tmp_path), [str(sources)], str(tmp_path / "node"))
+    assert os.stat(current).st_mtime > 0
+
+
+def test_own_bytecode_goes_stale_with_its_source(sources):
+    assert pycache._has_own_bytecode(str(sources / "compiled.py"))
+    assert not pycache._has_own_bytecode(str(sources / "app.py"))
+    (sources / "compiled.py").write_text("X = 2  # edited\n")
+    assert not pycache._has_own_bytecode(str(sources / "compiled.py"))
+
+
+def test_dry_run_builds_nothing(tmp_path, sources):
+    env = dict(pycache.prepare(str(tmp_path), [str(sources)], str(tmp_path / "node"), dry_run=True))
+    assert env["PYTHONPYCACHEPREFIX"].startswith(str(tmp_path / "node"))
+    assert not (tmp_path / "shared-cache").exists()
+    assert not (tmp_path / pycache.METRICS_FILE).exists()
+
+
+def test_ranks_import_from_the_node_local_copy(tmp_path, sources):
+    folder = tmp_path / "launch"
+    folder.mkdir()
+    env = dict(os.environ)
+    env.update(pycache.prepare(str(folder), [str(sources)], str(tmp_path / "node")))
+    metrics = json.loads((folder / pycache.METRICS_FILE).read_text())
+    assert metrics["modules_without_own_bytecode"] == 2
+
+    ranks = [
+        subprocess.Popen([sys.executable, "-c", _RANK, str(sources)], env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        for _ in range(4)
+    ]
+    results = [rank.communicate() for rank in ranks]
+    assert all(rank.returncode == 0 for rank in ranks), results
+    node_copy = env["PYTHONPYCACHEPREFIX"]
+    assert {out.strip() for out, _ in results} == {
+        f"{node_copy}{sources}/app.{sys.implementation.cache_tag}.pyc"
+    }
+    assert os.path.exists(os.path.join(node_copy, ".complete"))
+    # Nothing was compiled next to the sources.
+    assert sorted(os.listdir(sources / "__pycache__")) == [
+        f"compiled.{sys.implementation.cache_tag}.pyc"
+    ]
+
+
+def test_no_cache_without_the_environment(monkeypatch):
+    monkeypatch.delenv(pycache.SOURCE_ENV, raising=False)
+    assert pycache.sync_to_node() is None
+
+
+def test_default_directories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stdlib = sysconfig.get_paths()["stdlib"]
+    script_run = pycache.default_directories(str(tmp_path / "src" / "train.py"))
+    assert script_run[0] == str(tmp_path / "src") and stdlib in script_run
+    # python -m finds its module on the path; the working directory is not it.
+    module_run = pycache.default_directories(None)
+    assert str(tmp_path) not in module_run and stdlib in module_run
+
+
+def test_a_rank_killed_while_copying_does_not_lock_the_node(tmp_path, sources, monkeypatch):
+    env = dict(pycache.prepare(str(tmp_path), [str(sources)], str(tmp_path / "node")))
+    monkeypatch.setenv(pycache.SOURCE_ENV, env[pycache.SOURCE_ENV])
+    monkeypatch.setattr(sys, "pycache_prefix", env["PYTHONPYCACHEPREFIX"])
+    # Left behind by a rank that died holding it; the kernel dropped its lock.
+    (tmp_path / "node").mkdir()
+    open(env["PYTHONPYCACHEPREFIX"] + ".lock", "w").close()
+    assert pycache.sync_to_node() < pycache._WAIT_SECONDS
+    assert os.path.exists(os.path.join(env["PYTHONPYCACHEPREFIX"], ".complete"))
+
+
+def test_ranks_wait_for_the_copying_rank(tmp_path, sources, monkeypatch):
+    env = dict(pycache.prepare(str(tmp_path), [str(sources)], str(tmp_path / "node")))
+    monkeypatch.setenv(pycache.SOURCE_ENV, env[pycache.SOURCE_ENV])
+    monkeypatch.setattr(sys, "pycache_prefix", env["PYTHONPYCACHEPREFIX"])
+    monkeypatch.setattr(pycache, "_WAIT_SECONDS", 0.3)
+    (tmp_path / "node").mkdir()
+    with open(env["PYTHONPYCACHEPREFIX"] + ".lock", "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)  # another rank is copying
+        assert pycache.sync_to_node() >= 0.3
+    assert not os.path.exists(env["PYTHONPYCACHEPREFIX"])
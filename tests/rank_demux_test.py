@@ -0,0 +1,184 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for the rank-aware output demultiplexer: label parsing for the forms
+``flux run --label-io``, ``srun --label`` and ``jsrun --stdio_mode
+prepended`` emit, per-rank files through a bounded pool of descriptors, the
+console rank filter, and the scheduler flags that turn the labels on.
+"""
+import io
+import subprocess
+import sys
+
+import pytest
+
+from hpc_launcher.cli import rank_demux
+from hpc_launcher.cli.console_pipe import _LogWriterThread
+from hpc_launcher.cli.rank_demux import RankDemux, parse_rank_set, rank_log_path
+from hpc_launcher.schedulers.flux import FluxScheduler
+from hpc_launcher.schedulers.lsf import LSFScheduler
+from hpc_launcher.schedulers.slurm import SlurmScheduler
+from hpc_launcher.systems.system import GenericSystem
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        (None, None),
+        ("all", None),
+        ("0", {0}),
+        ("0,4, 8", {0, 4, 8}),
+        ("0-3,16", {0, 1, 2, 3, 16}),
+    ],
+)
+def test_parse_rank_set(spec, expected):
+    assert parse_rank_set(spec) == (None if expected is None else frozenset(expected))
+
+
+@pytest.mark.parametrize("spec", ["", "a", "3-1", "-1", "0-x"])
+def test_parse_rank_set_rejects_malformed_selections(spec):
+    with pytest.raises(ValueError):
+        parse_rank_set(spec)
+
+
+def test_rank_log_path():
+    assert rank_log_path("/run/out.log", 12) == "/run/out.rank12.log"
+
+
+def test_lines_are_split_by_rank_and_filtered_on_the_console(tmp_path):
+    console = io.BytesIO()
+    demux = RankDemux(console, str(tmp_path / "out.log"), frozenset({0}))
+    # flux/jsrun style, srun's right-aligned style, and an unlabeled line.
+    demux.write(b"0: alpha\n  1: beta\nsrun: warning\n 10: gam")
+    demux.write(b"ma\r\n")
+    demux.close()
+
+    assert (tmp_path / "out.rank0.log").read_bytes() == b"alpha\n"
+    assert (tmp_path / "out.rank1.log").read_bytes() == b"beta\n"
+    assert (tmp_path / "out.rank10.log").read_bytes() == b"gamma\r\n"
+    assert console.getvalue() == b"0: alpha\nsrun: warning\n"
+
+
+def test_console_only_filter_writes_no_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    console = io.BytesIO()
+    demux = RankDemux(console, None, frozenset({1}))
+    demux.write(b"0: a\n1: b\n")
+    demux.close()
+    assert console.getvalue() == b"1: b\n"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_open_files_are_bounded_and_evicted_ranks_append(tmp_path):
+    demux = RankDemux(None, str(tmp_path / "out.log"), max_open_files=4)
+    for round_ in range(3):
+        demux.write(b"".join(b"%d: r%d\n" % (rank, round_) for rank in range(50)))
+        demux.flush()
+        assert len(demux._files._open_files) <= 4
+    demux.close()
+    assert demux.ranks_seen == frozenset(range(50))
+    for rank in range(50):
+        assert (tmp_path / f"out.rank{rank}.log").read_bytes() == b"r0\nr1\nr2\n"
+
+
+def test_per_rank_writes_are_batched_until_flush(tmp_path):
+    demux = RankDemux(None, str(tmp_path / "out.log"))
+    demux.write(b"0: one\n0: two\n")
+    assert not (tmp_path / "out.rank0.log").exists()
+    demux.flush()
+    assert (tmp_path / "out.rank0.log").read_bytes() == b"one\ntwo\n"
+    demux.close()
+
+
+def test_a_progress_bar_reaches_the_console_before_its_line_ends(tmp_path):
+    console = io.BytesIO()
+    demux = RankDemux(console, str(tmp_path / "out.log"))
+    demux.write(b"0: 10%\r")
+    demux.write(b"50%\r")
+    assert console.getvalue() == b"0: 10%\r50%\r"
+    demux.write(b"100%\n1: done\n")
+    demux.close()
+    assert console.getvalue() == b"0: 10%\r50%\r100%\n1: done\n"
+    assert (tmp_path / "out.rank0.log").read_bytes() == b"10%\r50%\r100%\n"
+    assert (tmp_path / "out.rank1.log").read_bytes() == b"done\n"
+
+
+def test_an_unterminated_line_is_passed_on_in_bounded_pieces(tmp_path):
+    console = io.BytesIO()
+    demux = RankDemux(console, str(tmp_path / "out.log"))
+    piece = b"x" * rank_demux._MAX_PARTIAL_BYTES
+    demux.write(b"3: " + piece)
+    demux.write(piece)
+    assert len(demux._partial) < rank_demux._MAX_PARTIAL_BYTES
+    demux.close()
+    assert (tmp_path / "out.rank3.log").read_bytes() == piece * 2 + b"\n"
+    assert console.getvalue() == b"3: " + piece * 2 + b"\n"
+
+
+def test_per_rank_files_are_written_on_the_log_writer_thread(tmp_path):
+    writer = _LogWriterThread()
+    demux = RankDemux(None, str(tmp_path / "out.log"), log_writer=writer)
+    demux.write(b"0: one\n1: two\n")
+    demux.close()
+    writer.close()
+    assert (tmp_path / "out.rank0.log").read_bytes() == b"one\n"
+    assert (tmp_path / "out.rank1.log").read_bytes() == b"two\n"
+    assert writer.metrics()["bytes_queued"] == len(b"one\ntwo\n")
+    assert demux._files._open_files == {}
+
+
+@pytest.mark.parametrize(
+    "cls, flag",
+    [
+        (SlurmScheduler, "--label"),
+        (FluxScheduler, "--label-io"),
+        (LSFScheduler, "--stdio_mode=prepended"),
+    ],
+)
+def test_schedulers_label_output_only_when_it_is_demultiplexed(cls, flag):
+    system = GenericSystem()
+    assert flag not in cls(2, 2, 0).launch_command(system, True)
+    assert flag in cls(2, 2, 0, demux_ranks=True).launch_command(system, True)
+    assert flag in cls(2, 2, 0, console_ranks="0").launch_command(system, True)
+    assert flag not in cls(2, 2, 0, demux_ranks=True).launch_command(system, False)
+
+
+def test_launch_writes_per_rank_logs_and_filters_the_console(tmp_path):
+    """End to end through ``launch``; the child labels its own lines."""
+    launch_dir = tmp_path / "run"
+    child = "print('0: from zero'); print('1: from one'); print('unlabeled')"
+    proc = subprocess.run(
+        LAUNCH
+        + ["--local", "-N1", "-l", str(launch_dir), "--demux-ranks",
+           "--console-ranks", "1", "--", sys.executable, "-c", child],
+        capture_output=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert b"1: from one" in proc.stdout and b"unlabeled" in proc.stdout
+    assert b"from zero" not in proc.stdout
+    assert (launch_dir / "out.rank0.log").read_bytes() == b"from zero\n"
+    assert (launch_dir / "out.rank1.log").read_bytes() == b"from one\n"
+    assert b"0: from zero" in (launch_dir / "out.log").read_bytes()
+
+
+def test_demux_ranks_requires_a_blocking_launch_directory(tmp_path):
+    proc = subprocess.run(
+        LAUNCH + ["--local", "-N1", "--demux-ranks", "--", "true"],
+        capture_output=True,
+        cwd=tmp_path,
+    )
+    assert proc.returncode != 0
+    assert b"--demux-ranks" in proc.stderr
@@ -0,0 +1,139 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``torchrun-hpc --probe-port``: rank 0 choosing the rendezvous
+port on its own node, and the other ranks following it through the launch
+folder. Plain sockets stand in for torch's TCPStore.
+"""
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from hpc_launcher.runtime import rendezvous_port
+
+
+def _connect(refuse=()):
+    """
+    A ``connect`` that listens on the port for the master and connects to
+    it otherwise, retrying until the timeout like a TCPStore client. The
+    master refuses the ports in ``refuse`` once each, as if it lost them
+    between the test and the bind.
+    """
+    refused = set()
+
+    def connect(port, is_master, timeout):
+        if is_master:
+            if port in refuse and port not in refused:
+                refused.add(port)
+                raise RuntimeError(f"address already in use: {port}")
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(("127.0.0.1", port))
+            server.listen(16)
+            return server
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return socket.create_connection(("127.0.0.1", port), timeout=1)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+    return connect
+
+
+def _run(world_size, path, connect, preferred=None, **kwargs):
+    results = [None] * world_size
+
+    def rank(r):
+        try:
+            results[r] = rendezvous_port.rendezvous(r, path, connect, preferred, **kwargs)
+        except Exception as e:
+            results[r] = e
+
+    # The other ranks start first: they must wait for rank 0's port.
+    threads = [threading.Thread(target=rank, args=(r,)) for r in range(world_size - 1, -1, -1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    for sock, _ in results:
+        sock.close()
+    return [port for _, port in results]
+
+
+def test_prepare_names_a_unique_file_in_the_launch_folder(tmp_path):
+    [(name, path)] = rendezvous_port.prepare(str(tmp_path))
+    assert name == rendezvous_port.PORT_FILE_ENV
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path).startswith(rendezvous_port.PORT_FILE + ".")
+    time.sleep(0.001)
+    assert rendezvous_port.prepare(str(tmp_path)) != [(name, path)]
+
+
+def test_publish_and_read(tmp_path):
+    path = str(tmp_path / "port")
+    assert rendezvous_port.read(path) is None
+    rendezvous_port.publish(path, 2, 12345)
+    assert rendezvous_port.read(path) == (2, 12345)
+    assert os.listdir(tmp_path) == ["port"]
+    with pytest.raises(TimeoutError):
+        rendezvous_port.wait_for(str(tmp_path / "missing"), time.monotonic() + 0.2)
+
+
+def test_choose_port_keeps_a_free_preferred_port():
+    port = rendezvous_port.choose_port()
+    assert rendezvous_port.port_is_free(port)
+    assert rendezvous_port.choose_port(port) == port
+
+
+def test_choose_port_replaces_a_port_in_use():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as held:
+        held.bind(("", 0))
+        held.listen(1)
+        taken = held.getsockname()[1]
+        assert not rendezvous_port.port_is_free(taken)
+        assert rendezvous_port.choose_port(taken) != taken
+
+
+def test_all_ranks_meet_on_the_port_rank_0_chose(tmp_path):
+    path = str(tmp_path / "port")
+    preferred = rendezvous_port.choose_port()
+    ports = _run(4, path, _connect(), preferred, timeout=20)
+    assert ports == [preferred] * 4
+    assert rendezvous_port.read(path) == (0, preferred)
+
+
+def test_ranks_follow_rank_0_to_a_new_port(tmp_path):
+    path = str(tmp_path / "port")
+    preferred = rendezvous_port.choose_port()
+    ports = _run(3, path, _connect(refuse={preferred}), preferred,
+                 attempt_seconds=1, timeout=20)
+    assert len(set(ports)) == 1 and ports[0] != preferred
+    assert rendezvous_port.read(path) == (1, ports[0])
+
+
+def test_rank_0_gives_up_after_its_attempts(tmp_path):
+    def connect(port, is_master, timeout):
+        raise RuntimeError("address already in use")
+
+    with pytest.raises(RuntimeError, match="any of 2 ports"):
+        rendezvous_port.rendezvous(0, str(tmp_path / "port"), connect, attempts=2)
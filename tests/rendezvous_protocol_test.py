@@ -0,0 +1,329 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for the ``torchrun-hpc --rdv file`` and ``--rdv tcp-hier``
+rendezvous: the environment the schedulers generate, the node relay of
+``tcp-hier`` against an in-memory store, and (with a CPU-capable torch)
+multi-process gloo runs of the real trampoline on one machine.
+"""
+import collections
+import datetime
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import require_torch
+from hpc_launcher.runtime import rendezvous_relay
+from hpc_launcher.schedulers.flux import FluxScheduler
+from hpc_launcher.schedulers.local import LocalScheduler
+from hpc_launcher.schedulers.scheduler import RENDEZVOUS_FILE
+from hpc_launcher.schedulers.slurm import SlurmScheduler
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _protocol(env_list):
+    return dict(env_list)["TORCHRUN_HPC_RDV_PROTOCOL"]
+
+
+@pytest.mark.parametrize("scheduler_class", [LocalScheduler, SlurmScheduler, FluxScheduler])
+def test_file_rendezvous_is_a_launch_folder_file(scheduler_class):
+    scheduler = scheduler_class(nodes=1, procs_per_node=2, gpus_per_proc=0)
+    env_list = scheduler.setup_rendezvous_protocol("file")
+    protocol = _protocol(env_list)
+    assert protocol.startswith(f"file://{RENDEZVOUS_FILE}.")
+    # Nothing to resolve on the nodes: no address or port.
+    assert "TORCHRUN_HPC_MASTER_ADDR" not in dict(env_list)
+    assert _protocol(scheduler.setup_rendezvous_protocol("file")) != protocol
+
+
+@pytest.mark.parametrize("scheduler_class", [LocalScheduler, SlurmScheduler, FluxScheduler])
+def test_hierarchical_tcp_uses_the_tcp_address(scheduler_class):
+    scheduler = scheduler_class(nodes=2, procs_per_node=2, gpus_per_proc=0)
+    tcp = dict(scheduler.setup_rendezvous_protocol("tcp"))
+    hier = dict(scheduler.setup_rendezvous_protocol("tcp-hier"))
+    assert hier["TORCHRUN_HPC_MASTER_ADDR"] == tcp["TORCHRUN_HPC_MASTER_ADDR"]
+    assert hier["TORCHRUN_HPC_MASTER_PORT"] == tcp["TORCHRUN_HPC_MASTER_PORT"]
+    assert hier["TORCHRUN_HPC_RDV_PROTOCOL"] == tcp["TORCHRUN_HPC_RDV_PROTOCOL"].replace(
+        "tcp://", "tcp-hier://")
+
+
+class _DictStore:
+    """
+    The operations of a TCPStore, in memory, counting the requests it is
+    sent as rank 0's store would receive them.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Condition()
+        self.requests = collections.Counter()
+
+    def __getattribute__(self, name):
+        if name in ("set", "get", "add", "compare_set", "check", "wait",
+                    "delete_key", "num_keys"):
+            self.requests[name] += 1
+        return object.__getattribute__(self, name)
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.lock.notify_all()
+
+    def get(self, key):
+        with self.lock:
+            return self.data[key]
+
+    def add(self, key, value):
+        with self.lock:
+            total = int(self.data.get(key, b"0")) + value
+            self.data[key] = str(total).encode()
+            return total
+
+    def compare_set(self, key, expected, desired):
+        with self.lock:
+            current = self.data.get(key)
+            if current == expected or (current is None and not expected):
+                self.data[key] = desired
+                return desired
+            return current if current is not None else expected
+
+    def check(self, keys):
+        with self.lock:
+            return all(key in self.data for key in keys)
+
+    def wait(self, keys, timeout):
+        with self.lock:
+            if not self.lock.wait_for(lambda: all(key in self.data for key in keys),
+                                      timeout.total_seconds()):
+                raise RuntimeError(f"Wait timeout for {keys}")
+
+    def delete_key(self, key):
+        with self.lock:
+            return self.data.pop(key, None) is not None
+
+    def num_keys(self):
+        with self.lock:
+            return len(self.data)
+
+
+@pytest.fixture
+def relay():
+    store = _DictStore()
+    address = rendezvous_relay.address(f"tcp-hier://test:{os.getpid()}", str(id(store)))
+    server = rendezvous_relay.Server(address, lambda: store)
+    yield store, address
+    server.close()
+
+
+def test_relay_runs_store_operations(relay):
+    store, address = relay
+    client = rendezvous_relay.Client(address, timeout=5)
+    try:
+        client.set("a", b"\x00\xff")
+        client.set("b", "text")
+        assert store.data == {"a": b"\x00\xff", "b": b"text"}
+        assert client.get("a") == b"\x00\xff"
+        assert client.add("n", 2) == 2 and client.add("n", 3) == 5
+        assert client.compare_set("c", b"", b"first") == b"first"
+        assert client.compare_set("c", b"other", b"second") == b"first"
+        assert client.check(["a", "b"]) and not client.check(["a", "missing"])
+        assert client.num_keys() == 4
+        assert client.delete_key("b") and not client.delete_key("b")
+    finally:
+        client.close()
+
+
+def test_relayed_get_waits_for_another_local_rank(relay):
+    # The waiting rank must not hold up the relay for the rank that sets
+    # the key.
+    _, address = relay
+    waiter = rendezvous_relay.Client(address, timeout=5)
+    setter = rendezvous_relay.Client(address, timeout=5)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=waiter.get("late")))
+    thread.start()
+    setter.set("late", b"value")
+    thread.join(5)
+    assert result == {"value": b"value"}
+    waiter.close()
+    setter.close()
+
+
+def test_local_ranks_waiting_for_the_same_keys_share_one_request(relay):
+    store, address = relay
+    waiters = [rendezvous_relay.Client(address, timeout=5) for _ in range(6)]
+    threads = [threading.Thread(target=client.wait, args=(["ready", "go"],))
+               for client in waiters]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)  # every rank is waiting
+    store.set("ready", b"1")
+    store.set("go", b"1")
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert store.requests["wait"] == 1 and store.requests["check"] == 0
+    for client in waiters:
+        client.close()
+
+
+class _Connection:
+    """A client connection to ``store``, which runs one operation at a time, as a TCPStore's does."""
+
+    def __init__(self, store):
+        self._store = store
+        self._busy = threading.Lock()
+
+    def __getattr__(self, name):
+        operation = getattr(self._store, name)
+
+        def run(*args):
+            with self._busy:
+                return operation(*args)
+
+        return run
+
+
+def test_relay_does_not_queue_behind_the_first_ranks_connection():
+    store = _DictStore()
+    leader = _Connection(store)
+    address = rendezvous_relay.address(f"tcp-hier://own:{os.getpid()}", str(id(store)))
+    server = rendezvous_relay.Server(address, lambda: _Connection(store))
+    client = rendezvous_relay.Client(address, timeout=5)
+    try:
+        # The first rank blocks on its own connection for a key that only
+        # another local rank sets.
+        result = {}
+
+        def wait():
+            leader.wait(["peer"], datetime.timedelta(seconds=2))
+            result["waited"] = True
+
+        waiting = threading.Thread(target=wait)
+        waiting.start()
+        time.sleep(0.1)
+        client.set("peer", b"1")
+        assert client.add("n", 1) == 1
+        waiting.join(5)
+        assert result == {"waited": True}
+    finally:
+        client.close()
+        server.close()
+
+
+def test_relay_timeouts(relay):
+    _, address = relay
+    client = rendezvous_relay.Client(address, timeout=0.2)
+    with pytest.raises(TimeoutError):
+        client.get("never")
+    with pytest.raises(TimeoutError):
+        client.wait(["never"], timeout=0.1)
+    client.close()
+    with pytest.raises(TimeoutError):
+        rendezvous_relay.Client(rendezvous_relay.address("nobody"), timeout=1, connect_timeout=0.2)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_ranks(tmp_path, protocol, world_size, check="", **extra_env):
+    """
+    Run the trampoline as ``world_size`` gloo ranks of a stubbed one-node
+    Slurm job, each all-reducing a tensor (and running ``check``), and check
+    that all of them did.
+    """
+    user_script = tmp_path / "user_script.py"
+    user_script.write_text(
+        "import os\n"
+        "import torch\n"
+        "import torch.distributed as dist\n"
+        "t = torch.ones(1)\n"
+        "dist.all_reduce(t)\n"
+        "assert t.item() == dist.get_world_size()\n"
+        f"{check}\n"
+        "print(f'RDV_TEST_SUCCESS rank={dist.get_rank()}', flush=True)\n"
+    )
+    base_env = os.environ.copy()
+    base_env.update(
+        TORCHRUN_HPC_SCHEDULER="slurm",
+        SLURM_NTASKS=str(world_size),
+        SLURM_NNODES="1",
+        TORCHRUN_HPC_RDV_PROTOCOL=protocol,
+        TORCHRUN_HPC_LAUNCH_DIR=str(tmp_path),
+        HIP_VISIBLE_DEVICES="",
+        CUDA_VISIBLE_DEVICES="",
+        PYTHONPATH=REPO_ROOT + os.pathsep + base_env.get("PYTHONPATH", ""),
+        **extra_env,
+    )
+    procs = []
+    for rank in range(world_size):
+        env = dict(base_env, SLURM_PROCID=str(rank), SLURM_LOCALID=str(rank))
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "hpc_launcher.torch.torchrun_hpc_trampoline",
+             str(user_script)],
+            env=env, cwd=str(tmp_path), stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, universal_newlines=True,
+        ))
+    outputs = []
+    try:
+        for proc in procs:
+            outputs.append((proc.communicate(timeout=180)[0], proc.returncode))
+    except subprocess.TimeoutExpired:
+        for proc in procs:
+            proc.kill()
+        pytest.fail(f"The {protocol} rendezvous did not finish")
+    for rank, (out, rc) in enumerate(outputs):
+        assert rc == 0, f"rank {rank} exited with {rc}\n{out}"
+        assert f"RDV_TEST_SUCCESS rank={rank}" in out, out
+
+
+def test_file_rendezvous_with_gloo(tmp_path):
+    require_torch()
+    _run_ranks(tmp_path, f"file://{RENDEZVOUS_FILE}.test", 3)
+
+
+def test_hierarchical_tcp_rendezvous_with_gloo(tmp_path):
+    require_torch()
+    _run_ranks(tmp_path, f"tcp-hier://127.0.0.1:{_free_port()}", 3)
+
+
+def test_every_local_rank_exports_the_probed_port(tmp_path):
+    require_torch()
+    # The launch host's port is taken on the rank-0 node, so rank 0 moves
+    # the store; ranks behind the relay must export the port it moved to.
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as taken:
+        taken.bind(("", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        port_file = tmp_path / "rendezvous_port.test"
+        _run_ranks(
+            tmp_path,
+            f"tcp-hier://127.0.0.1:{port}",
+            3,
+            check=(
+                f"assert os.environ['MASTER_PORT'] == open({str(port_file)!r}).read().split()[1]\n"
+                f"assert os.environ['MASTER_PORT'] != '{port}'"
+            ),
+            TORCHRUN_HPC_PORT_FILE=str(port_file),
+            TORCHRUN_HPC_MASTER_PORT=str(port),
+        )
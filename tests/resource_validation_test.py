@@ -124,6 +124,19 @@ class _MockGenericCpuFallbackSystem(System):
         return _MockScheduler
 
 
+class _MockUnknownGpuMemorySystem(_MockGpuSystem):
+    """
+    A GPU node whose GPUs were counted but whose memory was not found, as
+    for NVIDIA GPUs autodetected without NVML: ``mem_per_gpu=0`` means
+    unknown, not none.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.system_params["mockq"].mem_per_gpu = 0
+        self.system_params["mockq"].gpu_arch = None
+
+
 # ---------------------------------------------------------------------------
 # GPU oversubscription: a visible warning, not an invisible false claim
 # ---------------------------------------------------------------------------
@@ -248,6 +261,16 @@ def test_gpumem_at_least_unaffected_on_a_real_gpu_system(mock_autodetect):
     assert gpus_per_proc == 1
 
 
+@patch(
+    "hpc_launcher.systems.autodetect.autodetect_current_system",
+    return_value=_MockUnknownGpuMemorySystem(),
+)
+def test_gpumem_at_least_with_unknown_gpu_memory_asks_for_it(mock_autodetect):
+    with pytest.raises(ValueError, match="is unknown.*-p mem_per_gpu"):
+        configure_launch(None, 0, 0, 1, 0, 22, None)
+    assert "unknown GB" in mock_autodetect.return_value.system_params["mockq"].prettyprint()
+
+
 # ---------------------------------------------------------------------------
 # -p overrides must not mutate a shared SystemParams template
 # ---------------------------------------------------------------------------
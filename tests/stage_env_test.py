@@ -0,0 +1,202 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``torchrun-hpc --stage-env``: packing the Python environment once
+and staging it on node-local storage, with a temporary directory standing
+in for each node's ``/tmp`` and a shell script for the interpreter.
+"""
+import os
+import subprocess
+
+import pytest
+
+from hpc_launcher.cli import stage_env
+from hpc_launcher.schedulers.local import LocalScheduler
+from hpc_launcher.systems.system import GenericSystem
+
+
+@pytest.fixture
+def environment(tmp_path, monkeypatch):
+    """A fake environment prefix whose ``bin/python`` reports where it runs from."""
+    monkeypatch.setenv(stage_env.CACHE_ENV, str(tmp_path / "shared-cache"))
+    prefix = tmp_path / "venv"
+    (prefix / "bin").mkdir(parents=True)
+    (prefix / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (prefix / "lib/site-packages/pkg").mkdir(parents=True)
+    (prefix / "lib/site-packages/pkg/__init__.py").write_text("")
+    python = prefix / "bin/python"
+    python.write_text('#!/bin/sh\necho "python=$0 args=$*"\n')
+    python.chmod(0o755)
+    os.symlink("python", prefix / "bin/python3")
+    return prefix
+
+
+def _prepare(tmp_path, prefix, **kwargs):
+    folder = tmp_path / "launch"
+    folder.mkdir(exist_ok=True)
+    script = stage_env.prepare(
+        str(folder), str(tmp_path / "node-local"),
+        prefix=str(prefix), executable=str(prefix / "bin/python"), **kwargs
+    )
+    return folder, script
+
+
+def test_content_key_follows_the_environment(environment):
+    key = stage_env.content_key(str(environment))
+    assert stage_env.content_key(str(environment)) == key
+    (environment / "lib/site-packages/new.py").write_text("x = 1\n")
+    assert stage_env.content_key(str(environment)) != key
+    key = stage_env.content_key(str(environment))
+    # An upgrade replaces the package's metadata directory.
+    (environment / "lib/site-packages/pkg-1.0.dist-info").mkdir()
+    assert stage_env.content_key(str(environment)) != key
+
+
+def test_content_key_reads_only_the_site_packages_listing(environment, monkeypatch):
+    for n in range(50):
+        (environment / "lib/site-packages/pkg" / f"mod{n}.py").write_text("")
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(stage_env.os, "stat", lambda p, *a, **k: stats.append(p) or real_stat(p, *a, **k))
+    stage_env.content_key(str(environment))
+    assert not any("/pkg/" in str(p) for p in stats)
+    assert len(stats) < 10
+
+
+def test_old_packs_are_evicted(tmp_path, environment):
+    cache = tmp_path / "shared-cache"
+    cache.mkdir()
+    day = stage_env._UNUSED_SECONDS
+    # Three packs used a minute ago, which a queued job may still need even
+    # beyond the few kept, and three unused for days.
+    for name, age in [("recent0", 60), ("recent1", 61), ("recent2", 62),
+                      ("old0", 2 * day), ("old1", 3 * day), ("old2", 4 * day)]:
+        pack = cache / f"env-{name}.tar"
+        pack.write_text("")
+        os.utime(pack, (pack.stat().st_atime - age,) * 2)
+    (cache / ".env-partial.tar").write_text("")
+    os.utime(cache / ".env-partial.tar", (0, 0))
+    _prepare(tmp_path, environment)
+    key = stage_env.content_key(str(environment), str(environment / "bin/python"))
+    assert sorted(p.name for p in cache.iterdir()) == [
+        f"env-{key}.tar", "env-recent0.tar", "env-recent1.tar", "env-recent2.tar"
+    ]
+
+
+def test_environment_is_packed_once(tmp_path, environment):
+    _, script = _prepare(tmp_path, environment)
+    (archive,) = (tmp_path / "shared-cache").iterdir()
+    inode = archive.stat().st_ino
+    _prepare(tmp_path, environment)
+    assert [p.name for p in (tmp_path / "shared-cache").iterdir()] == [archive.name]
+    assert archive.stat().st_ino == inode
+    assert str(archive) in open(script).read()
+
+
+def test_dry_run_packs_nothing(tmp_path, environment):
+    folder, script = _prepare(tmp_path, environment, dry_run=True)
+    assert script == str(folder / stage_env.STAGE_SCRIPT)
+    assert not os.path.exists(script)
+    assert not (tmp_path / "shared-cache").exists()
+
+
+def test_interpreter_outside_its_environment_is_rejected(tmp_path, environment):
+    with pytest.raises(ValueError, match="not inside"):
+        stage_env.prepare(str(tmp_path), prefix=str(environment), executable="/usr/bin/python3")
+
+
+def test_a_base_installation_is_not_staged(tmp_path, environment):
+    (environment / "pyvenv.cfg").unlink()
+    with pytest.raises(ValueError, match="not a venv or conda environment"):
+        _prepare(tmp_path, environment)
+    (environment / "conda-meta").mkdir()
+    _prepare(tmp_path, environment)
+
+
+def test_local_launch_runs_the_staged_interpreter(tmp_path, environment):
+    folder, script = _prepare(tmp_path, environment)
+    scheduler = LocalScheduler(nodes=1, procs_per_node=1, gpus_per_proc=0)
+    script_file = scheduler.create_launch_folder(str(folder), True)
+    result = scheduler.launch(
+        GenericSystem(), str(folder), script_file, script, ["train.py", "--lr", "0.1"],
+        blocking=True,
+    )
+    assert result.returncode == 0
+    out = (folder / "out.log").read_text()
+    (staged,) = [p for p in (tmp_path / "node-local").glob("hpc-launcher-env-*") if p.is_dir()]
+    assert out.strip() == f"python={staged}/bin/python args=train.py --lr 0.1"
+    assert (staged / "lib/site-packages/pkg/__init__.py").exists()
+    assert os.readlink(staged / "bin/python3") == "python"
+    assert "stage_env: staged" in (folder / "err.log").read_text()
+
+
+def test_one_task_per_node_stages(tmp_path, environment):
+    _, script = _prepare(tmp_path, environment)
+    tasks = [
+        subprocess.Popen([script, str(rank)], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                         universal_newlines=True)
+        for rank in range(6)
+    ]
+    outputs = [task.communicate() for task in tasks]
+    assert all(task.returncode == 0 for task in tasks)
+    assert sum("stage_env: staged" in err for _, err in outputs) == 1
+    assert sorted(out.split("args=")[1].strip() for out, _ in outputs) == list("012345")
+    # A later job on the node reuses the staged copy.
+    later = subprocess.run([script, "again"], capture_output=True, universal_newlines=True)
+    assert later.returncode == 0 and later.stderr == ""
+
+
+def test_a_task_killed_while_staging_does_not_lock_the_node(tmp_path, environment):
+    _, script = _prepare(tmp_path, environment)
+    staged = tmp_path / "node-local" / (
+        f"hpc-launcher-env-{os.getuid()}-"
+        f"{stage_env.content_key(str(environment), str(environment / 'bin/python'))}"
+    )
+    # A task died mid-extract: its lock file and partial copy are left behind.
+    (tmp_path / "node-local").mkdir()
+    (staged.parent / (staged.name + ".lock")).write_text("")
+    (staged.parent / (staged.name + ".tmp")).mkdir()
+    proc = subprocess.run([script, "0"], capture_output=True, universal_newlines=True,
+                          timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    assert (staged / ".staged").exists()
+    assert not (staged.parent / (staged.name + ".tmp")).exists()
+
+
+def test_staging_removes_the_unused_copies_of_older_environments(tmp_path, environment):
+    import fcntl
+
+    node = tmp_path / "node-local"
+    _, script = _prepare(tmp_path, environment)
+    assert subprocess.run([script], capture_output=True).returncode == 0
+    (first,) = [p for p in node.glob("hpc-launcher-env-*") if p.is_dir()]
+    (environment / "lib/site-packages/pkg-2.0.dist-info").mkdir()
+    _, script = _prepare(tmp_path, environment)
+    assert subprocess.run([script], capture_output=True).returncode == 0
+    (second,) = [p for p in node.glob("hpc-launcher-env-*") if p.is_dir() and p != first]
+
+    # Not used for two days, but a task of a running job still holds it.
+    os.utime(first / ".staged", (0, 0))
+    (environment / "lib/site-packages/pkg-3.0.dist-info").mkdir()
+    _, script = _prepare(tmp_path, environment)
+    with open(f"{first}.use", "a") as use:
+        fcntl.flock(use, fcntl.LOCK_SH)
+        assert subprocess.run([script], capture_output=True).returncode == 0
+    assert first.exists() and second.exists()  # in use, and recently used
+
+    os.utime(first / ".staged", (0, 0))
+    (environment / "lib/site-packages/pkg-4.0.dist-info").mkdir()
+    _, script = _prepare(tmp_path, environment)
+    assert subprocess.run([script], capture_output=True).returncode == 0
+    assert not first.exists() and second.exists()
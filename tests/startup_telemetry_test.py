@@ -0,0 +1,117 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for the per-rank start-up telemetry that rank 0 of a ``torchrun-hpc``
+job gathers and writes into the launch folder.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from conftest import require_torch
+
+from hpc_launcher.runtime import startup_telemetry
+from hpc_launcher.runtime.startup_telemetry import format_report, histogram, rank_record
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAMPOLINE_SOURCE = os.path.join(
+    REPO_ROOT, "hpc_launcher", "torch", "torchrun_hpc_trampoline.py"
+)
+
+
+def _records(n):
+    records = [
+        rank_record(r, f"node{r // 4:03d}", import_torch=2.0 + r * 0.01,
+                    device_selection=0.001, rendezvous=1.5)
+        for r in range(n)
+    ]
+    records[37 % n]["rendezvous"] = 42.0  # the one slow node
+    return records
+
+
+def test_histogram_bins_cover_the_range():
+    lines = histogram([1.0, 1.1, 1.2, 5.0], bins=4)
+    assert len(lines) == 4
+    assert [int(line.split()[3]) for line in lines] == [3, 0, 0, 1]
+    assert lines[0].endswith("#" * 40)
+    assert len(histogram([3.0] * 5)) == 1
+
+
+def test_report_lists_the_slowest_ranks_with_their_hosts():
+    report = format_report(_records(64))
+    assert report.startswith("Start-up times of 64 ranks")
+    assert "init_process_group (rendezvous): min 1.500s, median 1.500s, max 42.000s" in report
+    slowest = report.split("Slowest 10 ranks (total start-up):\n")[1].splitlines()
+    assert slowest[1].split()[:2] == ["37", "node009"]
+    assert len(slowest) == 11
+
+
+def test_write_report_orders_the_records_by_rank(tmp_path):
+    records = _records(8)
+    startup_telemetry.write_report(str(tmp_path), records[::-1] + [None])
+    written = json.loads((tmp_path / "startup_telemetry.json").read_text())
+    assert [r["rank"] for r in written] == list(range(8))
+    assert (tmp_path / "startup_report.txt").read_text() == format_report(records)
+
+
+def test_single_rank_trampoline_writes_the_report(tmp_path):
+    require_torch()
+    launch_dir = tmp_path / "launch"
+    launch_dir.mkdir()
+    shutil.copy(TRAMPOLINE_SOURCE, str(launch_dir / "torchrun_hpc_trampoline.py"))
+    script = tmp_path / "user_script.py"
+    script.write_text("print('ok')\n")
+
+    env = os.environ.copy()
+    env.update(
+        TORCHRUN_HPC_SCHEDULER="local",
+        TORCHRUN_HPC_LAUNCH_DIR=str(launch_dir),
+        TORCHRUN_HPC_STARTUP_REPORT=str(launch_dir),
+        CUDA_VISIBLE_DEVICES="",
+        ROCR_VISIBLE_DEVICES="",
+        HIP_VISIBLE_DEVICES="",
+    )
+    proc = subprocess.run(
+        [sys.executable, "-u", str(launch_dir / "torchrun_hpc_trampoline.py"), str(script)],
+        env=env,
+        cwd=str(launch_dir),
+        capture_output=True,
+        universal_newlines=True,
+        timeout=300,
+    )
+    assert proc.returncode == 0, proc.stderr
+    (record,) = json.loads((launch_dir / "startup_telemetry.json").read_text())
+    assert record["rank"] == 0 and record["import_torch"] > 0
+    assert "Slowest 1 rank" in (launch_dir / "startup_report.txt").read_text()
+
+
+def _launch_script(launch_dir, *cli_args):
+    subprocess.run(
+        [sys.executable, "-m", "hpc_launcher.cli.torchrun_hpc", "--scheduler",
+         "slurm", "-N1", "-n2", "--bg", "--setup-only", "-l", str(launch_dir),
+         *cli_args, "train.py"],
+        cwd=str(launch_dir.parent),
+        capture_output=True,
+        check=True,
+    )
+    return (launch_dir / "launch.sh").read_text()
+
+
+def test_the_report_and_its_gather_are_opt_in(tmp_path):
+    require_torch()
+    env = startup_telemetry.REPORT_ENV
+    assert env not in _launch_script(tmp_path / "default")
+    assert env in _launch_script(tmp_path / "report", "--startup-report")
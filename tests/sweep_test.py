@@ -0,0 +1,209 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``launch --sweep``: reading sweep files, rendering one launch
+folder per point, and submitting them as one job array through stub
+``sbatch``, ``flux`` and ``bsub`` commands.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from hpc_launcher.cli import sweep
+from hpc_launcher.schedulers.flux import FluxScheduler
+from hpc_launcher.schedulers.lsf import LSFScheduler
+from hpc_launcher.schedulers.slurm import SlurmScheduler
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each stub records its arguments and prints what the real command prints.
+_STUBS = {
+    "sbatch": 'echo "Submitted batch job 4242"',
+    "flux": 'for i in 1 2 3; do echo "f00$i"; done',
+    "bsub": 'echo "Job <77> is submitted to queue <pbatch>."',
+    # Runs the command after the options, as one task.
+    "srun": 'while [ "${1#-}" != "$1" ]; do shift; done; exec "$@"',
+}
+
+
+@pytest.fixture
+def stub_bin(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, body in _STUBS.items():
+        stub = bin_dir / name
+        stub.write_text(
+            f'#!/bin/sh\n[ "{name}" = srun ] || echo "$@" > "{bin_dir}/{name}.args"\n{body}\n'
+        )
+        stub.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return bin_dir
+
+
+def test_expand_takes_every_combination_then_the_points():
+    points = sweep.expand({"lr": [0.1, 0.01], "bs": [32, 64], "opt": "adam"},
+                          [{"lr": 1, "bs": 8, "opt": "sgd"}])
+    assert points == [
+        {"lr": "0.1", "bs": "32", "opt": "adam"},
+        {"lr": "0.1", "bs": "64", "opt": "adam"},
+        {"lr": "0.01", "bs": "32", "opt": "adam"},
+        {"lr": "0.01", "bs": "64", "opt": "adam"},
+        {"lr": "1", "bs": "8", "opt": "sgd"},
+    ]
+    with pytest.raises(ValueError, match="mapping"):
+        sweep.expand(points=[1])
+
+
+def test_load_yaml_and_json(tmp_path, monkeypatch):
+    yaml_file = tmp_path / "sweep.yaml"
+    yaml_file.write_text("parameters:\n  lr: [0.1, 0.2]\npoints:\n  - {lr: 3}\n")
+    json_file = tmp_path / "sweep.json"
+    json_file.write_text('{"parameters": {"lr": [0.1, 0.2]}, "points": [{"lr": 3}]}')
+    expected = [{"lr": "0.1"}, {"lr": "0.2"}, {"lr": "3"}]
+    assert sweep.load(str(json_file)) == expected
+
+    # Without PyYAML, a JSON sweep file is still read whatever its name.
+    def no_yaml():
+        raise ValueError("no PyYAML")
+
+    monkeypatch.setattr(sweep, "_require_yaml", no_yaml)
+    json_as_yaml = tmp_path / "json.yaml"
+    json_as_yaml.write_text(json_file.read_text())
+    assert sweep.load(str(json_as_yaml)) == expected
+    with pytest.raises(ValueError, match="PyYAML"):
+        sweep.load(str(yaml_file))
+
+    monkeypatch.undo()
+    pytest.importorskip("yaml")
+    assert sweep.load(str(yaml_file)) == expected
+
+
+@pytest.mark.parametrize("text,match", [
+    ('{"parameter": {"lr": [1]}}', "neither"),
+    ('{"points": [], "extra": 1}', "Unknown keys"),
+    ('{"points": []}', "no points"),
+])
+def test_load_rejects_bad_files(tmp_path, text, match):
+    path = tmp_path / "sweep.json"
+    path.write_text(text)
+    with pytest.raises(ValueError, match=match):
+        sweep.load(str(path))
+
+
+def test_substitute_only_replaces_parameters():
+    point = {"lr": "0.1", "x.y": "z"}
+    assert sweep.substitute("--lr={lr} {x.y} {other} {{lr}}", point) == "--lr=0.1 z {other} {0.1}"
+    assert sweep.substitute("{lr}", {}) == "{lr}"
+
+
+def test_slurm_sweep_from_the_command_line(tmp_path, stub_bin):
+    (tmp_path / "sweep.json").write_text(
+        '{"parameters": {"lr": [0.1, 0.01]}, "points": [{"lr": "a b"}]}'
+    )
+    proc = subprocess.run(
+        LAUNCH + ["--scheduler", "slurm", "-N", "2", "-n", "1", "-l", "run",
+                  "--sweep", "sweep.json", "--", "echo", "lr={lr}"],
+        capture_output=True, universal_newlines=True, cwd=str(tmp_path),
+        env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert "4242_0 .. 4242_2 (3 points)" in proc.stdout
+    run = tmp_path / "run"
+    # One submission for the whole sweep
+    assert (stub_bin / "sbatch.args").read_text().split() == [
+        "--array=0-2", str(run / "array.sh")
+    ]
+    array_script = (run / "array.sh").read_text()
+    assert f"#SBATCH --output={run}/point-%a/out.log" in array_script
+    assert "#SBATCH --nodes=2" in array_script
+    mapping = json.loads((run / "sweep.json").read_text())
+    assert [(p["folder"], p["parameters"]["lr"], p["job_id"]) for p in mapping["points"]] == [
+        ("point-0", "0.1", "4242_0"), ("point-1", "0.01", "4242_1"), ("point-2", "a b", "4242_2"),
+    ]
+    # Each point's script is the one a single --bg launch would write.
+    point = (run / "point-2" / "launch.sh").read_text()
+    assert f"#SBATCH --output={run}/point-2/out.log" in point
+    assert f"#SBATCH --chdir={run}/point-2" in point
+    assert "'lr=a b'" in point
+
+    # An element runs its own point from its own folder.
+    element = subprocess.run(
+        ["sh", str(run / "array.sh")], capture_output=True, universal_newlines=True,
+        env=dict(os.environ, SLURM_ARRAY_TASK_ID="1"),
+    )
+    assert element.returncode == 0, element.stderr
+    assert element.stdout == "lr=0.01\n"
+
+
+@pytest.mark.parametrize("scheduler_class,command,index_variable,job_ids", [
+    (FluxScheduler, "flux batch --cc=0-2", "FLUX_JOB_CC", ["f001", "f002", "f003"]),
+    (LSFScheduler, "bsub -J sweep[1-3]", "LSB_JOBINDEX", ["77[1]", "77[2]", "77[3]"]),
+])
+def test_one_submission_per_sweep(tmp_path, stub_bin, stub_system, monkeypatch,
+                                  scheduler_class, command, index_variable, job_ids):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("LSB_HOSTS", raising=False)
+    scheduler = scheduler_class(nodes=1, procs_per_node=2, gpus_per_proc=0)
+    result = sweep.submit(scheduler, stub_system, "run", "echo", ["{n}"],
+                          sweep.expand({"n": [1, 2, 3]}))
+    assert result.returncode is None
+    assert result.job_ids == job_ids
+    submitted = (stub_bin / f"{command.split()[0]}.args").read_text().split()
+    assert " ".join(submitted) == " ".join(command.split()[1:] + [str(tmp_path / "run" / "array.sh")])
+    indices = scheduler.array_indices(3)
+    assert sorted(os.listdir(tmp_path / "run")) == sorted(
+        ["array.sh", "sweep.json"] + [f"point-{i}" for i in indices]
+    )
+    assert f'point-"${{{index_variable}}}"' in (tmp_path / "run" / "array.sh").read_text()
+    # The scheduler the caller passed is left as it was.
+    assert scheduler.work_dir is None and scheduler.out_log_file is None
+
+
+def test_failed_submission(tmp_path, stub_bin, stub_system, monkeypatch):
+    (stub_bin / "sbatch").write_text("#!/bin/sh\necho 'sbatch: error: invalid partition' >&2\nexit 1\n")
+    monkeypatch.chdir(tmp_path)
+    result = sweep.submit(SlurmScheduler(nodes=1, procs_per_node=1, gpus_per_proc=0),
+                          stub_system, "run", "echo", ["{n}"], sweep.expand({"n": [1, 2]}))
+    assert result.returncode == 1 and result.job_ids == []
+    mapping = json.loads((tmp_path / "run" / "sweep.json").read_text())
+    assert [p.get("job_id") for p in mapping["points"]] == [None, None]
+
+
+def test_setup_only_and_dry_run_submit_nothing(tmp_path, stub_bin, stub_system, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    points = sweep.expand({"n": [1, 2]})
+    scheduler = SlurmScheduler(nodes=1, procs_per_node=1, gpus_per_proc=0)
+    assert sweep.submit(scheduler, stub_system, "setup", "echo", ["{n}"], points,
+                        setup_only=True).returncode == 0
+    assert (tmp_path / "setup" / "point-1" / "launch.sh").exists()
+    assert sweep.submit(scheduler, stub_system, "dry", "echo", ["{n}"], points,
+                        dry_run=True).returncode == 0
+    assert not (tmp_path / "dry").exists()
+    assert not (stub_bin / "sbatch.args").exists()
+
+
+def test_local_schedulers_cannot_sweep(tmp_path):
+    (tmp_path / "sweep.json").write_text('{"points": [{"n": 1}]}')
+    proc = subprocess.run(
+        LAUNCH + ["--scheduler", "local", "-N", "1", "-n", "1", "--sweep", "sweep.json",
+                  "--dry-run", "echo", "{n}"],
+        capture_output=True, universal_newlines=True, cwd=str(tmp_path),
+        env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+    )
+    assert proc.returncode != 0
+    assert "job array" in proc.stderr
@@ -0,0 +1,114 @@
+# Copyright (c) 2014-2025, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory.
+# Written by the LBANN Research Team (B. Van Essen, et al.) listed in
+# the CONTRIBUTORS file. See the top-level LICENSE file for details.
+#
+# LLNL-CODE-697807.
+# All rights reserved.
+#
+# This file is part of LBANN: Livermore Big Artificial Neural Network
+# Toolkit. For details, see http://software.llnl.gov/LBANN or
+# https://github.com/LBANN and https://github.com/LLNL/LBANN.
+#
+# SPDX-License-Identifier: (Apache-2.0)
+"""
+Tests for ``--timeline``: the Chrome trace of a launch's phases written to
+``timeline.json``, including the rank fragments the trampoline leaves for
+the launcher to merge.
+"""
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+from hpc_launcher.runtime import timeline
+from hpc_launcher.runtime.timeline import FirstOutputTap, Timeline
+
+LAUNCH = [sys.executable, "-m", "hpc_launcher.cli.launch"]
+
+
+@pytest.fixture
+def launcher_timeline(monkeypatch):
+    monkeypatch.setattr(timeline, "_current", None)
+    return timeline.start("launch")
+
+
+def _trace(path):
+    return json.loads(path.read_text())["traceEvents"]
+
+
+def test_phases_are_complete_events_on_the_wall_clock(launcher_timeline):
+    before = time.time()
+    with timeline.phase("parse arguments", argv=3):
+        time.sleep(0.01)
+    span = launcher_timeline.events[-1]
+    assert span["ph"] == "X" and span["name"] == "parse arguments"
+    assert span["dur"] >= 10000 and span["args"] == {"argv": 3}
+    assert abs(span["ts"] / 1e6 - before) < 1.0
+    startup = [e for e in launcher_timeline.events if e["name"] == "interpreter start-up and imports"]
+    assert startup and startup[0]["ts"] < span["ts"]
+
+
+def test_phase_without_a_timeline_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(timeline, "_current", None)
+    with timeline.phase("anything"):
+        pass
+    assert timeline.save("/nonexistent") is None
+
+
+def test_first_output_is_recorded_once():
+    trace = Timeline("launch")
+    tap = FirstOutputTap(trace, "out")
+    tap.write(b"hello\n")
+    tap.write(b"again\n")
+    assert [e["name"] for e in trace.events if e["ph"] == "i"] == ["first output (out)"]
+
+
+def test_save_merges_rank_fragments(tmp_path, launcher_timeline):
+    with timeline.phase("run job"):
+        rank = Timeline("torchrun-hpc rank")
+        rank.record_startup()  # this process was created before the job span
+        rank.events[-1]["ts"] = round(time.time() * 1e6)
+        rank.set_process_name("rank 3", pid=4)
+        with rank.phase("init_process_group"):
+            pass
+        rank.write(str(tmp_path / "timeline.rank3.json"))
+
+    timeline.save(str(tmp_path))
+    events = _trace(tmp_path / "timeline.json")
+    assert not (tmp_path / "timeline.rank3.json").exists()
+    assert {e["pid"] for e in events if e["name"] == "init_process_group"} == {4}
+    assert {"name": "process_name", "ph": "M", "pid": 4, "args": {"name": "rank 3"}} in events
+    queue = [e for e in events if e["name"] == "queue wait and process start"]
+    job = [e for e in events if e["name"] == "run job"][0]
+    assert queue and queue[0]["ts"] == job["ts"]
+
+
+def test_launch_writes_timeline_json(tmp_path):
+    launch_dir = tmp_path / "run"
+    proc = subprocess.run(
+        LAUNCH + ["--local", "-N1", "-l", str(launch_dir), "--timeline",
+                  "--", sys.executable, "-c", "print('hi')"],
+        capture_output=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    events = _trace(launch_dir / "timeline.json")
+    names = [e["name"] for e in events]
+    for phase in ("interpreter start-up and imports", "parse arguments",
+                  "autodetect_current_system", "generate launch script",
+                  "run job", "first output (out)"):
+        assert phase in names
+    spans = [e for e in events if e["ph"] == "X"]
+    assert all(e["dur"] >= 0 for e in spans)
+
+
+def test_timeline_requires_a_launch_directory(tmp_path):
+    proc = subprocess.run(
+        LAUNCH + ["--local", "-N1", "--timeline", "--", "true"],
+        capture_output=True,
+        cwd=tmp_path,
+    )
+    assert proc.returncode != 0
+    assert b"--timeline" in proc.stderr